@@ -3,13 +3,34 @@
 // --- Config moteurs --- (Av droit / Av gauche / Ar droit / Ar gauche)
 const int dirPower[4] = {4, 2, 5, 3}; //PIN PWM pour moteur
 
-struct Motor { int pinForward; int pinBackward; int pinPWM; };
+// slot: index de la roue dans la télémétrie (0=AvG, 1=AvD, 2=ArG, 3=ArD)
+struct Motor { int pinForward; int pinBackward; int pinPWM; int slot; };
 
 // Définition des moteurs 
-Motor frontRight = {44, 45, 4}; 
-Motor frontLeft = {52, 53, 2}; 
-Motor backRight = {41, 40, 5}; 
-Motor backLeft = {49, 48, 3};
+Motor frontRight = {44, 45, 4, 1}; 
+Motor frontLeft = {52, 53, 2, 0}; 
+Motor backRight = {41, 40, 5, 3}; 
+Motor backLeft = {49, 48, 3, 2};
+
+// --- Encodeurs --- (AvG / AvD / ArG / ArD), à adapter au câblage
+// canal A sur une broche d'interruption, canal B lu pour le sens
+const int encA[4] = {18, 19, 20, 21};
+const int encB[4] = {34, 35, 36, 37};
+volatile long encTicks[4] = {0, 0, 0, 0};
+
+// --- Télémétrie ---
+int lastPwm[4] = {0, 0, 0, 0};        // dernière consigne signée par roue
+unsigned long telemPeriodMs = 0;      // 0 = désactivée (commande TELEM <ms>)
+unsigned long lastTelemMs = 0;
+unsigned long lastLoopUs = 0;
+unsigned long loopMaxUs = 0;          // pire durée de boucle depuis la dernière trame
+
+// --- Chien de garde --- moteurs coupés si aucune commande pendant cmdTimeoutMs
+unsigned long cmdTimeoutMs = 0;       // 0 = désactivé (commande WDT <ms>)
+unsigned long lastCmdMs = 0;
+
+// --- Arrêt d'urgence --- ESTOP coupe et verrouille les moteurs jusqu'à RESUME
+bool estopLatched = false;
 
 // --- Config moteurs DRV8825 (exemple avec 3 moteurs) ---
 const int dirPins[3]  = {22, 24, 26};  // DIR pour NEMA
@@ -58,8 +79,27 @@ void setup() {
   pinMode(frontLeft.pinPWM, OUTPUT); 
   pinMode(backRight.pinPWM, OUTPUT); 
   pinMode(backLeft.pinPWM, OUTPUT);
+
+  // Config encodeurs
+  for (int i=0; i<4; i++) {
+    pinMode(encA[i], INPUT_PULLUP);
+    pinMode(encB[i], INPUT_PULLUP);
+  }
+  attachInterrupt(digitalPinToInterrupt(encA[0]), encoderISR0, RISING);
+  attachInterrupt(digitalPinToInterrupt(encA[1]), encoderISR1, RISING);
+  attachInterrupt(digitalPinToInterrupt(encA[2]), encoderISR2, RISING);
+  attachInterrupt(digitalPinToInterrupt(encA[3]), encoderISR3, RISING);
 }
 
+// ===============================
+// ENCODEURS
+// ===============================
+
+void encoderISR0() { encTicks[0] += digitalRead(encB[0]) ? -1 : 1; }
+void encoderISR1() { encTicks[1] += digitalRead(encB[1]) ? -1 : 1; }
+void encoderISR2() { encTicks[2] += digitalRead(encB[2]) ? -1 : 1; }
+void encoderISR3() { encTicks[3] += digitalRead(encB[3]) ? -1 : 1; }
+
 
 // ===============================
 // FONCTIONS DE BASE
@@ -67,6 +107,7 @@ void setup() {
 
 // Commande un moteur avec une vitesse (-255 à +255)
 void setMotor(Motor m, int speed) {
+  lastPwm[m.slot] = speed;
   if (speed > 0) {
     digitalWrite(m.pinForward, HIGH);
     digitalWrite(m.pinBackward, LOW);
@@ -168,15 +209,105 @@ void backwardLeft(int speed) {
   setMotor(backLeft, 0);
 }
 
+// Vitesse continue (cinématique inverse mécanum), unités PWM -255..255
+// vx: avant, vy: gauche, omega: anti-horaire. Si une roue dépasse 255,
+// les quatre sont réduites dans la même proportion (direction conservée).
+void velocity(int vx, int vy, int omega) {
+  long fl = (long)vx - vy - omega;
+  long fr = (long)vx + vy + omega;
+  long bl = (long)vx + vy - omega;
+  long br = (long)vx - vy + omega;
+  long peak = max(max(labs(fl), labs(fr)), max(labs(bl), labs(br)));
+  if (peak > 255) {
+    fl = fl * 255 / peak;
+    fr = fr * 255 / peak;
+    bl = bl * 255 / peak;
+    br = br * 255 / peak;
+  }
+  setMotor(frontLeft, fl);
+  setMotor(frontRight, fr);
+  setMotor(backLeft, bl);
+  setMotor(backRight, br);
+}
+
 
 
 
 
 
+// ===============================
+// RÉPONSES
+// ===============================
+
+// Numéro de séquence de la commande en cours (-1 si la commande n'est pas préfixée)
+long cmdSeq = -1;
+
+// Répond "OK" ou "OK <seq>" pour que l'émetteur associe la réponse à sa commande
+void reply(const char* status) {
+  Serial.print(status);
+  if (cmdSeq >= 0) {
+    Serial.print(' ');
+    Serial.print(cmdSeq);
+  }
+  Serial.println();
+}
+
+// Trame de télémétrie (texte, une ligne, somme de contrôle XOR façon NMEA):
+// T <millis> <boucle_max_us> <pwm AvG AvD ArG ArD> <ticks AvG AvD ArG ArD>*HH
+// ~50 octets: à 9600 bauds, ~52 ms de liaison par trame.
+void sendTelemetry() {
+  if (telemPeriodMs == 0) return;
+  unsigned long nowMs = millis();
+  if (nowMs - lastTelemMs < telemPeriodMs) return;
+  lastTelemMs = nowMs;
+
+  long ticks[4];
+  noInterrupts();
+  for (int i=0; i<4; i++) ticks[i] = encTicks[i];
+  interrupts();
+
+  char buf[112];
+  int n = snprintf(buf, sizeof(buf), "T %lu %lu %d %d %d %d %ld %ld %ld %ld",
+                   nowMs, loopMaxUs, lastPwm[0], lastPwm[1], lastPwm[2], lastPwm[3],
+                   ticks[0], ticks[1], ticks[2], ticks[3]);
+  byte checksum = 0;
+  for (int i=0; i<n; i++) checksum ^= buf[i];
+  Serial.print(buf);
+  Serial.print('*');
+  if (checksum < 16) Serial.print('0');
+  Serial.println(checksum, HEX);
+  loopMaxUs = 0;
+}
+
+// Silence de l'hôte (liaison coupée, Pi planté): arrêt des moteurs, signalé par "WDT"
+void checkWatchdog() {
+  if (cmdTimeoutMs == 0 || millis() - lastCmdMs < cmdTimeoutMs) return;
+  if (lastPwm[0] == 0 && lastPwm[1] == 0 && lastPwm[2] == 0 && lastPwm[3] == 0) return;
+  stopAll();
+  Serial.println("WDT");
+}
+
 void loop() {
+  unsigned long nowUs = micros();
+  if (lastLoopUs != 0 && nowUs - lastLoopUs > loopMaxUs) loopMaxUs = nowUs - lastLoopUs;
+  lastLoopUs = nowUs;
+  sendTelemetry();
+  checkWatchdog();
+
   if (Serial.available()) {
     String cmd = Serial.readStringUntil('\n');
     cmd.trim();
+    lastCmdMs = millis();
+
+    // --- Préfixe optionnel "#<seq> " (traçage de latence) ---
+    cmdSeq = -1;
+    if (cmd.startsWith("#")) {
+      int sp = cmd.indexOf(' ');
+      if (sp > 0) {
+        cmdSeq = cmd.substring(1, sp).toInt();
+        cmd = cmd.substring(sp + 1);
+      }
+    }
 
     // --- Ports numériques ---
     if (cmd.startsWith("SET_PIN")) {
@@ -184,7 +315,7 @@ void loop() {
       int state = cmd.substring(cmd.indexOf(' ',8)+1).toInt();
       pinMode(pin, OUTPUT);
       digitalWrite(pin, state);
-      Serial.println("OK");
+      reply("OK");
     }
 
     // --- Ports analogiques (PWM) ---
@@ -193,7 +324,24 @@ void loop() {
       int value = cmd.substring(cmd.indexOf(' ',8)+1).toInt();
       pinMode(pin, OUTPUT);
       analogWrite(pin, value); // 0-255
-      Serial.println("OK");
+      reply("OK");
+    }
+
+    // --- Arrêt d'urgence (prioritaire côté Pi), verrouillé jusqu'à RESUME ---
+    else if (cmd == "ESTOP") {
+      stopAll();
+      estopLatched = true;
+      reply("OK");
+    }
+    else if (cmd == "RESUME") {
+      estopLatched = false;
+      reply("OK");
+    }
+
+    // --- Mouvements refusés tant que l'arrêt d'urgence est verrouillé ---
+    else if (estopLatched && (cmd.startsWith("VEL") || (cmd.startsWith("MOVE") && cmd.indexOf("stop") < 0))) {
+      stopAll();
+      reply("ERR_ESTOP");
     }
 
     // --- Deplacement ---
@@ -203,7 +351,7 @@ void loop() {
       int secondSpace = cmd.indexOf(' ', firstSpace + 1);
     
       if (firstSpace < 0 || secondSpace < 0) {
-        Serial.println("ERR");
+        reply("ERR");
         return;
       }
     
@@ -227,10 +375,41 @@ void loop() {
       else if (movingDirection == "stop") stopAll();
     
       else {
-        Serial.println("ERR_UNKNOWN_MOVE");
+        reply("ERR_UNKNOWN_MOVE");
+        return;
+      }
+      reply("OK");
+    }
+
+    // --- Battement de cœur de l'hôte (réarme le chien de garde) ---
+    else if (cmd == "PING") {
+      reply("OK");
+    }
+
+    // --- Chien de garde: WDT <délai_ms> (0 = désactivé) ---
+    else if (cmd.startsWith("WDT")) {
+      long timeout = cmd.substring(4).toInt();
+      cmdTimeoutMs = constrain(timeout, 0, 10000);
+      reply("OK");
+    }
+
+    // --- Télémétrie: TELEM <période_ms> (0 = arrêt) ---
+    else if (cmd.startsWith("TELEM")) {
+      long period = cmd.substring(6).toInt();
+      telemPeriodMs = constrain(period, 0, 10000);
+      lastTelemMs = 0;
+      reply("OK");
+    }
+
+    // --- Vitesse continue: VEL <vx> <vy> <omega> ---
+    else if (cmd.startsWith("VEL")) {
+      int vx, vy, omega;
+      if (sscanf(cmd.c_str(), "VEL %d %d %d", &vx, &vy, &omega) != 3) {
+        reply("ERR");
         return;
       }
-      Serial.println("OK");
+      velocity(constrain(vx, -255, 255), constrain(vy, -255, 255), constrain(omega, -255, 255));
+      reply("OK");
     }
 
 
@@ -246,7 +425,7 @@ void loop() {
         digitalWrite(stepPins[motor], LOW);
         delayMicroseconds(500);
       }
-      Serial.println("OK");
+      reply("OK");
     }
 
     // --- 28BYJ-48 ---
@@ -259,7 +438,7 @@ void loop() {
         }
         delay(1); // ajuste la vitesse
       }
-      Serial.println("OK");
+      reply("OK");
     }
   }
 } 
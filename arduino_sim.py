@@ -0,0 +1,240 @@
+"""
+Fichier: arduino_sim.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Port série simulé qui se comporte comme l'Arduino (`PEI_-_Code_Arduino.ino`),
+adossé à `robot_simulation.MecanumSimulation`.
+
+Interface compatible pyserial pour ce qu'utilisent control_robot et telemetry:
+`write`, `read`, `readline`, `in_waiting`, `reset_input_buffer`, `close`.
+Commandes reconnues: préfixe `#<seq>`, `MOVE`, `VEL`, `TELEM`, `PING`, `WDT`,
+`ESTOP` / `RESUME` (mouvements refusés `ERR_ESTOP` entre les deux);
+réponse `OK[ seq]` ou `ERR...[ seq]` comme le firmware. Avec `TELEM <ms>` actif,
+des trames `T ...*HH` s'intercalent entre les réponses; avec `WDT <ms>`, les
+moteurs sont coupés après ce délai sans commande et la ligne `WDT` est émise.
+
+Le temps avance selon `clock` (par défaut time.monotonic); un test peut fournir
+une horloge factice et appeler `advance()` pour un déroulement déterministe.
+
+`DelayedArduino` ajoute une latence fixe à chaque écriture (liaison série lente)
+en conservant l'ordre des commandes.
+"""
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from command_trace import parse_tagged
+from robot_motion import MOVE_DIRECTIONS
+from robot_simulation import MecanumSimulation
+from telemetry import TelemetryFrame, format_telemetry
+
+
+class SimulatedArduino:
+    def __init__(self, simulation: Optional[MecanumSimulation] = None, timeout: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic, tick_hz: float = 100.0,
+                 loop_us: int = 1200):
+        self.sim = simulation or MecanumSimulation(tick_hz=tick_hz, script=())
+        self.timeout = timeout
+        self.clock = clock
+        self.loop_us = loop_us
+        self.telem_period = 0.0
+        self.cmd_timeout = 0.0
+        self.watchdog_trips = 0
+        self.estop_latched = False
+        self.commands = []
+        self._rx = bytearray()   # octets envoyés par l'hôte, pas encore traités
+        self._tx = bytearray()   # octets à lire par l'hôte
+        self._cond = threading.Condition()
+        self._t0 = clock()
+        self._last = self._t0
+        self._last_telem = None
+        self._last_cmd = self._t0
+        self.is_open = True
+
+    # --- temps simulé ----------------------------------------------------------------
+
+    def millis(self) -> int:
+        return int((self._last - self._t0) * 1000.0)
+
+    def advance(self, seconds: float) -> None:
+        """Fait avancer l'Arduino de `seconds` (pas de la simulation), trames comprises."""
+        with self._cond:
+            self._advance_to(self._last + seconds)
+
+    def _pump(self) -> None:
+        self._advance_to(self.clock())
+
+    def _advance_to(self, now: float) -> None:
+        dt = 1.0 / self.sim.tick_hz
+        while self._last + dt <= now:
+            self.sim.step(dt)
+            self._last += dt
+            self._maybe_telemetry()
+            self._check_watchdog()
+        if self._tx:
+            self._cond.notify_all()
+
+    def _maybe_telemetry(self) -> None:
+        if self.telem_period <= 0:
+            return
+        if self._last_telem is not None and self._last - self._last_telem < self.telem_period - 1e-9:
+            return
+        self._last_telem = self._last
+        self._tx.extend((format_telemetry(self.telemetry_frame()) + "\r\n").encode())
+
+    def _check_watchdog(self) -> None:
+        if not self.cmd_timeout or self._last - self._last_cmd < self.cmd_timeout:
+            return
+        if not self.sim.target_rpm.any():
+            return
+        self.sim.set_wheel_pwm((0, 0, 0, 0))
+        self.watchdog_trips += 1
+        self._tx.extend(b"WDT\r\n")
+
+    def telemetry_frame(self) -> TelemetryFrame:
+        pwm = np.rint(self.sim.target_rpm / self.sim.max_rpm * 255.0).astype(int)
+        ticks = self.sim.encoder.astype(np.int64)
+        return TelemetryFrame(self.millis(), self.loop_us, tuple(int(p) for p in pwm), tuple(int(t) for t in ticks))
+
+    # --- interprétation des commandes --------------------------------------------------
+
+    def _execute(self, line: str) -> None:
+        seq, cmd = parse_tagged(line)
+        if not cmd:
+            return
+        self.commands.append(cmd)
+        self._last_cmd = self._last
+        parts = cmd.split()
+        status = "OK"
+        try:
+            if parts[0] == "ESTOP":
+                self.sim.set_wheel_pwm((0, 0, 0, 0))
+                self.estop_latched = True
+            elif parts[0] == "RESUME":
+                self.estop_latched = False
+            elif self.estop_latched and (parts[0] == "VEL" or (parts[0] == "MOVE" and "stop" not in parts)):
+                self.sim.set_wheel_pwm((0, 0, 0, 0))
+                status = "ERR_ESTOP"
+            elif parts[0] == "MOVE" and len(parts) == 3:
+                if parts[1] in MOVE_DIRECTIONS:
+                    self.sim.command(parts[1], int(parts[2]))
+                else:
+                    status = "ERR_UNKNOWN_MOVE"
+            elif parts[0] == "VEL" and len(parts) == 4:
+                self.sim.set_velocity(*(int(p) for p in parts[1:]))
+            elif parts[0] == "TELEM":
+                period_ms = max(0, min(10000, int(parts[1]) if len(parts) > 1 else 0))
+                self.telem_period = period_ms / 1000.0
+                self._last_telem = None
+            elif parts[0] == "PING" and len(parts) == 1:
+                pass
+            elif parts[0] == "WDT":
+                self.cmd_timeout = max(0, min(10000, int(parts[1]) if len(parts) > 1 else 0)) / 1000.0
+            else:
+                status = "ERR_UNKNOWN_CMD"
+        except ValueError:
+            status = "ERR_UNKNOWN_CMD"
+        reply = status if seq is None else f"{status} {seq}"
+        self._tx.extend((reply + "\r\n").encode())
+
+    # --- interface type pyserial ------------------------------------------------------
+
+    def write(self, data: bytes) -> int:
+        with self._cond:
+            self._pump()
+            self._rx.extend(data)
+            while True:
+                end = self._rx.find(b'\n')
+                if end < 0:
+                    break
+                line = self._rx[:end].decode(errors='ignore').strip()
+                del self._rx[:end + 1]
+                self._execute(line)
+            self._cond.notify_all()
+        return len(data)
+
+    @property
+    def in_waiting(self) -> int:
+        with self._cond:
+            self._pump()
+            return len(self._tx)
+
+    def _wait(self, ready: Callable[[], bool]) -> None:
+        deadline = self.clock() + (self.timeout or 0.0)
+        self._pump()
+        while not ready() and self.is_open:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                break
+            # réveil régulier pour faire avancer la simulation (trames de télémétrie)
+            self._cond.wait(min(remaining, 1.0 / self.sim.tick_hz))
+            self._pump()
+
+    def read(self, size: int = 1) -> bytes:
+        with self._cond:
+            self._wait(lambda: len(self._tx) >= size)
+            data = bytes(self._tx[:size])
+            del self._tx[:size]
+        return data
+
+    def readline(self) -> bytes:
+        with self._cond:
+            self._wait(lambda: b'\n' in self._tx)
+            end = self._tx.find(b'\n')
+            end = len(self._tx) if end < 0 else end + 1
+            data = bytes(self._tx[:end])
+            del self._tx[:end]
+        return data
+
+    def reset_input_buffer(self) -> None:
+        with self._cond:
+            self._tx.clear()
+
+    def close(self) -> None:
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
+
+
+class DelayedArduino(SimulatedArduino):
+    """
+    Chaque écriture n'atteint l'Arduino qu'après `delay` secondes, dans l'ordre
+    d'écriture (un seul thread de livraison, comme sur le câble).
+    `in_flight` / `max_in_flight`: lignes écrites dont la réponse n'a pas encore été lue.
+    """
+    def __init__(self, delay: float, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._pending: 'queue.Queue[Optional[tuple]]' = queue.Queue()
+        threading.Thread(target=self._deliver, daemon=True).start()
+
+    def write(self, data: bytes) -> int:
+        self.in_flight += data.count(b'\n')
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self._pending.put((time.monotonic() + self.delay, data))
+        return len(data)
+
+    def _deliver(self) -> None:
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            due, data = item
+            time.sleep(max(0.0, due - time.monotonic()))
+            super().write(data)
+
+    def readline(self) -> bytes:
+        line = super().readline()
+        if line:
+            self.in_flight -= 1
+        return line
+
+    def close(self) -> None:
+        self._pending.put(None)
+        super().close()
@@ -0,0 +1,130 @@
+"""
+File: `aruco_benchmark.py`
+Author: Hugo Demont
+Version: 1.0.0
+
+Banc de mesure du pipeline de `pos_estimation` (MarkerDetector + detect_and_estimate)
+sur un corpus synthétique reproductible produit par `post_estimation_test_no_cam.py`:
+
+    python post_estimation_test_no_cam.py --corpus bench_corpus --count 200 --seed 0
+    python aruco_benchmark.py --corpus bench_corpus --json resultats.json
+
+Rapporte le rappel de détection, les faux positifs, l'erreur de pose
+(translation en mm, rotation en degrés, coins en px) et le débit (FPS).
+Les images sont chargées en mémoire avant la mesure: seul le pipeline est chronométré.
+"""
+from __future__ import print_function
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from pos_estimation import ARUCO_DICT, MarkerDetector, detect_and_estimate
+
+
+def load_corpus(corpus_dir):
+    with open(os.path.join(corpus_dir, 'ground_truth.json')) as f:
+        meta = json.load(f)
+    frames = []
+    for entry in meta['frames']:
+        img = cv2.imread(os.path.join(corpus_dir, entry['file']))
+        if img is None:
+            raise IOError(f"Image manquante dans le corpus: {entry['file']}")
+        frames.append(img)
+    return meta, frames
+
+
+def rotation_error_deg(rvec_true, rvec_est):
+    r_true = cv2.Rodrigues(np.asarray(rvec_true, dtype=np.float64))[0]
+    r_est = cv2.Rodrigues(np.asarray(rvec_est, dtype=np.float64))[0]
+    cos = (np.trace(r_true.T @ r_est) - 1.0) / 2.0
+    return float(np.degrees(np.arccos(np.clip(cos, -1.0, 1.0))))
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if values else float('nan')
+
+
+def run_benchmark(meta, frames, repeats=1, detector=None):
+    """
+    Exécute le pipeline sur toutes les images (`repeats` passes pour le débit)
+    et compare la première passe à la vérité terrain.
+    """
+    detector = detector or MarkerDetector(meta['dict'])
+    mtx = np.array(meta['camera_matrix'], dtype=np.float64)
+    dist = np.array(meta['dist'], dtype=np.float64)
+    size = float(meta['marker_size'])
+
+    results = []
+    t0 = time.perf_counter()
+    for r in range(repeats):
+        for frame in frames:
+            out = detect_and_estimate(detector, frame, size, mtx, dist)
+            if r == 0:
+                results.append(out)
+    elapsed = time.perf_counter() - t0
+
+    n_truth = n_found = n_false = 0
+    trans_err, rot_err, corner_err = [], [], []
+    for entry, (corners, ids, rvecs, tvecs) in zip(meta['frames'], results):
+        truth = {m['id']: m for m in entry['markers']}
+        n_truth += len(truth)
+        if ids is None:
+            continue
+        for i, mid in enumerate(ids.flatten()):
+            gt = truth.get(int(mid))
+            if gt is None:
+                n_false += 1
+                continue
+            n_found += 1
+            trans_err.append(1000.0 * float(np.linalg.norm(tvecs[i][0] - np.asarray(gt['tvec']))))
+            rot_err.append(rotation_error_deg(gt['rvec'], rvecs[i][0]))
+            corner_err.append(float(np.abs(corners[i].reshape(4, 2) - np.asarray(gt['corners'])).max()))
+
+    n_frames = len(frames) * repeats
+    return {
+        'frames': len(frames),
+        'markers': n_truth,
+        'detected': n_found,
+        'recall': n_found / n_truth if n_truth else float('nan'),
+        'false_positives': n_false,
+        'translation_error_mm': {'median': _percentile(trans_err, 50), 'p95': _percentile(trans_err, 95)},
+        'rotation_error_deg': {'median': _percentile(rot_err, 50), 'p95': _percentile(rot_err, 95)},
+        'corner_error_px': {'median': _percentile(corner_err, 50), 'p95': _percentile(corner_err, 95)},
+        'fps': n_frames / elapsed if elapsed > 0 else float('inf'),
+        'ms_per_frame': 1000.0 * elapsed / n_frames if n_frames else float('nan'),
+        'opencv': cv2.__version__,
+    }
+
+
+def print_report(res):
+    print(f"Images: {res['frames']} | Marqueurs: {res['markers']} | Détectés: {res['detected']}"
+          f" | Rappel: {res['recall']:.3f} | Faux positifs: {res['false_positives']}")
+    for key, unit in (('translation_error_mm', 'mm'), ('rotation_error_deg', '°'), ('corner_error_px', 'px')):
+        print(f"{key:22s} médiane {res[key]['median']:.2f} {unit} | p95 {res[key]['p95']:.2f} {unit}")
+    print(f"Débit: {res['fps']:.1f} FPS ({res['ms_per_frame']:.2f} ms/image, OpenCV {res['opencv']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du détecteur ArUco sur corpus synthétique")
+    parser.add_argument("--corpus", required=True, help="Dossier généré par post_estimation_test_no_cam.py --corpus")
+    parser.add_argument("--repeats", type=int, default=1, help="Nombre de passes pour la mesure du débit")
+    parser.add_argument("--json", default=None, help="Écrire les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+
+    meta, frames = load_corpus(args.corpus)
+    if meta['dict'] not in ARUCO_DICT:
+        print("[ERROR] Dictionnaire inconnu dans le corpus:", meta['dict'])
+        return
+    res = run_benchmark(meta, frames, repeats=args.repeats)
+    print_report(res)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Fichier: bench/bench_common.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Outils partagés des bancs de mesure de `bench/`: percentiles, métadonnées
+d'exécution (version Python, commit git) et écriture/comparaison des résultats JSON.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def percentiles(values, qs=(50, 90, 99, 99.9)):
+    """Percentiles (mêmes unités que `values`) + max; dict vide si aucune valeur."""
+    if not values:
+        return {}
+    data = sorted(values)
+    out = {}
+    for q in qs:
+        k = min(len(data) - 1, int(round(q / 100.0 * (len(data) - 1))))
+        out[f"p{q:g}"] = data[k]
+    out['max'] = data[-1]
+    out['mean'] = sum(data) / len(data)
+    return out
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ko sous Linux, octets sous macOS
+    return rss / (1024.0 * 1024.0) if sys.platform == 'darwin' else rss / 1024.0
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def run_metadata(bench_name, params):
+    return {
+        'bench': bench_name,
+        'params': params,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'git': git_revision(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def write_results(results, path=None):
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if path:
+        with open(path, 'w') as f:
+            f.write(text + '\n')
+        print(f"[INFO] Résultats écrits dans {path}")
+    else:
+        print(text)
+
+
+def _flatten(obj, prefix=''):
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            yield from _flatten(v, f"{prefix}{k}.")
+    elif isinstance(obj, list):
+        for i, v in enumerate(obj):
+            yield from _flatten(v, f"{prefix}{i}.")
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        yield prefix[:-1], float(obj)
+
+
+def compare_results(baseline, current, threshold=0.10):
+    """
+    Compare deux résultats (même banc) métrique par métrique. Retourne la liste
+    (métrique, référence, actuel, variation relative) des écarts supérieurs à `threshold`.
+    """
+    base = dict(_flatten(baseline.get('scenarios', baseline)))
+    cur = dict(_flatten(current.get('scenarios', current)))
+    diffs = []
+    for key in sorted(base.keys() & cur.keys()):
+        b, c = base[key], cur[key]
+        if b == 0:
+            continue
+        change = (c - b) / abs(b)
+        if abs(change) > threshold:
+            diffs.append((key, b, c, change))
+    return diffs
+
+
+def print_comparison(diffs):
+    if not diffs:
+        print("[INFO] Aucun écart significatif par rapport à la référence")
+        return
+    for key, b, c, change in diffs:
+        print(f"{key:60s} {b:12.4g} -> {c:12.4g} ({change:+.1%})")
@@ -0,0 +1,246 @@
+"""
+Fichier: bench/bench_gui_render.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Banc de rendu de `RobotInterface` sans écran: l'interface est construite sur un
+serveur X virtuel (Xvfb, lancé automatiquement si DISPLAY n'est pas défini) et
+alimentée par un flux d'états simulé (`robot_simulation`) ou rejoué depuis un
+enregistrement JSONL (`--record` / `--replay`).
+
+Mesures:
+- temps de chaque méthode de mise à jour (`_update_terrain`, `_update_sensors_panel`, ...)
+- cadence d'affichage atteinte (appels de `_update_display` par seconde)
+- retard de la boucle d'événements Tk (sonde `after` périodique: retard réel - attendu)
+
+Usage:
+    python bench/bench_gui_render.py --duration 10 --state-hz 200 --json gui.json
+    python bench/bench_gui_render.py --record etats.jsonl --duration 30   # enregistre le flux simulé
+    python bench/bench_gui_render.py --replay etats.jsonl --json gui.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import bench_common
+from robot_state import RobotStateManager
+
+PANEL_METHODS = (
+    '_update_display',
+    '_update_header',
+    '_update_terrain',
+    '_update_position_panel',
+    '_update_wheels_panel',
+    '_update_sensors_panel',
+    '_update_actuators_panel',
+    '_update_detection_panel',
+    '_update_camera_panel',
+)
+
+
+def ensure_display(screen='1280x1024x24'):
+    """
+    Retourne le processus Xvfb lancé (ou None si un DISPLAY existe déjà).
+    Lève RuntimeError si aucun affichage n'est disponible.
+    """
+    if os.environ.get('DISPLAY'):
+        return None
+    xvfb = shutil.which('Xvfb')
+    if xvfb is None:
+        raise RuntimeError("Pas de DISPLAY et Xvfb introuvable (apt install xvfb)")
+    for num in range(99, 120):
+        if os.path.exists(f'/tmp/.X{num}-lock'):
+            continue
+        proc = subprocess.Popen([xvfb, f':{num}', '-screen', '0', screen, '-nolisten', 'tcp'],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 5.0
+        while time.monotonic() < deadline:
+            if os.path.exists(f'/tmp/.X11-unix/X{num}'):
+                os.environ['DISPLAY'] = f':{num}'
+                return proc
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+        proc.kill()
+    raise RuntimeError("Impossible de démarrer Xvfb")
+
+
+def frame_from_state_dict(d):
+    """`RobotState.to_dict()` -> arguments de `RobotStateManager.update_frame`."""
+    pos = d['position']
+    return {
+        'position': (pos['x'], pos['y'], pos['theta']),
+        'linear_velocity': d['linear_velocity'],
+        'angular_velocity': d['angular_velocity'],
+        'wheel_states': [w['state'] for w in d['wheels']],
+        'wheel_speeds': [w['speed'] for w in d['wheels']],
+        'wheel_ticks': [w['encoder_ticks'] for w in d['wheels']],
+        'sensor_values': [s['value'] for s in d['sensors']],
+        'battery_level': d['battery_level'],
+        'aruco_ids': d['detected_aruco_ids'],
+    }
+
+
+def simulated_frames(seed=0, tick_hz=200.0):
+    from robot_simulation import MecanumSimulation
+    sim = MecanumSimulation(tick_hz=tick_hz, seed=seed)
+    while True:
+        sim.step()
+        yield sim.frame()
+
+
+def recorded_frames(path, loop=True):
+    with open(path) as f:
+        frames = [frame_from_state_dict(json.loads(line)) for line in f if line.strip()]
+    if not frames:
+        raise ValueError(f"Enregistrement vide: {path}")
+    while True:
+        yield from frames
+        if not loop:
+            return
+
+
+def record_stream(path, duration, state_hz=200.0, seed=0):
+    """Enregistre `duration` secondes de flux simulé (un état complet par ligne)."""
+    manager = RobotStateManager()
+    frames = simulated_frames(seed, state_hz)
+    with open(path, 'w') as f:
+        for _ in range(int(duration * state_hz)):
+            manager.update_frame(**next(frames))
+            f.write(json.dumps(manager.get_state().to_dict()) + '\n')
+    print(f"[INFO] {int(duration * state_hz)} états enregistrés dans {path}")
+
+
+class _Timed:
+    def __init__(self, fn):
+        self.fn = fn
+        self.samples = []
+
+    def __call__(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            self.samples.append(time.perf_counter() - t0)
+
+
+def run_benchmark(frames, duration=5.0, state_hz=200.0, interval_ms=None, probe_ms=10, withdraw=False):
+    import robot_interface  # import différé: après ensure_display
+    if interval_ms is not None:
+        robot_interface.UPDATE_INTERVAL_MS = interval_ms
+    manager = RobotStateManager()
+    ui = robot_interface.RobotInterface(manager)
+    if withdraw:
+        ui.root.withdraw()
+    timers = {}
+    for name in PANEL_METHODS:
+        if hasattr(ui, name):
+            timers[name] = _Timed(getattr(ui, name))
+            setattr(ui, name, timers[name])
+
+    stop = threading.Event()
+    produced = [0]
+
+    def producer():
+        period = 1.0 / state_hz if state_hz > 0 else 0.0
+        next_t = time.perf_counter()
+        for frame in frames:
+            if stop.is_set():
+                break
+            manager.update_frame(**frame)
+            produced[0] += 1
+            if period:
+                next_t += period
+                delay = next_t - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    lags = []
+    probe_s = probe_ms / 1000.0
+
+    def probe(expected):
+        now = time.perf_counter()
+        lags.append(max(0.0, now - expected))
+        ui.root.after(probe_ms, probe, time.perf_counter() + probe_s)
+
+    thread = threading.Thread(target=producer, daemon=True)
+    ui.root.update()  # premier affichage hors mesure
+    thread.start()
+    ui.root.after(probe_ms, probe, time.perf_counter() + probe_s)
+    ui.root.after(int(duration * 1000), ui.root.quit)
+    t0 = time.perf_counter()
+    ui.root.mainloop()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    thread.join(timeout=1.0)
+    ui.root.destroy()
+
+    display = timers.get('_update_display')
+    ms = lambda values: bench_common.percentiles([v * 1000.0 for v in values])
+    return {
+        'duration_s': elapsed,
+        'states_published': produced[0],
+        'states_per_s': produced[0] / elapsed,
+        'gui_fps': len(display.samples) / elapsed if display else None,
+        'update_interval_ms': robot_interface.UPDATE_INTERVAL_MS,
+        'panels_ms': {name: ms(t.samples) for name, t in timers.items() if t.samples},
+        'event_loop_lag_ms': ms(lags),
+        'max_rss_mb': bench_common.max_rss_mb(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de rendu de RobotInterface (Xvfb)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Durée de la mesure (s)")
+    parser.add_argument("--state-hz", type=float, default=200.0, help="Fréquence du flux d'états (0 = sans limite)")
+    parser.add_argument("--interval-ms", type=int, default=None,
+                        help="Remplace UPDATE_INTERVAL_MS de l'interface (défaut: valeur du module)")
+    parser.add_argument("--probe-ms", type=int, default=10, help="Période de la sonde de retard de la boucle Tk")
+    parser.add_argument("--seed", type=int, default=0, help="Graine de la simulation")
+    parser.add_argument("--replay", default=None, help="Rejouer un enregistrement JSONL au lieu de simuler")
+    parser.add_argument("--record", default=None, help="Enregistrer le flux simulé dans ce fichier et quitter")
+    parser.add_argument("--withdraw", action="store_true", help="Fenêtre non affichée (mesure sans dessin)")
+    parser.add_argument("--json", default=None, help="Écrire les résultats dans ce fichier (sinon sur stdout)")
+    parser.add_argument("--compare", default=None, help="Résultats de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Écart relatif signalé par --compare")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_stream(args.record, args.duration, args.state_hz or 200.0, args.seed)
+        return None
+
+    try:
+        xvfb = ensure_display()
+    except RuntimeError as e:
+        print("[ERROR]", e)
+        return None
+    try:
+        frames = recorded_frames(args.replay) if args.replay else simulated_frames(args.seed, args.state_hz or 200.0)
+        res = run_benchmark(frames, args.duration, args.state_hz, args.interval_ms, args.probe_ms, args.withdraw)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    lag = res['event_loop_lag_ms']
+    print(f"[INFO] GUI {res['gui_fps']:.1f} FPS | {res['states_per_s']:.0f} états/s | retard boucle Tk "
+          f"p50 {lag.get('p50', 0):.2f} ms p99 {lag.get('p99', 0):.2f} ms", flush=True)
+    for name, stats in sorted(res['panels_ms'].items(), key=lambda kv: -kv[1]['mean']):
+        print(f"    {name:26s} moy {stats['mean']:.3f} ms | p99 {stats['p99']:.3f} ms")
+
+    params = {k: v for k, v in vars(args).items() if k not in ('json', 'compare', 'threshold', 'record')}
+    results = {'meta': bench_common.run_metadata('gui_render', params), 'scenarios': {'render': res}}
+    if args.json or not args.compare:
+        bench_common.write_results(results, args.json)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        bench_common.print_comparison(bench_common.compare_results(baseline, results, args.threshold))
+    return results
+
+
+if __name__ == "__main__":
+    main()
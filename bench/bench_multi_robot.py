@@ -0,0 +1,180 @@
+"""
+Fichier: bench/bench_multi_robot.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Banc du suivi multi-robots (robot_registry.py), chaque robot à `--hz` trames/s:
+
+    original  un robot, `TelemetryDecoder`, terrain effacé et recréé à chaque
+              rafraîchissement (`_update_terrain` d'avant `TerrainSprites`)
+    single    un robot, `TelemetryDecoder`, terrain par `TerrainSprites`
+    fleet     N robots sur un flux multiplexé (`MultiTelemetryDecoder` +
+              `RobotRegistry`), terrain par `TerrainSprites`
+
+Chaque trame: une ligne de télémétrie et une mise à jour de pose. À chaque
+rafraîchissement de l'interface (`UPDATE_INTERVAL_MS`), le terrain est redessiné
+sur un canevas factice qui compte les appels: le coût Tk réel est mesuré par
+bench_gui_render.py.
+
+Mesures par scénario: µs par trame ingérée, µs et appels canevas par
+rafraîchissement, ms de calcul par seconde simulée (totale et par robot).
+
+Usage:
+    python bench/bench_multi_robot.py --json res.json
+    python bench/bench_multi_robot.py --compare res.json   # écarts > 10 % par rapport à res.json
+"""
+import argparse
+import json
+import math
+import time
+
+import bench_common
+from robot_interface import (ARROW_LAST, COLORS, ROBOT_SIZE, TERRAIN_DISPLAY_HEIGHT, TERRAIN_DISPLAY_WIDTH,
+                             TERRAIN_REAL_HEIGHT, TERRAIN_REAL_WIDTH, UPDATE_INTERVAL_MS, TerrainSprites)
+from robot_registry import MAIN_ROBOT, MultiTelemetryDecoder, RobotRegistry
+from robot_state import RobotStateManager
+from telemetry import TelemetryDecoder, TelemetryFrame, format_telemetry
+
+
+class CountingCanvas:
+    """Canevas factice: mêmes méthodes que tk.Canvas pour TerrainSprites, compte les appels."""
+    def __init__(self):
+        self.calls = 0
+        self._next = 0
+
+    def _create(self, *args, **kwargs):
+        self.calls += 1
+        self._next += 1
+        return self._next
+
+    create_oval = create_line = create_text = _create
+
+    def coords(self, item, *args):
+        self.calls += 1
+
+    def delete(self, item):
+        self.calls += 1
+
+
+class RecreatedSprite:
+    """Redessin d'origine du robot principal: suppression puis recréation des objets du canevas."""
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self._robot_id = self._direction_id = None
+
+    def draw(self, robot_id, state, body, label=None):
+        x_px = state.position.x * TERRAIN_DISPLAY_WIDTH / TERRAIN_REAL_WIDTH
+        y_px = state.position.y * TERRAIN_DISPLAY_HEIGHT / TERRAIN_REAL_HEIGHT
+        if self._robot_id:
+            self.canvas.delete(self._robot_id)
+        if self._direction_id:
+            self.canvas.delete(self._direction_id)
+        r = ROBOT_SIZE // 2
+        self._robot_id = self.canvas.create_oval(x_px - r, y_px - r, x_px + r, y_px + r, fill=body,
+                                                 outline=COLORS['robot_direction'], width=2)
+        angle_rad = math.radians(state.direction)
+        self._direction_id = self.canvas.create_line(
+            x_px, y_px, x_px + ROBOT_SIZE * math.cos(angle_rad), y_px - ROBOT_SIZE * math.sin(angle_rad),
+            fill=COLORS['robot_direction'], width=3, arrow=ARROW_LAST)
+        return True
+
+
+def _chunks(robot_ids, hz, seconds, prefixed):
+    """Un paquet d'octets par période de trame: une ligne par robot."""
+    chunks = []
+    for n in range(int(hz * seconds)):
+        t_ms = int(n * 1000 / hz)
+        lines = []
+        for i, robot_id in enumerate(robot_ids):
+            ticks = (n * 6 + i,) * 4
+            line = format_telemetry(TelemetryFrame(t_ms, 850, (90, 90, 90, 90), ticks))
+            lines.append(f"@{robot_id} {line}\n" if prefixed else f"{line}\n")
+        chunks.append(''.join(lines).encode('ascii'))
+    return chunks
+
+
+def run_scenario(robots, hz=50.0, seconds=4.0, recreate=False):
+    """recreate=True: redessin d'origine (un seul robot)."""
+    canvas = CountingCanvas()
+    sprites = RecreatedSprite(canvas) if recreate else TerrainSprites(canvas)
+    if robots == 1:
+        robot_ids = [MAIN_ROBOT]
+        main = RobotStateManager()
+        managers = [main]
+        decoder = TelemetryDecoder(main)
+        registry = None
+    else:
+        robot_ids = [MAIN_ROBOT] + [f'pami{i}' for i in range(1, robots)]
+        registry = RobotRegistry()
+        managers = [registry.add(robot_id) for robot_id in robot_ids]
+        main = managers[0]
+        decoder = MultiTelemetryDecoder(registry, auto_add=False)
+    chunks = _chunks(robot_ids, hz, seconds, prefixed=registry is not None)
+    frames_per_tick = max(1, int(round(hz * UPDATE_INTERVAL_MS / 1000.0)))
+
+    ingest = redraw = 0.0
+    ticks = calls = 0
+    for n, chunk in enumerate(chunks, 1):
+        t0 = time.perf_counter()
+        decoder.feed(chunk)
+        for i, manager in enumerate(managers):
+            manager.update_frame(position=(300.0 + n * 2.0 + i * 100.0, 400.0 + i * 150.0, (n + i * 30) % 360))
+        ingest += time.perf_counter() - t0
+        if n % frames_per_tick == 0:
+            before = canvas.calls
+            t0 = time.perf_counter()
+            sprites.draw(None, main.get_state(), COLORS['robot_body'])
+            if registry is not None:
+                for robot_id in registry.take_dirty():
+                    manager = registry.get(robot_id)
+                    if manager is None:
+                        sprites.remove(robot_id)
+                    elif manager is not main:
+                        sprites.draw(robot_id, manager.get_state(), COLORS['robot_secondary'], label=robot_id)
+            redraw += time.perf_counter() - t0
+            ticks += 1
+            calls += canvas.calls - before
+
+    frames = len(chunks) * robots
+    cpu_ms_per_s = (ingest + redraw) * 1000.0 / seconds
+    return {
+        'robots': robots,
+        'ingest_us_per_frame': ingest * 1e6 / frames,
+        'redraw_us_per_tick': redraw * 1e6 / ticks,
+        'canvas_calls_per_tick': calls / ticks,
+        'cpu_ms_per_s': cpu_ms_per_s,
+        'cpu_ms_per_s_per_robot': cpu_ms_per_s / robots,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc du suivi multi-robots (registre, télémétrie multiplexée, terrain)")
+    parser.add_argument("--robots", type=int, default=5, help="Nombre de robots du scénario multiplexé")
+    parser.add_argument("--hz", type=float, default=50.0, help="Trames par seconde et par robot")
+    parser.add_argument("--seconds", type=float, default=4.0, help="Durée simulée")
+    parser.add_argument("--json", default=None, help="Écrire les résultats dans ce fichier (sinon sur stdout)")
+    parser.add_argument("--compare", default=None, help="Résultats de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Écart relatif signalé par --compare")
+    args = parser.parse_args(argv)
+
+    scenarios = {'original': run_scenario(1, args.hz, args.seconds, recreate=True),
+                 'single': run_scenario(1, args.hz, args.seconds),
+                 'fleet': run_scenario(args.robots, args.hz, args.seconds)}
+    for name, res in scenarios.items():
+        print(f"[INFO] {name:8s} {res['robots']} robot(s): {res['ingest_us_per_frame']:6.1f} µs/trame | "
+              f"terrain {res['redraw_us_per_tick']:6.1f} µs, {res['canvas_calls_per_tick']:4.1f} appels | "
+              f"{res['cpu_ms_per_s']:6.1f} ms/s ({res['cpu_ms_per_s_per_robot']:5.1f} par robot)", flush=True)
+
+    params = {k: v for k, v in vars(args).items() if k not in ('json', 'compare', 'threshold')}
+    results = {'meta': bench_common.run_metadata('multi_robot', params), 'scenarios': scenarios}
+    if args.json or not args.compare:
+        bench_common.write_results(results, args.json)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        bench_common.print_comparison(bench_common.compare_results(baseline, results, args.threshold))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Fichier: bench/bench_state_codec.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Banc des encodages de l'état (state_codec.py) face à `to_dict()` + `json.dumps`.
+
+Encodages mesurés: json (référence), orjson (si installé), struct (taille fixe,
+tampon préalloué), msgpack (tableau positionnel), delta (champs modifiés depuis
+l'image précédente, pour une image de match typique: pose, roues et capteurs
+changent).
+
+Mesures par encodage: µs par encodage et par décodage, octets par image,
+octets restant alloués par encodage (tracemalloc).
+
+Usage:
+    python bench/bench_state_codec.py --json res.json
+    python bench/bench_state_codec.py --compare res.json   # écarts > 10 % par rapport à res.json
+"""
+import argparse
+import copy
+import json
+
+import bench_common
+import state_codec
+from bench_state_model import _allocated_bytes, _per_call_us
+from robot_state import RobotState, RobotStateManager
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _frames(count):
+    """États successifs d'un match: déplacement, roues et capteurs changent à chaque image."""
+    manager = RobotStateManager()
+    states = []
+    for i in range(1, count + 1):
+        manager.update_frame(position=(300.0 + i * 1.5, 200.0 + i * 0.5, (i * 0.7) % 360),
+                             wheel_states=['forward'] * 4, wheel_speeds=(120.5, 121.0, 119.5, 120.0),
+                             wheel_ticks=(i * 12, i * 12, i * 11, i * 12),
+                             sensor_values=(150.0 + i % 7, 300.0, 0.0, 0.0, 42.0, 0.0, 0.0), battery_level=80.0)
+        states.append(copy.deepcopy(manager.get_state()))
+    return states
+
+
+def _codecs():
+    codec = state_codec.StructCodec()
+    codecs = {
+        'json': (lambda s: json.dumps(s.to_dict()), json.loads),
+        'struct': (codec.encode, codec.decode),
+        'msgpack': (state_codec.encode_msgpack, state_codec.decode_msgpack),
+    }
+    if orjson is not None:
+        codecs['orjson'] = (lambda s: orjson.dumps(s.to_dict()), orjson.loads)
+    return codecs
+
+
+def run_codec(name, states, number):
+    if name == 'delta':
+        # les images se décodent dans l'ordre: flux pré-encodé, rejoué par le décodeur
+        stream = states * (number * 3 // len(states) + 1)
+        encoder = state_codec.DeltaEncoder()
+        payloads = [encoder.encode(s) for s in stream]
+        frames, replay = iter(stream), iter(payloads)
+        encoder, decoder, target = state_codec.DeltaEncoder(), state_codec.DeltaDecoder(), RobotState()
+        steady = state_codec.DeltaEncoder()
+        steady.encode(states[0])
+        return {
+            'encode_us': _per_call_us(lambda: encoder.encode(next(frames)), number),
+            'decode_us': _per_call_us(lambda: decoder.decode(next(replay), target), number),
+            'bytes': sum(map(len, payloads[1:])) / (len(payloads) - 1),
+            'encode_alloc_bytes': _allocated_bytes(lambda: steady.encode(states[1]), min(number, 1000)),
+        }
+
+    encode, decode = _codecs()[name]
+    state = states[-1]
+    data = encode(state)
+    data = data.encode() if isinstance(data, str) else bytes(data)
+    return {
+        'encode_us': _per_call_us(lambda: encode(state), number),
+        'decode_us': _per_call_us(lambda: decode(data), number),
+        'bytes': len(data),
+        'encode_alloc_bytes': _allocated_bytes(lambda: encode(state), min(number, 1000)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc des encodages de l'état (struct, msgpack, delta, JSON)")
+    parser.add_argument("--frames", type=int, default=200, help="Images de match générées")
+    parser.add_argument("--number", type=int, default=5000, help="Appels par série de mesure de temps")
+    parser.add_argument("--json", default=None, help="Écrire les résultats dans ce fichier (sinon sur stdout)")
+    parser.add_argument("--compare", default=None, help="Résultats de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Écart relatif signalé par --compare")
+    args = parser.parse_args(argv)
+
+    states = _frames(args.frames)
+    names = list(_codecs()) + ['delta']
+    scenarios = {name: run_codec(name, states, args.number) for name in names}
+    base = scenarios['json']
+    for name, res in scenarios.items():
+        print(f"[INFO] {name:8s} encode {res['encode_us']:7.1f} µs (x{base['encode_us'] / res['encode_us']:.1f}) | "
+              f"decode {res['decode_us']:7.1f} µs | {res['bytes']:7.1f} o | "
+              f"alloc {res['encode_alloc_bytes']:7.1f} o", flush=True)
+
+    params = {k: v for k, v in vars(args).items() if k not in ('json', 'compare', 'threshold')}
+    results = {'meta': bench_common.run_metadata('state_codec', params), 'scenarios': scenarios}
+    if args.json or not args.compare:
+        bench_common.write_results(results, args.json)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        bench_common.print_comparison(bench_common.compare_results(baseline, results, args.threshold))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Fichier: bench/bench_state_manager.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Banc de charge de `RobotStateManager` sans Tk ni matériel:
+N threads producteurs (à une fréquence donnée ou sans limite) appellent les
+setters pendant que M listeners sont notifiés.
+
+Mesures par scénario:
+- débit de mises à jour (total et par producteur)
+- contention du verrou (acquisitions bloquées, temps d'attente)
+- latence de notification (entrée du setter -> appel du listener), percentiles en µs
+- mémoire (RSS max, pic tracemalloc avec --trace-memory)
+
+Usage:
+    python bench/bench_state_manager.py --producers 1,4 --listeners 0,1,8 --duration 2 --json res.json
+    python bench/bench_state_manager.py --compare res.json   # écarts > 10 % par rapport à res.json
+"""
+import argparse
+import json
+import threading
+import time
+import tracemalloc
+
+import bench_common
+from robot_state import RobotStateManager
+
+UPDATE_KINDS = ('position', 'wheel', 'sensor', 'battery')
+
+
+class InstrumentedLock:
+    """Remplace `RobotStateManager._lock`: compte les acquisitions qui ont dû attendre."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_s = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(False):
+            self.acquisitions += 1
+            return True
+        if not blocking:
+            return False
+        t0 = time.perf_counter()
+        ok = self._lock.acquire(True, timeout)
+        if ok:
+            # compteurs modifiés verrou tenu: pas de course
+            self.wait_s += time.perf_counter() - t0
+            self.contended += 1
+            self.acquisitions += 1
+        return ok
+
+    def release(self):
+        self._lock.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def run_scenario(producers=1, listeners=1, rate=0.0, duration=1.0, mode='fields',
+                 listener_cost_us=0.0, trace_memory=False):
+    """
+    Exécute un scénario et retourne ses mesures. `mode='fields'` alterne les setters
+    unitaires (position, roue, capteur, batterie), `mode='frame'` publie des images
+    complètes via `update_frame`.
+    """
+    manager = RobotStateManager()
+    lock = InstrumentedLock()
+    manager._lock = lock
+    local = threading.local()
+    latencies = [[] for _ in range(producers)]
+    listener_cost = listener_cost_us / 1e6
+
+    def make_listener():
+        def listener(state):
+            # les listeners sont appelés dans le thread du producteur
+            local.samples.append(time.perf_counter() - local.t0)
+            if listener_cost:
+                _busy_wait(listener_cost)
+        return listener
+
+    for _ in range(listeners):
+        manager.add_listener(make_listener())
+
+    counts = [0] * producers
+    stop = threading.Event()
+    start_barrier = threading.Barrier(producers + 1)
+
+    def producer(index):
+        local.samples = latencies[index]
+        period = 1.0 / rate if rate > 0 else 0.0
+        n = 0
+        start_barrier.wait()
+        next_t = time.perf_counter()
+        while not stop.is_set():
+            local.t0 = time.perf_counter()
+            if mode == 'frame':
+                manager.update_frame(position=(n % 3000, n % 2000, n % 360), wheel_speeds=(n, n, n, n),
+                                     sensor_values=(n,) * 7, battery_level=80.0)
+            else:
+                kind = UPDATE_KINDS[n % len(UPDATE_KINDS)]
+                if kind == 'position':
+                    manager.update_position(n % 3000, n % 2000, n % 360)
+                elif kind == 'wheel':
+                    manager.update_wheel(n % 4, speed=float(n))
+                elif kind == 'sensor':
+                    manager.update_sensor(n % 7, float(n))
+                else:
+                    manager.set_battery_level(80.0)
+            n += 1
+            if period:
+                next_t += period
+                delay = next_t - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        counts[index] = n
+
+    threads = [threading.Thread(target=producer, args=(i,), daemon=True) for i in range(producers)]
+    for t in threads:
+        t.start()
+    if trace_memory:
+        tracemalloc.start()
+    start_barrier.wait()
+    t0 = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    peak_kb = None
+    if trace_memory:
+        peak_kb = tracemalloc.get_traced_memory()[1] / 1024.0
+        tracemalloc.stop()
+
+    total = sum(counts)
+    all_latencies = [s * 1e6 for samples in latencies for s in samples]
+    return {
+        'producers': producers,
+        'listeners': listeners,
+        'mode': mode,
+        'rate_hz': rate,
+        'updates': total,
+        'updates_per_s': total / elapsed,
+        'updates_per_s_per_producer': [c / elapsed for c in counts],
+        'lock': {
+            'acquisitions': lock.acquisitions,
+            'contended': lock.contended,
+            'contention_ratio': lock.contended / lock.acquisitions if lock.acquisitions else 0.0,
+            'wait_ms_total': lock.wait_s * 1000.0,
+            'wait_us_mean': lock.wait_s * 1e6 / lock.contended if lock.contended else 0.0,
+        },
+        'notify_latency_us': bench_common.percentiles(all_latencies),
+        'notifications': len(all_latencies),
+        'max_rss_mb': bench_common.max_rss_mb(),
+        'tracemalloc_peak_kb': peak_kb,
+    }
+
+
+def _int_list(text):
+    return [int(v) for v in text.split(',') if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de charge de RobotStateManager (sans Tk)")
+    parser.add_argument("--producers", type=_int_list, default=[1, 4], help="Nombres de producteurs (liste: 1,4)")
+    parser.add_argument("--listeners", type=_int_list, default=[0, 1, 8], help="Nombres de listeners (liste: 0,1,8)")
+    parser.add_argument("--rate", type=float, default=0.0, help="Fréquence par producteur en Hz (0 = sans limite)")
+    parser.add_argument("--duration", type=float, default=2.0, help="Durée de chaque scénario (s)")
+    parser.add_argument("--mode", choices=('fields', 'frame', 'both'), default='both',
+                        help="Setters unitaires, images complètes (update_frame) ou les deux")
+    parser.add_argument("--listener-cost-us", type=float, default=0.0,
+                        help="Travail simulé dans chaque listener (µs d'attente active)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Mesurer le pic d'allocations avec tracemalloc (ralentit le banc)")
+    parser.add_argument("--json", default=None, help="Écrire les résultats dans ce fichier (sinon sur stdout)")
+    parser.add_argument("--compare", default=None, help="Résultats de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Écart relatif signalé par --compare")
+    args = parser.parse_args(argv)
+
+    modes = ('fields', 'frame') if args.mode == 'both' else (args.mode,)
+    scenarios = {}
+    for mode in modes:
+        for p in args.producers:
+            for m in args.listeners:
+                res = run_scenario(p, m, rate=args.rate, duration=args.duration, mode=mode,
+                                   listener_cost_us=args.listener_cost_us, trace_memory=args.trace_memory)
+                name = f"{mode}_p{p}_l{m}"
+                scenarios[name] = res
+                lat = res['notify_latency_us']
+                print(f"[INFO] {name:18s} {res['updates_per_s']:10.0f} maj/s | contention "
+                      f"{res['lock']['contention_ratio']:.1%} | latence p50 {lat.get('p50', 0):.1f} µs"
+                      f" p99 {lat.get('p99', 0):.1f} µs", flush=True)
+
+    params = {k: v for k, v in vars(args).items() if k not in ('json', 'compare', 'threshold')}
+    results = {'meta': bench_common.run_metadata('state_manager', params), 'scenarios': scenarios}
+    if args.json or not args.compare:
+        bench_common.write_results(results, args.json)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        bench_common.print_comparison(bench_common.compare_results(baseline, results, args.threshold))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Fichier: bench/bench_state_model.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Banc des deux représentations de l'état: `RobotState` (dataclasses) et
+`CompactState` (__slots__ + tableaux, compact_state.py).
+
+Mesures par modèle:
+- mémoire par état (tracemalloc, moyenne sur `--states` instances) et coût de construction
+- mise à jour d'une image complète (`RobotStateManager.update_frame`, sans listener)
+- sérialisation: `to_dict`, `to_dict` + `json.dumps`, octets alloués par `to_dict`
+
+Usage:
+    python bench/bench_state_model.py --json res.json
+    python bench/bench_state_model.py --compare res.json   # écarts > 10 % par rapport à res.json
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import bench_common
+from compact_state import CompactState
+from robot_state import RobotState, RobotStateManager
+
+MODELS = {'dataclass': (RobotState, False), 'compact': (CompactState, True)}
+
+
+def _per_call_us(fn, number):
+    """Meilleur de trois séries de `number` appels, en µs par appel."""
+    best = float('inf')
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6 / number
+
+
+def _allocated_bytes(fn, number):
+    """Octets encore alloués après `number` appels dont on garde les résultats, par appel."""
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        kept = [fn() for _ in range(number)]
+        used = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    del kept
+    return used / number
+
+
+def run_model(name, states=1000, number=5000):
+    cls, compact = MODELS[name]
+    manager = RobotStateManager(compact=compact)
+    n = [0]
+
+    def frame():
+        i = n[0] = n[0] + 1
+        manager.update_frame(position=(i % 3000, i % 2000, i % 360), wheel_states=['forward'] * 4,
+                             wheel_speeds=(i, i, i, i), wheel_ticks=(i, i, i, i), sensor_values=(i,) * 7,
+                             battery_level=80.0)
+
+    frame()
+    state = manager.get_state()
+    return {
+        'state_bytes': _allocated_bytes(cls, states),
+        'construct_us': _per_call_us(cls, number),
+        'update_frame_us': _per_call_us(frame, number),
+        'to_dict_us': _per_call_us(state.to_dict, number),
+        'to_json_us': _per_call_us(lambda: json.dumps(state.to_dict()), number),
+        'to_dict_bytes': _allocated_bytes(state.to_dict, states),
+        'json_bytes': len(json.dumps(state.to_dict())),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc RobotState (dataclasses) / CompactState (tableaux)")
+    parser.add_argument("--states", type=int, default=1000, help="Instances pour la mesure mémoire")
+    parser.add_argument("--number", type=int, default=5000, help="Appels par série de mesure de temps")
+    parser.add_argument("--json", default=None, help="Écrire les résultats dans ce fichier (sinon sur stdout)")
+    parser.add_argument("--compare", default=None, help="Résultats de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Écart relatif signalé par --compare")
+    args = parser.parse_args(argv)
+
+    scenarios = {name: run_model(name, args.states, args.number) for name in MODELS}
+    base, comp = scenarios['dataclass'], scenarios['compact']
+    for key in ('state_bytes', 'construct_us', 'update_frame_us', 'to_dict_us', 'to_json_us', 'to_dict_bytes'):
+        ratio = base[key] / comp[key] if comp[key] else float('inf')
+        print(f"[INFO] {key:16s} dataclass {base[key]:10.1f} | compact {comp[key]:10.1f} | x{ratio:.2f}", flush=True)
+
+    params = {k: v for k, v in vars(args).items() if k not in ('json', 'compare', 'threshold')}
+    results = {'meta': bench_common.run_metadata('state_model', params), 'scenarios': scenarios}
+    if args.json or not args.compare:
+        bench_common.write_results(results, args.json)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        bench_common.print_comparison(bench_common.compare_results(baseline, results, args.threshold))
+    return results
+
+
+if __name__ == "__main__":
+    main()
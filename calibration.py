@@ -1,12 +1,19 @@
 """
 File: `calibration.py`
 Author: Hugo Demont
-Version: 1.0.1 (correction pattern size + reprojection error)
+Version: 1.3.0 (rapport de reprojection vectorisé + rejet des images aberrantes)
 """
 from __future__ import print_function
+import argparse
 import cv2
 import numpy as np
 import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 number_of_squares_X = 10
 number_of_squares_Y = 7
@@ -23,45 +30,534 @@ object_points_3D *= square_size
 object_points = []
 image_points = []
 
+CORNERS_CACHE = '.calibration_corners.npz'
 
-def main():
-    # change the glob if your images are in a subfolder, e.g. 'images/*.jpg'
-    images = glob.glob('*.jpg')
-    if not images:
-        print("Aucune image trouvée dans le dossier courant.")
+
+def file_key(image_file):
+    """Clé de cache: empreinte SHA1 du contenu + pattern (un changement de mire invalide tout)."""
+    h = hashlib.sha1()
+    with open(image_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return "{}:{}x{}".format(h.hexdigest(), nX, nY)
+
+
+def detect_corners(image_file):
+    """
+    Extraction des coins d'une image (exécutée dans un processus du pool).
+    Retourne (image_size, corners) avec corners=None si la mire n'est pas trouvée.
+    """
+    image = cv2.imread(image_file)
+    if image is None:
+        return None, None
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    found, corners = cv2.findChessboardCorners(gray, (nX, nY), None)
+    if not found:
+        return gray.shape[::-1], None
+    corners2 = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
+    return gray.shape[::-1], corners2.reshape(-1, 1, 2)
+
+
+def load_corners_cache(path):
+    """Cache des coins: {clé: (image_size, corners|None, chemin absolu de l'image)}."""
+    cache = {}
+    if not path or not os.path.exists(path):
+        return cache
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            files = data['files'] if 'files' in data.files else [''] * len(data['keys'])
+            for key, found, size, corners, image_file in zip(data['keys'], data['found'], data['sizes'],
+                                                              data['corners'], files):
+                cache[str(key)] = (tuple(int(v) for v in size), corners.copy() if found else None, str(image_file))
+    except Exception as e:
+        print("[WARN] Cache des coins illisible ({}): {}".format(path, e))
+    return cache
+
+
+def prune_corners_cache(cache, current=None):
+    """
+    Retire les entrées dont l'image a disparu, ou a changé depuis (`current`:
+    {chemin absolu: clé} des images du passage en cours). Sans cela le fichier
+    cache grossit à chaque série de prises de vue.
+    """
+    current = current or {}
+    kept = {}
+    for key, entry in cache.items():
+        image_file = entry[2]
+        if image_file in current:
+            if current[image_file] != key:
+                continue
+        elif not image_file or not os.path.exists(image_file):
+            continue
+        kept[key] = entry
+    return kept
+
+
+def save_corners_cache(path, cache):
+    if not path or not cache:
         return
+    keys = sorted(cache)
+    found = np.array([cache[k][1] is not None for k in keys], dtype=bool)
+    sizes = np.array([cache[k][0] for k in keys], dtype=np.int32)
+    corners = np.zeros((len(keys), nX * nY, 1, 2), dtype=np.float32)
+    for i, k in enumerate(keys):
+        if cache[k][1] is not None:
+            corners[i] = cache[k][1]
+    files = np.array([cache[k][2] for k in keys])
+    np.savez(path, keys=np.array(keys), found=found, sizes=sizes, corners=corners, files=files)
+
+
+def extract_corners_headless(images, jobs=None, cache_path=CORNERS_CACHE):
+    """
+    Extraction parallèle (pool de processus) avec cache par image.
+    Les images inchangées depuis le dernier passage ne sont pas retraitées; les
+    entrées des images disparues ou modifiées sont retirées du cache.
+    Retourne une liste [(image_file, image_size, corners|None)] dans l'ordre de `images`.
+    """
+    cache = load_corners_cache(cache_path)
+    keys = [file_key(f) for f in images]
+    current = {os.path.abspath(f): k for f, k in zip(images, keys)}
+    for image_file, key in current.items():
+        if key in cache:
+            cache[key] = cache[key][:2] + (image_file,)  # image déplacée ou copiée
+    todo = [(f, k) for f, k in zip(images, keys) if k not in cache]
+    print("[INFO] {} image(s), {} en cache, {} à traiter".format(
+        len(images), len(images) - len(todo), len(todo)))
+
+    if todo:
+        files = [f for f, _ in todo]
+        if jobs == 1:
+            results = [detect_corners(f) for f in files]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(detect_corners, files, chunksize=4))
+        for (image_file, key), (size, corners) in zip(todo, results):
+            if size is None:
+                print("[WARN] Image illisible:", image_file)
+                continue
+            cache[key] = (size, corners, os.path.abspath(image_file))
+    kept = prune_corners_cache(cache, current)
+    if todo or len(kept) != len(cache):
+        save_corners_cache(cache_path, kept)
+
+    out = []
+    for image_file, key in zip(images, keys):
+        if key in cache:
+            size, corners = cache[key][:2]
+            out.append((image_file, size, corners))
+    return out
 
+
+def extract_corners_interactive(images):
+    """Comportement historique: extraction séquentielle avec affichage de chaque mire."""
     pattern = (nX, nY)
+    out = []
     for image_file in images:
-        image = cv2.imread(image_file)
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        found, corners = cv2.findChessboardCorners(gray, pattern, None)
-        if found:
-            object_points.append(object_points_3D)
-            corners2 = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
-            image_points.append(corners2)
-            cv2.drawChessboardCorners(image, pattern, corners2, found)
+        size, corners2 = detect_corners(image_file)
+        if size is None:
+            continue
+        out.append((image_file, size, corners2))
+        if corners2 is not None:
+            image = cv2.imread(image_file)
+            cv2.drawChessboardCorners(image, pattern, corners2, True)
             cv2.imshow("Chessboard", image)
             cv2.waitKey(500)
+    return out
+
+
+def rodrigues_batch(rvecs):
+    """Vecteurs de rotation (N, 3) -> matrices (N, 3, 3), formule de Rodrigues vectorisée."""
+    rvecs = np.asarray(rvecs, dtype=np.float64).reshape(-1, 3)
+    theta = np.linalg.norm(rvecs, axis=1)
+    safe = np.where(theta < 1e-12, 1.0, theta)
+    k = rvecs / safe[:, None]
+    K = np.zeros((len(rvecs), 3, 3))
+    K[:, 0, 1], K[:, 0, 2] = -k[:, 2], k[:, 1]
+    K[:, 1, 0], K[:, 1, 2] = k[:, 2], -k[:, 0]
+    K[:, 2, 0], K[:, 2, 1] = -k[:, 1], k[:, 0]
+    s = np.sin(theta)[:, None, None]
+    c = (1.0 - np.cos(theta))[:, None, None]
+    return np.eye(3)[None] + s * K + c * (K @ K)
+
+
+def project_points_batch(points_3D, rvecs, tvecs, mtx, dist):
+    """
+    Équivalent vectorisé de cv2.projectPoints pour N poses d'une même mire.
+    Modèle de distorsion OpenCV (k1, k2, p1, p2[, k3[, k4, k5, k6]]).
+    Retourne un tableau (N, M, 2).
+    """
+    R = rodrigues_batch(rvecs)
+    t = np.asarray(tvecs, dtype=np.float64).reshape(-1, 1, 3)
+    P = np.einsum('nij,mj->nmi', R, np.asarray(points_3D, dtype=np.float64)) + t
+    x = P[..., 0] / P[..., 2]
+    y = P[..., 1] / P[..., 2]
+
+    d = np.zeros(8)
+    flat = np.asarray(dist, dtype=np.float64).ravel()[:8]
+    d[:len(flat)] = flat
+    k1, k2, p1, p2, k3, k4, k5, k6 = d
+    r2 = x * x + y * y
+    radial = (1 + r2 * (k1 + r2 * (k2 + r2 * k3))) / (1 + r2 * (k4 + r2 * (k5 + r2 * k6)))
+    xd = x * radial + 2 * p1 * x * y + p2 * (r2 + 2 * x * x)
+    yd = y * radial + p1 * (r2 + 2 * y * y) + 2 * p2 * x * y
+
+    u = mtx[0, 0] * xd + mtx[0, 1] * yd + mtx[0, 2]
+    v = mtx[1, 1] * yd + mtx[1, 2]
+    return np.stack([u, v], axis=-1)
+
+
+def reprojection_report(image_points_list, rvecs, tvecs, mtx, dist, outlier_k=3.0):
+    """
+    Résidus par coin et par image en un seul calcul NumPy.
+    Une image est marquée aberrante si son RMS dépasse médiane + outlier_k * MAD.
+    """
+    observed = np.asarray(image_points_list, dtype=np.float64).reshape(len(image_points_list), -1, 2)
+    projected = project_points_batch(object_points_3D, rvecs, tvecs, mtx, dist)
+    residuals = observed - projected                      # (N, M, 2)
+    corner_err = np.linalg.norm(residuals, axis=2)        # (N, M)
+    per_image_rms = np.sqrt((corner_err ** 2).mean(axis=1))
+    # même métrique que l'ancienne boucle cv2.norm(...) / M, pour comparaison
+    legacy = np.linalg.norm(corner_err, axis=1) / corner_err.shape[1]
+
+    median = float(np.median(per_image_rms))
+    mad = float(np.median(np.abs(per_image_rms - median))) * 1.4826
+    threshold = median + outlier_k * max(mad, 1e-6)
+    outliers = np.flatnonzero(per_image_rms > threshold)
+    return {
+        'residuals': residuals.astype(np.float32),
+        'corner_error': corner_err.astype(np.float32),
+        'per_image_rms': per_image_rms,
+        'rms': float(np.sqrt((corner_err ** 2).mean())),
+        'mean_error': float(legacy.mean()),
+        'max_corner_error': float(corner_err.max()),
+        'outlier_threshold': threshold,
+        'outliers': outliers,
+    }
+
+
+def write_report(prefix, report, image_files, mtx, dist):
+    """Résumé compact: `<prefix>.json` (lisible) + `<prefix>.npz` (résidus complets)."""
+    summary = {
+        'images': len(image_files),
+        'rms': report['rms'],
+        'mean_error': report['mean_error'],
+        'max_corner_error': report['max_corner_error'],
+        'outlier_threshold': report['outlier_threshold'],
+        'outliers': [image_files[i] for i in report['outliers']],
+        'dropped': report.get('dropped', []),
+        'per_image': {f: round(float(e), 5) for f, e in zip(image_files, report['per_image_rms'])},
+        'K': np.asarray(mtx).tolist(),
+        'D': np.asarray(dist).ravel().tolist(),
+    }
+    with open(prefix + '.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    np.savez_compressed(prefix + '.npz', files=np.array(image_files),
+                        residuals=report['residuals'], corner_error=report['corner_error'],
+                        per_image_rms=report['per_image_rms'])
+
+
+class PoseCoverage:
+    """
+    Indice de diversité des vues de la mire: chaque vue est rangée dans une case
+    (position du centre sur une grille, échelle apparente, inclinaison).
+    Une image n'est retenue que si elle remplit une case encore vide.
+    """
+    def __init__(self, grid=3, scale_bins=3, tilt_bins=3):
+        self.grid = grid
+        self.scale_bins = scale_bins
+        self.tilt_bins = tilt_bins
+        self._covered = set()
+
+    @property
+    def total(self):
+        return self.grid * self.grid * self.scale_bins * self.tilt_bins
+
+    @property
+    def score(self):
+        return len(self._covered) / float(self.total)
+
+    def bin_for(self, corners, image_size):
+        pts = corners.reshape(-1, 2)
+        w, h = image_size
+        cx, cy = pts.mean(axis=0)
+        gx = min(self.grid - 1, max(0, int(cx / w * self.grid)))
+        gy = min(self.grid - 1, max(0, int(cy / h * self.grid)))
+
+        # coins extérieurs de la mire: haut-gauche, haut-droit, bas-droit, bas-gauche
+        quad = pts[[0, nX - 1, nX * nY - 1, nX * (nY - 1)]]
+        area = 0.5 * abs(np.dot(quad[:, 0], np.roll(quad[:, 1], 1)) - np.dot(quad[:, 1], np.roll(quad[:, 0], 1)))
+        scale = np.sqrt(area / float(w * h))  # ~0.2 (loin) .. ~0.8 (près)
+        sb = min(self.scale_bins - 1, max(0, int((scale - 0.15) / 0.6 * self.scale_bins)))
+
+        # inclinaison: déséquilibre des côtés opposés (perspective)
+        edges = np.linalg.norm(quad - np.roll(quad, -1, axis=0), axis=1)
+        tilt = max(abs(1.0 - edges[0] / edges[2]), abs(1.0 - edges[1] / edges[3]))
+        tb = min(self.tilt_bins - 1, int(tilt / 0.15 * (self.tilt_bins - 1)))
+        return gx, gy, sb, tb
+
+    def adds_coverage(self, corners, image_size):
+        return self.bin_for(corners, image_size) not in self._covered
+
+    def add(self, corners, image_size):
+        self._covered.add(self.bin_for(corners, image_size))
+
+
+class LiveCalibrator:
+    """
+    Recalibration incrémentale dans un thread de fond.
+    Chaque nouvelle vue acceptée déclenche un calibrateCamera qui repart de la
+    dernière estimation (CALIB_USE_INTRINSIC_GUESS). La session est terminée
+    quand l'erreur RMS varie de moins de `tol` sur `window` résolutions.
+    """
+    def __init__(self, image_size, min_frames=10, tol=0.01, window=3):
+        self.image_size = image_size
+        self.min_frames = min_frames
+        self.tol = tol
+        self.window = window
+        self.mtx = None
+        self.dist = None
+        self.rms_history = []
+        self._solved = 0
+        self._object_points = []
+        self._image_points = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._thread = None
+
+    @property
+    def frame_count(self):
+        with self._lock:
+            return len(self._image_points)
+
+    @property
+    def converged(self):
+        hist = self.rms_history
+        if self.frame_count < self.min_frames or len(hist) < self.window + 1:
+            return False
+        recent = hist[-(self.window + 1):]
+        return max(recent) - min(recent) < self.tol
+
+    def add_view(self, corners):
+        with self._lock:
+            self._object_points.append(object_points_3D)
+            self._image_points.append(corners)
+        self._wakeup.set()
+
+    def wait_idle(self, timeout=5.0):
+        """Attend que la dernière vue ajoutée ait été prise en compte par une résolution."""
+        deadline = time.time() + timeout
+        # moins de 3 vues: aucune résolution n'aura lieu
+        while 3 <= self.frame_count and self._solved < self.frame_count and time.time() < deadline:
+            time.sleep(0.05)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def _loop(self):
+        while self._running:
+            self._wakeup.wait(timeout=0.5)
+            self._wakeup.clear()
+            with self._lock:
+                n = len(self._image_points)
+                obj = list(self._object_points)
+                img = list(self._image_points)
+            if n == self._solved or n < 3:
+                continue
+            flags = 0
+            mtx, dist = None, None
+            if self.mtx is not None:
+                flags = cv2.CALIB_USE_INTRINSIC_GUESS
+                mtx, dist = self.mtx.copy(), self.dist.copy()
+            try:
+                rms, mtx, dist, _, _ = cv2.calibrateCamera(obj, img, self.image_size, mtx, dist, flags=flags)
+            except cv2.error as e:
+                print("[WARN] Recalibration échouée:", e)
+                continue
+            self.mtx, self.dist = mtx, dist
+            self.rms_history.append(rms)
+            self._solved = n
+            print("[INFO] {} vue(s) -> RMS {:.4f} px".format(n, rms))
+
+
+def live_calibration(camera, min_frames=10, tol=0.01, max_frames=60, headless=False, max_seconds=120.0):
+    """
+    Calibration guidée depuis une caméra: les images qui n'apportent pas de
+    nouvelle couverture de pose sont ignorées, la recalibration tourne en fond
+    et la session s'arrête d'elle-même à la convergence de l'erreur.
+    `max_seconds` borne la session (0 = illimitée): une fois la couverture
+    saturée sans convergence, seules les images retenues comptent pour
+    `max_frames` et une caméra ne s'arrêterait jamais en mode headless.
+    Retourne (mtx, dist) ou (None, None).
+    """
+    cap = cv2.VideoCapture(camera)
+    if not cap.isOpened():
+        print("[ERROR] Impossible d'ouvrir la caméra", camera)
+        return None, None
+
+    pattern = (nX, nY)
+    coverage = PoseCoverage()
+    calibrator = None
+    flags = cv2.CALIB_CB_ADAPTIVE_THRESH + cv2.CALIB_CB_NORMALIZE_IMAGE + cv2.CALIB_CB_FAST_CHECK
+    t_end = time.time() + max_seconds if max_seconds else None
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            image_size = gray.shape[::-1]
+            if calibrator is None:
+                calibrator = LiveCalibrator(image_size, min_frames=min_frames, tol=tol)
+                calibrator.start()
+
+            found, corners = cv2.findChessboardCorners(gray, pattern, flags)
+            if found:
+                corners = corners.reshape(-1, 1, 2)
+                if coverage.adds_coverage(corners, image_size):
+                    corners = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria).reshape(-1, 1, 2)
+                    coverage.add(corners, image_size)
+                    calibrator.add_view(corners)
+
+            if calibrator.converged:
+                print("[INFO] Erreur de reprojection stabilisée, fin de la session")
+                break
+            if calibrator.frame_count >= max_frames:
+                print("[INFO] Nombre maximum de vues atteint")
+                break
+            if t_end is not None and time.time() >= t_end:
+                print("[WARN] Durée maximale atteinte sans convergence ({:g} s), fin de la session".format(max_seconds))
+                break
+
+            if not headless:
+                if found:
+                    cv2.drawChessboardCorners(frame, pattern, corners, found)
+                rms = calibrator.rms_history[-1] if calibrator.rms_history else float('nan')
+                cv2.putText(frame, "vues:{} couverture:{:.0%} rms:{:.3f}".format(
+                    calibrator.frame_count, coverage.score, rms),
+                    (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                cv2.imshow("Calibration live", frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+    finally:
+        cap.release()
+        if not headless:
+            cv2.destroyAllWindows()
+
+    if calibrator is None:
+        return None, None
+    # laisser le thread finir la dernière résolution en cours
+    calibrator.wait_idle()
+    calibrator.stop()
+    return calibrator.mtx, calibrator.dist
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibration caméra (mire échiquier)")
+    # change the glob if your images are in a subfolder, e.g. 'images/*.jpg'
+    parser.add_argument("--images", default="*.jpg", help="Motif glob des images de calibration")
+    parser.add_argument("--headless", action="store_true",
+                        help="Pas d'affichage: extraction parallèle des coins + cache")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Nombre de processus en mode headless (défaut: nombre de coeurs)")
+    parser.add_argument("--cache", default=CORNERS_CACHE, help="Fichier cache des coins (mode headless)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignorer le cache des coins")
+    parser.add_argument("--output", default="calibration_chessboard.yaml", help="Fichier de calibration produit")
+    parser.add_argument("--live", default=None, metavar="CAMERA",
+                        help="Calibration incrémentale depuis la caméra CAMERA (index ou fichier vidéo)")
+    parser.add_argument("--min-frames", type=int, default=10, help="Mode live: vues minimum avant convergence")
+    parser.add_argument("--tol", type=float, default=0.01, help="Mode live: variation RMS (px) jugée convergée")
+    parser.add_argument("--max-frames", type=int, default=60, help="Mode live: nombre maximum de vues")
+    parser.add_argument("--max-seconds", type=float, default=120.0,
+                        help="Mode live: durée maximale de la session en secondes (0 = illimitée)")
+    parser.add_argument("--report", default=None, metavar="PREFIX",
+                        help="Écrire le rapport de reprojection dans PREFIX.json / PREFIX.npz")
+    parser.add_argument("--drop-outliers", action="store_true",
+                        help="Retirer les images aberrantes et recalibrer")
+    parser.add_argument("--outlier-k", type=float, default=3.0,
+                        help="Seuil d'aberrance: médiane + k * MAD du RMS par image")
+    args = parser.parse_args()
+
+    if args.live is not None:
+        camera = int(args.live) if args.live.isdigit() else args.live
+        mtx, dist = live_calibration(camera, min_frames=args.min_frames, tol=args.tol,
+                                     max_frames=args.max_frames, headless=args.headless,
+                                     max_seconds=args.max_seconds)
+        if mtx is None:
+            print("Calibration live impossible (pas assez de vues).")
+            return
+        cv_file = cv2.FileStorage(args.output, cv2.FILE_STORAGE_WRITE)
+        cv_file.write('K', mtx)
+        cv_file.write('D', dist)
+        cv_file.release()
+        print("Camera matrix:")
+        print(mtx)
+        print("\nDistortion coefficients:")
+        print(dist)
+        return
+
+    images = sorted(glob.glob(args.images))
+    if not images:
+        print("Aucune image trouvée dans le dossier courant.")
+        return
+
+    if args.headless:
+        detections = extract_corners_headless(images, jobs=args.jobs,
+                                              cache_path=None if args.no_cache else args.cache)
+    else:
+        detections = extract_corners_interactive(images)
+
+    image_size = None
+    used_files = []
+    for image_file, size, corners in detections:
+        if corners is None:
+            continue
+        object_points.append(object_points_3D)
+        image_points.append(corners)
+        used_files.append(image_file)
+        image_size = size
 
     if not object_points:
         print("Aucun coin détecté. Vérifiez les images et le pattern.")
         return
 
+    # calibration une seule fois, après l'extraction complète des coins
     ret, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(object_points,
                                                        image_points,
-                                                       gray.shape[::-1],
+                                                       image_size,
                                                        None,
                                                        None)
+    report = reprojection_report(image_points, rvecs, tvecs, mtx, dist, outlier_k=args.outlier_k)
+
+    if args.drop_outliers and len(report['outliers']) and len(image_points) - len(report['outliers']) >= 3:
+        dropped = [used_files[i] for i in report['outliers']]
+        print("[INFO] Images aberrantes retirées:", ", ".join(dropped))
+        outliers = set(report['outliers'].tolist())
+        keep = [i for i in range(len(image_points)) if i not in outliers]
+        image_points[:] = [image_points[i] for i in keep]
+        object_points[:] = [object_points[i] for i in keep]
+        used_files = [used_files[i] for i in keep]
+        ret, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(object_points, image_points, image_size, None, None)
+        report = reprojection_report(image_points, rvecs, tvecs, mtx, dist, outlier_k=args.outlier_k)
+        report['dropped'] = dropped
 
     # save
-    cv_file = cv2.FileStorage('calibration_chessboard.yaml', cv2.FILE_STORAGE_WRITE)
+    cv_file = cv2.FileStorage(args.output, cv2.FILE_STORAGE_WRITE)
     cv_file.write('K', mtx)
     cv_file.write('D', dist)
     cv_file.release()
 
     # load (example)
-    cv_file = cv2.FileStorage('calibration_chessboard.yaml', cv2.FILE_STORAGE_READ)
+    cv_file = cv2.FileStorage(args.output, cv2.FILE_STORAGE_READ)
     mtx_loaded = cv_file.getNode('K').mat()
     dist_loaded = cv_file.getNode('D').mat()
     cv_file.release()
@@ -71,15 +567,18 @@ def main():
     print("\nDistortion coefficients:")
     print(dist_loaded)
 
-    # reprojection error
-    total_error = 0
-    for i in range(len(object_points)):
-        imgpoints2, _ = cv2.projectPoints(object_points[i], rvecs[i], tvecs[i], mtx, dist)
-        error = cv2.norm(image_points[i], imgpoints2, cv2.NORM_L2) / len(imgpoints2)
-        total_error += error
-    print("\nMean reprojection error:", total_error / len(object_points))
+    # reprojection error (calcul vectorisé, voir reprojection_report)
+    print("\nMean reprojection error:", report['mean_error'])
+    print("RMS reprojection error: {:.4f} px (max coin: {:.3f} px)".format(report['rms'], report['max_corner_error']))
+    for i in report['outliers']:
+        print("[WARN] Image aberrante: {} (RMS {:.3f} px > {:.3f})".format(
+            used_files[i], report['per_image_rms'][i], report['outlier_threshold']))
+    if args.report:
+        write_report(args.report, report, used_files, mtx, dist)
+        print("[INFO] Rapport écrit:", args.report + '.json', args.report + '.npz')
 
-    cv2.destroyAllWindows()
+    if not args.headless:
+        cv2.destroyAllWindows()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,145 @@
+"""
+File: `calibration_cache.py`
+Author: Hugo Demont
+Version: 1.0.0
+
+Chargement des artefacts de calibration caméra produits par `calibration.py`.
+
+- `read_calibration(path)` lit K et D depuis `calibration_chessboard.yaml`.
+- `load_calibration(path, image_size)` précalcule la nouvelle matrice caméra
+  optimale et les tables `initUndistortRectifyMap` (format virgule fixe
+  CV_16SC2, le plus rapide pour `cv2.remap`), puis les met en cache dans un
+  `.npz` binaire à côté du YAML (ex: `calibration_chessboard.npz`).
+- Le cache est invalidé si le YAML change (empreinte SHA1), si la taille
+  d'image ou le paramètre `alpha` diffèrent.
+
+En mode « undistort », chaque image est redressée une seule fois avec
+`CalibrationArtifacts.undistort`; la pose se calcule ensuite avec
+`pose_camera_matrix` / `pose_dist_coeffs` (distorsion nulle).
+"""
+import hashlib
+import os
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+CACHE_VERSION = 1
+
+
+class CalibrationArtifacts:
+    def __init__(self, mtx: np.ndarray, dist: np.ndarray, image_size: Tuple[int, int],
+                 new_mtx: np.ndarray, roi: Tuple[int, int, int, int],
+                 map1: np.ndarray, map2: np.ndarray, alpha: float = 0.0):
+        self.mtx = mtx
+        self.dist = dist
+        self.image_size = image_size  # (width, height)
+        self.new_mtx = new_mtx
+        self.roi = roi
+        self.map1 = map1
+        self.map2 = map2
+        self.alpha = alpha
+        self._zero_dist = np.zeros((1, 5), dtype=np.float64)
+
+    def undistort(self, frame: np.ndarray, dst: Optional[np.ndarray] = None) -> np.ndarray:
+        # une seule passe remap par image, avec les tables précalculées
+        return cv2.remap(frame, self.map1, self.map2, cv2.INTER_LINEAR, dst=dst)
+
+    def pose_camera_matrix(self, undistorted: bool) -> np.ndarray:
+        return self.new_mtx if undistorted else self.mtx
+
+    def pose_dist_coeffs(self, undistorted: bool) -> np.ndarray:
+        return self._zero_dist if undistorted else self.dist
+
+
+def read_calibration(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lit K et D depuis le fichier YAML OpenCV.
+    Lève IOError si le fichier ne peut pas être ouvert.
+    """
+    cv_file = cv2.FileStorage(path, cv2.FILE_STORAGE_READ)
+    if not cv_file.isOpened():
+        raise IOError(f"Impossible d'ouvrir {path}")
+    mtx = cv_file.getNode('K').mat()
+    dist = cv_file.getNode('D').mat()
+    cv_file.release()
+    if mtx is None or dist is None:
+        raise IOError(f"K ou D manquant dans {path}")
+    return mtx, dist
+
+
+def cache_path_for(calib_path: str) -> str:
+    return os.path.splitext(calib_path)[0] + '.npz'
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _load_cached(cache_path: str, digest: str, image_size: Tuple[int, int],
+                 alpha: float) -> Optional[CalibrationArtifacts]:
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            if int(data['version']) != CACHE_VERSION:
+                return None
+            if str(data['digest']) != digest:
+                return None
+            if tuple(int(v) for v in data['image_size']) != tuple(image_size):
+                return None
+            if float(data['alpha']) != float(alpha):
+                return None
+            return CalibrationArtifacts(
+                mtx=data['mtx'], dist=data['dist'],
+                image_size=tuple(image_size),
+                new_mtx=data['new_mtx'],
+                roi=tuple(int(v) for v in data['roi']),
+                map1=data['map1'], map2=data['map2'],
+                alpha=alpha,
+            )
+    except Exception as e:
+        print(f"[WARN] Cache de calibration illisible ({cache_path}): {e}")
+        return None
+
+
+def compute_artifacts(mtx: np.ndarray, dist: np.ndarray, image_size: Tuple[int, int],
+                      alpha: float = 0.0) -> CalibrationArtifacts:
+    new_mtx, roi = cv2.getOptimalNewCameraMatrix(mtx, dist, image_size, alpha, image_size)
+    map1, map2 = cv2.initUndistortRectifyMap(mtx, dist, None, new_mtx, image_size, cv2.CV_16SC2)
+    return CalibrationArtifacts(mtx, dist, tuple(image_size), new_mtx, tuple(int(v) for v in roi),
+                                map1, map2, alpha)
+
+
+def load_calibration(calib_path: str, image_size: Tuple[int, int], alpha: float = 0.0,
+                     use_cache: bool = True) -> CalibrationArtifacts:
+    """
+    Retourne les artefacts de calibration pour une taille d'image (largeur, hauteur).
+    Réutilise le `.npz` voisin du YAML s'il est à jour, sinon le régénère.
+    """
+    image_size = (int(image_size[0]), int(image_size[1]))
+    mtx, dist = read_calibration(calib_path)
+    cache_path = cache_path_for(calib_path)
+    digest = _file_digest(calib_path)
+
+    if use_cache:
+        cached = _load_cached(cache_path, digest, image_size, alpha)
+        if cached is not None:
+            return cached
+
+    artifacts = compute_artifacts(mtx, dist, image_size, alpha)
+    if use_cache:
+        try:
+            np.savez(cache_path,
+                     version=CACHE_VERSION, digest=digest,
+                     image_size=np.array(image_size), alpha=alpha,
+                     mtx=artifacts.mtx, dist=artifacts.dist,
+                     new_mtx=artifacts.new_mtx, roi=np.array(artifacts.roi),
+                     map1=artifacts.map1, map2=artifacts.map2)
+        except OSError as e:
+            print(f"[WARN] Impossible d'écrire le cache {cache_path}: {e}")
+    return artifacts
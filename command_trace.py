@@ -0,0 +1,255 @@
+"""
+Fichier: command_trace.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Traçage de la latence des commandes, de l'appui (bouton ou touche) jusqu'à
+l'acquittement de l'Arduino.
+
+Chaque commande reçoit un numéro de séquence, préfixé sur la ligne: `#12 MOVE forward 200`.
+Le firmware répond alors `OK 12` (sans préfixe: `OK`, comme avant). Étapes horodatées:
+
+    gui           clic / touche (PC)                       horloge PC
+    ssh_send      écriture dans le shell SSH (PC)          horloge PC
+    ssh_echo      écho de la ligne par le pty (PC)         horloge PC
+    pi_recv       ligne reçue par le pont série (Pi)       horloge Pi
+    serial_write  écriture sur le port série (Pi)          horloge Pi
+    ack           réponse `OK <seq>` lue sur le port (Pi)  horloge Pi
+    gui_ack       ligne TRACE reçue par l'interface (PC)   horloge PC
+
+Les deux horloges ne sont pas synchronisées: seules des différences prises dans
+une même horloge sont calculées. Le transport (SSH aller + retour) est déduit:
+total PC - durée passée sur le Pi.
+
+Le pont côté Pi (`control_robot.py --stdin`) renvoie une ligne par commande:
+    TRACE <seq> <pi_recv> <serial_write> <ack> <réponse>
+"""
+import csv
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Tuple
+
+PC_STAGES = ('gui', 'ssh_send', 'ssh_echo', 'gui_ack')
+MAX_PARTIAL_LINE = 4096  # ligne sans fin plus longue: abandonnée
+
+# commande préfixée dans l'écho du pty, après une invite quelconque (`root@pi:~# #12 MOVE ...`)
+_TAGGED_RE = re.compile(r'#(\d+) +\S')
+PI_STAGES = ('pi_recv', 'serial_write', 'ack')
+
+# segments: (nom, étape début, étape fin) dans une même horloge
+SEGMENTS = (
+    ('gui_to_send', 'gui', 'ssh_send'),
+    ('pty_echo', 'ssh_send', 'ssh_echo'),
+    ('pi_to_serial', 'pi_recv', 'serial_write'),
+    ('serial_ack', 'serial_write', 'ack'),
+    ('total', 'gui', 'gui_ack'),
+)
+
+
+def tag_command(seq: int, command: str) -> str:
+    return f"#{seq} {command}"
+
+
+def parse_tagged(line: str) -> Tuple[Optional[int], str]:
+    """`#12 MOVE forward 200` -> (12, 'MOVE forward 200'); ligne sans préfixe -> (None, ligne)."""
+    line = line.strip()
+    if line.startswith('#'):
+        head, _, rest = line.partition(' ')
+        try:
+            return int(head[1:]), rest.strip()
+        except ValueError:
+            pass
+    return None, line
+
+
+def parse_ack(line: str) -> Tuple[str, Optional[int]]:
+    """`OK 12` -> ('OK', 12); `ERR_UNKNOWN_MOVE 3` -> ('ERR_UNKNOWN_MOVE', 3); `OK` -> ('OK', None)."""
+    parts = line.strip().split()
+    if not parts:
+        return '', None
+    if len(parts) >= 2:
+        try:
+            return parts[0], int(parts[1])
+        except ValueError:
+            pass
+    return parts[0], None
+
+
+def format_trace_line(seq: int, pi_recv: float, serial_write: float, ack: float, reply: str) -> str:
+    return f"TRACE {seq} {pi_recv:.6f} {serial_write:.6f} {ack:.6f} {reply}"
+
+
+def parse_trace_line(line: str):
+    """Retourne (seq, {étape: t}, réponse) ou None si la ligne n'est pas une ligne TRACE."""
+    parts = line.strip().split(None, 5)
+    if len(parts) < 5 or parts[0] != 'TRACE':
+        return None
+    try:
+        seq = int(parts[1])
+        stamps = dict(zip(PI_STAGES, (float(p) for p in parts[2:5])))
+    except ValueError:
+        return None
+    return seq, stamps, parts[5] if len(parts) > 5 else ''
+
+
+class CommandTrace:
+    __slots__ = ('seq', 'command', 'stamps', 'reply')
+
+    def __init__(self, seq: int, command: str):
+        self.seq = seq
+        self.command = command
+        self.stamps = {}
+        self.reply = ''
+
+    @property
+    def complete(self) -> bool:
+        return 'gui_ack' in self.stamps or 'ack' in self.stamps
+
+    def segments(self) -> dict:
+        """Durées (s) disponibles pour cette commande, y compris le transport déduit."""
+        out = {}
+        s = self.stamps
+        for name, start, end in SEGMENTS:
+            if start in s and end in s:
+                out[name] = s[end] - s[start]
+        if 'total' in out and 'pi_recv' in s and 'ack' in s:
+            out['transport'] = out['total'] - (s['ack'] - s['pi_recv'])
+        return out
+
+    def to_dict(self) -> dict:
+        return {'seq': self.seq, 'command': self.command, 'reply': self.reply,
+                'stamps': dict(self.stamps), 'segments': self.segments()}
+
+
+class CommandTracer:
+    """
+    Registre des commandes tracées (thread-safe: le lecteur SSH complète les
+    traces depuis son thread). Garde les `history` dernières commandes.
+    """
+    def __init__(self, history: int = 2000, start_seq: int = 1):
+        self._lock = threading.Lock()
+        self._seq = start_seq - 1
+        self._pending = OrderedDict()
+        self._done = deque(maxlen=history)
+        self._partial = ''  # fin de ligne pas encore reçue (sortie SSH découpée n'importe où)
+        self.history = history
+
+    def begin(self, command: str, stage: str = 'gui', t: Optional[float] = None) -> Tuple[int, str]:
+        """Ouvre une trace; retourne (seq, commande préfixée à envoyer)."""
+        t = time.monotonic() if t is None else t
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            trace = CommandTrace(seq, command)
+            trace.stamps[stage] = t
+            self._pending[seq] = trace
+            while len(self._pending) > self.history:
+                # commande jamais acquittée (pont absent, ligne perdue): on l'archive telle quelle
+                self._done.append(self._pending.popitem(last=False)[1])
+        return seq, tag_command(seq, command)
+
+    def mark(self, seq: int, stage: str, t: Optional[float] = None) -> None:
+        t = time.monotonic() if t is None else t
+        with self._lock:
+            trace = self._pending.get(seq)
+            if trace is not None and stage not in trace.stamps:
+                trace.stamps[stage] = t
+
+    def finish(self, seq: int, stamps: Optional[dict] = None, reply: str = '',
+               stage: str = 'gui_ack', t: Optional[float] = None) -> Optional[CommandTrace]:
+        """Clôt une trace avec les horodatages distants (`stamps`) et l'heure locale de réception."""
+        t = time.monotonic() if t is None else t
+        with self._lock:
+            trace = self._pending.pop(seq, None)
+            if trace is None:
+                return None
+            if stamps:
+                trace.stamps.update(stamps)
+            trace.stamps[stage] = t
+            trace.reply = reply
+            self._done.append(trace)
+        return trace
+
+    def feed_output(self, text: str, t: Optional[float] = None) -> int:
+        """
+        Analyse la sortie du shell distant, reçue par morceaux quelconques (la fin
+        de ligne incomplète est gardée pour le morceau suivant): écho des lignes
+        préfixées (`ssh_echo`) et lignes TRACE du pont. Retourne le nombre de
+        traces closes.
+        """
+        t = time.monotonic() if t is None else t
+        lines = (self._partial + text).splitlines(True)
+        self._partial = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ''
+        if len(self._partial) > MAX_PARTIAL_LINE:
+            self._partial = ''
+        closed = 0
+        for line in lines:
+            line = line.rstrip('\r\n')
+            parsed = parse_trace_line(line)
+            if parsed is not None:
+                seq, stamps, reply = parsed
+                if self.finish(seq, stamps, reply, t=t) is not None:
+                    closed += 1
+                continue
+            # écho du pty: la ligne contient la commande préfixée (après l'invite du shell)
+            with self._lock:
+                seq = next((int(m.group(1)) for m in _TAGGED_RE.finditer(line)
+                            if int(m.group(1)) in self._pending), None)
+            if seq is not None:
+                self.mark(seq, 'ssh_echo', t)
+        return closed
+
+    def traces(self, include_pending: bool = False):
+        with self._lock:
+            done = list(self._done)
+            pending = list(self._pending.values()) if include_pending else []
+        return done + pending
+
+    def segment_values(self, name: str):
+        """Durées (s) d'un segment sur les commandes terminées."""
+        return [tr.segments()[name] for tr in self.traces() if name in tr.segments()]
+
+    def histogram(self, name: str, bins: int = 20, max_ms: Optional[float] = None):
+        """Retourne (bornes en ms, effectifs) du segment `name`."""
+        values = [v * 1000.0 for v in self.segment_values(name)]
+        if not values:
+            return [], []
+        hi = max_ms if max_ms is not None else max(values)
+        hi = hi if hi > 0 else 1.0
+        width = hi / bins
+        counts = [0] * bins
+        for v in values:
+            counts[min(bins - 1, max(0, int(v / width)))] += 1
+        edges = [i * width for i in range(bins + 1)]
+        return edges, counts
+
+    def summary(self) -> dict:
+        out = {}
+        for name in [s[0] for s in SEGMENTS] + ['transport']:
+            values = sorted(v * 1000.0 for v in self.segment_values(name))
+            if not values:
+                continue
+            pick = lambda q: values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+            out[name] = {'count': len(values), 'p50_ms': pick(50), 'p95_ms': pick(95), 'max_ms': values[-1]}
+        return out
+
+    def export(self, path: str) -> None:
+        """Export des traces: CSV si le nom finit par .csv, sinon JSON (avec le résumé)."""
+        traces = self.traces(include_pending=True)
+        if path.lower().endswith('.csv'):
+            stages = PC_STAGES + PI_STAGES
+            names = [s[0] for s in SEGMENTS] + ['transport']
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['seq', 'command', 'reply'] + list(stages) + [n + '_ms' for n in names])
+                for tr in traces:
+                    seg = tr.segments()
+                    writer.writerow([tr.seq, tr.command, tr.reply]
+                                    + [tr.stamps.get(s, '') for s in stages]
+                                    + [f"{seg[n] * 1000.0:.3f}" if n in seg else '' for n in names])
+        else:
+            with open(path, 'w') as f:
+                json.dump({'summary': self.summary(), 'traces': [tr.to_dict() for tr in traces]}, f, indent=2)
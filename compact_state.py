@@ -0,0 +1,340 @@
+"""
+Fichier: compact_state.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Représentation compacte de l'état du robot: `CompactState` range les grandeurs
+numériques des roues, capteurs et actionneurs dans trois tableaux `array`
+(flottants, ticks, drapeaux) au lieu d'un objet dataclass par élément, avec
+`__slots__` partout (pas de `__dict__`).
+
+L'accès reste celui de `RobotState` (`state.wheels[2].speed`, `state.position.x`,
+`state.sensors[0].value`...): `wheels`, `sensors` et `actuators` sont des tuples
+de vues, créées au premier accès, qui lisent et écrivent directement dans les
+tableaux. Le code existant (interface, télémétrie, simulation) fonctionne donc
+tel quel avec `RobotStateManager(compact=True)`.
+
+Les colonnes (`wheel_speeds`, `wheel_ticks`, `sensor_values`, ...) sont des
+`memoryview` sur ces tableaux, partagées avec NumPy sans copie:
+
+    speeds = numpy.frombuffer(state.wheel_speeds)      # vue float64, pas de copie
+
+`to_dict()` produit le même dictionnaire que `RobotState.to_dict()`, sans passer
+par `dataclasses.asdict` (copie profonde récursive). Gains mesurés par
+`bench/bench_state_model.py`.
+"""
+import time
+from array import array
+
+from robot_state import RobotMode, RobotState, WheelState
+
+# noms, unités et valeurs par défaut repris de RobotState (une seule définition)
+_DEFAULT = RobotState()
+WHEEL_NAMES = tuple(w.name for w in _DEFAULT.wheels)
+SENSOR_NAMES = tuple(s.name for s in _DEFAULT.sensors)
+SENSOR_UNITS = tuple(s.unit for s in _DEFAULT.sensors)
+ACTUATOR_NAMES = tuple(a.name for a in _DEFAULT.actuators)
+
+N_WHEELS, N_SENSORS, N_ACTUATORS = len(WHEEL_NAMES), len(SENSOR_NAMES), len(ACTUATOR_NAMES)
+
+# disposition du tableau de flottants `_f`: pose, cible, roues, capteurs, actionneurs
+POSE = 0
+TARGET = 3
+WHEEL_SPEEDS = 6
+WHEEL_TARGETS = WHEEL_SPEEDS + N_WHEELS
+SENSOR_VALUES = WHEEL_TARGETS + N_WHEELS
+ACTUATOR_POSITIONS = SENSOR_VALUES + N_SENSORS
+N_FLOATS = ACTUATOR_POSITIONS + N_ACTUATORS
+# tableau d'octets `_b`: capteur actif, actionneur activé
+SENSOR_ACTIVE = 0
+ACTUATOR_ENABLED = N_SENSORS
+
+
+def _float_column(offset: int):
+    """Propriété lue et écrite dans `state._f[offset + index]`."""
+    def fget(self):
+        return self._state._f[offset + self._index]
+
+    def fset(self, value):
+        self._state._f[offset + self._index] = value
+
+    return property(fget, fset)
+
+
+def _flag_column(offset: int):
+    """Drapeau booléen rangé dans `state._b[offset + index]`."""
+    def fget(self):
+        return bool(self._state._b[offset + self._index])
+
+    def fset(self, value):
+        self._state._b[offset + self._index] = bool(value)
+
+    return property(fget, fset)
+
+
+def _fill(column: array, start: int, n: int, values, typecode: str) -> None:
+    """Copie groupée de `values` dans `column[start:start + n]` (tronquée comme `zip`)."""
+    values = array(typecode, values)
+    m = min(len(values), n)
+    # affectation de tranche de même longueur: jamais de redimensionnement du tableau
+    column[start:start + m] = values if m == len(values) else values[:m]
+
+
+class _View:
+    __slots__ = ('_state', '_index')
+
+    def __init__(self, state: 'CompactState', index: int):
+        self._state = state
+        self._index = index
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in self._asdict().items())
+        return f"{type(self).__name__}({fields})"
+
+
+class PositionView(_View):
+    """Pose (x, y, theta) rangée dans `_f` à partir de `index` (POSE ou TARGET)."""
+    __slots__ = ()
+    x = _float_column(0)
+    y = _float_column(1)
+    theta = _float_column(2)
+
+    def _asdict(self) -> dict:
+        f, i = self._state._f, self._index
+        return {'x': f[i], 'y': f[i + 1], 'theta': f[i + 2]}
+
+
+class WheelView(_View):
+    __slots__ = ()
+    speed = _float_column(WHEEL_SPEEDS)
+    target_speed = _float_column(WHEEL_TARGETS)
+
+    @property
+    def encoder_ticks(self) -> int:
+        return self._state._ticks[self._index]
+
+    @encoder_ticks.setter
+    def encoder_ticks(self, value):
+        self._state._ticks[self._index] = value
+
+    @property
+    def state(self) -> str:
+        return self._state.wheel_states[self._index]
+
+    @state.setter
+    def state(self, value):
+        self._state.wheel_states[self._index] = value
+
+    @property
+    def name(self) -> str:
+        return WHEEL_NAMES[self._index]
+
+    def _asdict(self) -> dict:
+        s, i = self._state, self._index
+        return {'name': WHEEL_NAMES[i], 'state': s.wheel_states[i], 'speed': s._f[WHEEL_SPEEDS + i],
+                'target_speed': s._f[WHEEL_TARGETS + i], 'encoder_ticks': s._ticks[i]}
+
+
+class SensorView(_View):
+    __slots__ = ()
+    value = _float_column(SENSOR_VALUES)
+    is_active = _flag_column(SENSOR_ACTIVE)
+
+    @property
+    def name(self) -> str:
+        return SENSOR_NAMES[self._index]
+
+    @property
+    def unit(self) -> str:
+        return SENSOR_UNITS[self._index]
+
+    def _asdict(self) -> dict:
+        s, i = self._state, self._index
+        return {'name': SENSOR_NAMES[i], 'value': s._f[SENSOR_VALUES + i], 'unit': SENSOR_UNITS[i],
+                'is_active': bool(s._b[SENSOR_ACTIVE + i])}
+
+
+class ActuatorView(_View):
+    __slots__ = ()
+    position = _float_column(ACTUATOR_POSITIONS)
+    is_enabled = _flag_column(ACTUATOR_ENABLED)
+
+    @property
+    def name(self) -> str:
+        return ACTUATOR_NAMES[self._index]
+
+    def _asdict(self) -> dict:
+        s, i = self._state, self._index
+        return {'name': ACTUATOR_NAMES[i], 'position': s._f[ACTUATOR_POSITIONS + i],
+                'is_enabled': bool(s._b[ACTUATOR_ENABLED + i])}
+
+
+class CompactState:
+    """
+    Même interface que `RobotState` (attributs et `to_dict`), grandeurs numériques
+    dans trois tableaux: `_f` (float64, disposition POSE ... ACTUATOR_POSITIONS),
+    `_ticks` (int64) et `_b` (drapeaux). Les vues `position`, `wheels`, `sensors`,
+    `actuators` ne sont créées qu'au premier accès: un état jamais lu élément par
+    élément (historique, file d'envoi) n'en alloue aucune.
+    """
+    __slots__ = ('robot_name', 'team_name', 'mode', 'is_connected', 'battery_level',
+                 'match_time_remaining', 'score', 'direction', 'angular_velocity', 'linear_velocity',
+                 'obstacle_detected', 'emergency_stop_active', 'calibration_done', 'aruco_detected',
+                 'detected_aruco_ids', 'last_update',
+                 '_f', '_ticks', '_b', 'wheel_states', '_views')
+
+    def __init__(self):
+        self.robot_name = _DEFAULT.robot_name
+        self.team_name = _DEFAULT.team_name
+        self.mode = RobotMode.IDLE.value
+        self.is_connected = False
+        self.battery_level = 100.0
+        self.match_time_remaining = 100
+        self.score = 0
+        self.direction = 0.0
+        self.angular_velocity = 0.0
+        self.linear_velocity = 0.0
+        self.obstacle_detected = False
+        self.emergency_stop_active = False
+        self.calibration_done = False
+        self.aruco_detected = False
+        self.detected_aruco_ids = []
+        self.last_update = time.time()
+
+        self._f = array('d', bytes(8 * N_FLOATS))
+        self._ticks = array('q', bytes(8 * N_WHEELS))
+        self._b = array('b', bytes(N_SENSORS + N_ACTUATORS))
+        self._b[SENSOR_ACTIVE:SENSOR_ACTIVE + N_SENSORS] = array('b', [1] * N_SENSORS)
+        # chaînes internées (valeurs de WheelState): pas d'allocation à la mise à jour
+        self.wheel_states = [WheelState.STOPPED.value] * N_WHEELS
+        self._views = None
+
+    # --- vues compatibles RobotState (créées au premier accès) ---------------------------
+
+    def _make_views(self):
+        self._views = (PositionView(self, POSE), PositionView(self, TARGET),
+                       tuple(WheelView(self, i) for i in range(N_WHEELS)),
+                       tuple(SensorView(self, i) for i in range(N_SENSORS)),
+                       tuple(ActuatorView(self, i) for i in range(N_ACTUATORS)))
+        return self._views
+
+    @property
+    def position(self) -> PositionView:
+        return (self._views or self._make_views())[0]
+
+    @property
+    def target_position(self) -> PositionView:
+        return (self._views or self._make_views())[1]
+
+    @property
+    def wheels(self):
+        return (self._views or self._make_views())[2]
+
+    @property
+    def sensors(self):
+        return (self._views or self._make_views())[3]
+
+    @property
+    def actuators(self):
+        return (self._views or self._make_views())[4]
+
+    # --- colonnes (memoryview sans copie, compatibles numpy.frombuffer) --------------------
+
+    def _floats(self, start: int, n: int) -> memoryview:
+        return memoryview(self._f)[start:start + n]
+
+    @property
+    def wheel_speeds(self) -> memoryview:
+        return self._floats(WHEEL_SPEEDS, N_WHEELS)
+
+    @property
+    def wheel_targets(self) -> memoryview:
+        return self._floats(WHEEL_TARGETS, N_WHEELS)
+
+    @property
+    def wheel_ticks(self) -> memoryview:
+        return memoryview(self._ticks)
+
+    @property
+    def sensor_values(self) -> memoryview:
+        return self._floats(SENSOR_VALUES, N_SENSORS)
+
+    @property
+    def actuator_positions(self) -> memoryview:
+        return self._floats(ACTUATOR_POSITIONS, N_ACTUATORS)
+
+    @classmethod
+    def from_state(cls, state: RobotState) -> 'CompactState':
+        """Copie d'un `RobotState` (dataclasses) en représentation compacte."""
+        compact = cls()
+        for name in ('robot_name', 'team_name', 'mode', 'is_connected', 'battery_level',
+                     'match_time_remaining', 'score', 'direction', 'angular_velocity', 'linear_velocity',
+                     'obstacle_detected', 'emergency_stop_active', 'calibration_done', 'aruco_detected',
+                     'last_update'):
+            setattr(compact, name, getattr(state, name))
+        compact.detected_aruco_ids = list(state.detected_aruco_ids)
+        f = compact._f
+        f[POSE:POSE + 3] = array('d', (state.position.x, state.position.y, state.position.theta))
+        f[TARGET:TARGET + 3] = array('d', (state.target_position.x, state.target_position.y,
+                                           state.target_position.theta))
+        for i, wheel in enumerate(state.wheels):
+            compact.wheel_states[i] = wheel.state
+            f[WHEEL_SPEEDS + i] = wheel.speed
+            f[WHEEL_TARGETS + i] = wheel.target_speed
+            compact._ticks[i] = wheel.encoder_ticks
+        for i, sensor in enumerate(state.sensors):
+            f[SENSOR_VALUES + i] = sensor.value
+            compact._b[SENSOR_ACTIVE + i] = sensor.is_active
+        for i, actuator in enumerate(state.actuators):
+            f[ACTUATOR_POSITIONS + i] = actuator.position
+            compact._b[ACTUATOR_ENABLED + i] = actuator.is_enabled
+        return compact
+
+    def apply_columns(self, position=None, wheel_states=None, wheel_speeds=None, wheel_ticks=None,
+                      wheel_targets=None, sensor_values=None) -> None:
+        """Partie par élément de `RobotStateManager.update_frame`, copiée par tranches dans les tableaux."""
+        f = self._f
+        if position is not None:
+            _fill(f, POSE, 3, position, 'd')
+            self.direction = f[POSE + 2]
+        if wheel_states is not None:
+            for i, value in zip(range(N_WHEELS), wheel_states):
+                self.wheel_states[i] = value
+        if wheel_speeds is not None:
+            _fill(f, WHEEL_SPEEDS, N_WHEELS, wheel_speeds, 'd')
+        if wheel_ticks is not None:
+            _fill(self._ticks, 0, N_WHEELS, wheel_ticks, 'q')
+        if wheel_targets is not None:
+            _fill(f, WHEEL_TARGETS, N_WHEELS, wheel_targets, 'd')
+        if sensor_values is not None:
+            _fill(f, SENSOR_VALUES, N_SENSORS, sensor_values, 'd')
+
+    def to_dict(self) -> dict:
+        f, ticks, b, states = self._f, self._ticks, self._b, self.wheel_states
+        return {
+            'robot_name': self.robot_name,
+            'team_name': self.team_name,
+            'mode': self.mode,
+            'is_connected': self.is_connected,
+            'battery_level': self.battery_level,
+            'match_time_remaining': self.match_time_remaining,
+            'score': self.score,
+            'position': {'x': f[POSE], 'y': f[POSE + 1], 'theta': f[POSE + 2]},
+            'target_position': {'x': f[TARGET], 'y': f[TARGET + 1], 'theta': f[TARGET + 2]},
+            'direction': self.direction,
+            'angular_velocity': self.angular_velocity,
+            'linear_velocity': self.linear_velocity,
+            'wheels': [{'name': WHEEL_NAMES[i], 'state': states[i], 'speed': f[WHEEL_SPEEDS + i],
+                        'target_speed': f[WHEEL_TARGETS + i], 'encoder_ticks': ticks[i]}
+                       for i in range(N_WHEELS)],
+            'sensors': [{'name': SENSOR_NAMES[i], 'value': f[SENSOR_VALUES + i], 'unit': SENSOR_UNITS[i],
+                         'is_active': bool(b[SENSOR_ACTIVE + i])} for i in range(N_SENSORS)],
+            'actuators': [{'name': ACTUATOR_NAMES[i], 'position': f[ACTUATOR_POSITIONS + i],
+                           'is_enabled': bool(b[ACTUATOR_ENABLED + i])} for i in range(N_ACTUATORS)],
+            'obstacle_detected': self.obstacle_detected,
+            'emergency_stop_active': self.emergency_stop_active,
+            'calibration_done': self.calibration_done,
+            'aruco_detected': self.aruco_detected,
+            'detected_aruco_ids': self.detected_aruco_ids,
+            'last_update': self.last_update,
+        }
@@ -1,17 +1,199 @@
-import serial
+import argparse
+import os
+import select
+import sys
 import time
 import curses
+from collections import deque
 
-arduino = serial.Serial('/dev/ttyACM0', 9600, timeout=1)
-time.sleep(2)
+try:
+    import serial
+except ImportError:
+    serial = None
 
-def send_command(cmd):
-    arduino.write((cmd + "\n").encode())
-    response = arduino.readline().decode().strip()
+from command_trace import CommandTracer, format_trace_line, parse_ack, parse_tagged, tag_command
+from robot_daemon import DEFAULT_PORT as DAEMON_PORT, KIND_COMMAND, KIND_PRIORITY, DaemonClient
+from robot_motion import MotionClient
+from telemetry import is_any_telemetry, is_robot_event
+
+arduino = None
+# reçoit les trames de télémétrie (`T ...*HH`) lues en attendant une réponse
+telemetry_sink = None
+
+
+def open_serial(port='/dev/ttyACM0', baud=9600, timeout=1):
+    global arduino
+    if serial is None:
+        raise RuntimeError("pyserial n'est pas installé (pip install pyserial)")
+    arduino = serial.Serial(port, baud, timeout=timeout)
+    time.sleep(2)  # l'Arduino redémarre à l'ouverture du port
+    return arduino
+
+
+def send_command_timed(cmd, seq=None, port=None, on_telemetry=None):
+    """
+    Envoie une commande (préfixée `#seq` si seq est donné) et attend la réponse.
+    Retourne (réponse, instant d'écriture, instant de réception) en time.monotonic().
+    Les trames de télémétrie intercalées sont passées à `on_telemetry` (ou `telemetry_sink`).
+    """
+    port = port or arduino
+    sink = on_telemetry or telemetry_sink
+    line = tag_command(seq, cmd) if seq is not None else cmd
+    t_write = time.monotonic()
+    port.write((line + "\n").encode())
+    while True:
+        response = port.readline().decode(errors='ignore').strip()
+        t_ack = time.monotonic()
+        if not response:
+            break  # timeout du port
+        if is_any_telemetry(response):
+            if sink is not None:
+                sink(response)
+            continue
+        if is_robot_event(response):
+            print(f"[WARN] Événement firmware: {response}")
+            continue
+        _, ack_seq = parse_ack(response)
+        if seq is None or ack_seq is None or ack_seq == seq:
+            break
+        # réponse tardive d'une commande précédente: ignorée
+    return response, t_write, t_ack
+
+
+def send_command(cmd, seq=None):
+    response, _, _ = send_command_timed(cmd, seq)
     print(f"> {cmd} -> {response}")
     return response
 
-def keyboard_control():
+
+def drain_telemetry(port=None, on_telemetry=None):
+    """Lit les trames de télémétrie en attente sur le port (hors attente d'une réponse)."""
+    port = port or arduino
+    sink = on_telemetry or telemetry_sink
+    while port.in_waiting:
+        line = port.readline().decode(errors='ignore').strip()
+        if not line:
+            break
+        if is_any_telemetry(line) and sink is not None:
+            sink(line)
+
+
+def _stdin_batches(stream, idle):
+    """
+    Lots de lignes déjà disponibles sur `stream`; lot vide toutes les `idle` s sans entrée.
+    Sans descripteur (tests), tout le flux forme un seul lot.
+    """
+    try:
+        fd = stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        fd = None
+    if fd is None:
+        yield list(stream)
+        return
+    pending = b""
+    while True:
+        ready, _, _ = select.select([fd], [], [], idle)
+        if not ready:
+            yield []
+            continue
+        data = os.read(fd, 4096)  # tout ce qui est arrivé, pas seulement la première ligne
+        if not data:
+            return
+        pending += data
+        *lines, pending = pending.split(b"\n")
+        yield [line.decode(errors='ignore') for line in lines]
+
+
+def _is_estop(cmd):
+    return cmd.split(None, 1)[0].upper() == "ESTOP"
+
+
+def stdin_bridge(stream=None, out=None, port=None, idle=0.05, send=None, drain=None, keepalive=None):
+    """
+    Pont stdin -> port série, utilisé depuis le shell SSH de l'interface.
+    Pour chaque commande préfixée `#seq`, écrit une ligne TRACE (voir command_trace).
+    Un ESTOP passe avant les commandes lues en même temps que lui, qui sont
+    annulées (réponse CANCELLED) au lieu d'être envoyées au robot.
+    Les trames de télémétrie sont relayées telles quelles, y compris sans commande en cours.
+    `send(cmd, seq)` / `drain()` remplacent le port série (voir `daemon_bridge`);
+    `keepalive` (s): PING sans commande pendant ce délai (chien de garde du firmware).
+    """
+    stream = stream or sys.stdin
+    out = out or sys.stdout
+    sink = telemetry_sink or (lambda frame: out.write(frame + "\n"))
+    if send is None:
+        send = lambda cmd, seq: send_command_timed(cmd, seq, port, sink)
+    if drain is None:
+        drain = lambda: drain_telemetry(port, sink)
+    last_sent = time.monotonic()
+
+    def report(seq, cmd, t_recv, response, t_write, t_ack):
+        if seq is not None:
+            out.write(format_trace_line(seq, t_recv, t_write, t_ack, response) + "\n")
+        else:
+            out.write(f"> {cmd} -> {response}\n")
+
+    for batch in _stdin_batches(stream, idle):
+        if not batch:
+            drain()
+            if keepalive and time.monotonic() - last_sent >= keepalive:
+                send("PING", None)
+                last_sent = time.monotonic()
+            out.flush()
+            continue
+        t_recv = time.monotonic()
+        commands = [(seq, cmd) for seq, cmd in map(parse_tagged, batch) if cmd]
+        stops = [i for i, (_, cmd) in enumerate(commands) if _is_estop(cmd)]
+        if stops:
+            seq, cmd = commands[stops[-1]]
+            report(seq, cmd, t_recv, *send(cmd, seq))
+            for seq, cmd in commands[:stops[-1]]:
+                report(seq, cmd, t_recv, "CANCELLED", t_recv, t_recv)
+            commands = commands[stops[-1] + 1:]
+        for seq, cmd in commands:
+            report(seq, cmd, t_recv, *send(cmd, seq))
+        last_sent = time.monotonic()
+        out.flush()
+
+
+def daemon_command_timed(client, cmd, seq=None, timeout=2.0):
+    """
+    Comme `send_command_timed`, mais par `robot_daemon` (ESTOP sur la voie prioritaire).
+    Écriture série et acquittement sont horodatés par le démon, dans l'horloge du Pi.
+    """
+    kind = KIND_PRIORITY if _is_estop(cmd) else KIND_COMMAND
+    t_send = time.monotonic()
+    status, stamps = client.request(cmd, timeout, kind)
+    t_ack = time.monotonic()
+    status = status or 'TIMEOUT'
+    response = f"{status} {seq}" if seq is not None else status
+    return response, stamps.get('serial_write', t_send), stamps.get('ack', t_ack)
+
+
+def daemon_bridge(target=f"127.0.0.1:{DAEMON_PORT}", stream=None, out=None, idle=0.05, keepalive=0.15):
+    """
+    Pont stdin -> `robot_daemon` (`--stdin --daemon`): le démon reste seul sur le port
+    série (TELEM et WDT compris); le pont n'est qu'un client de plus. Les PING de
+    `keepalive` maintiennent le chien de garde armé par le démon tant que le pont vit.
+    """
+    out = out or sys.stdout
+    host, _, port = target.rpartition(':')
+    frames = deque()  # télémétrie et événements reçus par le thread du client
+    client = DaemonClient(host or '127.0.0.1', int(port), on_telemetry=frames.append,
+                          on_robot_event=frames.append).connect()
+
+    def drain():
+        while frames:
+            out.write(frames.popleft() + "\n")
+
+    try:
+        stdin_bridge(stream, out, idle=idle, keepalive=keepalive, drain=drain,
+                     send=lambda cmd, seq: daemon_command_timed(client, cmd, seq))
+    finally:
+        client.close()
+
+
+def keyboard_control(tracer=None):
     SPEED = 200
 
     stdscr = curses.initscr()
@@ -26,6 +208,17 @@ def keyboard_control():
     stdscr.addstr(3, 0, "Y/U/I/O = Diagonales | Suppr=Quitter")
     stdscr.addstr(5, 0, "Maintiens les touches pour bouger...")
 
+    def send(cmd, t_key):
+        if tracer is None:
+            return send_command(cmd)
+        # touche -> écriture série -> OK <seq>, tout dans l'horloge du Pi
+        seq, _ = tracer.begin(cmd, stage='gui', t=t_key)
+        tracer.mark(seq, 'pi_recv', t_key)
+        response, t_write, t_ack = send_command_timed(cmd, seq)
+        tracer.finish(seq, {'serial_write': t_write, 'ack': t_ack}, response, t=t_ack)
+        print(f"> {cmd} -> {response}")
+        return response
+
     try:
         while True:
             keys = set()
@@ -36,10 +229,11 @@ def keyboard_control():
                 if key == -1:
                     break
                 keys.add(key)
+            t_key = time.monotonic()
 
             # Quitter avec SUPPR
             if curses.KEY_DC in keys:
-                send_command("MOVE stop 0")
+                send("MOVE stop 0", t_key)
                 break
 
             # Flags touches
@@ -58,34 +252,34 @@ def keyboard_control():
             # --- PRIORITÉ : diagonales sur Y U I O ---
             if y:
                 # choisis la diagonale que tu veux; exemple: avant gauche
-                send_command(f"MOVE forwardLeft {SPEED}")
+                send(f"MOVE forwardLeft {SPEED}", t_key)
             elif u:
                 # exemple: avant droite
-                send_command(f"MOVE forwardRight {SPEED}")
+                send(f"MOVE forwardRight {SPEED}", t_key)
             elif i:
                 # exemple: arrière gauche
-                send_command(f"MOVE backwardLeft {SPEED}")
+                send(f"MOVE backwardLeft {SPEED}", t_key)
             elif o:
                 # exemple: arrière droite
-                send_command(f"MOVE backwardRight {SPEED}")
+                send(f"MOVE backwardRight {SPEED}", t_key)
 
             # --- MOUVEMENTS SIMPLES ---
             elif z:
-                send_command(f"MOVE forward {SPEED}")
+                send(f"MOVE forward {SPEED}", t_key)
             elif s:
-                send_command(f"MOVE backward {SPEED}")
+                send(f"MOVE backward {SPEED}", t_key)
             elif q:
-                send_command(f"MOVE left {SPEED}")
+                send(f"MOVE left {SPEED}", t_key)
             elif d:
-                send_command(f"MOVE right {SPEED}")
+                send(f"MOVE right {SPEED}", t_key)
             elif a:
-                send_command(f"MOVE rotateCCW {SPEED}")
+                send(f"MOVE rotateCCW {SPEED}", t_key)
             elif e:
-                send_command(f"MOVE rotateCW {SPEED}")
+                send(f"MOVE rotateCW {SPEED}", t_key)
 
             # --- AUCUNE TOUCHE : STOP ---
             else:
-                send_command("MOVE stop 0")
+                send("MOVE stop 0", t_key)
 
             time.sleep(0.05)
 
@@ -96,5 +290,88 @@ def keyboard_control():
         curses.endwin()
 
 
+def joystick_control(rate_hz=20.0, device=0):
+    """
+    Pilotage analogique: une commande VEL par tick (stick gauche: translation,
+    stick droit horizontal: rotation). Bouton 0: arrêt et sortie.
+    À 9600 bauds, une commande VEL + OK prend ~20 ms sur la liaison: rester sous ~40 Hz.
+    """
+    try:
+        import pygame
+    except ImportError:
+        raise RuntimeError("pygame n'est pas installé (pip install pygame)")
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # pas de fenêtre, utilisable via SSH
+    pygame.init()
+    pygame.joystick.init()
+    if pygame.joystick.get_count() == 0:
+        pygame.quit()
+        raise RuntimeError("Aucune manette détectée")
+    stick = pygame.joystick.Joystick(device)
+    stick.init()
+    print(f"[INFO] Manette: {stick.get_name()} ({rate_hz:g} Hz)")
+
+    client = MotionClient(lambda cmd: send_command_timed(cmd)[0])
+    period = 1.0 / rate_hz
+    next_tick = time.monotonic()
+    try:
+        while True:
+            pygame.event.pump()
+            if stick.get_button(0):
+                break
+            rot = stick.get_axis(3) if stick.get_numaxes() > 3 else 0.0
+            client.joystick(stick.get_axis(0), stick.get_axis(1), rot)
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+    finally:
+        client.stop()
+        pygame.quit()
+        print(f"[INFO] {client.sent} commandes envoyées, {client.skipped} répétitions évitées")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pilotage du robot par le port série de l'Arduino")
+    parser.add_argument("--port", default="/dev/ttyACM0", help="Port série de l'Arduino")
+    parser.add_argument("--baud", type=int, default=9600, help="Débit du port série")
+    parser.add_argument("--stdin", action="store_true",
+                        help="Pont stdin -> série (commandes envoyées par l'interface via SSH)")
+    parser.add_argument("--joystick", action="store_true",
+                        help="Pilotage analogique à la manette (commandes VEL, nécessite pygame)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Fréquence des commandes VEL en mode manette (Hz)")
+    parser.add_argument("--telem", type=int, default=0,
+                        help="Période de la télémétrie codeurs/PWM demandée à l'Arduino (ms, 0 = désactivée)")
+    parser.add_argument("--wdt", type=int, default=0,
+                        help="Chien de garde du firmware: arrêt des moteurs sans commande pendant ce délai (ms, 0 = désactivé)")
+    parser.add_argument("--daemon", nargs='?', const=f"127.0.0.1:{DAEMON_PORT}", default=None, metavar="HOTE:PORT",
+                        help="Avec --stdin: passe par robot_daemon au lieu d'ouvrir le port série (déjà tenu par le démon)")
+    parser.add_argument("--trace", default=None,
+                        help="Tracer la latence touche -> OK et exporter dans ce fichier (.json ou .csv)")
+    args = parser.parse_args()
+
+    if args.daemon:
+        if not args.stdin:
+            parser.error("--daemon s'utilise avec --stdin")
+        daemon_bridge(args.daemon)
+        return
+    open_serial(args.port, args.baud)
+    send_command_timed(f"TELEM {args.telem}")
+    send_command_timed(f"WDT {args.wdt}")
+    if args.stdin:
+        stdin_bridge()
+        return
+    if args.joystick:
+        joystick_control(args.rate)
+        return
+    tracer = CommandTracer() if args.trace else None
+    keyboard_control(tracer)
+    if tracer is not None:
+        tracer.export(args.trace)
+        for name, s in tracer.summary().items():
+            print(f"{name:14s} n={s['count']:5d} p50 {s['p50_ms']:7.2f} ms | p95 {s['p95_ms']:7.2f} ms | max {s['max_ms']:7.2f} ms")
+
+
 if __name__ == "__main__":
-    keyboard_control()
+    main()
@@ -0,0 +1,239 @@
+"""
+File: `frame_ring.py`
+Author: Hugo Demont
+Version: 1.0.0
+
+Anneau de tampons d'images en mémoire partagée (`multiprocessing.shared_memory`)
+entre un processus de capture et un nombre quelconque de consommateurs
+(détecteurs, enregistreurs), sans sérialisation des images.
+
+Disposition du segment:
+    en-tête global (64 o): magic, nombre de slots, taille d'un slot, dernier seq écrit
+    slot i: en-tête (64 o: seq, timestamp, hauteur, largeur, canaux) + pixels
+
+Chaque slot est protégé par un « seqlock »: l'écrivain met seq à 0 pendant la
+copie puis écrit le numéro d'image; un lecteur vérifie que seq n'a pas changé
+après usage (`FrameRing.is_valid`) pour détecter un écrasement.
+
+Usage:
+    python frame_ring.py --source 0 --name robot_cam          # processus de capture
+    python pos_estimation.py --source ring:robot_cam --quiet  # un ou plusieurs détecteurs
+"""
+import argparse
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+from frame_source import FrameSource, open_source
+
+MAGIC = 0x52494E47  # 'RING'
+HEADER_BYTES = 64
+SLOT_HEADER_BYTES = 64
+SLOT_DTYPE = np.dtype([('seq', '<u8'), ('ts', '<f8'), ('h', '<u4'), ('w', '<u4'), ('c', '<u4')])
+
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    # Avant Python 3.13, un simple attach enregistre le segment auprès du
+    # resource_tracker, qui le détruit à la sortie du consommateur.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # on neutralise l'enregistrement plutôt que de désinscrire après coup:
+        # dans un processus forké, le tracker est partagé avec le créateur
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class FrameRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self.owner = owner
+        self.name = shm.name
+        self._header = np.ndarray((4,), dtype='<u8', buffer=shm.buf, offset=0)
+        if int(self._header[0]) != MAGIC:
+            raise ValueError(f"Segment {shm.name} n'est pas un anneau d'images")
+        self.slots = int(self._header[1])
+        self.slot_bytes = int(self._header[2])
+        self._slot_headers = []
+        self._slot_data = []
+        for i in range(self.slots):
+            base = HEADER_BYTES + i * (SLOT_HEADER_BYTES + self.slot_bytes)
+            self._slot_headers.append(np.ndarray((1,), dtype=SLOT_DTYPE, buffer=shm.buf, offset=base))
+            self._slot_data.append(np.ndarray((self.slot_bytes,), dtype=np.uint8, buffer=shm.buf,
+                                              offset=base + SLOT_HEADER_BYTES))
+
+    @classmethod
+    def create(cls, name: Optional[str], frame_shape: Tuple[int, ...], slots: int = 8) -> 'FrameRing':
+        slot_bytes = int(np.prod(frame_shape))
+        slot_bytes = (slot_bytes + 63) // 64 * 64  # slots alignés sur 64 octets
+        size = HEADER_BYTES + slots * (SLOT_HEADER_BYTES + slot_bytes)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((4,), dtype='<u8', buffer=shm.buf, offset=0)
+        header[:] = (MAGIC, slots, slot_bytes, 0)
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'FrameRing':
+        return cls(_attach_untracked(name), owner=False)
+
+    @property
+    def last_seq(self) -> int:
+        return int(self._header[3])
+
+    def write(self, frame: np.ndarray, timestamp: float) -> int:
+        """Copie une image dans le slot suivant et la publie. Retourne son numéro de séquence."""
+        if frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes:
+            raise ValueError("Image incompatible avec l'anneau (uint8, taille max {} o)".format(self.slot_bytes))
+        seq = self.last_seq + 1
+        hdr = self._slot_headers[seq % self.slots]
+        hdr['seq'] = 0  # slot en cours d'écriture
+        np.copyto(self._slot_data[seq % self.slots][:frame.nbytes], frame.reshape(-1))
+        shape = frame.shape + (1,) * (3 - frame.ndim)
+        hdr['ts'] = timestamp
+        hdr['h'], hdr['w'], hdr['c'] = shape
+        hdr['seq'] = seq
+        self._header[3] = seq
+        return seq
+
+    def view(self, seq: int) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Vue zéro-copie de l'image `seq` si elle est encore présente, sinon None.
+        La vue peut être écrasée par l'écrivain: vérifier `is_valid(seq)` après usage.
+        """
+        hdr = self._slot_headers[seq % self.slots][0]
+        if int(hdr['seq']) != seq:
+            return None
+        h, w, c = int(hdr['h']), int(hdr['w']), int(hdr['c'])
+        ts = float(hdr['ts'])
+        data = self._slot_data[seq % self.slots][:h * w * c]
+        shape = (h, w) if c == 1 else (h, w, c)
+        frame = data.reshape(shape)
+        frame.flags.writeable = False  # partagée avec les autres consommateurs
+        if not self.is_valid(seq):
+            return None
+        return frame, ts
+
+    def is_valid(self, seq: int) -> bool:
+        return int(self._slot_headers[seq % self.slots][0]['seq']) == seq
+
+    def wait_for(self, seq: int, timeout: float = 1.0, poll: float = 0.001) -> bool:
+        """Attend que l'image `seq` ait été publiée."""
+        deadline = time.monotonic() + timeout
+        while self.last_seq < seq:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def close(self) -> None:
+        self._header = None
+        self._slot_headers = []
+        self._slot_data = []
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # des vues zéro-copie sont encore référencées par l'appelant
+        if self.owner:
+            self._shm.unlink()
+
+
+class RingSource(FrameSource):
+    """
+    Consommateur de l'anneau sous forme de FrameSource.
+    `latest=True` saute directement à l'image la plus récente (détecteur temps réel);
+    sinon les images sont lues dans l'ordre et les images écrasées sont comptées dans `dropped`.
+    `copy=False` renvoie des vues zéro-copie en lecture seule (à traiter avant que
+    l'écrivain ne fasse le tour; copier avant de dessiner dessus): vérifier
+    `frame_valid()` après traitement et jeter le résultat si l'image a été écrasée.
+    """
+    def __init__(self, name: str, latest: bool = True, copy: bool = False, timeout: float = 2.0):
+        self.ring = FrameRing.attach(name)
+        self.latest = latest
+        self.copy = copy
+        self.timeout = timeout
+        self.dropped = 0
+        self._next = max(1, self.ring.last_seq)
+        self._seq = 0  # dernière image rendue
+
+    def read(self):
+        while True:
+            if self.latest:
+                self._next = max(self._next, self.ring.last_seq)
+            if not self.ring.wait_for(self._next, timeout=self.timeout):
+                return False, None, 0.0
+            item = self.ring.view(self._next)
+            if item is None:
+                # écrasée avant lecture: on rattrape l'écrivain
+                newest = self.ring.last_seq
+                self.dropped += max(1, newest - self._next)
+                self._next = newest
+                continue
+            frame, ts = item
+            seq = self._next
+            self._next += 1
+            if self.copy:
+                frame = frame.copy()
+                if not self.ring.is_valid(seq):
+                    self.dropped += 1
+                    continue
+            self._seq = seq
+            return True, frame, ts
+
+    def frame_valid(self) -> bool:
+        if self.copy or not self._seq:
+            return True
+        if self.ring.is_valid(self._seq):
+            return True
+        self.dropped += 1
+        return False
+
+    def release(self):
+        self.ring.close()
+
+
+def capture_process(name: str, source_spec: str = "0", slots: int = 8, max_frames: int = 0) -> None:
+    """Boucle du processus de capture: lit la source et publie chaque image dans l'anneau."""
+    source = open_source(source_spec)
+    ok, frame, ts = source.read()
+    if not ok:
+        print("[ERROR] Aucune image reçue de la source", source_spec)
+        source.release()
+        return
+    ring = FrameRing.create(name, frame.shape, slots=slots)
+    print(f"[INFO] Anneau '{ring.name}' prêt: {slots} slots de {frame.shape}")
+    count = 0
+    try:
+        while ok:
+            ring.write(frame, ts)
+            count += 1
+            if max_frames and count >= max_frames:
+                break
+            ok, frame, ts = source.read()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        source.release()
+        print(f"[INFO] {count} images publiées")
+        ring.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processus de capture vers un anneau d'images partagé")
+    parser.add_argument("--source", default="0", help="Source d'images (voir frame_source.open_source)")
+    parser.add_argument("--name", default="robot_cam", help="Nom du segment de mémoire partagée")
+    parser.add_argument("--slots", type=int, default=8, help="Nombre de tampons de l'anneau")
+    parser.add_argument("--max-frames", type=int, default=0, help="Arrêt après N images (0 = sans limite)")
+    args = parser.parse_args()
+    capture_process(args.name, args.source, slots=args.slots, max_frames=args.max_frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+File: `frame_source.py`
+Author: Hugo Demont
+Version: 1.0.0
+
+Sources d'images interchangeables pour `pos_estimation.py`:
+
+- caméra (`"0"`, `"1"`, ...)                -> CaptureSource (horodatage à l'acquisition)
+- fichier vidéo (`video/robot_demo.mp4`)    -> CaptureSource (horodatage média exact, CAP_PROP_POS_MSEC)
+- dossier d'images (`images/`)              -> ImageDirSource (horodatage index / fps)
+- générateur synthétique (`synthetic:N:S`)  -> SyntheticSource (N images, graine S)
+- anneau mémoire partagée (`ring:NOM`)      -> frame_ring.RingSource (image la plus récente)
+
+Toutes exposent `read() -> (ok, frame, timestamp)`; le timestamp est en secondes.
+`PrefetchSource` décode dans un thread séparé avec une file bornée: c'est le
+mode « max speed » utilisé pour benchmarker le détecteur hors ligne.
+"""
+import glob
+import os
+import queue
+import threading
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('*.png', '*.jpg', '*.jpeg', '*.bmp')
+
+
+class FrameSource:
+    """Interface commune: read() -> (ok, frame, timestamp), release()."""
+    def read(self) -> Tuple[bool, Optional[np.ndarray], float]:
+        raise NotImplementedError
+
+    def release(self) -> None:
+        pass
+
+    def is_opened(self) -> bool:
+        return True
+
+    def frame_valid(self) -> bool:
+        """La dernière image lue est-elle encore intacte? (toujours, sauf vues partagées de `ring:`)"""
+        return True
+
+    def __iter__(self):
+        while True:
+            ok, frame, ts = self.read()
+            if not ok:
+                return
+            yield frame, ts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class CaptureSource(FrameSource):
+    def __init__(self, target):
+        self._cap = cv2.VideoCapture(target)
+        self._is_file = isinstance(target, str)
+
+    def is_opened(self) -> bool:
+        return self._cap.isOpened()
+
+    def read(self):
+        ok, frame = self._cap.read()
+        if not ok:
+            return False, None, 0.0
+        if self._is_file:
+            # temps média de l'image décodée (indépendant de la vitesse de lecture)
+            ts = self._cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        else:
+            ts = time.monotonic()
+        return True, frame, ts
+
+    def release(self):
+        self._cap.release()
+
+
+class ImageDirSource(FrameSource):
+    def __init__(self, directory: str, fps: float = 30.0):
+        files = []
+        for ext in IMAGE_EXTENSIONS:
+            files.extend(glob.glob(os.path.join(directory, ext)))
+        self.files = sorted(files)
+        self.fps = fps
+        self._index = 0
+
+    def is_opened(self) -> bool:
+        return bool(self.files)
+
+    def read(self):
+        while self._index < len(self.files):
+            index = self._index
+            self._index += 1
+            frame = cv2.imread(self.files[index])
+            if frame is not None:
+                return True, frame, index / self.fps
+        return False, None, 0.0
+
+
+class SyntheticSource(FrameSource):
+    """
+    Images générées à la volée par `post_estimation_test_no_cam` (même graine => même flux).
+    `last_truth` contient la vérité terrain de la dernière image lue.
+    """
+    def __init__(self, count: int = 200, seed: int = 0, dict_name: str = "DICT_4X4_50",
+                 frame_size=(1280, 720), fps: float = 30.0, batch_size: int = 16, size_m: float = 0.066):
+        import post_estimation_test_no_cam as synth  # import différé: scipy et le générateur ne sont utiles qu'ici
+        self._synth = synth
+        self.count = count
+        self.fps = fps
+        self.batch_size = batch_size
+        self.frame_size = frame_size
+        self.size_m = size_m
+        self.camera_matrix = synth.default_camera_matrix(*frame_size)
+        self._rng = np.random.default_rng(seed)
+        self._dict = cv2.aruco.getPredefinedDictionary(synth.ARUCO_DICT[dict_name])
+        self._id_pool = np.arange(int(dict_name.rsplit('_', 1)[-1]) if dict_name[-1].isdigit() else 50)
+        self._noise = synth.NoiseBank(self._rng, (frame_size[1], frame_size[0]))
+        self._batch = []
+        self._index = 0
+        self.last_truth = []
+
+    def read(self):
+        if self._index >= self.count:
+            return False, None, 0.0
+        if not self._batch:
+            n = min(self.batch_size, self.count - self._index)
+            frames, truths = self._synth.generate_synthetic_batch(
+                self._rng, self._dict, self._id_pool, self._rng.integers(1, 5, size=n).tolist(),
+                self.camera_matrix, np.zeros(5), self.size_m, self.frame_size, noise_bank=self._noise)
+            self._batch = list(zip(frames, truths))[::-1]
+        gray, self.last_truth = self._batch.pop()
+        ts = self._index / self.fps
+        self._index += 1
+        return True, cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR), ts
+
+
+class PrefetchSource(FrameSource):
+    """
+    Décodage dans un thread dédié, `prefetch` images d'avance.
+    Le consommateur ne paie plus le coût de décodage tant que la file n'est pas vide.
+    """
+    _END = object()
+
+    def __init__(self, source: FrameSource, prefetch: int = 8):
+        self.source = source
+        self._queue = queue.Queue(maxsize=max(1, prefetch))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def is_opened(self) -> bool:
+        return self.source.is_opened()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                ok, frame, ts = self.source.read()
+                if not ok:
+                    break
+                # put bloquant avec timeout pour pouvoir s'arrêter proprement
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put((frame, ts), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        finally:
+            while True:
+                try:
+                    self._queue.put(self._END, timeout=0.1)
+                    break
+                except queue.Full:
+                    if self._stop.is_set():
+                        break
+
+    def read(self):
+        while True:
+            if self._stop.is_set():
+                return False, None, 0.0  # après release(): images encore en file ignorées
+            try:
+                item = self._queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if not self._thread.is_alive():
+                    return False, None, 0.0  # thread de décodage mort sans marquer la fin du flux
+        if item is self._END:
+            self._queue.put_nowait(self._END)  # les lectures suivantes restent en fin de flux
+            return False, None, 0.0
+        frame, ts = item
+        return True, frame, ts
+
+    def release(self):
+        self._stop.set()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._thread.join(timeout=1.0)
+        self.source.release()
+
+
+def open_source(spec: str, max_speed: bool = False, prefetch: int = 8, fps: float = 30.0) -> FrameSource:
+    """
+    Construit une source depuis une chaîne: index caméra, fichier vidéo,
+    dossier d'images, `synthetic[:N[:graine]]` ou `ring:NOM`.
+    """
+    spec = str(spec)
+    if spec.startswith('ring:'):
+        from frame_ring import RingSource  # import différé (dépendance circulaire)
+        # pas de préchargement: l'anneau est déjà un tampon et on veut l'image la plus récente
+        return RingSource(spec[len('ring:'):])
+    elif spec.startswith('synthetic'):
+        parts = spec.split(':')
+        count = int(parts[1]) if len(parts) > 1 and parts[1] else 200
+        seed = int(parts[2]) if len(parts) > 2 and parts[2] else 0
+        source = SyntheticSource(count=count, seed=seed, fps=fps)
+    elif spec.isdigit():
+        source = CaptureSource(int(spec))
+    elif os.path.isdir(spec):
+        source = ImageDirSource(spec, fps=fps)
+    else:
+        source = CaptureSource(spec)
+    if max_speed:
+        source = PrefetchSource(source, prefetch=prefetch)
+    return source
@@ -0,0 +1,121 @@
+"""
+Fichier: link_watchdog.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Chien de garde côté PC: détection rapide d'une perte de liaison.
+
+Chaque source de données (acquittements du démon, télémétrie, sortie SSH...)
+est surveillée avec son propre délai: `feed(source)` à chaque donnée reçue.
+Des battements de cœur (`PING`, acquittés par le firmware) sont envoyés toutes
+les `heartbeat_period` s par la fonction `heartbeat` fournie (démon, pont SSH),
+ce qui garde la source d'acquittements vivante même sans commande.
+
+Si une source dépasse son délai (200 ms par défaut), le chien de garde passe
+l'état en déconnecté et déclenche `set_emergency_stop(True)` puis `on_trip`
+(envoi d'un arrêt au robot). La reconnexion est signalée dès que toutes les
+sources sont de nouveau fraîches; l'arrêt d'urgence reste actif jusqu'à sa
+levée par l'opérateur.
+
+Côté firmware, `WDT <ms>` coupe les moteurs après ce délai sans commande
+(PING compris) et envoie la ligne `WDT`.
+
+La vérification tourne dans la boucle de l'IOCore (`start(core)`), toutes les
+`deadline / 4` s au plus: détection en moins de 1,25 x le délai.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class Watchdog:
+    def __init__(self, manager=None, deadline: float = 0.2,
+                 heartbeat: Optional[Callable[[], None]] = None, heartbeat_period: float = 0.05,
+                 on_trip: Optional[Callable[[List[str]], None]] = None,
+                 on_recover: Optional[Callable[[], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.manager = manager
+        self.deadline = deadline
+        self.heartbeat = heartbeat
+        self.heartbeat_period = heartbeat_period
+        self.on_trip = on_trip
+        self.on_recover = on_recover
+        self.clock = clock
+        self._deadlines: Dict[str, float] = {}
+        self._last: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_heartbeat = None
+        self._future = None
+        self.tripped = False
+        self.trips = 0
+        self.stale: List[str] = []
+
+    def watch(self, source: str, deadline: Optional[float] = None) -> None:
+        """Surveille `source`; le délai démarre maintenant (pas de déclenchement immédiat)."""
+        with self._lock:
+            self._deadlines[source] = self.deadline if deadline is None else deadline
+            self._last[source] = self.clock()
+
+    def unwatch(self, source: str) -> None:
+        with self._lock:
+            self._deadlines.pop(source, None)
+            self._last.pop(source, None)
+
+    def feed(self, source: str) -> None:
+        """Donnée reçue de `source` (thread-safe, appelable depuis n'importe quel thread)."""
+        self._last[source] = self.clock()
+
+    def ages(self) -> Dict[str, float]:
+        """Âge (s) de la dernière donnée de chaque source surveillée."""
+        now = self.clock()
+        with self._lock:
+            return {s: now - self._last.get(s, now) for s in self._deadlines}
+
+    def check(self) -> List[str]:
+        """Retourne les sources en retard; déclenche ou lève l'alarme selon le cas."""
+        now = self.clock()
+        with self._lock:
+            stale = [s for s, d in self._deadlines.items() if now - self._last.get(s, now) > d]
+        self.stale = stale
+        if stale and not self.tripped:
+            self.tripped = True
+            self.trips += 1
+            print(f"[WARN] Chien de garde: pas de données depuis plus de {self.deadline * 1000:.0f} ms ({', '.join(stale)})")
+            if self.manager is not None:
+                self.manager.set_connected(False)
+                self.manager.set_emergency_stop(True)
+            if self.on_trip is not None:
+                self.on_trip(stale)
+        elif not stale and self.tripped:
+            self.tripped = False
+            print("[INFO] Chien de garde: liaison rétablie")
+            if self.manager is not None:
+                self.manager.set_connected(True)
+            if self.on_recover is not None:
+                self.on_recover()
+        return stale
+
+    def tick(self) -> None:
+        now = self.clock()
+        if self.heartbeat is not None and (self._last_heartbeat is None
+                                           or now - self._last_heartbeat >= self.heartbeat_period - 1e-6):
+            self._last_heartbeat = now
+            try:
+                self.heartbeat()
+            except Exception as e:
+                print(f"[ERROR] Battement de cœur: {e}")
+        self.check()
+
+    @property
+    def period(self) -> float:
+        return min(self.deadline / 4.0, self.heartbeat_period if self.heartbeat else self.deadline / 4.0)
+
+    def start(self, core) -> 'Watchdog':
+        """Planifie `tick()` dans la boucle d'un `robot_io.IOCore`."""
+        self._future = core.every(self.period, self.tick)
+        return self
+
+    def stop(self) -> None:
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
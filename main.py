@@ -6,6 +6,10 @@ Version: 1.0.0
 
 import argparse
 import sys
+import threading
+import time
+
+import perf
 
 
 def main():
@@ -23,6 +27,15 @@ Exemples d'utilisation:
   python main.py                 Lance l'interface (mode normal)
   python main.py --simulation    Lance avec données simulées
   python main.py -s              Raccourci pour --simulation
+  python main.py -s --sim-hz 500 --time-scale 4 --seed 1
+                                 Simulation à 500 Hz, 4x plus rapide, reproductible
+  python main.py -s --profile-startup
+                                 Détail des temps d'import et de construction
+  python main.py -s --robots pami1,pami2
+                                 Robots supplémentaires (simulés) sur le terrain
+  python main.py --share-state   Diffuse l'état aux tableaux de bord distants (port 5802)
+  python main.py --mirror poste-pilote.local
+                                 Tableau de bord miroir (lecture seule, sans liaison robot)
 
 Pour plus d'informations, consultez le README.md
         """
@@ -34,6 +47,63 @@ Pour plus d'informations, consultez le README.md
         help='Démarre automatiquement le mode simulation avec données fictives'
     )
     
+    parser.add_argument(
+        '--sim-hz',
+        type=float,
+        default=10.0,
+        help='Fréquence de tick du moteur de simulation (Hz, défaut: 10)'
+    )
+
+    parser.add_argument(
+        '--time-scale',
+        type=float,
+        default=1.0,
+        help='Accélération du temps simulé (2 = deux fois plus vite, 0 = aussi vite que possible)'
+    )
+
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Graine du générateur aléatoire de la simulation (reproductibilité)'
+    )
+
+    parser.add_argument(
+        '--profile-startup',
+        action='store_true',
+        help="Affiche le détail du démarrage (imports, fenêtre, onglets, premier affichage)"
+    )
+
+    parser.add_argument(
+        '--no-theme',
+        action='store_true',
+        help="N'utilise pas ttkbootstrap (ttk seul, démarrage plus rapide)"
+    )
+
+    parser.add_argument(
+        '--robots',
+        default='',
+        metavar='ID,ID,...',
+        help="Robots supplémentaires (robots secondaires, PAMI) dessinés sur le terrain; simulés avec --simulation"
+    )
+
+    parser.add_argument(
+        '--share-state',
+        type=int,
+        nargs='?',
+        const=5802,
+        default=None,
+        metavar='PORT',
+        help="Diffuse l'état du robot aux interfaces miroir (port par défaut: 5802)"
+    )
+
+    parser.add_argument(
+        '--mirror',
+        default=None,
+        metavar='HOTE[:PORT]',
+        help="Interface miroir: affiche l'état diffusé par un autre poste (--share-state), sans commande"
+    )
+
     parser.add_argument(
         '-v', '--version',
         action='version',
@@ -41,6 +111,10 @@ Pour plus d'informations, consultez le README.md
     )
     
     args = parser.parse_args()
+    t_start = time.perf_counter()
+    perf_was_enabled = perf.ENABLED
+    if args.profile_startup:
+        perf.enable()
 
     print("""
 ╔══════════════════════════════════════════════════════════════════════════════╗
@@ -53,8 +127,10 @@ Pour plus d'informations, consultez le README.md
     """)
     
     try:
-        from robot_state import RobotStateManager
-        from robot_interface import RobotInterface
+        with perf.span('startup.import.robot_state'):
+            from robot_state import RobotStateManager
+        with perf.span('startup.import.robot_interface'):
+            from robot_interface import RobotInterface
     except ImportError as e:
         print(f"❌ Erreur d'import: {e}")
         print("\nVérifiez que vous êtes dans le bon répertoire et que tous les fichiers existent:")
@@ -63,108 +139,132 @@ Pour plus d'informations, consultez le README.md
         sys.exit(1)
     print("📦 Initialisation du gestionnaire d'état...")
     state_manager = RobotStateManager()
-    if args.simulation:
+    if args.mirror:
+        print(f"🪞 Mode MIROIR - État reçu de {args.mirror}")
+    elif args.simulation:
         print("🎮 Mode SIMULATION activé - Données fictives générées automatiquement")
-        state_manager.start_simulation()
+        state_manager.start_simulation(tick_hz=args.sim_hz, time_scale=args.time_scale, seed=args.seed)
     else:
         print("📡 Mode NORMAL - En attente de données du robot")
         print("   (Utilisez --simulation pour tester sans robot réel)")
-        # Tentative de connexion SSH au Raspberry pour lancer le script distant
-        try:
-            # import local pour ne pas imposer paramiko si l'utilisateur reste en simulation
-            from robot_ssh import start_test_on_pi
-            print("🔌 Tentative de connexion SSH à PEI.local pour lancer test.py...")
-            try:
-                logfile = start_test_on_pi(hostname="PEI.local", username="admin", password="admin")
-                print(f"✅ Script distant lancé. Journal distant attendu: {logfile}")
-            except Exception as e:
-                print(f"⚠️ Impossible de lancer le script distant via SSH: {e}")
-        except Exception:
-            # robot_ssh absent ou paramiko non installé — on continue sans crash
-            print("⚠️ Module robot_ssh non disponible ou paramiko manquant — saut de la tentative SSH")
+        # Connexion SSH au Raspberry en arrière-plan: la fenêtre n'attend pas le robot
+        # (jusqu'à 10 s de délai si PEI.local ne répond pas)
+        threading.Thread(target=launch_remote_scripts, daemon=True).start()
+
+    registry = None
+    robot_ids = [r for r in args.robots.split(',') if r.strip()]
+    if robot_ids:
+        from robot_registry import MAIN_ROBOT, RobotRegistry
+        registry = RobotRegistry()
+        registry.add(MAIN_ROBOT, state_manager)
+        for i, robot_id in enumerate(robot_ids, 1):
+            manager = registry.add(robot_id.strip())
+            if args.simulation and not args.mirror:
+                manager.start_simulation(tick_hz=args.sim_hz, time_scale=args.time_scale,
+                                         seed=None if args.seed is None else args.seed + i)
+        print(f"🤖 Robots suivis: {', '.join(registry.ids())}")
+
+    broadcast = None
+    if args.share_state is not None and not args.mirror:
+        from state_sync import StateBroadcastServer
+        broadcast = StateBroadcastServer(state_manager, port=args.share_state)
+        print(f"📤 Diffusion de l'état sur le port {broadcast.port}")
 
     print("🖥️  Création de l'interface graphique...")
-    interface = RobotInterface(state_manager)
-    
+    interface = RobotInterface(state_manager, theme=None if args.no_theme else 'darkly', mirror=args.mirror,
+                               registry=registry)
+
+    if args.profile_startup:
+        with perf.span('startup.first_frame'):
+            interface.root.update()
+        print("⏱️  Démarrage:")
+        print(perf.breakdown('startup.', 'import.', 'gui.tab.'))
+        print(f"{'total':32s} {(time.perf_counter() - t_start) * 1000.0:8.1f} ms")
+        perf.enable(perf_was_enabled)
+
     print("✅ Interface prête! Ouverture de la fenêtre...\n")
     
     # Cette ligne bloque jusqu'à la fermeture de la fenêtre
     interface.run()
     print("\n👋 Fermeture de l'interface...")
-    if args.simulation:
+    if broadcast is not None:
+        broadcast.close()
+    if args.simulation and not args.mirror:
         state_manager.stop_simulation()
+        if registry is not None:
+            for robot_id in registry:
+                if registry[robot_id] is not state_manager:
+                    registry[robot_id].stop_simulation()
     print("✅ Au revoir!")
 
+def launch_remote_scripts():
+    """Lance test.py et robot_daemon.py sur le Pi par SSH (hors du fil de l'interface)."""
+    try:
+        # import local pour ne pas imposer paramiko si l'utilisateur reste en simulation
+        from robot_ssh import start_test_on_pi
+        print("🔌 Tentative de connexion SSH à PEI.local pour lancer test.py et robot_daemon.py...")
+        try:
+            logfile = start_test_on_pi(hostname="PEI.local", username="admin", password="admin")
+            print(f"✅ Script distant lancé. Journal distant attendu: {logfile}")
+        except Exception as e:
+            print(f"⚠️ Impossible de lancer le script distant via SSH: {e}")
+    except Exception:
+        # robot_ssh absent ou paramiko non installé — on continue sans crash
+        print("⚠️ Module robot_ssh non disponible ou paramiko manquant — saut de la tentative SSH")
+
+
 def example_robot_integration():
-    import threading
-    import time
     from robot_state import RobotStateManager, WheelState
     from robot_interface import RobotInterface
-    
-    # Variable pour contrôler l'arrêt propre du thread
-    running = True
+    from robot_io import IOCore
     
     # 1. Créer le gestionnaire d'état
     manager = RobotStateManager()
     
-    # 2. Fonction qui simule la réception de données du robot
+    # 2. Fonction qui lit une trame de données du robot
     #    (Remplacez par votre vrai code de communication)
     def receive_robot_data():
-        while running:
-            try:
-                # Exemple de données reçues (à remplacer par vos vraies données):
-                robot_data = {
-                    'x': 1500,        # Position X en mm
-                    'y': 1000,        # Position Y en mm
-                    'theta': 45,      # Angle en degrés
-                    'battery': 85,    # Batterie en %
-                    'wheels': [
-                        {'state': 'forward', 'speed': 60},
-                        {'state': 'forward', 'speed': 60},
-                        {'state': 'forward', 'speed': 60},
-                        {'state': 'forward', 'speed': 60},
-                    ],
-                    'sensors': [200, 180, 150, 220, 0, 1, 0],  # Valeurs capteurs
-                }
-                
-                # Position
-                manager.update_position(
-                    x=robot_data['x'],
-                    y=robot_data['y'],
-                    theta=robot_data['theta']
-                )
-                
-                # Batterie
-                manager.set_battery_level(robot_data['battery'])
-                
-                # Statut connexion
-                manager.set_connected(True)
-                
-                # Roues
-                for i, wheel in enumerate(robot_data['wheels']):
-                    manager.update_wheel(i, state=wheel['state'], speed=wheel['speed'])
-                
-                # Capteurs
-                for i, value in enumerate(robot_data['sensors']):
-                    manager.update_sensor(i, value)
-                
-            except Exception as e:
-                print(f"Erreur de communication: {e}")
-                manager.set_connected(False)
+        try:
+            # Exemple de données reçues (à remplacer par vos vraies données):
+            robot_data = {
+                'x': 1500,        # Position X en mm
+                'y': 1000,        # Position Y en mm
+                'theta': 45,      # Angle en degrés
+                'battery': 85,    # Batterie en %
+                'wheels': [
+                    {'state': 'forward', 'speed': 60},
+                    {'state': 'forward', 'speed': 60},
+                    {'state': 'forward', 'speed': 60},
+                    {'state': 'forward', 'speed': 60},
+                ],
+                'sensors': [200, 180, 150, 220, 0, 1, 0],  # Valeurs capteurs
+            }
+            
+            # Une seule mise à jour groupée: un verrou, une notification
+            manager.update_frame(
+                position=(robot_data['x'], robot_data['y'], robot_data['theta']),
+                wheel_states=[w['state'] for w in robot_data['wheels']],
+                wheel_speeds=[w['speed'] for w in robot_data['wheels']],
+                sensor_values=robot_data['sensors'],
+                battery_level=robot_data['battery'],
+            )
+            manager.set_connected(True)
             
-            # Pause entre les lectures (ajustez selon votre protocole)
-            time.sleep(0.1)
+        except Exception as e:
+            print(f"Erreur de communication: {e}")
+            manager.set_connected(False)
     
-    # 3. Démarrer le thread de réception en arrière-plan
-    recv_thread = threading.Thread(target=receive_robot_data, daemon=True)
-    recv_thread.start()
+    # 3. Lecture périodique dans la boucle asyncio de l'IOCore (pas de thread dédié);
+    #    une vraie liaison utilisera robot_io.SerialLink / DaemonLink sur le même cœur
+    io = IOCore().start()
+    io.every(0.1, receive_robot_data)  # période ajustable selon votre protocole
     
     # 4. Créer et lancer l'interface
     interface = RobotInterface(manager)
     interface.run()  # Bloque jusqu'à fermeture
     
-    # 5. Arrêt propre du thread (quand la fenêtre est fermée)
-    running = False
+    # 5. Arrêt propre (quand la fenêtre est fermée): annule les tâches de la boucle
+    io.stop()
 
 
 if __name__ == "__main__":
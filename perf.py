@@ -0,0 +1,213 @@
+"""
+Fichier: perf.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Instrumentation légère des chemins critiques (état, interface, SSH, détecteur).
+
+Désactivée par défaut: chaque point de mesure se réduit alors au test d'un
+booléen (`perf.ENABLED`, ou `perf.timed` qui appelle directement la fonction).
+Activation par `perf.enable()` (bouton « Perf » de l'interface) ou par la
+variable d'environnement `ROBOT_PERF=1`.
+
+    if perf.ENABLED:
+        t0 = time.perf_counter()
+    ...
+    if perf.ENABLED:
+        perf.record('detector.frame', time.perf_counter() - t0)
+
+    with perf.span('gui.update'):
+        ...
+
+Chaque mesure nommée garde un compteur, un total, un maximum et une fenêtre
+glissante des dernières valeurs et de leurs instants (fréquence en Hz et
+percentiles). Les écritures ne prennent pas de verrou: sous le GIL, une valeur
+perdue de temps en temps est acceptable pour des statistiques.
+"""
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+ENABLED = os.environ.get('ROBOT_PERF', '') not in ('', '0')
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class Stat:
+    __slots__ = ('name', 'count', 'total', 'max', '_values', '_times', '_first')
+
+    def __init__(self, name: str, window: int = 512):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._values = deque(maxlen=window)
+        self._times = deque(maxlen=window)
+        self._first = None
+
+    def add(self, value: float = 0.0) -> None:
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        now = time.perf_counter()
+        if self._first is None:
+            self._first = now
+        self._values.append(value)
+        self._times.append(now)
+
+    def rate(self, horizon: float = 2.0) -> float:
+        """Événements par seconde sur les `horizon` dernières secondes."""
+        times = list(self._times)
+        if not times:
+            return 0.0
+        now = time.perf_counter()
+        recent = [t for t in times if t >= now - horizon]
+        if not recent:
+            return 0.0
+        if len(recent) == len(times) == self._times.maxlen:
+            # fenêtre pleine plus courte que l'horizon
+            return len(recent) / max(now - recent[0], 1e-9)
+        # mesure commencée depuis moins de `horizon` secondes
+        return len(recent) / max(min(horizon, now - self._first), 1e-9)
+
+    def percentile(self, q: float) -> float:
+        values = sorted(self._values)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+
+    def mean(self) -> float:
+        values = list(self._values)
+        return sum(values) / len(values) if values else 0.0
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'rate_hz': self.rate(),
+            'mean_ms': self.mean() * 1000.0,
+            'p50_ms': self.percentile(50) * 1000.0,
+            'p95_ms': self.percentile(95) * 1000.0,
+            'max_ms': self.max * 1000.0,
+        }
+
+    def reset(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._values.clear()
+        self._times.clear()
+        self._first = None
+
+
+def stat(name: str) -> Stat:
+    s = _stats.get(name)
+    if s is None:
+        with _stats_lock:
+            s = _stats.setdefault(name, Stat(name))
+    return s
+
+
+def record(name: str, seconds: float) -> None:
+    """Enregistre une durée (s) ou une valeur quelconque (latence, RTT)."""
+    stat(name).add(seconds)
+
+
+def count(name: str) -> None:
+    """Compte un événement (fréquence uniquement)."""
+    stat(name).add(0.0)
+
+
+class _Span:
+    __slots__ = ('name', 't0')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        stat(self.name).add(time.perf_counter() - self.t0)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """Bloc chronométré (`with perf.span('x'):`); objet inerte partagé si désactivé."""
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def timed(name: str):
+    """Décorateur: chronomètre chaque appel quand l'instrumentation est active."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stat(name).add(time.perf_counter() - t0)
+        return wrapper
+    return decorator
+
+
+def enable(on: bool = True) -> None:
+    global ENABLED
+    ENABLED = bool(on)
+
+
+def disable() -> None:
+    enable(False)
+
+
+def reset() -> None:
+    with _stats_lock:
+        for s in _stats.values():
+            s.reset()
+
+
+def snapshot() -> dict:
+    """Résumé de toutes les mesures: {nom: {count, rate_hz, mean_ms, p50_ms, p95_ms, max_ms}}."""
+    with _stats_lock:
+        items = list(_stats.items())
+    return {name: s.summary() for name, s in sorted(items)}
+
+
+def breakdown(*prefixes: str) -> str:
+    """
+    Durées cumulées des mesures dont le nom commence par l'un des `prefixes`,
+    dans l'ordre de leur première mesure (détail du démarrage, `main.py --profile-startup`).
+    """
+    with _stats_lock:
+        items = [(name, s) for name, s in _stats.items() if s.count and name.startswith(prefixes)]
+    lines = []
+    for name, s in items:
+        calls = f"  (x{s.count})" if s.count > 1 else ""
+        lines.append(f"{name:32s} {s.total * 1000.0:8.1f} ms{calls}")
+    return "\n".join(lines)
+
+
+def format_snapshot(snap: dict) -> str:
+    lines = []
+    for name, s in snap.items():
+        lines.append(f"{name:22s} {s['rate_hz']:8.1f} Hz | moy {s['mean_ms']:8.3f} ms"
+                     f" | p95 {s['p95_ms']:8.3f} ms | max {s['max_ms']:8.3f} ms")
+    return "\n".join(lines)
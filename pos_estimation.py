@@ -1,7 +1,7 @@
 """
 File: `pos_estimation.py`
 Author: Hugo Demont
-Version: 1.0.1
+Version: 1.3.0 (sources d'images: caméra, vidéo, dossier, synthétique + mode max speed)
 """
 from __future__ import print_function
 import argparse
@@ -9,6 +9,10 @@ import cv2
 import numpy as np
 from scipy.spatial.transform import Rotation as R
 import math
+import time
+from calibration_cache import load_calibration
+from frame_source import open_source
+import perf
 
 # mapping existant
 ARUCO_DICT = {
@@ -44,12 +48,77 @@ def euler_from_quaternion(x, y, z, w):
     yaw_z = math.atan2(t3, t4)
     return roll_x, pitch_y, yaw_z
 
+class MarkerDetector:
+    """
+    Détecteur ArUco compatible avec les deux API OpenCV:
+    `cv2.aruco.ArucoDetector` (>= 4.7) et l'ancien `cv2.aruco.detectMarkers`.
+    """
+    def __init__(self, dict_name="DICT_4X4_50"):
+        self.dictionary = cv2.aruco.getPredefinedDictionary(ARUCO_DICT[dict_name])
+        if hasattr(cv2.aruco, "DetectorParameters_create"):
+            self.parameters = cv2.aruco.DetectorParameters_create()
+        else:
+            self.parameters = cv2.aruco.DetectorParameters()
+        if hasattr(cv2.aruco, "ArucoDetector"):
+            self._detector = cv2.aruco.ArucoDetector(self.dictionary, self.parameters)
+        else:
+            self._detector = None
+
+    def detect(self, frame):
+        if self._detector is not None:
+            return self._detector.detectMarkers(frame)
+        return cv2.aruco.detectMarkers(frame, self.dictionary, parameters=self.parameters)
+
+def estimate_poses(corners, marker_size, mtx, dst):
+    """
+    Pose de chaque marqueur, au format de `estimatePoseSingleMarkers`
+    (rvecs et tvecs de forme (N, 1, 3)). Repli sur solvePnP(IPPE_SQUARE)
+    quand la fonction historique n'existe plus.
+    """
+    if hasattr(cv2.aruco, "estimatePoseSingleMarkers"):
+        rvecs, tvecs, _ = cv2.aruco.estimatePoseSingleMarkers(corners, marker_size, mtx, dst)
+        return rvecs, tvecs
+    half = marker_size / 2.0
+    obj = np.array([[-half, half, 0], [half, half, 0],
+                    [half, -half, 0], [-half, -half, 0]], dtype=np.float32)
+    rvecs = np.zeros((len(corners), 1, 3))
+    tvecs = np.zeros((len(corners), 1, 3))
+    for i, c in enumerate(corners):
+        _, rvec, tvec = cv2.solvePnP(obj, c.reshape(4, 2), mtx, dst, flags=cv2.SOLVEPNP_IPPE_SQUARE)
+        rvecs[i, 0] = rvec.ravel()
+        tvecs[i, 0] = tvec.ravel()
+    return rvecs, tvecs
+
+def detect_and_estimate(detector, frame, marker_size, mtx, dst):
+    """Pipeline complet d'une image: détection puis pose. Retourne (corners, ids, rvecs, tvecs)."""
+    corners, marker_ids, _ = detector.detect(frame)
+    if marker_ids is None or len(marker_ids) == 0:
+        return corners, None, None, None
+    rvecs, tvecs = estimate_poses(corners, marker_size, mtx, dst)
+    return corners, marker_ids, rvecs, tvecs
+
 def main():
     parser = argparse.ArgumentParser(description="ArUco pose estimation")
     parser.add_argument("--dict", default="DICT_4X4_50", help="ArUco dictionary name (see ARUCO_DICT keys)")
     parser.add_argument("--id", type=int, default=-1, help="Marker ID to follow (-1 = all)")
     parser.add_argument("--size", type=float, default=0.066, help="Marker side length in meters")
     parser.add_argument("--calib", default="calibration_chessboard.yaml", help="Calibration file")
+    parser.add_argument("--undistort", action="store_true",
+                        help="Redresser chaque image une fois (remap) avant détection")
+    parser.add_argument("--alpha", type=float, default=0.0,
+                        help="Paramètre alpha de getOptimalNewCameraMatrix (0 = recadré, 1 = tous les pixels)")
+    parser.add_argument("--no-cache", action="store_true", help="Ne pas lire/écrire le cache .npz")
+    parser.add_argument("--source", default="0",
+                        help="Caméra (index), fichier vidéo, dossier d'images, synthetic[:N[:graine]] ou ring:NOM")
+    parser.add_argument("--max-speed", action="store_true",
+                        help="Décodage dans un thread avec préchargement, sans affichage (benchmark hors ligne)")
+    parser.add_argument("--prefetch", type=int, default=8, help="Images préchargées en mode --max-speed")
+    parser.add_argument("--quiet", action="store_true", help="Ne pas afficher les poses image par image")
+    parser.add_argument("--stream-port", type=int, default=0,
+                        help="Publier les images annotées en JPEG sur ce port TCP (0 = désactivé)")
+    parser.add_argument("--stream-width", type=int, default=480, help="Largeur maximale des images du flux")
+    parser.add_argument("--perf", action="store_true",
+                        help="Instrumentation (perf.py): temps de lecture/détection, résumé toutes les 5 s")
     args = parser.parse_args()
 
     if args.dict not in ARUCO_DICT:
@@ -58,36 +127,66 @@ def main():
             print("  -", k)
         return
 
-    # lecture calibration
-    cv_file = cv2.FileStorage(args.calib, cv2.FILE_STORAGE_READ)
-    if not cv_file.isOpened():
-        print("[ERROR] Impossible d'ouvrir", args.calib)
+    detector = MarkerDetector(args.dict)
+
+    cap = open_source(args.source, max_speed=args.max_speed, prefetch=args.prefetch)
+    if not cap.is_opened():
+        print("[ERROR] Impossible d'ouvrir la source", args.source)
         return
-    mtx = cv_file.getNode('K').mat()
-    dst = cv_file.getNode('D').mat()
-    cv_file.release()
 
-    this_aruco_dictionary = cv2.aruco.getPredefinedDictionary(ARUCO_DICT[args.dict])
-    this_aruco_parameters = cv2.aruco.DetectorParameters_create()
+    ret, frame, timestamp = cap.read()
+    if not ret:
+        print("[ERROR] Aucune image reçue de la source", args.source)
+        cap.release()
+        return
 
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("[ERROR] Impossible d'ouvrir la caméra")
+    # lecture calibration (+ tables d'undistortion en cache pour cette résolution)
+    h, w = frame.shape[:2]
+    try:
+        calib = load_calibration(args.calib, (w, h), alpha=args.alpha, use_cache=not args.no_cache)
+    except IOError as e:
+        print("[ERROR]", e)
+        cap.release()
         return
+    mtx = calib.pose_camera_matrix(args.undistort)
+    dst = calib.pose_dist_coeffs(args.undistort)
+    axis_length = args.size * 0.75
 
     target_id = args.id
+    show = not args.max_speed
+    streamer = None
+    if args.stream_port:
+        from video_stream import FrameStreamServer  # import différé: inutile sans flux
+        streamer = FrameStreamServer(args.stream_port, max_width=args.stream_width)
+        print(f"[INFO] Flux vidéo sur le port {streamer.port}")
+    annotate = show or streamer is not None
+    if args.perf:
+        perf.enable()
+    frame_count = 0
+    torn = 0
+    t_start = time.perf_counter()
+    t_frame = t_start
+    t_report = t_start
+    detector_fps = 0.0
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    while ret:
+        if perf.ENABLED:
+            t_process = time.perf_counter()
+        if args.undistort:
+            frame = calib.undistort(frame)
+        elif annotate and not frame.flags.writeable:
+            frame = frame.copy()  # vue partagée (ring:): on dessine sur une copie
 
-        corners, marker_ids, _ = cv2.aruco.detectMarkers(frame, this_aruco_dictionary,
-                                                         parameters=this_aruco_parameters)
+        corners, marker_ids, rvecs, tvecs = detect_and_estimate(detector, frame, args.size, mtx, dst)
+        # vue partagée (ring:) écrasée par l'écrivain pendant la détection: résultat déchiré, jeté
+        valid = cap.frame_valid()
+        if not valid:
+            torn += 1
+            marker_ids = None
 
         if marker_ids is not None:
-            cv2.aruco.drawDetectedMarkers(frame, corners, marker_ids)
-            rvecs, tvecs, _ = cv2.aruco.estimatePoseSingleMarkers(corners, args.size, mtx, dst)
+            if annotate:
+                cv2.aruco.drawDetectedMarkers(frame, corners, marker_ids)
 
             ids_flat = marker_ids.flatten()
             for idx, mid in enumerate(ids_flat):
@@ -111,21 +210,54 @@ def main():
                 yaw_z = math.degrees(yaw_z)
 
                 # affichage console (court)
-                print(f"ID {mid} -> tx:{tx:.3f} ty:{ty:.3f} tz:{tz:.3f} roll:{roll_x:.1f} pitch:{pitch_y:.1f} yaw:{yaw_z:.1f}")
+                if not args.quiet:
+                    print(f"t:{timestamp:.3f} ID {mid} -> tx:{tx:.3f} ty:{ty:.3f} tz:{tz:.3f} roll:{roll_x:.1f} pitch:{pitch_y:.1f} yaw:{yaw_z:.1f}")
 
+                if not annotate:
+                    continue
                 # dessiner axes et label cible
-                cv2.drawFrameAxes(frame, mtx, dst, rvecs[idx], tvecs[idx], args.size * 0.75)
+                cv2.drawFrameAxes(frame, mtx, dst, rvecs[idx], tvecs[idx], axis_length)
                 # mettre en évidence le marqueur suivi
                 corner_pts = corners[idx].reshape((4, 2)).astype(int)
                 cv2.polylines(frame, [corner_pts], True, (0, 255, 0), 3)
                 cv2.putText(frame, f"ID:{mid}", tuple(corner_pts[0]), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
 
-        cv2.imshow('frame', frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+        frame_count += 1
+        now = time.perf_counter()
+        if now > t_frame:
+            detector_fps = 0.9 * detector_fps + 0.1 / (now - t_frame) if detector_fps else 1.0 / (now - t_frame)
+        t_frame = now
+        if perf.ENABLED:
+            perf.record('detector.frame', now - t_process)
+            if now - t_report >= 5.0:
+                print(perf.format_snapshot(perf.snapshot()))
+                t_report = now
+        if streamer is not None and valid:
+            streamer.publish(frame, timestamp, detector_fps)
+        if show and valid:
+            cv2.imshow('frame', frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+
+        if perf.ENABLED:
+            t_read = time.perf_counter()
+            ret, frame, timestamp = cap.read()
+            perf.record('detector.read', time.perf_counter() - t_read)
+        else:
+            ret, frame, timestamp = cap.read()
 
+    elapsed = time.perf_counter() - t_start
     cap.release()
-    cv2.destroyAllWindows()
+    if streamer is not None:
+        streamer.close()
+    if show:
+        cv2.destroyAllWindows()
+    if elapsed > 0:
+        print(f"[INFO] {frame_count} images en {elapsed:.2f} s ({frame_count / elapsed:.1f} FPS)")
+    if torn:
+        print(f"[WARN] {torn} images écrasées pendant la détection (anneau trop court), résultats ignorés")
+    if perf.ENABLED:
+        print(perf.format_snapshot(perf.snapshot()))
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,13 @@
 import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import cv2
 import numpy as np
 import math
 from scipy.spatial.transform import Rotation as R
+from pos_estimation import MarkerDetector, detect_and_estimate
 
 ARUCO_DICT = {
     "DICT_4X4_50": cv2.aruco.DICT_4X4_50,
@@ -19,6 +24,12 @@ def make_marker_image_from_dict(aruco_dict, marker_id, marker_px):
     except Exception:
         pass
 
+    # OpenCV >= 4.7 : drawMarker renommé en generateImageMarker
+    try:
+        return cv2.aruco.generateImageMarker(aruco_dict, int(marker_id), marker_px)
+    except Exception:
+        pass
+
     # Fallback : reconstruire depuis bytesList
     if not hasattr(aruco_dict, "bytesList"):
         raise RuntimeError(
@@ -61,9 +72,37 @@ def make_marker_image_from_dict(aruco_dict, marker_id, marker_px):
 
     return marker
 
+# Cache LRU des marqueurs rendus, clé (dictionnaire, id, px, marge).
+# Le dictionnaire est identifié par son nom ou, pour un objet, par son contenu.
+_DICTS_BY_KEY = {}
+
+def _dict_key(aruco_dict):
+    if isinstance(aruco_dict, str):
+        if aruco_dict not in _DICTS_BY_KEY:
+            _DICTS_BY_KEY[aruco_dict] = cv2.aruco.getPredefinedDictionary(ARUCO_DICT[aruco_dict])
+        return aruco_dict
+    key = (int(aruco_dict.markerSize), np.asarray(aruco_dict.bytesList).tobytes())
+    _DICTS_BY_KEY.setdefault(key, aruco_dict)
+    return key
+
+@lru_cache(maxsize=1024)
+def _render_marker(dict_key, marker_id, marker_px, border_px):
+    gray = make_marker_image_from_dict(_DICTS_BY_KEY[dict_key], marker_id, marker_px)
+    if border_px:
+        gray = cv2.copyMakeBorder(gray, border_px, border_px, border_px, border_px,
+                                  cv2.BORDER_CONSTANT, value=255)
+    bgr = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    # partagés entre appels : lecture seule pour éviter toute corruption du cache
+    gray.flags.writeable = False
+    bgr.flags.writeable = False
+    return gray, bgr
+
+def cached_marker(aruco_dict, marker_id, marker_px, border_px=0):
+    """Marqueur rendu (niveaux de gris, BGR), en lecture seule, mis en cache. `aruco_dict`: objet ou nom."""
+    return _render_marker(_dict_key(aruco_dict), int(marker_id), int(marker_px), int(border_px))
+
 def create_transformed_marker(aruco_dict, marker_id, marker_px=200, angle_deg=0, scale=1.0):
-    marker = make_marker_image_from_dict(aruco_dict, marker_id, marker_px)
-    marker_bgr = cv2.cvtColor(marker, cv2.COLOR_GRAY2BGR)
+    marker_bgr = cached_marker(aruco_dict, marker_id, marker_px)[1]
     h, w = marker_bgr.shape[:2]
     center = (w // 2, h // 2)
     M = cv2.getRotationMatrix2D(center, angle_deg, scale)
@@ -89,10 +128,19 @@ def paste_marker(frame, marker_img, mask, top_left):
     roi = frame[y0:y1, x0:x1]
     m = mask[my0:my1, mx0:mx1]
     mi = marker_img[my0:my1, mx0:mx1]
-    roi[m] = mi[m]
-    frame[y0:y1, x0:x1] = roi
+    # copie masquée en place (pas de tableaux intermédiaires d'indexation booléenne)
+    np.copyto(roi, mi, where=m[..., None] if roi.ndim == 3 else m)
     return frame
 
+def composite_markers(frames, placements):
+    """
+    Compositeur par lot: `frames` est un tableau (N, H, W, 3) (ou une liste d'images),
+    `placements` un itérable de (index_image, marker_img, mask, top_left).
+    """
+    for index, marker_img, mask, top_left in placements:
+        paste_marker(frames[index], marker_img, mask, top_left)
+    return frames
+
 def euler_from_quaternion(x, y, z, w):
     t0 = +2.0 * (w * x + y * z)
     t1 = +1.0 - 2.0 * (x * x + y * y)
@@ -106,6 +154,216 @@ def euler_from_quaternion(x, y, z, w):
     yaw_z = math.atan2(t3, t4)
     return math.degrees(roll_x), math.degrees(pitch_y), math.degrees(yaw_z)
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Générateur de corpus synthétique (benchmark du détecteur, voir aruco_benchmark.py)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def default_camera_matrix(W, H, f=800.0):
+    return np.array([[f, 0, W / 2.0],
+                     [0, f, H / 2.0],
+                     [0, 0, 1]], dtype=np.float64)
+
+def marker_object_points(size_m):
+    # même convention que estimatePoseSingleMarkers : HG, HD, BD, BG
+    half = size_m / 2.0
+    return np.array([[-half, half, 0], [half, half, 0],
+                     [half, -half, 0], [-half, -half, 0]], dtype=np.float64)
+
+def random_marker_pose(rng, mtx, frame_size, size_m, z_range=(0.35, 1.5), max_tilt_deg=45.0):
+    # marqueur face caméra (rotation de pi autour de x), puis inclinaison et rotation dans le plan
+    W, H = frame_size
+    z = rng.uniform(*z_range)
+    x = rng.uniform(-0.8, 0.8) * (W / 2.0) * z / mtx[0, 0]
+    y = rng.uniform(-0.8, 0.8) * (H / 2.0) * z / mtx[1, 1]
+    tilt = np.radians(max_tilt_deg)
+    rot = (R.from_euler('x', math.pi)
+           * R.from_euler('xyz', [rng.uniform(-tilt, tilt), rng.uniform(-tilt, tilt),
+                                  rng.uniform(-math.pi, math.pi)]))
+    return rot.as_rotvec(), np.array([x, y, z])
+
+def project_marker(rvec, tvec, mtx, dist, size_m):
+    pts, _ = cv2.projectPoints(marker_object_points(size_m), rvec, tvec, mtx, dist)
+    return pts.reshape(4, 2)
+
+def warp_marker_perspective(marker_bgr, image_corners, border_px):
+    """
+    Projette le marqueur (avec sa marge blanche `border_px`) sur les 4 coins image
+    donnés. Le rendu est limité à la boîte englobante : retourne (img, mask, top_left)
+    directement utilisable par paste_marker.
+    """
+    h, w = marker_bgr.shape[:2]
+    # convention OpenCV: centre des pixels sur les entiers, bords à +-0.5
+    b0, bx, by = border_px - 0.5, w - border_px - 0.5, h - border_px - 0.5
+    inner = np.float32([[b0, b0], [bx, b0], [bx, by], [b0, by]])
+    M = cv2.getPerspectiveTransform(inner, np.float32(image_corners))
+    outer = cv2.perspectiveTransform(np.float32([[[-0.5, -0.5]], [[w - 0.5, -0.5]], [[w - 0.5, h - 0.5]],
+                                                 [[-0.5, h - 0.5]]]), M).reshape(4, 2)
+    x0, y0 = np.floor(outer.min(axis=0)).astype(int)
+    x1, y1 = np.ceil(outer.max(axis=0)).astype(int)
+    T = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], dtype=np.float64)
+    size = (int(x1 - x0), int(y1 - y0))
+    warped = cv2.warpPerspective(marker_bgr, T @ M, size, flags=cv2.INTER_LINEAR)
+    mask = cv2.warpPerspective(np.full((h, w), 255, np.uint8), T @ M, size, flags=cv2.INTER_NEAREST) > 0
+    return warped, mask, (int(x0), int(y0))
+
+class NoiseBank:
+    """
+    Banque de bruit gaussien précalculée (float32, tirée du générateur seedé).
+    Chaque image utilise une fenêtre décalée aléatoirement : coût d'un slice
+    au lieu d'un tirage de millions d'échantillons par image.
+    """
+    def __init__(self, rng, frame_shape, banks=2, margin=64):
+        H, W = frame_shape[:2]
+        self.margin = margin
+        self.shape = tuple(frame_shape)
+        self.banks = [rng.standard_normal((H + margin, W + margin) + self.shape[2:], dtype=np.float32)
+                      for _ in range(banks)]
+
+    def sample(self, rng):
+        H, W = self.shape[:2]
+        bank = self.banks[int(rng.integers(len(self.banks)))]
+        dy, dx = rng.integers(0, self.margin, size=2)
+        return bank[dy:dy + H, dx:dx + W]
+
+@lru_cache(maxsize=8)
+def _gradient_basis(H, W):
+    gx = np.tile(np.linspace(-1, 1, W, dtype=np.float32), (H, 1))
+    gy = np.tile(np.linspace(-1, 1, H, dtype=np.float32)[:, None], (1, W))
+    return gx, gy
+
+def apply_photometric(frame, rng, max_blur=5, max_noise=8.0, lighting=True, noise_bank=None):
+    # éclairage (gain, offset, gradient), flou et bruit capteur
+    H, W = frame.shape[:2]
+    if lighting:
+        gx, gy = _gradient_basis(H, W)
+        gain = rng.uniform(0.6, 1.1)
+        # gradient = gain * (1 + a*gx + b*gy), en une seule opération fusionnée
+        gradient = cv2.addWeighted(gx, gain * rng.uniform(-0.25, 0.25), gy, gain * rng.uniform(-0.25, 0.25), gain)
+        if frame.ndim == 3:
+            gradient = cv2.merge([gradient] * frame.shape[2])
+        img = cv2.multiply(frame, gradient, dtype=cv2.CV_32F)
+        cv2.add(img, float(rng.uniform(-20, 20)), dst=img)
+    else:
+        img = frame.astype(np.float32)
+    k = int(rng.choice([0] + [k for k in (3, 5, 7) if k <= max_blur]))
+    if k:
+        img = cv2.GaussianBlur(img, (k, k), 0)
+    if max_noise > 0:
+        if noise_bank is None:
+            noise_bank = NoiseBank(rng, img.shape, banks=1)
+        cv2.scaleAdd(noise_bank.sample(rng), float(rng.uniform(0, max_noise)), img, dst=img)
+    return cv2.convertScaleAbs(img)  # saturation 0..255 + conversion uint8
+
+def sample_frame_layout(rng, id_pool, n_markers, mtx, dist, size_m, frame_size, max_tilt_deg=45.0):
+    """Tire les poses de `n_markers` marqueurs d'IDs distincts, sans chevauchement ni sortie d'image."""
+    W, H = frame_size
+    ids = rng.choice(id_pool, size=min(n_markers, len(id_pool)), replace=False)
+    boxes = []
+    truth = []
+    for mid in ids:
+        for _ in range(50):
+            rvec, tvec = random_marker_pose(rng, mtx, frame_size, size_m, max_tilt_deg=max_tilt_deg)
+            corners = project_marker(rvec, tvec, mtx, dist, size_m)
+            lo, hi = corners.min(axis=0), corners.max(axis=0)
+            pad = 0.35 * (hi - lo).max()
+            box = (lo[0] - pad, lo[1] - pad, hi[0] + pad, hi[1] + pad)
+            if box[0] < 0 or box[1] < 0 or box[2] >= W or box[3] >= H:
+                continue
+            if any(box[0] < b[2] and b[0] < box[2] and box[1] < b[3] and b[1] < box[3] for b in boxes):
+                continue
+            break
+        else:
+            continue  # pas de place pour ce marqueur
+        boxes.append(box)
+        truth.append({'id': int(mid), 'rvec': rvec.tolist(), 'tvec': tvec.tolist(),
+                      'corners': corners.tolist()})
+    return truth
+
+def generate_synthetic_batch(rng, aruco_dict, id_pool, n_markers_list, mtx, dist, size_m,
+                             frame_size=(1280, 720), marker_px=200, max_tilt_deg=45.0,
+                             photometric=True, noise_bank=None):
+    """
+    Lot d'images synthétiques: poses tirées, marqueurs pris dans le cache LRU,
+    warps perspective limités à leur boîte englobante, puis collage en lot
+    (composite_markers) dans un tableau (N, H, W) préalloué.
+    Le rendu se fait en niveaux de gris (le détecteur travaille en gris):
+    trois fois moins de pixels à traiter qu'en BGR.
+    Retourne (frames en niveaux de gris, vérités terrain par image).
+    """
+    W, H = frame_size
+    n = len(n_markers_list)
+    frames = np.empty((n, H, W), dtype=np.uint8)
+    frames[:] = rng.integers(150, 256, size=n, dtype=np.uint8)[:, None, None]
+    border = marker_px // 6
+    truths = []
+    placements = []
+    for index, n_markers in enumerate(n_markers_list):
+        truth = sample_frame_layout(rng, id_pool, n_markers, mtx, dist, size_m, frame_size, max_tilt_deg)
+        for m in truth:
+            marker = cached_marker(aruco_dict, m['id'], marker_px, border)[0]
+            img, mask, top_left = warp_marker_perspective(marker, np.asarray(m['corners']), border)
+            placements.append((index, img, mask, top_left))
+        truths.append(truth)
+    composite_markers(frames, placements)
+    if photometric:
+        if noise_bank is None:
+            noise_bank = NoiseBank(rng, (H, W))
+        for index in range(n):
+            frames[index] = apply_photometric(frames[index], rng, noise_bank=noise_bank)
+    return frames, truths
+
+def generate_synthetic_frame(rng, aruco_dict, id_pool, n_markers, mtx, dist, size_m,
+                             frame_size=(1280, 720), marker_px=200, max_tilt_deg=45.0,
+                             photometric=True):
+    """
+    Une image synthétique avec `n_markers` marqueurs d'IDs distincts tirés dans `id_pool`.
+    Retourne (frame, vérité terrain [{id, rvec, tvec, corners}]).
+    """
+    frames, truths = generate_synthetic_batch(rng, aruco_dict, id_pool, [n_markers], mtx, dist, size_m,
+                                              frame_size, marker_px, max_tilt_deg, photometric)
+    return cv2.cvtColor(frames[0], cv2.COLOR_GRAY2BGR), truths[0]
+
+def generate_corpus(out_dir, count, seed=0, dict_name="DICT_4X4_50", markers_per_frame=(1, 4),
+                    size_m=0.066, frame_size=(1280, 720), marker_px=200, max_tilt_deg=45.0,
+                    batch_size=16, workers=4):
+    """
+    Corpus reproductible: `count` images PNG + `ground_truth.json` (caméra, taille
+    marqueur, dictionnaire, poses vraies). Même graine => même corpus.
+    Les images sont produites par lots et écrites sur disque en parallèle
+    (imwrite relâche le GIL).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    aruco_dict = cv2.aruco.getPredefinedDictionary(ARUCO_DICT[dict_name])
+    dict_size = int(dict_name.rsplit('_', 1)[-1]) if dict_name[-1].isdigit() else 50
+    mtx = default_camera_matrix(*frame_size)
+    dist = np.zeros(5)
+    noise_bank = NoiseBank(rng, (frame_size[1], frame_size[0]))
+    png_params = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+    frames = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for start in range(0, count, batch_size):
+            n_list = rng.integers(markers_per_frame[0], markers_per_frame[1] + 1,
+                                  size=min(batch_size, count - start))
+            batch, truths = generate_synthetic_batch(rng, aruco_dict, np.arange(dict_size), n_list.tolist(),
+                                                     mtx, dist, size_m, frame_size, marker_px,
+                                                     max_tilt_deg, noise_bank=noise_bank)
+            for offset, truth in enumerate(truths):
+                name = f"frame_{start + offset:05d}.png"
+                pending.append(pool.submit(cv2.imwrite, os.path.join(out_dir, name), batch[offset], png_params))
+                frames.append({'file': name, 'markers': truth})
+        for fut in pending:
+            fut.result()
+    meta = {
+        'seed': seed, 'dict': dict_name, 'marker_size': size_m,
+        'frame_size': list(frame_size), 'camera_matrix': mtx.tolist(), 'dist': dist.tolist(),
+        'frames': frames,
+    }
+    with open(os.path.join(out_dir, 'ground_truth.json'), 'w') as f:
+        json.dump(meta, f)
+    return meta
+
 def main():
     parser = argparse.ArgumentParser(description="Test ArUco without camera")
     parser.add_argument("--dict", default="DICT_4X4_50", help="ArUco dictionary name")
@@ -113,17 +371,25 @@ def main():
     parser.add_argument("--size", type=float, default=0.066, help="Marker side in meters (for pose)")
     parser.add_argument("--show", action="store_true", help="Afficher la fenêtre")
     parser.add_argument("--marker_px", type=int, default=220, help="Taille du marqueur en pixels")
+    parser.add_argument("--corpus", default=None, help="Générer un corpus de benchmark dans ce dossier")
+    parser.add_argument("--count", type=int, default=200, help="Nombre d'images du corpus")
+    parser.add_argument("--seed", type=int, default=0, help="Graine aléatoire du corpus")
+    parser.add_argument("--max-markers", type=int, default=4, help="Marqueurs max par image du corpus")
     args = parser.parse_args()
 
     if args.dict not in ARUCO_DICT:
         print("Dictionnaire inconnu. Clés:", list(ARUCO_DICT.keys()))
         return
 
+    if args.corpus:
+        meta = generate_corpus(args.corpus, args.count, seed=args.seed, dict_name=args.dict,
+                               markers_per_frame=(1, args.max_markers), size_m=args.size)
+        n = sum(len(f['markers']) for f in meta['frames'])
+        print(f"Corpus généré: {args.corpus} ({args.count} images, {n} marqueurs)")
+        return
+
     aruco_dict = cv2.aruco.getPredefinedDictionary(ARUCO_DICT[args.dict])
-    try:
-        detector_params = cv2.aruco.DetectorParameters_create()
-    except AttributeError:
-        detector_params = cv2.aruco.DetectorParameters()
+    detector = MarkerDetector(args.dict)
 
     W, H = 1280, 720
     frame = np.full((H, W, 3), 255, dtype=np.uint8)
@@ -143,12 +409,11 @@ def main():
                     [0,  0,  1]], dtype=np.float64)
     dist = np.zeros((5, 1), dtype=np.float64)
 
-    corners, ids, rejected = cv2.aruco.detectMarkers(frame, aruco_dict, parameters=detector_params)
+    corners, ids, rvecs, tvecs = detect_and_estimate(detector, frame, args.size, mtx, dist)
     if ids is None:
         print("Aucun marqueur détecté.")
     else:
         cv2.aruco.drawDetectedMarkers(frame, corners, ids)
-        rvecs, tvecs, _ = cv2.aruco.estimatePoseSingleMarkers(corners, args.size, mtx, dist)
         for i, mid in enumerate(ids.flatten()):
             tx, ty, tz = map(float, tvecs[i][0])
             rot_mat = cv2.Rodrigues(rvecs[i][0])[0]
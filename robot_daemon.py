@@ -0,0 +1,580 @@
+"""
+Fichier: robot_daemon.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Démon de commande côté Raspberry Pi: remplace l'envoi de `MOVE ...` dans un
+shell SSH interactif (pty, écho, discipline de ligne) par une socket TCP.
+
+Trames (les deux sens): en-tête `!cIH` = type (1 octet), numéro (uint32),
+longueur de la charge utile (uint16), puis la charge utile ASCII.
+
+    C <seq> "MOVE forward 200"       client -> démon: commande
+    S <seq> "ESTOP"                  client -> démon: voie prioritaire (arrêt d'urgence)
+    A <seq> "OK <t_recv> <t_write> <t_ack>"
+                                     démon -> client: acquittement de l'Arduino
+                                     (réponse du firmware + horodatages Pi)
+    T 0     "T 1234 ...*HH"          démon -> clients: trame de télémétrie
+                                     (`@<id> T ...` pour un flux multiplexé)
+    E 0     "WDT"                    démon -> clients: événement spontané du firmware
+
+Le démon renumérote les commandes pour le port série (`#<n> ...`, voir
+command_trace) et les écrit sans attendre les acquittements précédents
+(pipelining), dans la limite de `max_in_flight` commandes en vol: le tampon de
+réception de l'Arduino ne fait que 64 octets. Chaque `OK <n>` est routé vers le
+client d'origine; une commande sans réponse après `ack_timeout` est acquittée
+`TIMEOUT`; file pleine: `BUSY`. La télémétrie est diffusée à tous les clients.
+
+Aucune écriture socket dans le lecteur série, l'écrivain ou la voie
+prioritaire: chaque client a sa file d'envoi bornée et son thread d'envoi. Un
+client qui ne lit plus (file pleine, envoi bloqué plus de `send_timeout`) est
+déconnecté, ce qui déclenche l'homme mort ci-dessous.
+
+Voie prioritaire (trame S): la file d'attente est vidée (`CANCELLED`) et la
+commande, `ESTOP` en général, part tout de suite, hors fenêtre; elle est
+acquittée de bout en bout par le firmware comme les autres.
+
+Homme mort: à la déconnexion d'un client, le démon envoie `MOVE stop 0`;
+`--wdt <ms>` arme en plus le chien de garde du firmware (arrêt sans commande
+pendant ce délai, les clients envoient des `PING`, voir link_watchdog).
+
+Lancement sur le Pi (fait par `robot_ssh.start_test_on_pi`):
+    python3 robot_daemon.py --serial /dev/ttyACM0 --telem 200
+Sans Arduino (tests, poste de développement): `--sim` branche le port série
+simulé (`arduino_sim.SimulatedArduino`).
+"""
+import argparse
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+
+from command_trace import PI_STAGES, parse_ack, tag_command
+from telemetry import is_any_telemetry, is_robot_event
+
+DEFAULT_PORT = 5801
+HEADER = struct.Struct('!cIH')
+KIND_COMMAND = b'C'
+KIND_ACK = b'A'
+KIND_TELEMETRY = b'T'
+KIND_EVENT = b'E'
+KIND_PRIORITY = b'S'
+SEQ_MODULO = 1 << 31  # numéros série: `long` côté firmware
+
+
+def pack_frame(kind: bytes, seq: int, payload: str) -> bytes:
+    data = payload.encode('ascii', errors='replace')
+    return HEADER.pack(kind, seq, len(data)) + data
+
+
+class FrameDecoder:
+    """Découpe un flux TCP en trames (kind, seq, payload)."""
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes):
+        self._buffer.extend(data)
+        frames = []
+        while len(self._buffer) >= HEADER.size:
+            kind, seq, size = HEADER.unpack_from(self._buffer)
+            end = HEADER.size + size
+            if len(self._buffer) < end:
+                break
+            frames.append((kind, seq, self._buffer[HEADER.size:end].decode('ascii', errors='replace')))
+            del self._buffer[:end]
+        return frames
+
+
+def is_firmware_ack(status: str) -> bool:
+    """Réponse du firmware (`OK`, `ERR_*`), par opposition à `TIMEOUT`/`BUSY`/`CANCELLED` produits par le démon."""
+    return status == 'OK' or status.startswith('ERR')
+
+
+def format_ack(status: str, t_recv: float, t_write: float, t_ack: float) -> str:
+    return f"{status} {t_recv:.6f} {t_write:.6f} {t_ack:.6f}"
+
+
+def parse_ack_payload(payload: str):
+    """`OK 1.0 1.1 1.2` -> ('OK', {'pi_recv': 1.0, 'serial_write': 1.1, 'ack': 1.2})."""
+    parts = payload.split()
+    if not parts:
+        return '', {}
+    try:
+        stamps = dict(zip(PI_STAGES, (float(p) for p in parts[1:4])))
+    except ValueError:
+        stamps = {}
+    return parts[0], stamps
+
+
+class _Client:
+    """
+    Client connecté. Les trames sortantes passent par une file bornée, vidée par
+    un thread d'envoi: lecteur série, écrivain et voie prioritaire ne bloquent
+    jamais sur une socket. File pleine ou envoi bloqué plus de `send_timeout`
+    (Wi-Fi perdu sans FIN): client trop lent, déconnecté.
+    """
+    def __init__(self, sock: socket.socket, addr, max_queue: int = 256, send_timeout: float = 1.0):
+        self.sock = sock
+        self.addr = addr
+        self.max_queue = max_queue
+        self.alive = True
+        self.dropped = False
+        self._queue = deque()
+        self._cond = threading.Condition()
+        # délai des envois (sendall) et des lectures: le lecteur ignore les délais de lecture
+        sock.settimeout(send_timeout)
+        self._thread = threading.Thread(target=self._send_loop, daemon=True)
+        self._thread.start()
+
+    def send(self, frame: bytes) -> bool:
+        """Met la trame en file (non bloquant); False si le client est perdu."""
+        with self._cond:
+            if not self.alive:
+                return False
+            if len(self._queue) < self.max_queue:
+                self._queue.append(frame)
+                self._cond.notify()
+                return True
+        self.drop("file d'envoi pleine")
+        return False
+
+    def drop(self, reason: str) -> None:
+        with self._cond:
+            if not self.alive:
+                return
+            self.alive = False
+            self.dropped = True
+            self._queue.clear()
+            self._cond.notify()
+        print(f"[WARN] Client trop lent ({self.addr[0]}:{self.addr[1]}): {reason}, déconnecté")
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # réveille le lecteur du client
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        with self._cond:
+            self.alive = False
+            self._queue.clear()
+            self._cond.notify()
+
+    def _send_loop(self):
+        while True:
+            with self._cond:
+                while self.alive and not self._queue:
+                    self._cond.wait()
+                if not self.alive:
+                    return
+                data = b''.join(self._queue)
+                self._queue.clear()
+            try:
+                self.sock.sendall(data)
+            except socket.timeout:
+                self.drop(f"envoi bloqué plus de {self.sock.gettimeout():g} s")
+                return
+            except OSError:
+                self.close()
+                return
+
+
+class _Pending:
+    __slots__ = ('client', 'seq', 't_recv', 't_write')
+
+    def __init__(self, client, seq, t_recv, t_write):
+        self.client = client
+        self.seq = seq
+        self.t_recv = t_recv
+        self.t_write = t_write
+
+
+class RobotDaemon:
+    def __init__(self, serial_port, port: int = DEFAULT_PORT, host: str = '0.0.0.0',
+                 max_in_flight: int = 3, ack_timeout: float = 1.0, telem_ms: int = 0,
+                 wdt_ms: int = 0, stop_on_disconnect: bool = True, max_queue: int = 32,
+                 client_queue: int = 256, send_timeout: float = 1.0):
+        self.serial = serial_port
+        self.host = host
+        self.port = port
+        self.max_in_flight = max_in_flight
+        self.ack_timeout = ack_timeout
+        self.telem_ms = telem_ms
+        self.wdt_ms = wdt_ms
+        self.stop_on_disconnect = stop_on_disconnect
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()  # numéro série -> _Pending, ordre d'écriture
+        self._queue = deque()          # commandes en attente d'une place dans la fenêtre
+        self.max_queue = max_queue
+        self.client_queue = client_queue
+        self.send_timeout = send_timeout
+        self.priority_commands = 0
+        self.dropped = 0  # clients déconnectés pour lenteur
+        self._serial_seq = 0
+        self._clients = []
+        self._clients_lock = threading.Lock()
+        self._server: Optional[socket.socket] = None
+        self._threads = []
+        self._running = False
+        self.max_pending = 0
+        self.acks = 0
+        self.timeouts = 0
+        self.telemetry_frames = 0
+
+    # --- cycle de vie -------------------------------------------------------------------
+
+    def start(self) -> 'RobotDaemon':
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, self.port))
+        server.listen(4)
+        server.settimeout(0.2)
+        self.port = server.getsockname()[1]
+        self._server = server
+        self._running = True
+        if self.telem_ms:
+            self._write_serial(f"TELEM {self.telem_ms}")
+        if self.wdt_ms:
+            self._write_serial(f"WDT {self.wdt_ms}")
+        for target in (self._accept_loop, self._serial_loop, self._writer_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[INFO] Démon robot en écoute sur {self.host}:{self.port}")
+        return self
+
+    def serve_forever(self) -> None:
+        try:
+            while self._running:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        with self._clients_lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+            try:
+                client.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.sock.close()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    # --- clients ------------------------------------------------------------------------
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, addr = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = _Client(sock, addr, self.client_queue, self.send_timeout)
+            with self._clients_lock:
+                self._clients.append(client)
+            thread = threading.Thread(target=self._client_loop, args=(client,), daemon=True)
+            thread.start()
+            print(f"[INFO] Client connecté: {addr[0]}:{addr[1]}")
+
+    def _client_loop(self, client: _Client):
+        decoder = FrameDecoder()
+        try:
+            while self._running and client.alive:
+                try:
+                    data = client.sock.recv(4096)
+                except socket.timeout:
+                    continue  # client silencieux: normal
+                if not data:
+                    break
+                t_recv = time.monotonic()
+                for kind, seq, payload in decoder.feed(data):
+                    if kind == KIND_COMMAND:
+                        self.submit(client, seq, payload, t_recv)
+                    elif kind == KIND_PRIORITY:
+                        self.priority(client, seq, payload or "ESTOP", t_recv)
+        except OSError:
+            pass
+        finally:
+            client.close()
+            if client.dropped:
+                self.dropped += 1
+            with self._clients_lock:
+                if client in self._clients:
+                    self._clients.remove(client)
+            client.sock.close()
+            if self.stop_on_disconnect and self._running:
+                print(f"[WARN] Client perdu ({client.addr[0]}:{client.addr[1]}): arrêt des moteurs")
+                self.priority(None, 0, "MOVE stop 0")
+
+    def _broadcast(self, frame: bytes) -> None:
+        with self._clients_lock:
+            clients = list(self._clients)
+        for client in clients:
+            client.send(frame)
+
+    # --- port série ---------------------------------------------------------------------
+
+    def _write_serial(self, line: str) -> None:
+        self.serial.write((line + "\n").encode())
+
+    def submit(self, client, seq: int, command: str, t_recv: Optional[float] = None) -> None:
+        """Met la commande en file; elle part dès qu'une place se libère dans la fenêtre."""
+        t_recv = time.monotonic() if t_recv is None else t_recv
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                busy = True
+            else:
+                busy = False
+                self._queue.append((client, seq, command, t_recv))
+                self._cond.notify_all()
+        if busy:
+            self._reply(_Pending(client, seq, t_recv, t_recv), 'BUSY', time.monotonic())
+
+    def priority(self, client, seq: int, command: str = "ESTOP", t_recv: Optional[float] = None) -> None:
+        """
+        Voie prioritaire: les commandes en file sont annulées (`CANCELLED`) et `command`
+        est écrite immédiatement, même si la fenêtre est pleine. Seules les commandes
+        déjà en vol (au plus `max_in_flight`) la précèdent sur la liaison.
+        """
+        t_recv = time.monotonic() if t_recv is None else t_recv
+        with self._cond:
+            cancelled = list(self._queue)
+            self._queue.clear()
+            self._write_command(client, seq, command, t_recv)
+            self.priority_commands += 1
+            self._cond.notify_all()
+        now = time.monotonic()
+        for q_client, q_seq, _, q_recv in cancelled:
+            self._reply(_Pending(q_client, q_seq, q_recv, now), 'CANCELLED', now)
+
+    def _write_command(self, client, seq: int, command: str, t_recv: float) -> None:
+        """Numérotation série et écriture (appelé sous `_cond`)."""
+        self._serial_seq = self._serial_seq % (SEQ_MODULO - 1) + 1
+        serial_seq = self._serial_seq
+        self._pending[serial_seq] = _Pending(client, seq, t_recv, time.monotonic())
+        self.max_pending = max(self.max_pending, len(self._pending))
+        self._write_serial(tag_command(serial_seq, command.strip()))
+
+    def _writer_loop(self):
+        while self._running:
+            with self._cond:
+                if not self._queue or len(self._pending) >= self.max_in_flight:
+                    self._cond.wait(0.05)
+                    expired = self._expire()
+                elif self._running:
+                    expired = ()
+                    self._write_command(*self._queue.popleft())
+            self._reply_expired(expired)
+
+    def _serial_loop(self):
+        while self._running:
+            try:
+                raw = self.serial.readline()
+            except Exception as e:
+                print(f"[ERROR] Lecture série: {e}")
+                break
+            t_ack = time.monotonic()
+            line = raw.decode(errors='ignore').strip() if raw else ''
+            if self._pending:
+                with self._cond:
+                    expired = self._expire()
+                self._reply_expired(expired)
+            if not line:
+                continue
+            if is_any_telemetry(line):
+                self.telemetry_frames += 1
+                self._broadcast(pack_frame(KIND_TELEMETRY, 0, line))
+                continue
+            if is_robot_event(line):
+                print(f"[WARN] Événement firmware: {line}")
+                self._broadcast(pack_frame(KIND_EVENT, 0, line))
+                continue
+            status, serial_seq = parse_ack(line)
+            with self._cond:
+                if serial_seq is None:
+                    # firmware sans numéros: réponses dans l'ordre d'écriture
+                    entry = self._pending.popitem(last=False)[1] if self._pending else None
+                else:
+                    entry = self._pending.pop(serial_seq, None)
+                self._cond.notify_all()
+            if entry is not None:
+                self.acks += 1
+                self._reply(entry, status, t_ack)
+
+    def _expire(self) -> list:
+        """Retire les commandes trop anciennes (appelé sous `_cond`); à acquitter avec `_reply_expired`."""
+        now = time.monotonic()
+        expired = []
+        while self._pending:
+            serial_seq, entry = next(iter(self._pending.items()))
+            if now - entry.t_write < self.ack_timeout:
+                break
+            del self._pending[serial_seq]
+            self.timeouts += 1
+            expired.append((entry, now))
+        if expired:
+            self._cond.notify_all()
+        return expired
+
+    def _reply_expired(self, expired) -> None:
+        """Acquittements `TIMEOUT`, hors de `_cond`."""
+        for entry, t_ack in expired:
+            self._reply(entry, 'TIMEOUT', t_ack)
+
+    def _reply(self, entry: _Pending, status: str, t_ack: float) -> None:
+        if entry.client is not None:
+            entry.client.send(pack_frame(KIND_ACK, entry.seq, format_ack(status, entry.t_recv, entry.t_write, t_ack)))
+
+
+class DaemonClient:
+    """
+    Client du démon (interface, scripts). `send()` n'attend pas l'acquittement:
+    il arrive dans `on_ack(seq, réponse, horodatages Pi)` depuis le thread de lecture.
+    `request()` envoie et attend la réponse.
+    """
+    def __init__(self, host: str = 'PEI.local', port: int = DEFAULT_PORT, timeout: float = 3.0,
+                 on_ack: Optional[Callable[[int, str, dict], None]] = None,
+                 on_telemetry: Optional[Callable[[str], None]] = None,
+                 on_robot_event: Optional[Callable[[str], None]] = None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.on_ack = on_ack
+        self.on_telemetry = on_telemetry
+        self.on_robot_event = on_robot_event
+        self._sock: Optional[socket.socket] = None
+        self._send_lock = threading.Lock()
+        self._seq = 0
+        self._waiters = {}
+        self._waiters_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def connect(self) -> 'DaemonClient':
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(None)
+        self._sock = sock
+        self._thread = threading.Thread(target=self._reader, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def send(self, command: str, seq: Optional[int] = None, kind: bytes = KIND_COMMAND) -> int:
+        if self._sock is None:
+            raise RuntimeError("Démon non connecté")
+        with self._send_lock:
+            if seq is None:
+                self._seq = self._seq % (SEQ_MODULO - 1) + 1
+                seq = self._seq
+            self._sock.sendall(pack_frame(kind, seq, command))
+        return seq
+
+    def request(self, command: str, timeout: float = 2.0, kind: bytes = KIND_COMMAND):
+        """Envoie et attend l'acquittement: (réponse, horodatages Pi); ('', {}) si délai dépassé."""
+        event = threading.Event()
+        result = {}
+        with self._send_lock:
+            self._seq = self._seq % (SEQ_MODULO - 1) + 1
+            seq = self._seq
+        with self._waiters_lock:
+            self._waiters[seq] = (event, result)
+        self.send(command, seq, kind)
+        if not event.wait(timeout):
+            with self._waiters_lock:
+                self._waiters.pop(seq, None)
+            return '', {}
+        return result['status'], result['stamps']
+
+    def emergency_stop(self, timeout: float = 2.0):
+        """Arrêt d'urgence par la voie prioritaire, acquitté par le firmware."""
+        return self.request("ESTOP", timeout, KIND_PRIORITY)
+
+    def _reader(self):
+        decoder = FrameDecoder()
+        sock = self._sock
+        try:
+            while True:
+                data = sock.recv(4096)
+                if not data:
+                    break
+                for kind, seq, payload in decoder.feed(data):
+                    if kind == KIND_ACK:
+                        status, stamps = parse_ack_payload(payload)
+                        with self._waiters_lock:
+                            waiter = self._waiters.pop(seq, None)
+                        if waiter is not None:
+                            waiter[1].update(status=status, stamps=stamps)
+                            waiter[0].set()
+                        elif self.on_ack is not None:
+                            self.on_ack(seq, status, stamps)
+                    elif kind == KIND_TELEMETRY and self.on_telemetry is not None:
+                        self.on_telemetry(payload)
+                    elif kind == KIND_EVENT and self.on_robot_event is not None:
+                        self.on_robot_event(payload)
+        except OSError:
+            pass
+        finally:
+            self._sock = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Démon de commande du robot (socket TCP -> port série Arduino)")
+    parser.add_argument("--serial", default="/dev/ttyACM0", help="Port série de l'Arduino")
+    parser.add_argument("--baud", type=int, default=9600, help="Débit du port série")
+    parser.add_argument("--sim", action="store_true", help="Arduino simulé (arduino_sim) au lieu du port série")
+    parser.add_argument("--host", default="0.0.0.0", help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port TCP d'écoute")
+    parser.add_argument("--window", type=int, default=3, help="Commandes en vol sur le port série")
+    parser.add_argument("--ack-timeout", type=float, default=1.0, help="Délai d'acquittement (s)")
+    parser.add_argument("--telem", type=int, default=0, help="Période de télémétrie demandée à l'Arduino (ms)")
+    parser.add_argument("--wdt", type=int, default=0,
+                        help="Chien de garde du firmware: arrêt des moteurs sans commande pendant ce délai (ms)")
+    args = parser.parse_args()
+
+    if args.sim:
+        from arduino_sim import SimulatedArduino
+        port = SimulatedArduino(timeout=0.1)
+        print("[INFO] Arduino simulé")
+    else:
+        try:
+            import serial
+        except ImportError:
+            raise SystemExit("[ERROR] pyserial n'est pas installé (pip install pyserial)")
+        port = serial.Serial(args.serial, args.baud, timeout=0.1)
+        time.sleep(2)  # l'Arduino redémarre à l'ouverture du port
+    daemon = RobotDaemon(port, port=args.port, host=args.host, max_in_flight=args.window,
+                         ack_timeout=args.ack_timeout, telem_ms=args.telem, wdt_ms=args.wdt)
+    daemon.start().serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,37 +5,53 @@ Version: 1.0.0
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import importlib
+import importlib.util
 import math
-from typing import Optional, Literal, cast, Any
+import time
+from collections import deque
+from typing import Optional, Literal, cast, Any, TYPE_CHECKING
 from robot_state import RobotStateManager, RobotState, RobotMode, WheelState
-try:
-    import ttkbootstrap as tb
-    TB_AVAILABLE = True
-except Exception:
-    TB_AVAILABLE = False
+from command_trace import CommandTracer, SEGMENTS
+from telemetry import TelemetryDecoder, TerminalFilter
+from robot_daemon import DEFAULT_PORT as DAEMON_PORT, is_firmware_ack
+from link_watchdog import Watchdog
+import perf
+
+if TYPE_CHECKING:
+    from robot_io import IOCore, TkBridge, DaemonLink
+    from robot_registry import RobotRegistry
+
+# Dépendances lourdes ou optionnelles importées à la première utilisation:
+# ttkbootstrap à la création de la fenêtre, robot_ssh (paramiko) à la connexion SSH,
+# video_stream (OpenCV) à la connexion caméra, robot_io (asyncio) à la connexion au démon,
+# state_sync en mode miroir.
+_backends = {}
+
+
+def _backend(name: str):
+    """Module `name` importé au premier appel (None s'il est absent); durée mesurée sous `import.<name>`."""
+    if name not in _backends:
+        try:
+            with perf.span(f'import.{name}'):
+                _backends[name] = importlib.import_module(name)
+        except Exception:
+            _backends[name] = None
+    return _backends[name]
+
+
+def _has_module(name: str) -> bool:
+    """Module installé, sans l'importer."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
 
-import importlib
-_robot_serial_module = None
-try:
-    _robot_serial_module = importlib.import_module('robot_serial')
-    RobotSerial = getattr(_robot_serial_module, 'RobotSerial')
-    SERIAL_AVAILABLE = True
-except Exception:
-    RobotSerial = None
-    SERIAL_AVAILABLE = False
-
-# SSH interactive support
-_robot_ssh_module = None
-try:
-    _robot_ssh_module = importlib.import_module('robot_ssh')
-    SSHInteractive = getattr(_robot_ssh_module, 'SSHInteractive')
-    start_test_on_pi = getattr(_robot_ssh_module, 'start_test_on_pi')
-    SSH_AVAILABLE = True
-except Exception:
-    SSHInteractive = None
-    start_test_on_pi = None
-    SSH_AVAILABLE = False
+
+SSH_AVAILABLE = _has_module('paramiko')
+VIDEO_AVAILABLE = _has_module('cv2')
+VIDEO_STREAM_PORT = 5800  # video_stream.DEFAULT_PORT, sans importer OpenCV
 
 
 
@@ -59,11 +75,14 @@ COLORS = {
     'terrain_bg': '#07121a',
     'robot_body': '#fb7185',
     'robot_direction': '#dbeaf8',
+    'robot_secondary': '#a78bfa',
     'text_primary': '#dbeaf8',
     'wheel_stopped': '#64748b',
 }
 
 UPDATE_INTERVAL_MS = 100
+PERF_OVERLAY_INTERVAL_MS = 500
+WATCHDOG_DEADLINE_S = 0.2  # perte de liaison avec le démon -> arrêt d'urgence
 
 # Constantes typées pour satisfaire le vérificateur de type (Literal attendu)
 FILL_X = cast(Literal["x"], tk.X)
@@ -76,14 +95,73 @@ ANCHOR_W = cast(Literal["w"], tk.W)
 ARROW_LAST = cast(Literal["last"], tk.LAST)
 
 
+class TerrainSprites:
+    """
+    Robots dessinés sur le terrain: les objets du canevas sont créés une fois par
+    robot puis déplacés (`coords`), et seulement si la pose affichée a changé.
+    """
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self._items = {}  # robot -> (corps, flèche, étiquette ou None)
+        self._drawn = {}  # robot -> pose affichée (px, px, degrés)
+
+    def draw(self, robot_id, state: RobotState, body: str, label: Optional[str] = None) -> bool:
+        """Place le robot `robot_id`; False si rien n'a bougé à l'écran."""
+        x_px = state.position.x * TERRAIN_DISPLAY_WIDTH / TERRAIN_REAL_WIDTH
+        y_px = state.position.y * TERRAIN_DISPLAY_HEIGHT / TERRAIN_REAL_HEIGHT
+        pose = (round(x_px, 1), round(y_px, 1), round(state.direction, 1))
+        if self._drawn.get(robot_id) == pose:
+            return False
+        self._drawn[robot_id] = pose
+
+        r = ROBOT_SIZE // 2
+        angle_rad = math.radians(state.direction)
+        end_x = x_px + ROBOT_SIZE * math.cos(angle_rad)
+        end_y = y_px - ROBOT_SIZE * math.sin(angle_rad)
+        items = self._items.get(robot_id)
+        if items is None:
+            self._items[robot_id] = (
+                self.canvas.create_oval(x_px - r, y_px - r, x_px + r, y_px + r, fill=body,
+                                        outline=COLORS['robot_direction'], width=2),
+                self.canvas.create_line(x_px, y_px, end_x, end_y, fill=COLORS['robot_direction'], width=3,
+                                        arrow=ARROW_LAST),
+                self.canvas.create_text(x_px, y_px - r - 8, text=label, fill=COLORS['text_primary'],
+                                        font=("Segoe UI", 8)) if label else None,
+            )
+        else:
+            oval, arrow, text = items
+            self.canvas.coords(oval, x_px - r, y_px - r, x_px + r, y_px + r)
+            self.canvas.coords(arrow, x_px, y_px, end_x, end_y)
+            if text is not None:
+                self.canvas.coords(text, x_px, y_px - r - 8)
+        return True
+
+    def remove(self, robot_id) -> None:
+        for item in self._items.pop(robot_id, ()):
+            if item is not None:
+                self.canvas.delete(item)
+        self._drawn.pop(robot_id, None)
+
+    def __contains__(self, robot_id) -> bool:
+        return robot_id in self._items
+
+
 class RobotInterface:
-    def __init__(self, state_manager: RobotStateManager):
+    def __init__(self, state_manager: RobotStateManager, theme: Optional[str] = 'darkly',
+                 mirror: Optional[str] = None, registry: Optional['RobotRegistry'] = None):
+        # mirror="hôte[:port]": simple vue d'un StateBroadcastServer (state_sync.py), sans commande du robot
+        # registry: autres robots (robot_registry.py) dessinés sur le terrain; les panneaux suivent state_manager
         self.state_manager = state_manager
+        self.registry = registry
         self._last_state: Optional[RobotState] = None
         
-        self.root = tk.Tk()
-        if TB_AVAILABLE:
-            self.style = tb.Style(theme='darkly')
+        with perf.span('startup.tk'):
+            self.root = tk.Tk()
+        # thème ttkbootstrap (theme=None: ttk seul, démarrage plus rapide)
+        self._tb = _backend('ttkbootstrap') if theme else None
+        if self._tb is not None:
+            with perf.span('startup.theme'):
+                self.style = self._tb.Style(theme=theme)
         # ensure app background is the panel color to avoid white-on-white
         try:
             self.root.configure(bg=COLORS['panel_bg'])
@@ -93,8 +171,13 @@ class RobotInterface:
         self.root.geometry("1200x800")
         self.root.minsize(1000, 700)
         
-        self._setup_style()
-        self._build_layout()
+        self._init_links()
+        with perf.span('startup.style'):
+            self._setup_style()
+        with perf.span('startup.layout'):
+            self._build_layout()
+        if mirror:
+            self._start_mirror(mirror)
 
         self.state_manager.add_listener(self._on_state_update)
         
@@ -145,6 +228,16 @@ class RobotInterface:
         self.battery_label = ttk.Label(right_info, text="🔋 100%", style="Header.TLabel")
         self.battery_label.pack(side=SIDE_LEFT, padx=8)
 
+        self.perf_btn = ttk.Button(right_info, text="📊 Perf", command=self._on_toggle_perf)
+        self.perf_btn.pack(side=SIDE_LEFT, padx=8)
+
+        # overlay de performance (F2), posé au-dessus des panneaux
+        self.perf_overlay = tk.Label(self.root, text="", justify='left', anchor='nw', font=("Consolas", 9),
+                                     bg='#000000', fg=COLORS['positive'], padx=8, pady=6)
+        self._perf_overlay_visible = False
+        self._perf_overlay_last = 0.0
+        self.root.bind('<F2>', lambda e: self._on_toggle_perf())
+
         main = ttk.Frame(self.root)
         main.pack(fill=FILL_BOTH, expand=True, padx=12, pady=12)
 
@@ -170,36 +263,34 @@ class RobotInterface:
 
         tabs = ttk.Notebook(right)
         tabs.pack(fill=FILL_BOTH, expand=True)
-
-        pos_tab = ttk.Frame(tabs, style='TFrame')
-        wheels_tab = ttk.Frame(tabs, style='TFrame')
-        sensors_tab = ttk.Frame(tabs, style='TFrame')
-        actuators_tab = ttk.Frame(tabs, style='TFrame')
-        detection_tab = ttk.Frame(tabs, style='TFrame')
-        # Terminal tab
-        terminal_tab = ttk.Frame(tabs, style='TFrame')
-
-        tabs.add(pos_tab, text="Position")
-        tabs.add(wheels_tab, text="Roues")
-        tabs.add(sensors_tab, text="Capteurs")
-        tabs.add(actuators_tab, text="Actionneurs")
-        tabs.add(detection_tab, text="ArUco")
-        tabs.add(terminal_tab, text="Terminal")
-
-        self._create_position_panel(pos_tab)
-        self._create_wheels_panel(wheels_tab)
-        self._create_sensors_panel(sensors_tab)
-        self._create_actuators_panel(actuators_tab)
-        self._create_detection_panel(detection_tab)
-        self._create_terminal_panel(terminal_tab)
+        self._tabs = tabs
+
+        # onglets vides au départ, contenu construit à la première ouverture
+        self._tab_builders = {}
+        self._built_tabs = set()
+        for text, builder in (("Position", self._create_position_panel),
+                              ("Roues", self._create_wheels_panel),
+                              ("Capteurs", self._create_sensors_panel),
+                              ("Actionneurs", self._create_actuators_panel),
+                              ("ArUco", self._create_detection_panel),
+                              ("Caméra", self._create_camera_panel),
+                              ("Terminal", self._create_terminal_panel)):
+            tab = ttk.Frame(tabs, style='TFrame')
+            tabs.add(tab, text=text)
+            self._tab_builders[str(tab)] = (text, builder, tab)
+        tabs.bind('<<NotebookTabChanged>>', lambda e: self._build_tab(tabs.select()))
+        self._build_tab(tabs.select())
 
         controls = ttk.Frame(self.root)
         controls.pack(fill=FILL_X, side=SIDE_BOTTOM, pady=(0, 8))
 
         self.emergency_btn = ttk.Button(controls, text="🛑 ARRÊT D'URGENCE", style="Danger.TButton", command=self._on_emergency_stop)
-        if TB_AVAILABLE:
-            self.emergency_btn = tb.Button(controls, text="🛑 ARRÊT D'URGENCE", bootstyle="danger", command=self._on_emergency_stop)
+        if self._tb is not None:
+            self.emergency_btn = self._tb.Button(controls, text="🛑 ARRÊT D'URGENCE", bootstyle="danger", command=self._on_emergency_stop)
         self.emergency_btn.pack(side=SIDE_LEFT, padx=12, pady=6)
+        # latence bouton -> acquittement de l'arrêt par le robot
+        self.estop_label = ttk.Label(controls, text="Arrêt: -", style="Small.TLabel")
+        self.estop_label.pack(side=SIDE_LEFT, padx=(0, 12))
 
         modes_frame = ttk.Frame(controls)
         modes_frame.pack(side=SIDE_LEFT, padx=12)
@@ -208,23 +299,61 @@ class RobotInterface:
 
         self.mode_buttons = {}
         for mode in [RobotMode.IDLE, RobotMode.MANUAL, RobotMode.AUTONOMOUS]:
-            if TB_AVAILABLE:
-                b = tb.Button(modes_frame, text=mode.value.upper(), bootstyle="primary-outline", command=lambda m=mode: self._on_mode_change(m))
+            if self._tb is not None:
+                b = self._tb.Button(modes_frame, text=mode.value.upper(), bootstyle="primary-outline", command=lambda m=mode: self._on_mode_change(m))
             else:
                 b = ttk.Button(modes_frame, text=mode.value.upper(), style="Primary.TButton", command=lambda m=mode: self._on_mode_change(m))
             b.pack(side=SIDE_LEFT, padx=4)
             self.mode_buttons[mode.value] = b
 
-        if TB_AVAILABLE:
-            self.sim_btn = tb.Button(controls, text="▶️ Démarrer Simulation", bootstyle="success", command=self._on_toggle_simulation)
+        if self._tb is not None:
+            self.sim_btn = self._tb.Button(controls, text="▶️ Démarrer Simulation", bootstyle="success", command=self._on_toggle_simulation)
         else:
             self.sim_btn = ttk.Button(controls, text="▶️ Démarrer Simulation", style="Primary.TButton", command=self._on_toggle_simulation)
         self.sim_btn.pack(side=SIDE_RIGHT, padx=12)
 
         self._simulation_running = False
+
+    def _init_links(self):
+        # état des liaisons, indépendant des onglets (l'arrêt d'urgence s'en sert même
+        # si l'onglet Terminal n'a jamais été ouvert)
+        self._tracer = CommandTracer()
+        self._estop_seq: Optional[int] = None  # ESTOP envoyé par SSH, en attente de sa ligne TRACE
+        if self.registry is not None:
+            # flux multiplexé (`@<id> T ...`): chaque trame va au robot de son préfixe,
+            # les trames sans préfixe au robot principal (celui des panneaux)
+            from robot_registry import MAIN_ROBOT, MultiTelemetryDecoder
+            main_id = next((robot_id for robot_id in self.registry
+                            if self.registry.get(robot_id) is self.state_manager), MAIN_ROBOT)
+            self._telemetry = MultiTelemetryDecoder(self.registry, default=main_id)
+        else:
+            self._telemetry = TelemetryDecoder(self.state_manager)
+        self._terminal_filter = TerminalFilter()
+        # E/S du démon dans la boucle asyncio de l'IOCore, événements rapatriés par TkBridge
+        self._io: Optional['IOCore'] = None
+        self._io_bridge: Optional['TkBridge'] = None
+        self._daemon: Optional['DaemonLink'] = None
+        self._daemon_connecting = False
+        self._watchdog: Optional[Watchdog] = None
+        self._latency_window: Optional[tk.Toplevel] = None
+        self._camera_client: Optional[object] = None
+        self._camera_photo: Optional[tk.PhotoImage] = None
+        self._mirror: Optional[object] = None  # state_sync.StateSyncClient en mode miroir
         # SSH interactive session (created on demand)
         self._ssh_session: Optional[object] = None
         self._ssh_connected = False
+        # sortie du terminal reçue avant la construction de l'onglet
+        self.term_text: Optional[tk.Text] = None
+        self._terminal_backlog = deque(maxlen=500)
+
+    def _build_tab(self, tab_id: str):
+        entry = self._tab_builders.pop(str(tab_id), None)
+        if entry is None:
+            return
+        text, builder, tab = entry
+        with perf.span(f'gui.tab.{text}'):
+            builder(tab)
+        self._built_tabs.add(text)
 
     def _create_terrain_canvas(self, parent):
         container = ttk.Frame(parent)
@@ -240,9 +369,7 @@ class RobotInterface:
         self.terrain_canvas.pack()
         
         self._draw_terrain_grid()
-        
-        self._robot_id = None
-        self._direction_id = None
+        self._sprites = TerrainSprites(self.terrain_canvas)
     
     def _draw_terrain_grid(self):
 
@@ -398,6 +525,36 @@ class RobotInterface:
         self.aruco_ids_label = ttk.Label(frame, text="-", style="Accent.TLabel")
         self.aruco_ids_label.pack(side=SIDE_LEFT)
 
+    def _create_camera_panel(self, parent):
+        frame = ttk.Frame(parent, padding=8)
+        frame.pack(fill=FILL_BOTH, expand=True)
+
+        conn_row = ttk.Frame(frame)
+        conn_row.pack(fill=FILL_X, pady=(0, 6))
+
+        ttk.Label(conn_row, text="Hôte:", style="Small.TLabel").pack(side=SIDE_LEFT)
+        self.camera_host = ttk.Entry(conn_row, width=18)
+        self.camera_host.insert(0, "PEI.local")
+        self.camera_host.pack(side=SIDE_LEFT, padx=(4, 8))
+
+        ttk.Label(conn_row, text="Port:", style="Small.TLabel").pack(side=SIDE_LEFT)
+        self.camera_port = ttk.Entry(conn_row, width=6)
+        self.camera_port.insert(0, str(VIDEO_STREAM_PORT))
+        self.camera_port.pack(side=SIDE_LEFT, padx=(4, 8))
+
+        self.camera_connect_btn = ttk.Button(conn_row, text="📷 Connecter", command=self._on_camera_toggle)
+        self.camera_connect_btn.pack(side=SIDE_LEFT, padx=6)
+
+        self.camera_stats_label = ttk.Label(frame, text="Flux: -", style="Small.TLabel")
+        self.camera_stats_label.pack(anchor=ANCHOR_W)
+
+        self.camera_image_label = tk.Label(frame, bg=COLORS['terrain_bg'])
+        self.camera_image_label.pack(fill=FILL_BOTH, expand=True, pady=(6, 0))
+
+        if not VIDEO_AVAILABLE:
+            self.camera_connect_btn.config(state='disabled')
+            self.camera_stats_label.config(text="Flux vidéo non disponible (OpenCV manquant)")
+
     def _create_terminal_panel(self, parent):
         frame = ttk.Frame(parent, padding=8)
         frame.pack(fill=FILL_BOTH, expand=True)
@@ -427,6 +584,13 @@ class RobotInterface:
         self.ssh_start_remote_btn = ttk.Button(conn_row, text="▶️ Lancer test.py", command=self._on_ssh_start_remote)
         self.ssh_start_remote_btn.pack(side=SIDE_LEFT, padx=6)
 
+        self.ssh_bridge_btn = ttk.Button(conn_row, text="🔁 Pont série", command=self._on_ssh_start_bridge)
+        self.ssh_bridge_btn.pack(side=SIDE_LEFT, padx=6)
+
+        # connexion directe au démon du Pi (robot_daemon.py), sans shell SSH
+        self.daemon_btn = ttk.Button(conn_row, text="🤖 Démon", command=self._on_daemon_toggle)
+        self.daemon_btn.pack(side=SIDE_LEFT, padx=6)
+
         # Terminal output
         out_frame = ttk.Frame(frame)
         out_frame.pack(fill=FILL_BOTH, expand=True)
@@ -434,6 +598,8 @@ class RobotInterface:
         self.term_text = tk.Text(out_frame, height=18, wrap='none', bg='#000000', fg='#dbeaf8')
         self.term_text.pack(side=SIDE_LEFT, fill=FILL_BOTH, expand=True)
         self.term_text.configure(state='disabled')
+        while self._terminal_backlog:
+            self._append_terminal_output(self._terminal_backlog.popleft())
 
         scrollbar_v = ttk.Scrollbar(out_frame, orient='vertical', command=self.term_text.yview)
         scrollbar_v.pack(side=SIDE_RIGHT, fill=SIDE_BOTTOM)
@@ -467,13 +633,19 @@ class RobotInterface:
         make_btn("E Rot D.", "MOVE rotateCW 200")
         make_btn("STOP", "MOVE stop 0")
 
+        ttk.Button(ctrl_row, text="📈 Latences", command=self._open_latency_window).pack(side=SIDE_RIGHT, padx=4)
+
         # disable SSH controls if paramiko/robot_ssh not available
         if not SSH_AVAILABLE:
             self.ssh_connect_btn.config(state='disabled')
             self.ssh_start_remote_btn.config(state='disabled')
+            self.ssh_bridge_btn.config(state='disabled')
             self._append_terminal_output("SSH non disponible (paramiko manquant). Installez paramiko et relancez l'application.\n")
 
     def _append_terminal_output(self, text: str):
+        if self.term_text is None:
+            self._terminal_backlog.append(text)
+            return
         try:
             self.term_text.configure(state='normal')
             self.term_text.insert(tk.END, text)
@@ -482,8 +654,20 @@ class RobotInterface:
         except Exception:
             pass
 
+    def _on_ssh_output(self, text: str):
+        # lignes TRACE du pont série et écho des commandes préfixées
+        self._tracer.feed_output(text)
+        if self._estop_seq is not None:
+            self._check_estop_trace()
+        # trames de télémétrie relayées par le pont: roues mises à jour, lignes masquées
+        self._telemetry.feed(text.encode(errors='ignore'))
+        text = self._terminal_filter.feed(text)
+        if text:
+            self._append_terminal_output(text)
+
     def _on_ssh_toggle(self):
-        if not SSH_AVAILABLE:
+        ssh = _backend('robot_ssh') if SSH_AVAILABLE else None
+        if ssh is None:
             messagebox.showerror("SSH non disponible", "Le module robot_ssh/paramiko n'est pas installé.")
             return
         if not self._ssh_connected:
@@ -491,9 +675,9 @@ class RobotInterface:
             user = self.ssh_user.get().strip() or "admin"
             pwd = self.ssh_pass.get()
             try:
-                self._ssh_session = SSHInteractive(hostname=host, username=user, password=pwd)
+                self._ssh_session = ssh.SSHInteractive(hostname=host, username=user, password=pwd)
                 self._ssh_session.connect()
-                self._ssh_session.set_output_callback(self._append_terminal_output)
+                self._ssh_session.set_output_callback(self._on_ssh_output)
                 self._ssh_session.start_shell()
                 self._ssh_connected = True
                 self.ssh_connect_btn.config(text="🔌 Déconnecter")
@@ -523,6 +707,18 @@ class RobotInterface:
         except Exception as e:
             messagebox.showerror("Erreur", f"Impossible de lancer le script distant: {e}")
 
+    def _on_ssh_start_bridge(self):
+        if not self._ssh_connected or not self._ssh_session:
+            messagebox.showwarning("Non connecté", "Connectez-vous d'abord au Raspberry via SSH.")
+            return
+        try:
+            # pont stdin -> robot_daemon (lancé par start_test_on_pi, seul à tenir le port série):
+            # les boutons de déplacement lui envoient des commandes tracées
+            self._ssh_session.send("python3 control_robot.py --stdin --daemon")
+            self._append_terminal_output("▶️ Pont série lancé: python3 control_robot.py --stdin --daemon\n")
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Impossible de lancer le pont série: {e}")
+
     def _on_ssh_send(self):
         if not self._ssh_connected or not self._ssh_session:
             messagebox.showwarning("Non connecté", "Connectez-vous d'abord au Raspberry via SSH.")
@@ -536,14 +732,218 @@ class RobotInterface:
         except Exception as e:
             messagebox.showerror("Erreur envoi", f"Impossible d'envoyer la commande: {e}")
 
+    def _open_latency_window(self):
+        if self._latency_window is not None and self._latency_window.winfo_exists():
+            self._latency_window.lift()
+            return
+        win = tk.Toplevel(self.root)
+        win.title("Latence des commandes")
+        win.configure(bg=COLORS['panel_bg'])
+        self._latency_window = win
+
+        top = ttk.Frame(win, padding=8)
+        top.pack(fill=FILL_X)
+        ttk.Label(top, text="Segment:", style="Small.TLabel").pack(side=SIDE_LEFT)
+        names = [s[0] for s in SEGMENTS] + ['transport']
+        self._latency_segment = tk.StringVar(value='total')
+        ttk.Combobox(top, textvariable=self._latency_segment, values=names, state='readonly',
+                     width=14).pack(side=SIDE_LEFT, padx=6)
+        ttk.Button(top, text="💾 Exporter", command=self._export_latency_trace).pack(side=SIDE_RIGHT)
+
+        self._latency_canvas = tk.Canvas(win, width=460, height=220, bg=COLORS['terrain_bg'], highlightthickness=0)
+        self._latency_canvas.pack(padx=8)
+        self._latency_label = ttk.Label(win, text="", style="Small.TLabel", padding=8)
+        self._latency_label.pack(anchor=ANCHOR_W)
+        self._refresh_latency_window()
+
+    def _refresh_latency_window(self):
+        win = self._latency_window
+        if win is None or not win.winfo_exists():
+            self._latency_window = None
+            return
+        name = self._latency_segment.get()
+        edges, counts = self._tracer.histogram(name, bins=24)
+        canvas = self._latency_canvas
+        canvas.delete('all')
+        w, h, margin = 460, 220, 24
+        if counts:
+            peak = max(counts)
+            bar_w = (w - 2 * margin) / len(counts)
+            for i, c in enumerate(counts):
+                x0 = margin + i * bar_w
+                y0 = h - margin - (h - 2 * margin) * c / peak
+                canvas.create_rectangle(x0 + 1, y0, x0 + bar_w - 1, h - margin, fill=COLORS['accent'], outline='')
+            for frac in (0.0, 0.5, 1.0):
+                x = margin + frac * (w - 2 * margin)
+                canvas.create_text(x, h - margin / 2, text=f"{edges[-1] * frac:.0f} ms",
+                                   fill=COLORS['muted'], font=("Segoe UI", 8))
+        else:
+            canvas.create_text(w / 2, h / 2, text="Aucune commande acquittée", fill=COLORS['muted'])
+        stats = self._tracer.summary().get(name)
+        if stats:
+            self._latency_label.config(text=f"{name}: n={stats['count']} | p50 {stats['p50_ms']:.1f} ms"
+                                            f" | p95 {stats['p95_ms']:.1f} ms | max {stats['max_ms']:.1f} ms")
+        else:
+            self._latency_label.config(text=f"{name}: -")
+        win.after(500, self._refresh_latency_window)
+
+    def _export_latency_trace(self):
+        path = filedialog.asksaveasfilename(defaultextension='.json',
+                                            filetypes=[("JSON", "*.json"), ("CSV", "*.csv")])
+        if not path:
+            return
+        try:
+            self._tracer.export(path)
+            self._append_terminal_output(f"💾 Trace de latence exportée: {path}\n")
+        except OSError as e:
+            messagebox.showerror("Export impossible", str(e))
+
+    def _on_camera_toggle(self):
+        if self._camera_client is None:
+            host = self.camera_host.get().strip() or "PEI.local"
+            try:
+                port = int(self.camera_port.get())
+            except ValueError:
+                messagebox.showerror("Port invalide", "Le port du flux vidéo doit être un entier.")
+                return
+            video_stream = _backend('video_stream')  # OpenCV chargé à la première connexion
+            if video_stream is None:
+                messagebox.showerror("Flux vidéo indisponible", "Le module video_stream/OpenCV n'a pas pu être chargé.")
+                return
+            self._camera_client = video_stream.FrameStreamClient(host, port)
+            self.camera_connect_btn.config(text="📷 Déconnecter")
+        else:
+            self._camera_client.close()
+            self._camera_client = None
+            self.camera_connect_btn.config(text="📷 Connecter")
+            self.camera_stats_label.config(text="Flux: -")
+
+    def _start_mirror(self, target: str):
+        state_sync = _backend('state_sync')
+        host, _, port = target.partition(':')
+        self._mirror = state_sync.StateSyncClient(host, self.state_manager,
+                                                  port=int(port) if port else state_sync.DEFAULT_PORT)
+        self.root.title(f"Robot Interface - Eurobot 2026 (miroir de {target})")
+        # vue seule: les commandes passent par le poste relié au robot
+        for button in (self.emergency_btn, self.sim_btn, *self.mode_buttons.values()):
+            button.config(state='disabled')
+        self.estop_label.config(text="Miroir: connexion...")
+
+    def _update_mirror_status(self):
+        client = self._mirror
+        if client.connected:
+            self.estop_label.config(text=f"Miroir: {client.fps:.0f} img/s, {client.kbps:.1f} kb/s")
+        else:
+            self.estop_label.config(text=f"Miroir: connexion... {client.last_error}")
+
+    def _ensure_io(self) -> 'IOCore':
+        if self._io is None:
+            robot_io = _backend('robot_io')  # asyncio chargé à la première connexion au démon
+            self._io = robot_io.IOCore().start()
+            self._io_bridge = robot_io.TkBridge(self.root, self._io.events)
+            self._io_bridge.on('ack', self._on_daemon_ack)
+            self._io_bridge.on('disconnected', self._on_daemon_disconnected)
+            self._io_bridge.on('robot_event', self._on_robot_event)
+            self._io_bridge.on('estop_ack', self._on_estop_ack)
+            self._io_bridge.on('daemon_connect', self._on_daemon_connect_done)
+            self._io_bridge.start()
+        return self._io
+
+    def _on_daemon_toggle(self):
+        if self._daemon_connecting:
+            return
+        if self._daemon is None:
+            host = self.ssh_host.get().strip() or "PEI.local"
+            io = self._ensure_io()
+            link = _backend('robot_io').DaemonLink(host, DAEMON_PORT, on_event=self._on_daemon_event, on_telemetry=self._on_daemon_telemetry)
+            # connexion dans la boucle asyncio, résultat rapatrié dans le thread Tk par TkBridge:
+            # l'interface reste réactive pendant les 3 s de délai
+            self._daemon_connecting = True
+            self.daemon_btn.config(text="🤖 Connexion…")
+            future = io.submit(link.connect(timeout=3.0))
+            future.add_done_callback(lambda f: io.post('daemon_connect', (host, link, f)))
+        else:
+            self._io.submit(self._daemon.close())  # 'disconnected' remet l'interface à jour
+
+    def _on_daemon_connect_done(self, payload):
+        host, link, future = payload
+        self._daemon_connecting = False
+        try:
+            future.result()
+        except _backend('robot_io').CONNECT_ERRORS as e:
+            self.daemon_btn.config(text="🤖 Démon")
+            messagebox.showerror("Démon injoignable", f"Impossible de joindre {host}:{DAEMON_PORT}: {e}")
+            return
+        self._daemon = link
+        # PING toutes les 50 ms; sans acquittement pendant 200 ms: déconnecté + arrêt d'urgence
+        self._watchdog = Watchdog(self.state_manager, deadline=WATCHDOG_DEADLINE_S,
+                                  heartbeat=self._daemon_heartbeat, on_trip=self._on_watchdog_trip)
+        self._watchdog.watch('daemon')
+        self._watchdog.start(self._io)
+        self.state_manager.set_connected(True)
+        self.daemon_btn.config(text="🤖 Démon ✓")
+        self._append_terminal_output(f"✅ Démon connecté ({host}:{DAEMON_PORT})\n")
+
+    def _on_daemon_event(self, kind: str, payload):
+        # boucle asyncio: le chien de garde est nourri ici, sans dépendre de la réactivité de Tk
+        if kind == 'ack':
+            # seule une réponse de l'Arduino prouve la liaison: les TIMEOUT du démon arrivent aussi robot mort
+            if self._watchdog is not None and is_firmware_ack(payload[1]):
+                self._watchdog.feed('daemon')
+            if payload[0] >= _backend('robot_io').AUTO_SEQ_BASE:
+                return  # PING et commandes internes: pas d'affichage
+        self._io.post(kind, payload)
+
+    def _daemon_heartbeat(self):
+        link = self._daemon
+        if link is not None and link.connected:
+            self._io.loop.create_task(link.command("PING", timeout=WATCHDOG_DEADLINE_S))
+
+    def _on_watchdog_trip(self, stale):
+        # boucle asyncio: arrêt envoyé au robot au cas où la liaison serait seulement lente
+        link = self._daemon
+        if link is not None and link.connected:
+            self._io.loop.create_task(link.command("MOVE stop 0"))
+        self._io.post('robot_event', f"liaison perdue ({', '.join(stale)})")
+
+    def _on_robot_event(self, text: str):
+        self._append_terminal_output(f"⚠️ {text}\n")
+
+    def _on_daemon_disconnected(self, _payload):
+        if self._watchdog is not None:
+            self._watchdog.stop()
+            self._watchdog = None
+        self.state_manager.set_connected(False)
+        self._daemon = None
+        self.daemon_btn.config(text="🤖 Démon")
+        self._append_terminal_output("🔌 Démon déconnecté\n")
+
+    def _on_daemon_ack(self, ack):
+        # événement rapatrié dans le thread Tk par TkBridge
+        seq, status, stamps = ack
+        self._tracer.finish(seq, stamps, status)
+        self._append_terminal_output(f"← {status} {seq}\n")
+
+    def _on_daemon_telemetry(self, line: str):
+        # boucle asyncio: mise à jour directe de l'état (thread-safe), sans passer par Tk
+        self._telemetry.feed_line(line)
+
     def _send_move_command(self, cmd: str):
-        # Envoie des commandes MOVE via la session SSH shell
+        # Par le démon si connecté (socket directe, non bloquant), sinon via la session SSH shell
+        if self._daemon is not None and self._daemon.connected:
+            seq, _ = self._tracer.begin(cmd)
+            self._tracer.mark(seq, 'ssh_send')  # envoi sur la liaison
+            self._io.submit(self._daemon.command(cmd, seq))
+            self._append_terminal_output(f"→ {cmd} (démon #{seq})\n")
+            return
         if not self._ssh_connected or not self._ssh_session:
             messagebox.showwarning("Non connecté", "Connectez-vous d'abord au Raspberry via SSH.")
             return
         try:
-            self._ssh_session.send(cmd)
-            self._append_terminal_output(f"→ {cmd}\n")
+            seq, tagged = self._tracer.begin(cmd)
+            self._ssh_session.send(tagged)
+            self._tracer.mark(seq, 'ssh_send')
+            self._append_terminal_output(f"→ {tagged}\n")
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur en envoyant la commande: {e}")
 
@@ -557,15 +957,31 @@ class RobotInterface:
         cast(Any, self.root.after)(UPDATE_INTERVAL_MS, self._schedule_update)
 
     def _update_display(self):
+        if perf.ENABLED:
+            t0 = time.perf_counter()
         state = self.state_manager.get_state()
         
         self._update_header(state)
         self._update_terrain(state)
-        self._update_position_panel(state)
-        self._update_wheels_panel(state)
-        self._update_sensors_panel(state)
-        self._update_actuators_panel(state)
-        self._update_detection_panel(state)
+        # onglets pas encore ouverts: rien à mettre à jour
+        built = self._built_tabs
+        if "Position" in built:
+            self._update_position_panel(state)
+        if "Roues" in built:
+            self._update_wheels_panel(state)
+        if "Capteurs" in built:
+            self._update_sensors_panel(state)
+        if "Actionneurs" in built:
+            self._update_actuators_panel(state)
+        if "ArUco" in built:
+            self._update_detection_panel(state)
+        self._update_camera_panel()
+        if self._mirror is not None:
+            self._update_mirror_status()
+        if perf.ENABLED:
+            perf.record('gui.update', time.perf_counter() - t0)
+        if self._perf_overlay_visible:
+            self._update_perf_overlay()
     
     def _update_header(self, state: RobotState):
         if state.is_connected:
@@ -592,40 +1008,22 @@ class RobotInterface:
         if TERRAIN_REAL_WIDTH <= 0 or TERRAIN_REAL_HEIGHT <= 0 or TERRAIN_DISPLAY_WIDTH <= 0 or TERRAIN_DISPLAY_HEIGHT <= 0:
             return
         
-        scale_x = TERRAIN_DISPLAY_WIDTH / TERRAIN_REAL_WIDTH
-        scale_y = TERRAIN_DISPLAY_HEIGHT / TERRAIN_REAL_HEIGHT
-        
-        x_px = state.position.x * scale_x
-        y_px = state.position.y * scale_y
-        
-        if self._robot_id:
-            self.terrain_canvas.delete(self._robot_id)
-        if self._direction_id:
-            self.terrain_canvas.delete(self._direction_id)
-        
-        r = ROBOT_SIZE // 2
-        self._robot_id = self.terrain_canvas.create_oval(
-            x_px - r, y_px - r, x_px + r, y_px + r,
-            fill=COLORS['robot_body'],
-            outline=COLORS['robot_direction'],
-            width=2
-        )
-        
-        angle_rad = math.radians(state.direction)
-        arrow_len = ROBOT_SIZE
-        end_x = x_px + arrow_len * math.cos(angle_rad)
-        end_y = y_px - arrow_len * math.sin(angle_rad)
-        
-        self._direction_id = self.terrain_canvas.create_line(
-            x_px, y_px, end_x, end_y,
-            fill=COLORS['robot_direction'],
-            width=3,
-            arrow=ARROW_LAST
-        )
+        self._sprites.draw(None, state, COLORS['robot_body'])
+        if self.registry is not None:
+            self._update_other_robots()
         
         self.coord_label.config(text=f"Position: X={state.position.x:.0f}mm, Y={state.position.y:.0f}mm, θ={state.direction:.1f}°")
         self.velocity_label.config(text=f"Vitesse: {state.linear_velocity:.0f} mm/s | Rotation: {state.angular_velocity:.1f} °/s")
 
+    def _update_other_robots(self):
+        # un seul passage par rafraîchissement pour tous les robots modifiés depuis le précédent
+        for robot_id in self.registry.take_dirty():
+            manager = self.registry.get(robot_id)
+            if manager is None:
+                self._sprites.remove(robot_id)
+            elif manager is not self.state_manager:
+                self._sprites.draw(robot_id, manager.get_state(), COLORS['robot_secondary'], label=robot_id)
+
     def _update_position_panel(self, state: RobotState):
         self.position_labels["X"].config(text=f"{state.position.x:.1f} mm")
         self.position_labels["Y"].config(text=f"{state.position.y:.1f} mm")
@@ -679,13 +1077,115 @@ class RobotInterface:
             self.aruco_status_label.config(text="❌ Non détecté", foreground=COLORS['danger'])
             self.aruco_ids_label.config(text="-")
     
+    def _update_camera_panel(self):
+        client = self._camera_client
+        if client is None:
+            return
+        # décodage déjà fait dans le thread du client: ici on ne crée que la PhotoImage
+        ppm = client.latest()
+        if ppm is not None:
+            self._camera_photo = tk.PhotoImage(data=ppm, format='PPM')
+            self.camera_image_label.config(image=self._camera_photo)
+        if client.connected:
+            w, h = client.size
+            self.camera_stats_label.config(
+                text=f"Flux: {w}x{h} | {client.fps:.1f} img/s | {client.kbps:.0f} kbit/s | JPEG q{client.quality}")
+        else:
+            self.camera_stats_label.config(text=f"Flux: connexion... {client.last_error}")
+
+    def _on_toggle_perf(self):
+        # l'instrumentation n'est active que pendant l'affichage de l'overlay
+        self._perf_overlay_visible = not self._perf_overlay_visible
+        if self._perf_overlay_visible:
+            perf.reset()
+            perf.enable()
+            self.perf_overlay.place(relx=1.0, y=56, x=-12, anchor='ne')
+            self.perf_overlay.lift()
+        else:
+            perf.disable()
+            self.perf_overlay.place_forget()
+
+    def _update_perf_overlay(self):
+        now = time.monotonic()
+        if now - self._perf_overlay_last < PERF_OVERLAY_INTERVAL_MS / 1000.0:
+            return
+        self._perf_overlay_last = now
+        snap = perf.snapshot()
+        empty = {'rate_hz': 0.0, 'mean_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0, 'count': 0}
+        updates = snap.get('state.update', empty)
+        listeners = snap.get('state.listener', empty)
+        gui = snap.get('gui.update', empty)
+        rtt = snap.get('ssh.rtt', empty)
+        target_fps = 1000.0 / UPDATE_INTERVAL_MS
+        gui_flag = " ⚠" if gui['count'] and gui['rate_hz'] < 0.8 * target_fps else ""
+        lines = [
+            f"État     {updates['rate_hz']:7.1f} maj/s  setter p95 {updates['p95_ms']:6.3f} ms",
+            f"Listener p95 {listeners['p95_ms']:6.3f} ms  max {listeners['max_ms']:6.2f} ms",
+            f"GUI      {gui['rate_hz']:7.1f} FPS    update p95 {gui['p95_ms']:6.2f} ms{gui_flag}",
+            f"SSH RTT  " + (f"{rtt['mean_ms']:7.1f} ms     p95 {rtt['p95_ms']:6.1f} ms" if rtt['count'] else "-"),
+        ]
+        client = self._camera_client
+        if client is not None and client.connected:
+            lines.append(f"Détect.  {client.detector_fps:7.1f} FPS    flux {client.fps:5.1f} img/s")
+        else:
+            lines.append("Détect.  - (onglet Caméra non connecté)")
+        self.perf_overlay.config(text="\n".join(lines))
+
     def _on_emergency_stop(self):
+        # non bloquant: état local immédiat, arrêt par la voie prioritaire, latence affichée à l'acquittement
+        t_press = time.monotonic()
         self.state_manager.set_emergency_stop(True)
-        messagebox.showwarning("Arrêt d'urgence", "ARRÊT D'URGENCE ACTIVÉ!\nToutes les roues sont arrêtées.")
+        self._append_terminal_output("🛑 ARRÊT D'URGENCE\n")
+        if self._daemon is not None and self._daemon.connected:
+            self.estop_label.config(text="Arrêt: envoyé…")
+            self._io.submit(self._daemon_estop(self._daemon, t_press))
+        elif self._ssh_connected and self._ssh_session:
+            # le pont passe l'ESTOP avant les commandes lues en même temps que lui
+            seq, tagged = self._tracer.begin("ESTOP", t=t_press)
+            self._estop_seq = seq
+            self.estop_label.config(text="Arrêt: envoyé…")
+            try:
+                self._ssh_session.send(tagged)
+                self._tracer.mark(seq, 'ssh_send')
+            except Exception as e:
+                self._estop_seq = None
+                self.estop_label.config(text="Arrêt: non envoyé")
+                self._append_terminal_output(f"❌ ESTOP non envoyé: {e}\n")
+        else:
+            self.estop_label.config(text="Arrêt: local (non connecté)")
+
+    async def _daemon_estop(self, link: 'DaemonLink', t_press: float):
+        # boucle asyncio: trame prioritaire, le démon annule sa file avant d'écrire l'ESTOP
+        try:
+            status, _ = await link.emergency_stop(timeout=1.0)
+        except (ConnectionError, OSError):
+            status = 'ERREUR'
+        self._io.post('estop_ack', (status, time.monotonic() - t_press))
+
+    def _check_estop_trace(self):
+        for trace in reversed(self._tracer.traces()):
+            if trace.seq == self._estop_seq:
+                self._estop_seq = None
+                latency = trace.segments().get('total')
+                if latency is not None:
+                    self._on_estop_ack((trace.reply.split(' ', 1)[0], latency))
+                return
+
+    def _on_estop_ack(self, ack):
+        status, latency = ack
+        if perf.ENABLED:
+            perf.record('estop.latency', latency)
+        self.estop_label.config(text=f"Arrêt: {status} en {latency * 1000:.0f} ms")
+        if status != 'OK':
+            self._append_terminal_output(f"⚠️ Arrêt d'urgence: {status}\n")
 
     def _on_mode_change(self, mode: RobotMode):
         if self.state_manager.get_state().emergency_stop_active:
             self.state_manager.set_emergency_stop(False)
+            # le firmware garde l'arrêt verrouillé jusqu'à RESUME
+            if (self._daemon is not None and self._daemon.connected) or self._ssh_connected:
+                self._send_move_command("RESUME")
+                self.estop_label.config(text="Arrêt: -")
         self.state_manager.set_mode(mode.value)
 
     def _on_toggle_simulation(self):
@@ -701,6 +1201,17 @@ class RobotInterface:
     def _on_close(self):
         if self._simulation_running:
             self.state_manager.stop_simulation()
+        if self._camera_client is not None:
+            self._camera_client.close()
+        if self._mirror is not None:
+            self._mirror.close()
+        if self._io is not None:
+            self._io_bridge.stop()
+            if self._watchdog is not None:
+                self._watchdog.stop()
+            if self._daemon is not None:
+                self._io.call(self._daemon.close(), timeout=2.0)
+            self._io.stop()
         # ensure SSH closed
         try:
             if hasattr(self, '_ssh_session') and self._ssh_session:
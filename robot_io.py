@@ -0,0 +1,437 @@
+"""
+Fichier: robot_io.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Cœur d'entrées/sorties asyncio: une seule boucle d'événements, sur un thread
+d'arrière-plan, porte toutes les E/S du robot (port série, démon du Pi,
+tâches périodiques) au lieu d'un thread bloquant par sujet.
+
+    core = IOCore().start()
+    link = DaemonLink("PEI.local", on_event=core.post)
+    core.call(link.connect())
+    future = core.submit(link.command("MOVE forward 200"))   # non bloquant
+    ...
+    bridge = TkBridge(root, core.events)                      # côté Tk
+    bridge.on('ack', lambda ack: ...)
+    bridge.start()
+
+- `IOCore.submit()` retourne un `concurrent.futures.Future`: `cancel()` annule
+  la tâche dans la boucle; `every()` planifie une fonction périodique (échéancier absolu).
+- Délais: `command(..., timeout)` répond `TIMEOUT` au lieu de bloquer.
+- Arrêt d'urgence: `emergency_stop()` passe hors fenêtre (voie prioritaire) et
+  les commandes qui attendaient encore la fenêtre répondent `CANCELLED`.
+- Contre-pression: fenêtre de commandes en vol (sémaphore), `drain()` sur les
+  sockets, lecture série suspendue quand le tampon dépasse `limit`, et file
+  d'événements vers Tk bornée (les plus anciens sont jetés, compteur `dropped`).
+- Tk n'est jamais appelé depuis la boucle: les événements passent par une
+  `queue.Queue` vidée par `TkBridge` avec `root.after`.
+"""
+import asyncio
+import concurrent.futures
+import queue
+import socket
+import threading
+import time
+from typing import Callable, Optional
+
+from command_trace import parse_ack, tag_command
+from robot_daemon import (DEFAULT_PORT, KIND_ACK, KIND_COMMAND, KIND_EVENT, KIND_PRIORITY, KIND_TELEMETRY,
+                          SEQ_MODULO, FrameDecoder, pack_frame, parse_ack_payload)
+from telemetry import TelemetryDecoder, is_robot_event, is_telemetry, parse_telemetry
+
+# numéros automatiques de DaemonLink (moitié haute)
+AUTO_SEQ_BASE = 1 << 30
+
+# échecs de connexion; les deux TimeoutError ne sont des alias du TimeoutError natif que depuis Python 3.11
+CONNECT_ERRORS = (OSError, asyncio.TimeoutError, concurrent.futures.TimeoutError)
+
+
+class IOCore:
+    def __init__(self, events_max: int = 1000):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.events = queue.Queue(maxsize=events_max)
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> 'IOCore':
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self.loop = loop
+            ready.set()
+            try:
+                loop.run_forever()
+                # arrêt: annulation des tâches restantes (lecteurs, périodiques)
+                tasks = asyncio.all_tasks(loop)
+                for task in tasks:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            finally:
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name='robot-io', daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        if self.loop is not None and self.running:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, coro):
+        """Planifie une coroutine depuis n'importe quel thread (Future annulable)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, coro, timeout: Optional[float] = None):
+        """Exécute une coroutine et attend son résultat (à éviter dans le thread Tk)."""
+        return self.submit(coro).result(timeout)
+
+    def every(self, period: float, fn: Callable[[], None]):
+        """Appelle `fn()` toutes les `period` s dans la boucle; annuler le Future l'arrête."""
+        async def periodic():
+            next_tick = time.monotonic()
+            while True:
+                fn()
+                next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay < -10 * period:
+                    next_tick = time.monotonic()  # trop de retard: on repart de maintenant
+                await asyncio.sleep(max(0.0, delay))
+        return self.submit(periodic())
+
+    def post(self, kind: str, payload=None) -> None:
+        """Événement vers le thread Tk (thread-safe). File pleine: le plus ancien est jeté."""
+        while True:
+            try:
+                self.events.put_nowait((kind, payload))
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class TkBridge:
+    """Vide la file d'événements de l'IOCore dans le thread Tk (`root.after`)."""
+    def __init__(self, root, events: queue.Queue, interval_ms: int = 20, max_batch: int = 200):
+        self.root = root
+        self.events = events
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self.handlers = {}
+        self._after_id = None
+
+    def on(self, kind: str, handler: Callable) -> None:
+        self.handlers[kind] = handler
+
+    def poll(self) -> int:
+        handled = 0
+        while handled < self.max_batch:
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            handler = self.handlers.get(kind)
+            if handler is not None:
+                handler(payload)
+            handled += 1
+        return handled
+
+    def start(self) -> None:
+        def tick():
+            self.poll()
+            self._after_id = self.root.after(self.interval_ms, tick)
+        self._after_id = self.root.after(self.interval_ms, tick)
+
+    def stop(self) -> None:
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+
+class AsyncSerial:
+    """
+    Adaptateur asyncio d'un port pyserial (ou `arduino_sim.SimulatedArduino`).
+    Avec un descripteur de fichier (pyserial sous Linux), la boucle est réveillée
+    par `add_reader`; sinon le port est scruté toutes les `poll` s.
+    """
+    def __init__(self, port, poll: float = 0.005, limit: int = 64 * 1024):
+        self.port = port
+        self.poll = poll
+        self.limit = limit
+        self._buffer = bytearray()
+        self._data: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fd = None
+        self._poll_task = None
+        self._paused = False
+
+    async def open(self) -> 'AsyncSerial':
+        self._loop = asyncio.get_running_loop()
+        self._data = asyncio.Event()
+        try:
+            self._fd = self.port.fileno()
+        except (AttributeError, OSError, ValueError):
+            self._fd = None
+        self._resume()
+        return self
+
+    def _pull(self) -> None:
+        waiting = self.port.in_waiting
+        if waiting:
+            self._buffer.extend(self.port.read(waiting))
+            self._data.set()
+            if len(self._buffer) > self.limit:
+                self._pause()
+
+    def _pause(self) -> None:
+        # contre-pression: plus de lecture tant que le consommateur n'a pas vidé le tampon
+        self._paused = True
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+        elif self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+
+    def _resume(self) -> None:
+        self._paused = False
+        if self._fd is not None:
+            self._loop.add_reader(self._fd, self._pull)
+        elif self._poll_task is None:
+            self._poll_task = self._loop.create_task(self._poll_loop())
+
+    async def _poll_loop(self):
+        while True:
+            self._pull()
+            await asyncio.sleep(self.poll)
+
+    async def readline(self, timeout: Optional[float] = None) -> bytes:
+        """Ligne complète (avec `\\n`); asyncio.TimeoutError si rien avant `timeout`."""
+        async def wait_line():
+            while True:
+                end = self._buffer.find(b'\n')
+                if end >= 0:
+                    line = bytes(self._buffer[:end + 1])
+                    del self._buffer[:end + 1]
+                    if self._paused and len(self._buffer) < self.limit // 2:
+                        self._resume()
+                    return line
+                self._data.clear()
+                await self._data.wait()
+        return await asyncio.wait_for(wait_line(), timeout)
+
+    async def write(self, data: bytes) -> None:
+        self.port.write(data)
+
+    def close(self) -> None:
+        if self._fd is not None and not self._paused:
+            self._loop.remove_reader(self._fd)
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+
+
+class SerialLink:
+    """
+    Protocole du firmware sur un AsyncSerial: commandes numérotées (`#seq`),
+    fenêtre de `max_in_flight` commandes en vol, télémétrie décodée au fil de l'eau.
+    """
+    def __init__(self, serial: AsyncSerial, decoder: Optional[TelemetryDecoder] = None,
+                 max_in_flight: int = 3, on_event: Optional[Callable[[str, object], None]] = None):
+        self.serial = serial
+        self.decoder = decoder
+        self.max_in_flight = max_in_flight
+        self.on_event = on_event
+        self._seq = 0
+        self._epoch = 0
+        self._pending = {}
+        self._window: Optional[asyncio.Semaphore] = None
+        self._reader_task = None
+
+    async def start(self) -> 'SerialLink':
+        self._window = asyncio.Semaphore(self.max_in_flight)
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_loop())
+        return self
+
+    async def command(self, command: str, timeout: float = 1.0) -> str:
+        epoch = self._epoch
+        async with self._window:
+            if self._epoch != epoch:
+                return 'CANCELLED'  # arrêt d'urgence pendant l'attente de la fenêtre
+            return await self._send(command, timeout)
+
+    async def emergency_stop(self, command: str = "ESTOP", timeout: float = 1.0) -> str:
+        """Écrit l'arrêt tout de suite, sans attendre la fenêtre, et annule les commandes en attente."""
+        self._epoch += 1
+        return await self._send(command, timeout)
+
+    async def _send(self, command: str, timeout: float) -> str:
+        self._seq = self._seq % (SEQ_MODULO - 1) + 1
+        seq = self._seq
+        future = asyncio.get_running_loop().create_future()
+        self._pending[seq] = future
+        try:
+            await self.serial.write((tag_command(seq, command) + "\n").encode())
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return 'TIMEOUT'
+        finally:
+            self._pending.pop(seq, None)
+
+    async def _read_loop(self):
+        while True:
+            line = (await self.serial.readline()).decode(errors='ignore').strip()
+            if not line:
+                continue
+            if is_telemetry(line):
+                frame = parse_telemetry(line)
+                if frame is not None:
+                    if self.decoder is not None:
+                        self.decoder.handle(frame)
+                    if self.on_event is not None:
+                        self.on_event('telemetry', frame)
+                continue
+            if is_robot_event(line):
+                if self.on_event is not None:
+                    self.on_event('robot_event', line)
+                continue
+            status, seq = parse_ack(line)
+            future = self._pending.get(seq)
+            if future is not None and not future.done():
+                future.set_result(status)
+
+    async def close(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+        self.serial.close()
+
+
+class DaemonLink:
+    """
+    Client asyncio de `robot_daemon` (même protocole que `DaemonClient`).
+    Événements émis via `on_event`: ('ack', (seq, réponse, horodatages Pi)),
+    ('telemetry', ligne) si `on_telemetry` n'est pas fourni, ('robot_event', 'WDT'),
+    ('disconnected', None).
+    Sans `seq`, les numéros sont pris à partir de `AUTO_SEQ_BASE`: ils ne croisent
+    pas ceux fournis par l'appelant (CommandTracer, qui part de 1).
+    """
+    def __init__(self, host: str = 'PEI.local', port: int = DEFAULT_PORT, max_in_flight: int = 8,
+                 on_event: Optional[Callable[[str, object], None]] = None,
+                 on_telemetry: Optional[Callable[[str], None]] = None):
+        self.host = host
+        self.port = port
+        self.max_in_flight = max_in_flight
+        self.on_event = on_event
+        self.on_telemetry = on_telemetry
+        self._reader = None
+        self._writer = None
+        self._seq = AUTO_SEQ_BASE
+        self._epoch = 0
+        self._pending = {}
+        self._window: Optional[asyncio.Semaphore] = None
+        self._reader_task = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def connect(self, timeout: float = 3.0) -> 'DaemonLink':
+        self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), timeout)
+        sock = self._writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._window = asyncio.Semaphore(self.max_in_flight)
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_loop())
+        return self
+
+    async def command(self, command: str, seq: Optional[int] = None, timeout: float = 1.0):
+        """Envoie et attend l'acquittement: (réponse, horodatages Pi); ('TIMEOUT', {}) sinon."""
+        if self._writer is None:
+            raise ConnectionError("Démon non connecté")
+        epoch = self._epoch
+        async with self._window:
+            if self._epoch != epoch:
+                return 'CANCELLED', {}  # arrêt d'urgence pendant l'attente de la fenêtre
+            return await self._send(KIND_COMMAND, command, seq, timeout)
+
+    async def emergency_stop(self, seq: Optional[int] = None, timeout: float = 1.0):
+        """
+        Trame prioritaire ESTOP: hors fenêtre côté client, le démon vide sa file
+        (acquittements CANCELLED) et l'écrit avant toute autre commande.
+        """
+        if self._writer is None:
+            raise ConnectionError("Démon non connecté")
+        self._epoch += 1
+        return await self._send(KIND_PRIORITY, "ESTOP", seq, timeout)
+
+    async def _send(self, kind: bytes, command: str, seq: Optional[int], timeout: float):
+        if seq is None:
+            self._seq = self._seq + 1 if self._seq < SEQ_MODULO - 1 else AUTO_SEQ_BASE
+            seq = self._seq
+        future = asyncio.get_running_loop().create_future()
+        self._pending[seq] = future
+        try:
+            self._writer.write(pack_frame(kind, seq, command))
+            await self._writer.drain()
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return 'TIMEOUT', {}
+        finally:
+            self._pending.pop(seq, None)
+
+    async def _read_loop(self):
+        decoder = FrameDecoder()
+        try:
+            while True:
+                data = await self._reader.read(4096)
+                if not data:
+                    break
+                for kind, seq, payload in decoder.feed(data):
+                    if kind == KIND_ACK:
+                        status, stamps = parse_ack_payload(payload)
+                        future = self._pending.get(seq)
+                        if future is not None and not future.done():
+                            future.set_result((status, stamps))
+                        if self.on_event is not None:
+                            self.on_event('ack', (seq, status, stamps))
+                    elif kind == KIND_TELEMETRY:
+                        # traitée dans la boucle si possible, sinon transmise à Tk
+                        if self.on_telemetry is not None:
+                            self.on_telemetry(payload)
+                        elif self.on_event is not None:
+                            self.on_event('telemetry', payload)
+                    elif kind == KIND_EVENT and self.on_event is not None:
+                        self.on_event('robot_event', payload)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._writer = None
+            if self.on_event is not None:
+                self.on_event('disconnected', None)
+
+    async def close(self) -> None:
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
@@ -0,0 +1,96 @@
+"""
+Fichier: robot_motion.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+API de commande de mouvement côté Python.
+
+- `MOVE <direction> <vitesse>`: les dix déplacements discrets du firmware
+- `VEL <vx> <vy> <omega>`: vitesse continue (unités PWM, -255..255), convertie
+  par l'Arduino en quatre PWM de roues (cinématique inverse mécanum, `mecanum_mix`).
+  Repère: vx vers l'avant, vy vers la gauche, omega anti-horaire (comme robot_simulation).
+
+`MotionClient` est indépendant du transport: il reçoit une fonction `send(ligne)`
+(port série de `control_robot`, session SSH, simulateur...). En mode joystick,
+une seule commande VEL par tick de contrôle remplace les enchaînements de MOVE;
+les commandes identiques consécutives ne sont renvoyées qu'au bout de `keepalive`
+secondes.
+"""
+import time
+from typing import Callable, Optional, Tuple
+
+MOVE_DIRECTIONS = (
+    "forward", "backward", "right", "left", "rotateCW", "rotateCCW",
+    "forwardRight", "forwardLeft", "backwardRight", "backwardLeft", "stop",
+)
+PWM_MAX = 255
+
+
+def _clamp(value: float, limit: int = PWM_MAX) -> int:
+    return int(max(-limit, min(limit, round(value))))
+
+
+def mecanum_mix(vx: float, vy: float, omega: float, limit: int = PWM_MAX) -> Tuple[int, int, int, int]:
+    """
+    Cinématique inverse (même calcul que `velocity()` du firmware): PWM (FL, FR, RL, RR).
+    Si une roue dépasse `limit`, les quatre sont réduites dans la même proportion
+    pour conserver la direction du mouvement.
+    """
+    wheels = [vx - vy - omega, vx + vy + omega, vx + vy - omega, vx - vy + omega]
+    peak = max(abs(w) for w in wheels)
+    if peak > limit:
+        wheels = [w * limit / peak for w in wheels]
+    return tuple(int(w) for w in wheels)
+
+
+def joystick_to_velocity(x: float, y: float, rot: float, deadzone: float = 0.08,
+                         expo: float = 0.3, max_pwm: int = PWM_MAX) -> Tuple[int, int, int]:
+    """
+    Axes analogiques (-1..1, convention manette: y vers le bas, x vers la droite,
+    rot vers la droite = horaire) -> (vx, vy, omega) en unités PWM.
+    Zone morte rééchelonnée (pas de saut en sortie de zone) et courbe expo pour
+    la précision à basse vitesse.
+    """
+    def shape(v):
+        v = max(-1.0, min(1.0, v))
+        if abs(v) < deadzone:
+            return 0.0
+        mag = (abs(v) - deadzone) / (1.0 - deadzone)
+        mag = (1.0 - expo) * mag + expo * mag ** 3
+        return mag if v > 0 else -mag
+    return _clamp(-shape(y) * max_pwm), _clamp(-shape(x) * max_pwm), _clamp(-shape(rot) * max_pwm)
+
+
+class MotionClient:
+    def __init__(self, send: Callable[[str], Optional[str]], keepalive: float = 0.5):
+        self._send = send
+        self.keepalive = keepalive
+        self._last_cmd: Optional[str] = None
+        self._last_time = 0.0
+        self.sent = 0
+        self.skipped = 0
+
+    def _emit(self, cmd: str, force: bool = False) -> Optional[str]:
+        now = time.monotonic()
+        if not force and cmd == self._last_cmd and now - self._last_time < self.keepalive:
+            self.skipped += 1
+            return None
+        self._last_cmd = cmd
+        self._last_time = now
+        self.sent += 1
+        return self._send(cmd)
+
+    def move(self, direction: str, speed: int) -> Optional[str]:
+        if direction not in MOVE_DIRECTIONS:
+            raise ValueError(f"Direction inconnue: {direction}")
+        return self._emit(f"MOVE {direction} {_clamp(speed)}")
+
+    def velocity(self, vx: float, vy: float, omega: float) -> Optional[str]:
+        return self._emit(f"VEL {_clamp(vx)} {_clamp(vy)} {_clamp(omega)}")
+
+    def joystick(self, x: float, y: float, rot: float, **kwargs) -> Optional[str]:
+        return self.velocity(*joystick_to_velocity(x, y, rot, **kwargs))
+
+    def stop(self) -> Optional[str]:
+        # toujours envoyé, même si la dernière commande était déjà un arrêt
+        return self._emit("VEL 0 0 0", force=True)
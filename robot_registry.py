@@ -0,0 +1,189 @@
+"""
+Fichier: robot_registry.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Suivi de plusieurs robots à la fois (robot principal, robots secondaires, PAMI).
+
+- `RobotRegistry`: un `RobotStateManager` par identifiant, donc un verrou par
+  robot: les mises à jour de deux robots ne se gênent pas et `snapshot()` lit
+  chaque robot sous son propre verrou, sans verrou global.
+- `take_dirty()`: robots modifiés (ou retirés) depuis le dernier appel. Le terrain
+  de `robot_interface.py` est redessiné une fois par rafraîchissement pour tous
+  ces robots, quelle que soit la cadence de chacun.
+- `MultiTelemetryDecoder`: un seul flux (passerelle radio, démon) portant les
+  trames de tous les robots, préfixées par `@<id> `; les lignes sans préfixe
+  vont au robot `default`.
+
+    registry = RobotRegistry()
+    registry.add('main', manager)
+    mux = MultiTelemetryDecoder(registry)
+    mux.feed(b"@pami1 T 1200 850 90 90 90 90 10 10 10 10*6A\\n")   # pami1 ajouté au passage
+"""
+import re
+import threading
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional
+
+from robot_state import RobotState, RobotStateManager
+from state_codec import snapshot as flat_snapshot
+from telemetry import TICKS_PER_REV, TelemetryDecoder, split_robot_id
+
+MAIN_ROBOT = 'main'
+ROBOT_ID_RE = re.compile(r'[A-Za-z0-9_-]{1,16}$')  # identifiant acceptable pour `auto_add`
+
+
+class RobotRegistry:
+    def __init__(self, compact: bool = False):
+        self.compact = compact
+        # copie à l'écriture: lecture et itération sans verrou depuis n'importe quel thread
+        self._robots: Dict[str, RobotStateManager] = {}
+        self._callbacks = {}
+        self._lock = threading.Lock()  # ajout/retrait de robots et ensemble `_dirty`
+        self._dirty = set()
+        self._listeners: List[Callable[[str, RobotState], None]] = []
+
+    def add(self, robot_id: str, manager: Optional[RobotStateManager] = None) -> RobotStateManager:
+        """Enregistre un robot (gestionnaire neuf par défaut); retourne le gestionnaire existant s'il est déjà là."""
+        with self._lock:
+            existing = self._robots.get(robot_id)
+            if existing is not None:
+                return existing
+            if manager is None:
+                manager = RobotStateManager(compact=self.compact)
+            self._robots = {**self._robots, robot_id: manager}
+            self._callbacks[robot_id] = partial(self._on_update, robot_id)
+            self._dirty.add(robot_id)
+        manager.add_listener(self._callbacks[robot_id])
+        return manager
+
+    def remove(self, robot_id: str) -> Optional[RobotStateManager]:
+        with self._lock:
+            robots = dict(self._robots)
+            manager = robots.pop(robot_id, None)
+            if manager is None:
+                return None
+            self._robots = robots
+            callback = self._callbacks.pop(robot_id)
+            self._dirty.add(robot_id)  # le terrain efface le robot
+        manager.remove_listener(callback)
+        return manager
+
+    def get(self, robot_id: str) -> Optional[RobotStateManager]:
+        return self._robots.get(robot_id)
+
+    def __getitem__(self, robot_id: str) -> RobotStateManager:
+        return self._robots[robot_id]
+
+    def __contains__(self, robot_id) -> bool:
+        return robot_id in self._robots
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._robots)
+
+    def __len__(self) -> int:
+        return len(self._robots)
+
+    def ids(self) -> List[str]:
+        return list(self._robots)
+
+    def add_listener(self, callback: Callable[[str, RobotState], None]):
+        """`callback(robot_id, état)` après chaque mise à jour d'un robot (thread de la mise à jour)."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str, RobotState], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _on_update(self, robot_id: str, state: RobotState) -> None:
+        with self._lock:
+            self._dirty.add(robot_id)
+        for listener in self._listeners:
+            try:
+                listener(robot_id, state)
+            except Exception as e:
+                print(f"[ERREUR] Erreur lors de la notification du listener ({robot_id}): {e}")
+
+    def take_dirty(self) -> set:
+        """Robots modifiés ou retirés depuis le dernier appel (un robot retiré n'est plus dans le registre)."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    def snapshot(self, fn: Callable[[RobotState], object] = flat_snapshot) -> dict:
+        """`{robot_id: fn(état)}`, chaque robot lu sous son propre verrou (valeurs plates de state_codec par défaut)."""
+        return {robot_id: manager.read(fn) for robot_id, manager in self._robots.items()}
+
+
+class MultiTelemetryDecoder:
+    """
+    Télémétrie multiplexée: découpe le flux en lignes et confie chacune au
+    `TelemetryDecoder` de son robot (`@<id> <ligne>`). Un robot inconnu est ajouté
+    au registre si `auto_add` (identifiant valide, `max_robots` au plus), sinon la
+    ligne est comptée dans `unknown`; un robot retiré du registre n'est plus mis à
+    jour (ou est ré-ajouté si `auto_add`).
+    Les lignes qui ne sont pas des trames vont à `on_line(robot_id, ligne)`.
+    """
+    def __init__(self, registry: RobotRegistry, default: str = MAIN_ROBOT, auto_add: bool = True,
+                 ticks_per_rev: int = TICKS_PER_REV, on_line: Optional[Callable[[str, str], None]] = None,
+                 max_robots: int = 16):
+        self.registry = registry
+        self.default = default
+        self.auto_add = auto_add
+        self.max_robots = max_robots
+        self.ticks_per_rev = ticks_per_rev
+        self.on_line = on_line
+        self.unknown = 0
+        self._retired = [0, 0]  # trames et erreurs des décodeurs abandonnés
+        self._buffer = bytearray()
+        self._decoders: Dict[str, TelemetryDecoder] = {}
+
+    @property
+    def frames(self) -> int:
+        return self._retired[0] + sum(d.frames for d in self._decoders.values())
+
+    @property
+    def errors(self) -> int:
+        return self._retired[1] + sum(d.errors for d in self._decoders.values())
+
+    def decoder(self, robot_id: str) -> Optional[TelemetryDecoder]:
+        manager = self.registry.get(robot_id)
+        decoder = self._decoders.get(robot_id)
+        if decoder is None or decoder.manager is not manager:
+            # robot nouveau, retiré ou remplacé depuis la création du décodeur
+            if decoder is not None:
+                del self._decoders[robot_id]
+                self._retired[0] += decoder.frames
+                self._retired[1] += decoder.errors
+            if manager is None:
+                if not (self.auto_add and ROBOT_ID_RE.match(robot_id) and len(self.registry) < self.max_robots):
+                    return None
+                manager = self.registry.add(robot_id)
+            on_line = partial(self.on_line, robot_id) if self.on_line is not None else None
+            decoder = self._decoders[robot_id] = TelemetryDecoder(manager, self.ticks_per_rev, on_line=on_line)
+        return decoder
+
+    def feed(self, data: bytes) -> int:
+        """Ajoute des octets reçus; retourne le nombre de trames décodées (tous robots)."""
+        self._buffer.extend(data)
+        decoded = 0
+        while True:
+            end = self._buffer.find(b'\n')
+            if end < 0:
+                break
+            line = self._buffer[:end].decode('ascii', errors='replace').strip()
+            del self._buffer[:end + 1]
+            decoded += self.feed_line(line)
+        return decoded
+
+    def feed_line(self, line: str) -> bool:
+        if not line:
+            return False
+        robot_id, line = split_robot_id(line)
+        if robot_id is None:
+            robot_id = self.default
+        decoder = self.decoder(robot_id)
+        if decoder is None:
+            self.unknown += 1
+            return False
+        return decoder.feed_line(line)
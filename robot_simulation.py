@@ -0,0 +1,260 @@
+"""
+Fichier: robot_simulation.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Moteur de simulation du robot mécanum (NumPy) pour `RobotStateManager`.
+
+Les commandes `MOVE <direction> <vitesse>` (et `VEL`, voir robot_motion) appliquent les mêmes consignes PWM
+par roue que `PEI_-_Code_Arduino.ino` (`FIRMWARE_MOVES`). La cinématique directe
+d'un châssis mécanum à rouleaux en X convertit les vitesses de roue en vitesse
+du châssis, intégrée à chaque tick. Capteurs, codeurs et batterie sont calculés
+en un seul passage vectoriel, puis publiés comme une image complète de l'état
+(`RobotStateManager.update_frame`).
+
+Repère: x vers l'avant, y vers la gauche, θ positif anti-horaire (degrés dans l'état).
+Remarque: avec ce modèle de rouleaux, les tables `right` et `rotateCW` du
+firmware donnent un déplacement à gauche / anti-horaire, alors que les diagonales
+sont correctes. On simule ce que fait le firmware, sans corriger ses tables.
+
+Fréquence de tick, facteur d'accélération du temps (`time_scale`, 0 = aussi vite
+que possible) et graine du générateur aléatoire sont configurables.
+"""
+import math
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from robot_motion import mecanum_mix
+
+# ordre des roues dans RobotState.wheels
+WHEEL_NAMES = ("front_left", "front_right", "rear_left", "rear_right")
+
+# signes des consignes PWM par roue (FL, FR, RL, RR), repris du firmware
+FIRMWARE_MOVES = {
+    "forward":       ( 1,  1,  1,  1),
+    "backward":      (-1, -1, -1, -1),
+    "right":         (-1,  1,  1, -1),
+    "left":          ( 1, -1, -1,  1),
+    "rotateCW":      (-1,  1, -1,  1),
+    "rotateCCW":     ( 1, -1,  1, -1),
+    "forwardRight":  ( 1,  0,  0,  1),
+    "forwardLeft":   ( 0,  1,  1,  0),
+    "backwardRight": ( 0, -1, -1,  0),
+    "backwardLeft":  (-1,  0,  0, -1),
+    "stop":          ( 0,  0,  0,  0),
+}
+
+# capteurs de RobotState.sensors: angle de visée (rad, repère robot) des télémètres
+RANGE_SENSOR_ANGLES = np.array([0.0, math.pi, math.pi / 2, -math.pi / 2])
+RANGE_SENSOR_NOISE = np.array([5.0, 5.0, 15.0, 15.0])  # mm
+LINE_SENSOR_OFFSETS = np.array([-20.0, 0.0, 20.0])  # mm, latéral
+LINE_Y = 1000.0  # ligne centrale du terrain (mm)
+LINE_HALF_WIDTH = 10.0
+
+# scénario de démonstration utilisé quand aucune commande n'est donnée
+DEMO_SCRIPT = (
+    ("forward", 180, 2.0),
+    ("rotateCCW", 120, 1.0),
+    ("forwardRight", 200, 1.5),
+    ("backward", 150, 1.5),
+    ("left", 180, 1.5),
+    ("rotateCW", 120, 1.0),
+    ("backwardLeft", 200, 1.5),
+    ("stop", 0, 0.5),
+)
+
+
+def mecanum_forward_matrix(half_length: float, half_width: float) -> np.ndarray:
+    """Matrice 3x4: vitesses de jante (FL, FR, RL, RR) -> (vx, vy, ω) du châssis."""
+    k = 1.0 / (half_length + half_width)
+    return 0.25 * np.array([
+        [1.0, 1.0, 1.0, 1.0],
+        [-1.0, 1.0, 1.0, -1.0],
+        [-k, k, -k, k],
+    ])
+
+
+def ray_box_distance(origins: np.ndarray, angles: np.ndarray, width: float, height: float) -> np.ndarray:
+    """Distance de chaque rayon (origine (N,2), angle (N,)) au bord du rectangle [0,w]x[0,h]."""
+    dx = np.cos(angles)
+    dy = np.sin(angles)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tx = np.where(dx > 0, (width - origins[:, 0]) / dx, np.where(dx < 0, -origins[:, 0] / dx, np.inf))
+        ty = np.where(dy > 0, (height - origins[:, 1]) / dy, np.where(dy < 0, -origins[:, 1] / dy, np.inf))
+    return np.maximum(np.minimum(tx, ty), 0.0)
+
+
+class MecanumSimulation:
+    def __init__(self, manager=None, tick_hz: float = 100.0, time_scale: float = 1.0, seed: Optional[int] = None,
+                 start=(1500.0, 1000.0, 0.0), terrain=(3000.0, 2000.0), wheel_diameter: float = 80.0,
+                 max_rpm: float = 150.0, half_length: float = 100.0, half_width: float = 120.0,
+                 motor_tau: float = 0.15, ticks_per_rev: int = 360, speed_noise: float = 0.02,
+                 script=DEMO_SCRIPT):
+        self.manager = manager
+        self.tick_hz = float(tick_hz)
+        self.time_scale = float(time_scale)
+        self.rng = np.random.default_rng(seed)
+        self.terrain = terrain
+        self.wheel_circumference = math.pi * wheel_diameter
+        self.max_rpm = max_rpm
+        self.motor_tau = motor_tau
+        self.ticks_per_rev = ticks_per_rev
+        self.speed_noise = speed_noise
+        self.half_width = half_width
+        self.forward_matrix = mecanum_forward_matrix(half_length, half_width)
+        self.script = script
+
+        self.pose = np.array(start, dtype=np.float64)  # x, y (mm), θ (rad)
+        self.pose[2] = math.radians(self.pose[2])
+        self.rpm = np.zeros(4)
+        self.target_rpm = np.zeros(4)
+        self.encoder = np.zeros(4)
+        self.body_velocity = np.zeros(3)
+        self.ranges = np.zeros(4)
+        self.lines = np.zeros(3)
+        self.battery = 100.0
+        self.aruco_ids = []
+        self.sim_time = 0.0
+        self.ticks = 0
+
+        self._manual = False
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    # --- commandes -----------------------------------------------------------------
+
+    def command(self, direction: str, speed: int) -> None:
+        """Équivalent de `MOVE <direction> <speed>` (speed 0..255). Désactive le scénario de démo."""
+        if direction not in FIRMWARE_MOVES:
+            raise ValueError(f"Direction inconnue: {direction}")
+        self._manual = True
+        self._apply(direction, speed)
+
+    def set_wheel_pwm(self, pwm) -> None:
+        """Consigne PWM brute par roue (FL, FR, RL, RR), -255..255."""
+        self._manual = True
+        self.target_rpm = np.clip(np.asarray(pwm, dtype=np.float64), -255, 255) / 255.0 * self.max_rpm
+
+    def set_velocity(self, vx: float, vy: float, omega: float) -> None:
+        """Équivalent de `VEL <vx> <vy> <omega>`: même cinématique inverse que le firmware."""
+        self.set_wheel_pwm(mecanum_mix(vx, vy, omega))
+
+    def _apply(self, direction: str, speed: int) -> None:
+        speed = max(0, min(255, int(speed)))
+        self.target_rpm = np.asarray(FIRMWARE_MOVES[direction], dtype=np.float64) * (speed / 255.0 * self.max_rpm)
+
+    def _script_command(self):
+        total = sum(d for _, _, d in self.script)
+        t = self.sim_time % total
+        for direction, speed, duration in self.script:
+            if t < duration:
+                return direction, speed
+            t -= duration
+        return "stop", 0
+
+    # --- intégration ---------------------------------------------------------------
+
+    def step(self, dt: Optional[float] = None) -> None:
+        dt = 1.0 / self.tick_hz if dt is None else dt
+        if not self._manual and self.script:
+            self._apply(*self._script_command())
+
+        # réponse moteur du 1er ordre + bruit proportionnel
+        alpha = 1.0 - math.exp(-dt / self.motor_tau)
+        self.rpm += (self.target_rpm - self.rpm) * alpha
+        noisy = self.rpm * (1.0 + self.speed_noise * self.rng.standard_normal(4))
+
+        rim_speed = noisy / 60.0 * self.wheel_circumference  # mm/s
+        self.body_velocity = self.forward_matrix @ rim_speed
+        vx, vy, omega = self.body_velocity
+        theta = self.pose[2] + 0.5 * omega * dt  # point milieu
+        c, s = math.cos(theta), math.sin(theta)
+        self.pose += np.array([c * vx - s * vy, s * vx + c * vy, omega]) * dt
+        np.clip(self.pose[:2], 0.0, self.terrain, out=self.pose[:2])
+        self.pose[2] = (self.pose[2] + math.pi) % (2 * math.pi) - math.pi
+
+        self.encoder += noisy / 60.0 * self.ticks_per_rev * dt
+
+        origins = np.broadcast_to(self.pose[:2], (4, 2))
+        self.ranges = ray_box_distance(origins, self.pose[2] + RANGE_SENSOR_ANGLES, *self.terrain)
+        self.ranges += RANGE_SENSOR_NOISE * self.rng.standard_normal(4)
+        np.maximum(self.ranges, 0.0, out=self.ranges)
+        # capteurs de ligne: décalage latéral (axe y du robot) projeté sur y terrain
+        line_y = self.pose[1] + LINE_SENSOR_OFFSETS * math.cos(self.pose[2])
+        self.lines = (np.abs(line_y - LINE_Y) < LINE_HALF_WIDTH).astype(np.float64)
+
+        load = float(np.abs(self.rpm).sum()) / (4.0 * self.max_rpm)
+        self.battery -= (0.002 + 0.02 * load) * dt
+        if self.battery <= 20.0:
+            self.battery = 100.0
+
+        # détection ArUco simulée, tirée une fois par seconde simulée
+        if int(self.sim_time) != int(self.sim_time + dt):
+            self.aruco_ids = [23] if self.rng.random() > 0.3 else []
+
+        self.sim_time += dt
+        self.ticks += 1
+
+    def frame(self) -> dict:
+        """Image complète de l'état pour `RobotStateManager.update_frame`."""
+        rpm = self.rpm
+        states = np.where(np.abs(rpm) < 1.0, "stopped", np.where(rpm > 0, "forward", "backward"))
+        return {
+            'position': (float(self.pose[0]), float(self.pose[1]), math.degrees(self.pose[2]) % 360.0),
+            'linear_velocity': float(math.hypot(self.body_velocity[0], self.body_velocity[1])),
+            'angular_velocity': math.degrees(self.body_velocity[2]),
+            'wheel_states': states.tolist(),
+            'wheel_speeds': rpm.tolist(),
+            'wheel_ticks': self.encoder.astype(np.int64).tolist(),
+            'sensor_values': np.concatenate((self.ranges, self.lines)).tolist(),
+            'battery_level': self.battery,
+            'aruco_ids': self.aruco_ids,
+        }
+
+    def publish(self) -> None:
+        if self.manager is not None:
+            self.manager.update_frame(**self.frame())
+
+    def run_for(self, seconds: float, publish_every: int = 1) -> None:
+        """Simulation hors temps réel (aussi vite que possible) de `seconds` secondes simulées."""
+        n = int(round(seconds * self.tick_hz))
+        for i in range(n):
+            self.step()
+            if publish_every and (i + 1) % publish_every == 0:
+                self.publish()
+
+    # --- thread --------------------------------------------------------------------
+
+    def start(self) -> None:
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def _loop(self):
+        dt = 1.0 / self.tick_hz
+        period = dt / self.time_scale if self.time_scale > 0 else 0.0
+        next_tick = time.perf_counter()
+        while self._running:
+            self.step(dt)
+            self.publish()
+            if period:
+                # échéancier absolu: pas de dérive si un tick prend du retard
+                next_tick += period
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -10 * period:
+                    next_tick = time.perf_counter()
@@ -16,6 +16,8 @@ import time
 import os
 from typing import Optional, Any
 
+import perf
+
 try:
     import paramiko
     PARAMIKO_AVAILABLE = True
@@ -71,15 +73,22 @@ class SSHRunner:
 
 
 def start_test_on_pi(hostname: str = "PEI.local", username: str = "admin",
-                     password: str = "admin", remote_path: str = "test.py") -> str:
+                     password: str = "admin", remote_path: str = "test.py",
+                     daemon_port: Optional[int] = 5801, daemon_args: str = "--telem 200 --wdt 500") -> str:
     """
-    Connexion au Raspberry et lancement de `test.py` en arrière-plan.
+    Connexion au Raspberry et lancement de `test.py` en arrière-plan, ainsi que
+    du démon de commande `robot_daemon.py` (socket `daemon_port`, None pour ne pas le lancer).
+    Le démon tient seul le port série: le pont SSH de l'interface passe par lui
+    (`control_robot.py --stdin --daemon`) au lieu d'ouvrir `/dev/ttyACM0` à son tour.
     Retourne le chemin du logfile distant où stdout/stderr sont redirigés.
     Lève une exception si la connexion/exécution échoue.
     """
     runner = SSHRunner(hostname=hostname, username=username, password=password)
     try:
         runner.connect()
+        if daemon_port is not None:
+            runner.run_remote_script(f"robot_daemon.py --port {daemon_port} {daemon_args}".strip(),
+                                     logfile_prefix="robot_daemon")
         logfile = runner.run_remote_script(remote_path)
         return logfile
     finally:
@@ -109,6 +118,7 @@ class SSHInteractive:
         self._out_cb = None
         self._reader_thread = None
         self._stop_reader = False
+        self._last_send: Optional[float] = None
 
     def connect(self) -> None:
         if not PARAMIKO_AVAILABLE:
@@ -140,6 +150,12 @@ class SSHInteractive:
                         data = self._chan.recv(self.recv_buffer)
                         if not data:
                             break
+                        if perf.ENABLED:
+                            # RTT: envoi -> premier octet reçu (écho du shell), inclut l'attente de scrutation
+                            perf.count('ssh.rx')
+                            if self._last_send is not None:
+                                perf.record('ssh.rtt', time.perf_counter() - self._last_send)
+                                self._last_send = None
                         text = data.decode(errors='ignore')
                         if self._out_cb:
                             try:
@@ -161,6 +177,8 @@ class SSHInteractive:
         if not text.endswith('\n'):
             text = text + '\n'
         try:
+            if perf.ENABLED:
+                self._last_send = time.perf_counter()
             self._chan.send(text)
         except Exception as e:
             raise
@@ -1,11 +1,11 @@
 import time
 import threading
-import math
-import random
 from dataclasses import dataclass, field, asdict
 from typing import Optional, Callable, List
 from enum import Enum
 
+import perf
+
 
 class WheelState(Enum):
     STOPPED = "stopped"
@@ -126,12 +126,17 @@ class RobotState:
 
 
 class RobotStateManager:
-    def __init__(self):
-        self._state = RobotState()
+    def __init__(self, compact: bool = False):
+        if compact:
+            # colonnes array + vues compatibles (compact_state importe ce module: import différé)
+            from compact_state import CompactState
+            self._state = CompactState()
+        else:
+            self._state = RobotState()
+        self._compact = compact
         self._lock = threading.Lock()
         self._listeners: List[Callable[[RobotState], None]] = []
-        self._running = False
-        self._simulation_thread: Optional[threading.Thread] = None
+        self._simulation = None
 
     @property
     def state(self) -> RobotState:
@@ -142,6 +147,19 @@ class RobotStateManager:
         with self._lock:
             return self._state
 
+    def read(self, fn: Callable[[RobotState], object]):
+        """Lecture cohérente: `fn(état)` sous le verrou, sans mise à jour en parallèle."""
+        with self._lock:
+            return fn(self._state)
+
+    @perf.timed('state.update')
+    def apply(self, fn: Callable[[RobotState], object]):
+        """Modification quelconque `fn(état)` sous le verrou, puis notification (état miroir)."""
+        with self._lock:
+            result = fn(self._state)
+        self._notify_listeners()
+        return result
+
     def add_listener(self, callback: Callable[[RobotState], None]):
         self._listeners.append(callback)
 
@@ -150,12 +168,25 @@ class RobotStateManager:
             self._listeners.remove(callback)
 
     def _notify_listeners(self):
+        if perf.ENABLED:
+            self._notify_listeners_timed()
+            return
+        for listener in self._listeners:
+            try:
+                listener(self._state)
+            except Exception as e:
+                print(f"[ERREUR] Erreur lors de la notification du listener: {e}")
+
+    def _notify_listeners_timed(self):
         for listener in self._listeners:
+            t0 = time.perf_counter()
             try:
                 listener(self._state)
             except Exception as e:
                 print(f"[ERREUR] Erreur lors de la notification du listener: {e}")
+            perf.record('state.listener', time.perf_counter() - t0)
 
+    @perf.timed('state.update')
     def update_position(self, x: float, y: float, theta: float):
         with self._lock:
             self._state.position.x = x
@@ -165,6 +196,7 @@ class RobotStateManager:
             self._state.last_update = time.time()
         self._notify_listeners()
 
+    @perf.timed('state.update')
     def update_wheel(self, wheel_index: int, state: str = None, speed: float = None):
         with self._lock:
             if 0 <= wheel_index < len(self._state.wheels):
@@ -175,6 +207,7 @@ class RobotStateManager:
                 self._state.last_update = time.time()
         self._notify_listeners()
 
+    @perf.timed('state.update')
     def update_sensor(self, sensor_index: int, value: float):
         with self._lock:
             if 0 <= sensor_index < len(self._state.sensors):
@@ -182,6 +215,7 @@ class RobotStateManager:
                 self._state.last_update = time.time()
         self._notify_listeners()
 
+    @perf.timed('state.update')
     def update_actuator(self, actuator_index: int, position: float = None, 
                         is_enabled: bool = None):
         with self._lock:
@@ -193,24 +227,28 @@ class RobotStateManager:
                 self._state.last_update = time.time()
         self._notify_listeners()
 
+    @perf.timed('state.update')
     def set_mode(self, mode: str):
         with self._lock:
             self._state.mode = mode
             self._state.last_update = time.time()
         self._notify_listeners()
 
+    @perf.timed('state.update')
     def set_connected(self, connected: bool):
         with self._lock:
             self._state.is_connected = connected
             self._state.last_update = time.time()
         self._notify_listeners()
 
+    @perf.timed('state.update')
     def set_battery_level(self, level: float):
         with self._lock:
             self._state.battery_level = max(0.0, min(100.0, level))
             self._state.last_update = time.time()
         self._notify_listeners()
 
+    @perf.timed('state.update')
     def set_emergency_stop(self, active: bool):
         with self._lock:
             self._state.emergency_stop_active = active
@@ -222,6 +260,7 @@ class RobotStateManager:
             self._state.last_update = time.time()
         self._notify_listeners()
 
+    @perf.timed('state.update')
     def update_aruco_detection(self, detected: bool, ids: List[int] = None):
         with self._lock:
             self._state.aruco_detected = detected
@@ -229,61 +268,84 @@ class RobotStateManager:
             self._state.last_update = time.time()
         self._notify_listeners()
 
+    @perf.timed('state.update')
+    def update_frame(self, position=None, linear_velocity: float = None, angular_velocity: float = None,
+                     wheel_states: List[str] = None, wheel_speeds: List[float] = None,
+                     wheel_ticks: List[int] = None, wheel_targets: List[float] = None, sensor_values: List[float] = None,
+                     battery_level: float = None, aruco_ids: List[int] = None):
+        """Mise à jour groupée (une image complète): un seul verrou, une seule notification."""
+        with self._lock:
+            s = self._state
+            if self._compact:
+                # copie par tranches dans les tableaux, sans passer par les vues
+                s.apply_columns(position, wheel_states, wheel_speeds, wheel_ticks, wheel_targets, sensor_values)
+            else:
+                if position is not None:
+                    s.position.x, s.position.y, s.position.theta = position
+                    s.direction = s.position.theta
+                if wheel_states is not None:
+                    for wheel, value in zip(s.wheels, wheel_states):
+                        wheel.state = value
+                if wheel_speeds is not None:
+                    for wheel, value in zip(s.wheels, wheel_speeds):
+                        wheel.speed = value
+                if wheel_ticks is not None:
+                    for wheel, value in zip(s.wheels, wheel_ticks):
+                        wheel.encoder_ticks = value
+                if wheel_targets is not None:
+                    for wheel, value in zip(s.wheels, wheel_targets):
+                        wheel.target_speed = value
+                if sensor_values is not None:
+                    for sensor, value in zip(s.sensors, sensor_values):
+                        sensor.value = value
+            if linear_velocity is not None:
+                s.linear_velocity = linear_velocity
+            if angular_velocity is not None:
+                s.angular_velocity = angular_velocity
+            if battery_level is not None:
+                s.battery_level = max(0.0, min(100.0, battery_level))
+            if aruco_ids is not None:
+                s.aruco_detected = bool(aruco_ids)
+                s.detected_aruco_ids = list(aruco_ids)
+            s.last_update = time.time()
+        self._notify_listeners()
+
+    @perf.timed('state.update')
     def update_match_time(self, time_remaining: int):
         with self._lock:
             self._state.match_time_remaining = max(0, time_remaining)
             self._state.last_update = time.time()
         self._notify_listeners()
 
+    @perf.timed('state.update')
     def update_score(self, score: int):
         with self._lock:
             self._state.score = score
             self._state.last_update = time.time()
         self._notify_listeners()
 
-    def start_simulation(self):
-        self._running = True
-        def simulation_loop():
-            t = 0
-            while self._running:
-                with self._lock:
-                    self._state.position.x = 1500 + 500 * math.sin(t * 0.1)
-                    self._state.position.y = 1000 + 400 * math.cos(t * 0.1)
-                    self._state.position.theta = (t * 10) % 360
-                    self._state.direction = self._state.position.theta
-                    self._state.linear_velocity = 100 + random.uniform(-10, 10)
-                    self._state.angular_velocity = 5 + random.uniform(-2, 2)
-                    for wheel in self._state.wheels:
-                        wheel.state = WheelState.FORWARD.value
-                        wheel.speed = 60 + random.uniform(-5, 5)
-                        wheel.encoder_ticks += int(wheel.speed)
-                    for sensor in self._state.sensors:
-                        if "lidar" in sensor.name or "ultrasonic" in sensor.name:
-                            sensor.value = 200 + random.uniform(-50, 50)
-                        else:
-                            sensor.value = random.choice([0, 1])
-                    if self._state.battery_level <= 20:
-                        self._state.battery_level = 100.0
-                    else:
-                        self._state.battery_level -= 0.05
-                    self._state.aruco_detected = random.random() > 0.3
-                    if self._state.aruco_detected:
-                        self._state.detected_aruco_ids = [23]
-                    else:
-                        self._state.detected_aruco_ids = []
-                    self._state.is_connected = True
-                    self._state.mode = RobotMode.AUTONOMOUS.value
-                    self._state.last_update = time.time()
-                self._notify_listeners()
-                t += 1
-                time.sleep(0.1)
-        self._simulation_thread = threading.Thread(target=simulation_loop, daemon=True)
-        self._simulation_thread.start()
-        print("[INFO] Mode simulation démarré")
+    @property
+    def simulation(self):
+        return self._simulation
+
+    def start_simulation(self, tick_hz: float = 10.0, time_scale: float = 1.0, seed: Optional[int] = None):
+        """
+        Démarre le moteur mécanum (`robot_simulation.MecanumSimulation`) qui publie
+        une image complète de l'état à chaque tick (`tick_hz` en temps simulé,
+        `time_scale` > 1 pour accélérer, 0 = aussi vite que possible).
+        """
+        from robot_simulation import MecanumSimulation  # import différé: NumPy uniquement en simulation
+        if self._simulation is not None:
+            self.stop_simulation()
+        with self._lock:
+            self._state.is_connected = True
+            self._state.mode = RobotMode.AUTONOMOUS.value
+        self._simulation = MecanumSimulation(self, tick_hz=tick_hz, time_scale=time_scale, seed=seed)
+        self._simulation.start()
+        print(f"[INFO] Mode simulation démarré ({tick_hz:g} Hz, x{time_scale:g})")
 
     def stop_simulation(self):
-        self._running = False
-        if self._simulation_thread:
-            self._simulation_thread.join(timeout=1.0)
-            self._simulation_thread = None
+        if self._simulation is not None:
+            self._simulation.stop()
+            self._simulation = None
         print("[INFO] Mode simulation arrêté")
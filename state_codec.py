@@ -0,0 +1,381 @@
+"""
+Fichier: state_codec.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Encodages de l'état du robot (`RobotState` ou `CompactState`) pour la
+journalisation et le réseau, plus rapides et plus petits que `to_dict()` + JSON:
+
+- `StructCodec`: binaire de taille fixe, un seul `struct.pack_into` dans un
+  tampon préalloué (pas de `bytes` neuf par image; seule la liste de `flatten`
+  est temporaire). Flottants en float32 (horodatage en float64).
+- `encode_msgpack` / `decode_msgpack`: tableau positionnel au format MessagePack
+  (pas de clés, petits entiers sur un octet). Utilise le paquet `msgpack` s'il
+  est installé, sinon l'implémentation de ce module (sous-ensemble du format).
+- `DeltaEncoder` / `DeltaDecoder`: image complète puis seulement les champs
+  modifiés depuis l'image précédente (`{indice: valeur}`), en MessagePack.
+
+Tous passent par le même schéma plat (`FIELDS`, `flatten`, `unflatten`): les
+noms du robot et de l'équipe sont des constantes et ne sont pas transmis.
+
+    codec = StructCodec()
+    data = codec.encode(state)              # memoryview sur le tampon interne
+    copy = codec.decode(bytes(data))        # RobotState
+
+    enc, dec = DeltaEncoder(), DeltaDecoder()
+    view = dec.decode(enc.encode(state))    # puis enc.encode(...) à chaque image
+"""
+import struct
+from typing import Optional
+
+from robot_state import RobotMode, RobotState, WheelState
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MODES = tuple(m.value for m in RobotMode)
+WHEEL_STATES = tuple(w.value for w in WheelState)
+_MODE_CODE = {m: i for i, m in enumerate(MODES)}
+_WHEEL_CODE = {w: i for i, w in enumerate(WHEEL_STATES)}
+
+_DEFAULT = RobotState()
+N_WHEELS, N_SENSORS, N_ACTUATORS = len(_DEFAULT.wheels), len(_DEFAULT.sensors), len(_DEFAULT.actuators)
+MAX_ARUCO_IDS = 8  # au-delà, StructCodec tronque la liste
+
+# schéma plat: (nom, code struct), dans l'ordre de `flatten`
+FIELDS = (
+    ('mode', 'B'), ('is_connected', '?'), ('obstacle_detected', '?'), ('emergency_stop_active', '?'),
+    ('calibration_done', '?'), ('aruco_detected', '?'), ('battery_level', 'f'),
+    ('match_time_remaining', 'i'), ('score', 'i'), ('direction', 'f'), ('angular_velocity', 'f'),
+    ('linear_velocity', 'f'), ('last_update', 'd'),
+    ('position.x', 'f'), ('position.y', 'f'), ('position.theta', 'f'),
+    ('target_position.x', 'f'), ('target_position.y', 'f'), ('target_position.theta', 'f'),
+) + tuple(
+    (f'wheels.{i}.{name}', code) for i in range(N_WHEELS)
+    for name, code in (('state', 'B'), ('speed', 'f'), ('target_speed', 'f'), ('encoder_ticks', 'q'))
+) + tuple(
+    (f'sensors.{i}.{name}', code) for i in range(N_SENSORS) for name, code in (('value', 'f'), ('is_active', '?'))
+) + tuple(
+    (f'actuators.{i}.{name}', code) for i in range(N_ACTUATORS)
+    for name, code in (('position', 'f'), ('is_enabled', '?'))
+) + (
+    ('detected_aruco_ids', None),  # tuple de longueur variable
+)
+
+
+def flatten(state) -> list:
+    """Valeurs de l'état dans l'ordre de `FIELDS` (modes et états de roue en codes)."""
+    p, t = state.position, state.target_position
+    values = [_MODE_CODE[state.mode], state.is_connected, state.obstacle_detected, state.emergency_stop_active,
+              state.calibration_done, state.aruco_detected, state.battery_level,
+              state.match_time_remaining, state.score, state.direction, state.angular_velocity,
+              state.linear_velocity, state.last_update,
+              p.x, p.y, p.theta, t.x, t.y, t.theta]
+    for w in state.wheels:
+        values += (_WHEEL_CODE[w.state], w.speed, w.target_speed, w.encoder_ticks)
+    for s in state.sensors:
+        values += (s.value, s.is_active)
+    for a in state.actuators:
+        values += (a.position, a.is_enabled)
+    values.append(tuple(state.detected_aruco_ids))
+    return values
+
+
+def unflatten(values, state=None):
+    """Écrit les valeurs de `flatten` dans `state` (RobotState neuf par défaut) et le retourne."""
+    state = RobotState() if state is None else state
+    it = iter(values)
+    state.mode = MODES[next(it)]
+    state.is_connected = bool(next(it))
+    state.obstacle_detected = bool(next(it))
+    state.emergency_stop_active = bool(next(it))
+    state.calibration_done = bool(next(it))
+    state.aruco_detected = bool(next(it))
+    state.battery_level = float(next(it))
+    state.match_time_remaining = int(next(it))
+    state.score = int(next(it))
+    state.direction = float(next(it))
+    state.angular_velocity = float(next(it))
+    state.linear_velocity = float(next(it))
+    state.last_update = float(next(it))
+    for pose in (state.position, state.target_position):
+        pose.x, pose.y, pose.theta = float(next(it)), float(next(it)), float(next(it))
+    for w in state.wheels:
+        w.state = WHEEL_STATES[next(it)]
+        w.speed, w.target_speed, w.encoder_ticks = float(next(it)), float(next(it)), int(next(it))
+    for s in state.sensors:
+        s.value, s.is_active = float(next(it)), bool(next(it))
+    for a in state.actuators:
+        a.position, a.is_enabled = float(next(it)), bool(next(it))
+    state.detected_aruco_ids = list(next(it))
+    return state
+
+
+# --- binaire de taille fixe ------------------------------------------------------------
+
+class StructCodec:
+    """
+    Encodage binaire de taille fixe (`size` octets, petit-boutiste). `encode()`
+    écrit dans un tampon préalloué et retourne une memoryview dessus: la copier
+    (`bytes(...)`) avant l'encodage suivant si elle doit être conservée.
+    Les valeurs passent par la liste de `flatten`: un `pack_into` par champ,
+    sans cette liste, s'est révélé plus lent (appels Python plus coûteux que
+    la liste temporaire).
+    """
+    def __init__(self):
+        codes = ''.join(code for _, code in FIELDS if code is not None)
+        self._struct = struct.Struct('<' + codes + 'B' + 'H' * MAX_ARUCO_IDS)
+        self.size = self._struct.size
+        self._buffer = bytearray(self.size)
+        self._view = memoryview(self._buffer)
+        self._no_ids = (0,) * MAX_ARUCO_IDS
+
+    def encode(self, state) -> memoryview:
+        values = flatten(state)
+        ids = values.pop()[:MAX_ARUCO_IDS]
+        self._struct.pack_into(self._buffer, 0, *values, len(ids), *ids, *self._no_ids[len(ids):])
+        return self._view
+
+    def decode(self, data, state=None):
+        values = list(self._struct.unpack_from(data))
+        count = values[len(FIELDS) - 1]
+        ids = tuple(values[len(FIELDS):len(FIELDS) + count])
+        del values[len(FIELDS) - 1:]
+        values.append(ids)
+        return unflatten(values, state)
+
+
+# --- MessagePack ------------------------------------------------------------------------
+
+_pack_double = struct.Struct('>d').pack
+_UNPACK = {0xcc: struct.Struct('>B'), 0xcd: struct.Struct('>H'), 0xce: struct.Struct('>I'),
+           0xcf: struct.Struct('>Q'), 0xd0: struct.Struct('>b'), 0xd1: struct.Struct('>h'),
+           0xd2: struct.Struct('>i'), 0xd3: struct.Struct('>q'), 0xca: struct.Struct('>f'),
+           0xcb: struct.Struct('>d')}
+
+
+def _pack_into(obj, out: bytearray) -> None:
+    if obj is None:
+        out.append(0xc0)
+    elif obj is True:
+        out.append(0xc3)
+    elif obj is False:
+        out.append(0xc2)
+    elif type(obj) is int:
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xff)
+        elif obj >= 0:
+            for code, limit in ((0xcc, 1 << 8), (0xcd, 1 << 16), (0xce, 1 << 32), (0xcf, 1 << 64)):
+                if obj < limit:
+                    out.append(code)
+                    out += _UNPACK[code].pack(obj)
+                    return
+            raise ValueError(f"entier trop grand pour MessagePack: {obj}")
+        else:
+            for code, limit in ((0xd0, 1 << 7), (0xd1, 1 << 15), (0xd2, 1 << 31), (0xd3, 1 << 63)):
+                if obj >= -limit:
+                    out.append(code)
+                    out += _UNPACK[code].pack(obj)
+                    return
+            raise ValueError(f"entier trop petit pour MessagePack: {obj}")
+    elif type(obj) is float:
+        out.append(0xcb)
+        out += _pack_double(obj)
+    elif isinstance(obj, str):
+        raw = obj.encode('utf-8')
+        n = len(raw)
+        if n < 32:
+            out.append(0xa0 | n)
+        elif n < 1 << 8:
+            out += b'\xd9' + bytes((n,))
+        elif n < 1 << 16:
+            out += b'\xda' + n.to_bytes(2, 'big')
+        else:
+            out += b'\xdb' + n.to_bytes(4, 'big')
+        out += raw
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        n = len(obj)
+        if n < 1 << 8:
+            out += b'\xc4' + bytes((n,))
+        elif n < 1 << 16:
+            out += b'\xc5' + n.to_bytes(2, 'big')
+        else:
+            out += b'\xc6' + n.to_bytes(4, 'big')
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            out.append(0x90 | n)
+        elif n < 1 << 16:
+            out += b'\xdc' + n.to_bytes(2, 'big')
+        else:
+            out += b'\xdd' + n.to_bytes(4, 'big')
+        for item in obj:
+            _pack_into(item, out)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            out.append(0x80 | n)
+        elif n < 1 << 16:
+            out += b'\xde' + n.to_bytes(2, 'big')
+        else:
+            out += b'\xdf' + n.to_bytes(4, 'big')
+        for key, value in obj.items():
+            _pack_into(key, out)
+            _pack_into(value, out)
+    elif isinstance(obj, int):  # bool déjà traité; sous-classes (IntEnum...)
+        _pack_into(int(obj), out)
+    elif isinstance(obj, float):
+        _pack_into(float(obj), out)
+    else:
+        raise TypeError(f"type non encodable en MessagePack: {type(obj).__name__}")
+
+
+def _unpack_from(data, i: int):
+    b = data[i]
+    i += 1
+    if b < 0x80:
+        return b, i
+    if b >= 0xe0:
+        return b - 0x100, i
+    if 0x90 <= b <= 0x9f:
+        return _unpack_array(data, i, b & 0x0f)
+    if 0x80 <= b <= 0x8f:
+        return _unpack_map(data, i, b & 0x0f)
+    if 0xa0 <= b <= 0xbf:
+        n = b & 0x1f
+        return bytes(data[i:i + n]).decode('utf-8'), i + n
+    if b == 0xc0:
+        return None, i
+    if b == 0xc2:
+        return False, i
+    if b == 0xc3:
+        return True, i
+    codec = _UNPACK.get(b)
+    if codec is not None:
+        return codec.unpack_from(data, i)[0], i + codec.size
+    if b in (0xd9, 0xda, 0xdb, 0xc4, 0xc5, 0xc6):
+        width = {0xd9: 1, 0xda: 2, 0xdb: 4, 0xc4: 1, 0xc5: 2, 0xc6: 4}[b]
+        n = int.from_bytes(data[i:i + width], 'big')
+        i += width
+        raw = bytes(data[i:i + n])
+        return (raw.decode('utf-8') if b >= 0xd9 else raw), i + n
+    if b in (0xdc, 0xdd):
+        width = 2 if b == 0xdc else 4
+        return _unpack_array(data, i + width, int.from_bytes(data[i:i + width], 'big'))
+    if b in (0xde, 0xdf):
+        width = 2 if b == 0xde else 4
+        return _unpack_map(data, i + width, int.from_bytes(data[i:i + width], 'big'))
+    raise ValueError(f"octet MessagePack non pris en charge: 0x{b:02x}")
+
+
+def _unpack_array(data, i, n):
+    items = []
+    for _ in range(n):
+        item, i = _unpack_from(data, i)
+        items.append(item)
+    return items, i
+
+
+def _unpack_map(data, i, n):
+    items = {}
+    for _ in range(n):
+        key, i = _unpack_from(data, i)
+        items[key], i = _unpack_from(data, i)
+    return items, i
+
+
+def pack(obj) -> bytes:
+    """Objet Python (None, bool, int, float, str, bytes, list/tuple, dict) -> MessagePack."""
+    if msgpack is not None:
+        return msgpack.packb(obj, use_bin_type=True)
+    out = bytearray()
+    _pack_into(obj, out)
+    return bytes(out)
+
+
+def unpack(data):
+    """MessagePack -> objet Python (tableaux en listes, clés de dictionnaire quelconques)."""
+    if msgpack is not None:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    obj, end = _unpack_from(data, 0)
+    if end != len(data):
+        raise ValueError(f"{len(data) - end} octets en trop après l'objet MessagePack")
+    return obj
+
+
+def _compact(values: list) -> list:
+    # flottants entiers (0.0, 200.0...) envoyés comme entiers: 1 à 3 octets au lieu de 9;
+    # `unflatten` rétablit le type d'après le schéma
+    return [int(v) if type(v) is float and v.is_integer() and -2 ** 53 < v < 2 ** 53 else v for v in values]
+
+
+def snapshot(state) -> list:
+    """Valeurs de `flatten` prêtes à encoder (flottants entiers compactés), partageables entre encodeurs."""
+    return _compact(flatten(state))
+
+
+def encode_msgpack(state) -> bytes:
+    return pack(snapshot(state))
+
+
+def decode_msgpack(data, state=None):
+    return unflatten(unpack(data), state)
+
+
+# --- delta ------------------------------------------------------------------------------
+
+class DeltaEncoder:
+    """
+    `[seq, valeurs]` pour une image complète, `[seq, {indice: valeur}]` ensuite
+    (indices de `FIELDS`). Un encodeur par destinataire: la référence est la
+    dernière image envoyée à ce destinataire. `keyframe_every` > 0 force une image
+    complète périodique; `reset()` en force une à la prochaine image.
+    """
+    def __init__(self, keyframe_every: int = 0):
+        self.keyframe_every = keyframe_every
+        self.seq = 0
+        self.changed = 0  # champs transmis par la dernière image
+        self._last: Optional[list] = None
+
+    def reset(self) -> None:
+        self._last = None
+
+    def encode(self, state) -> bytes:
+        return self.encode_snapshot(snapshot(state))
+
+    def encode_snapshot(self, values: list) -> bytes:
+        """Comme `encode`, à partir de `snapshot(state)` (liste non modifiée ensuite)."""
+        self.seq = self.seq % 0xFFFFFFFF + 1
+        last = self._last
+        if last is None or (self.keyframe_every and self.seq % self.keyframe_every == 0):
+            payload = values
+            self.changed = len(values)
+        else:
+            payload = {i: v for i, (v, old) in enumerate(zip(values, last)) if v != old}
+            self.changed = len(payload)
+        self._last = values
+        return pack([self.seq, payload])
+
+
+class DeltaDecoder:
+    """Reconstruit l'état à partir des images de `DeltaEncoder` (ValueError si une image manque)."""
+    def __init__(self):
+        self.seq: Optional[int] = None
+        self.values: Optional[list] = None
+
+    def decode(self, data, state=None):
+        seq, payload = unpack(data)
+        if isinstance(payload, dict):
+            if self.values is None or seq != self.seq % 0xFFFFFFFF + 1:
+                raise ValueError(f"image delta {seq} sans référence (dernière: {self.seq})")
+            for index, value in payload.items():
+                self.values[index] = value
+        else:
+            self.values = list(payload)
+        self.seq = seq
+        return unflatten(self.values, state)
@@ -0,0 +1,294 @@
+"""
+Fichier: state_sync.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Diffusion de l'état du robot vers des tableaux de bord distants (autres
+portables, écran de l'arbitre) sans charge supplémentaire sur la liaison robot.
+
+Le serveur (`main.py --share-state`) s'abonne au `RobotStateManager` local. À la
+connexion, chaque client reçoit l'état complet, puis seulement les champs
+modifiés (`state_codec.DeltaEncoder`, un encodeur par client). Comme pour le
+flux vidéo, chaque client a son thread d'envoi qui ne transmet que l'état le
+plus récent: un client limité à 5 Hz saute des images au lieu de prendre du
+retard, et un client qui ne lit plus (envoi bloqué plus de `send_timeout`) est
+déconnecté sans ralentir les autres.
+
+Client -> serveur, à la connexion: `HELLO` (magic, cadence souhaitée en Hz, 0 =
+celle du serveur). Serveur -> client: `HEADER` (magic, taille) puis l'image
+`DeltaEncoder`. État inchangé: un `HEADER` de taille 0 toutes les `keepalive`
+secondes, pour que le client distingue un robot immobile d'un serveur perdu
+(délai de lecture `read_timeout`).
+
+`StateSyncClient` (mode miroir de `robot_interface.py`, `main.py --mirror HOST`)
+applique les images à un `RobotStateManager` local: l'interface s'y abonne
+comme à un robot réel.
+"""
+import socket
+import struct
+import threading
+import time
+from typing import Optional
+
+from state_codec import DeltaDecoder, DeltaEncoder, snapshot
+
+MAGIC = b'RSS1'
+HELLO = struct.Struct('!4sf')
+HEADER = struct.Struct('!4sI')
+DEFAULT_PORT = 5802  # 5800: flux vidéo, 5801: robot_daemon
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        r = sock.recv_into(view[got:], n - got)
+        if r == 0:
+            raise ConnectionError("Diffusion d'état fermée par le pair")
+        got += r
+    return bytes(buf)
+
+
+class _Subscriber(threading.Thread):
+    def __init__(self, server: 'StateBroadcastServer', conn: socket.socket, addr):
+        super().__init__(daemon=True)
+        self.server = server
+        self.conn = conn
+        self.addr = addr
+        self.rate = server.max_rate
+        self.encoder = DeltaEncoder(keyframe_every=server.keyframe_every)
+        self.sent = 0
+        self.bytes = 0
+
+    def _read_hello(self) -> None:
+        self.conn.settimeout(1.0)
+        try:
+            magic, rate = HELLO.unpack(_recv_exact(self.conn, HELLO.size))
+        except socket.timeout:
+            return  # client muet: cadence du serveur
+        if magic != MAGIC:
+            raise ConnectionError("En-tête de diffusion d'état invalide")
+        if rate > 0:
+            self.rate = min(rate, self.server.max_rate)
+
+    def run(self):
+        last_seq = 0
+        next_time = 0.0
+        last_send = time.monotonic()
+        try:
+            self._read_hello()
+            self.conn.settimeout(self.server.send_timeout)
+            interval = 1.0 / self.rate
+            while not self.server._stop.is_set():
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    # limite de cadence: on attend, l'état envoyé sera le plus récent
+                    self.server._stop.wait(delay)
+                    continue
+                item = self.server._wait_snapshot(last_seq, timeout=min(0.5, self.server.keepalive))
+                if item is None:
+                    if time.monotonic() - last_send >= self.server.keepalive:
+                        self.conn.sendall(HEADER.pack(MAGIC, 0))
+                        last_send = time.monotonic()
+                    continue
+                last_seq, values = item
+                data = self.encoder.encode_snapshot(values)
+                t0 = time.monotonic()
+                self.conn.sendall(HEADER.pack(MAGIC, len(data)) + data)
+                self.sent += 1
+                self.bytes += HEADER.size + len(data)
+                last_send = time.monotonic()
+                next_time = t0 + interval
+        except socket.timeout:
+            self.server.dropped += 1
+            print(f"[WARN] Client d'état trop lent, déconnecté: {self.addr[0]}:{self.addr[1]}")
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            self.server._remove(self)
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+
+
+class StateBroadcastServer:
+    """
+    Serveur de diffusion d'état. Le listener du gestionnaire ne fait que
+    signaler une nouvelle version (aucun encodage dans le thread de la liaison
+    robot); l'instantané est pris une fois par version, sous le verrou du
+    gestionnaire, et partagé par les clients.
+    """
+    def __init__(self, state_manager, port: int = DEFAULT_PORT, host: str = '0.0.0.0', max_rate: float = 20.0,
+                 send_timeout: float = 1.0, keyframe_every: int = 0, sndbuf: int = 16384,
+                 keepalive: float = 1.0):
+        self.state_manager = state_manager
+        self.max_rate = max_rate
+        self.send_timeout = send_timeout
+        self.keepalive = keepalive
+        self.keyframe_every = keyframe_every
+        self.sndbuf = sndbuf
+        self.dropped = 0  # clients déconnectés pour lenteur
+        self._cond = threading.Condition()
+        self._seq = 1  # un client qui arrive reçoit tout de suite l'état courant
+        self._snapshot_seq = 0
+        self._snapshot: Optional[list] = None
+        self._clients = []
+        self._stop = threading.Event()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(8)
+        self._sock.settimeout(0.5)
+        self.port = self._sock.getsockname()[1]
+        state_manager.add_listener(self._on_state)
+        self._accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._accept_thread.start()
+
+    @property
+    def client_count(self) -> int:
+        with self._cond:
+            return len(self._clients)
+
+    @property
+    def clients(self) -> list:
+        with self._cond:
+            return list(self._clients)
+
+    def _on_state(self, state) -> None:
+        with self._cond:
+            self._seq += 1
+            if self._clients:
+                self._cond.notify_all()
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, addr = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # petit tampon: un client qui ne lit plus bloque sendall vite et est détecté
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+            subscriber = _Subscriber(self, conn, addr)
+            with self._cond:
+                self._clients.append(subscriber)
+            print(f"[INFO] Client d'état connecté: {addr[0]}:{addr[1]}")
+            subscriber.start()
+
+    def _remove(self, subscriber):
+        with self._cond:
+            if subscriber in self._clients:
+                self._clients.remove(subscriber)
+
+    def _wait_snapshot(self, last_seq: int, timeout: float):
+        with self._cond:
+            if self._seq == last_seq:
+                self._cond.wait(timeout)
+            seq = self._seq
+            if seq == last_seq or self._stop.is_set():
+                return None
+            if self._snapshot_seq != seq:
+                self._snapshot = self.state_manager.read(snapshot)
+                self._snapshot_seq = seq
+            return seq, self._snapshot
+
+    def close(self) -> None:
+        self._stop.set()
+        self.state_manager.remove_listener(self._on_state)
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        with self._cond:
+            clients = list(self._clients)
+            self._cond.notify_all()
+        for subscriber in clients:
+            try:
+                subscriber.conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            subscriber.join(timeout=1.0)
+        self._accept_thread.join(timeout=1.0)
+
+
+class StateSyncClient:
+    """
+    Miroir d'un `StateBroadcastServer`: réception dans un thread, chaque image
+    est appliquée à `state_manager` (listeners notifiés comme pour un robot local).
+    `rate` > 0 demande une cadence plus basse que celle du serveur.
+    Reconnexion automatique toutes les `retry` secondes, et après `read_timeout`
+    secondes sans rien recevoir (ni image, ni maintien de connexion).
+    """
+    def __init__(self, host: str, state_manager, port: int = DEFAULT_PORT, rate: float = 0.0, retry: float = 2.0,
+                 read_timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.state_manager = state_manager
+        self.rate = rate
+        self.retry = retry
+        self.read_timeout = read_timeout
+        self.connected = False
+        self.frames = 0
+        self.fps = 0.0
+        self.kbps = 0.0
+        self.last_error = ''
+        self._sock: Optional[socket.socket] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._sock = socket.create_connection((self.host, self.port), timeout=self.retry)
+                self._sock.sendall(HELLO.pack(MAGIC, self.rate))
+                self._sock.settimeout(self.read_timeout)
+                self.connected = True
+                self._receive(self._sock)
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+            finally:
+                self.connected = False
+                if self._sock is not None:
+                    try:
+                        self._sock.close()
+                    except OSError:
+                        pass
+                    self._sock = None
+            self._stop.wait(self.retry)
+
+    def _receive(self, sock: socket.socket):
+        decoder = DeltaDecoder()  # nouvelle connexion: le serveur commence par l'état complet
+        window_start = time.monotonic()
+        window_frames = 0
+        window_bytes = 0
+        while not self._stop.is_set():
+            magic, length = HEADER.unpack(_recv_exact(sock, HEADER.size))
+            if magic != MAGIC:
+                raise ValueError("En-tête de diffusion d'état invalide")
+            if not length:
+                continue  # maintien de connexion: état inchangé
+            data = _recv_exact(sock, length)
+            self.state_manager.apply(lambda state: decoder.decode(data, state))
+            self.frames += 1
+            window_frames += 1
+            window_bytes += HEADER.size + length
+            now = time.monotonic()
+            if now - window_start >= 1.0:
+                self.fps = window_frames / (now - window_start)
+                self.kbps = 8.0 * window_bytes / (now - window_start) / 1000.0
+                window_start, window_frames, window_bytes = now, 0, 0
+
+    def close(self) -> None:
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._thread.join(timeout=2.0)
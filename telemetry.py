@@ -0,0 +1,233 @@
+"""
+Fichier: telemetry.py
+Auteur: Hugo Demont
+Version: 1.0.0
+
+Décodage des trames de télémétrie du firmware (activées par `TELEM <période_ms>`):
+
+    T <millis> <boucle_max_us> <pwm AvG AvD ArG ArD> <ticks AvG AvD ArG ArD>*HH
+
+HH = XOR de tous les caractères avant `*` (hexadécimal). Les trames partagent la
+liaison avec les réponses `OK`/`ERR`: `TelemetryDecoder.feed()` découpe le flux
+en lignes, décode les trames et transmet les autres lignes à `on_line`.
+
+Chaque trame met à jour les quatre roues de `RobotStateManager` en un seul appel
+(`update_frame`): état, consigne PWM, ticks codeurs et vitesse en RPM déduite
+des ticks entre deux trames (base de l'asservissement en vitesse).
+"""
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from robot_state import WheelState
+
+TICKS_PER_REV = 360
+
+
+@dataclass
+class TelemetryFrame:
+    t_ms: int
+    loop_us: int
+    pwm: Tuple[int, int, int, int]
+    ticks: Tuple[int, int, int, int]
+
+
+def checksum(payload: str) -> int:
+    value = 0
+    for ch in payload.encode('ascii', errors='replace'):
+        value ^= ch
+    return value
+
+
+def format_telemetry(frame: TelemetryFrame) -> str:
+    """Inverse de `parse_telemetry` (même format que le firmware), utilisé par les simulateurs."""
+    payload = "T {} {} {} {} {} {} {} {} {} {}".format(frame.t_ms, frame.loop_us, *frame.pwm, *frame.ticks)
+    return f"{payload}*{checksum(payload):02X}"
+
+
+def is_telemetry(line: str) -> bool:
+    return line.startswith('T ')
+
+
+def split_robot_id(line: str) -> Tuple[Optional[str], str]:
+    """`@pami1 T ...` (flux multiplexé de plusieurs robots) -> ('pami1', 'T ...'); sans préfixe -> (None, ligne)."""
+    if line.startswith('@'):
+        robot_id, _, rest = line[1:].partition(' ')
+        return robot_id, rest
+    return None, line
+
+
+def is_any_telemetry(line: str) -> bool:
+    """Trame de n'importe quel robot, préfixée `@<id> ` ou non."""
+    return is_telemetry(split_robot_id(line)[1])
+
+
+# lignes spontanées du firmware, sans numéro: ni acquittement, ni télémétrie
+ROBOT_EVENTS = ('WDT',)
+
+
+def is_robot_event(line: str) -> bool:
+    return line.strip() in ROBOT_EVENTS
+
+
+def parse_telemetry(line: str) -> Optional[TelemetryFrame]:
+    """Décode une ligne `T ...*HH`; None si la ligne est tronquée ou la somme de contrôle fausse."""
+    line = line.strip()
+    if not is_telemetry(line):
+        return None
+    payload, sep, cs = line.rpartition('*')
+    if not sep:
+        return None
+    try:
+        if int(cs, 16) != checksum(payload):
+            return None
+        values = [int(v) for v in payload.split()[1:]]
+    except ValueError:
+        return None
+    if len(values) != 10:
+        return None
+    return TelemetryFrame(values[0], values[1], tuple(values[2:6]), tuple(values[6:10]))
+
+
+def wheel_state(pwm: int) -> str:
+    if pwm > 0:
+        return WheelState.FORWARD.value
+    if pwm < 0:
+        return WheelState.BACKWARD.value
+    return WheelState.STOPPED.value
+
+
+class TelemetryDecoder:
+    """
+    Découpe un flux série (octets) en lignes et met à jour `manager` pour chaque
+    trame valide. Les lignes qui ne sont pas des trames vont à `on_line`.
+    """
+    def __init__(self, manager=None, ticks_per_rev: int = TICKS_PER_REV,
+                 on_line: Optional[Callable[[str], None]] = None,
+                 on_frame: Optional[Callable[[TelemetryFrame], None]] = None):
+        self.manager = manager
+        self.ticks_per_rev = ticks_per_rev
+        self.on_line = on_line
+        self.on_frame = on_frame
+        self._buffer = bytearray()
+        self._previous: Optional[TelemetryFrame] = None
+        self.frames = 0
+        self.errors = 0
+        self.rpm = (0.0, 0.0, 0.0, 0.0)
+        self.last: Optional[TelemetryFrame] = None
+
+    def feed(self, data: bytes) -> int:
+        """Ajoute des octets reçus; retourne le nombre de trames décodées."""
+        self._buffer.extend(data)
+        decoded = 0
+        while True:
+            end = self._buffer.find(b'\n')
+            if end < 0:
+                break
+            line = self._buffer[:end].decode('ascii', errors='replace').strip()
+            del self._buffer[:end + 1]
+            decoded += self.feed_line(line)
+        return decoded
+
+    def feed_line(self, line: str) -> bool:
+        """Traite une ligne déjà découpée (sans fin de ligne); True si c'était une trame valide."""
+        if not line:
+            return False
+        if is_telemetry(line):
+            frame = parse_telemetry(line)
+            if frame is None:
+                self.errors += 1
+                return False
+            self.handle(frame)
+            return True
+        if self.on_line is not None:
+            self.on_line(line)
+        return False
+
+    def handle(self, frame: TelemetryFrame) -> None:
+        prev = self._previous
+        if prev is not None and frame.t_ms > prev.t_ms:
+            dt_min = (frame.t_ms - prev.t_ms) / 60000.0
+            self.rpm = tuple((t - p) / self.ticks_per_rev / dt_min for t, p in zip(frame.ticks, prev.ticks))
+        self._previous = frame
+        self.last = frame
+        self.frames += 1
+        if self.manager is not None:
+            self.manager.update_frame(
+                wheel_states=[wheel_state(p) for p in frame.pwm],
+                wheel_speeds=self.rpm,
+                wheel_targets=frame.pwm,
+                wheel_ticks=frame.ticks,
+            )
+        if self.on_frame is not None:
+            self.on_frame(frame)
+
+
+class TerminalFilter:
+    """
+    Retire les trames de télémétrie (préfixées `@<id> ` ou non) d'une sortie de
+    terminal reçue par morceaux quelconques (shell SSH). Un début de ligne qui peut être une trame est retenu
+    jusqu'à sa fin de ligne; le reste (invite du shell sans fin de ligne) passe
+    tout de suite.
+    """
+    def __init__(self, max_held: int = 256):
+        self.max_held = max_held
+        self._held = ''
+        self._midline = False  # début de ligne déjà affiché: la suite n'est pas une trame
+        self._drop_lf = False  # trame retirée sur `\r`, son `\n` arrive dans le morceau suivant
+
+    def feed(self, text: str) -> str:
+        """Retourne le texte à afficher."""
+        text, self._held = self._held + text, ''
+        out = []
+        for line in text.splitlines(True):
+            if self._drop_lf:
+                self._drop_lf = False
+                if line == '\n':
+                    continue
+            complete = line.endswith(('\n', '\r'))
+            if self._midline or len(line) > self.max_held:
+                out.append(line)
+            elif complete:
+                if not is_any_telemetry(line.strip()):
+                    out.append(line)
+                else:
+                    self._drop_lf = line.endswith('\r')
+            elif self._may_be_frame(line):
+                self._held = line  # dernier morceau, fin de ligne à venir
+                break
+            else:
+                out.append(line)
+            self._midline = not complete
+        return ''.join(out)
+
+    @staticmethod
+    def _may_be_frame(start: str) -> bool:
+        if start.startswith('@') and ' ' not in start:
+            return True  # identifiant de robot pas encore complet
+        start = split_robot_id(start)[1]
+        return is_telemetry(start) or 'T '.startswith(start)
+
+
+class TelemetryReader:
+    """Thread de lecture d'un port série (pyserial ou équivalent) alimentant un TelemetryDecoder."""
+    def __init__(self, port, decoder: TelemetryDecoder):
+        self.port = port
+        self.decoder = decoder
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> 'TelemetryReader':
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            # lit tout ce qui est disponible, sinon attend un octet (timeout du port)
+            data = self.port.read(getattr(self.port, 'in_waiting', 0) or 1)
+            if data:
+                self.decoder.feed(data)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=2.0)
@@ -0,0 +1,55 @@
+# Tests du générateur de corpus synthétique et du banc aruco_benchmark.py
+# Corpus minuscule (quelques images 640x480) pour rester rapide.
+
+import sys
+import os
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+pytest.importorskip('scipy')
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import post_estimation_test_no_cam as synth
+import aruco_benchmark
+
+
+def test_corpus_is_reproducible(tmp_path):
+    a = synth.generate_corpus(str(tmp_path / 'a'), 3, seed=7, frame_size=(640, 480), marker_px=120)
+    b = synth.generate_corpus(str(tmp_path / 'b'), 3, seed=7, frame_size=(640, 480), marker_px=120)
+    assert a['frames'] == b['frames']
+    img_a = cv2.imread(str(tmp_path / 'a' / 'frame_00000.png'))
+    img_b = cv2.imread(str(tmp_path / 'b' / 'frame_00000.png'))
+    assert np.array_equal(img_a, img_b)
+
+
+def test_benchmark_recall_and_pose(tmp_path):
+    synth.generate_corpus(str(tmp_path), 6, seed=1, frame_size=(640, 480), marker_px=120,
+                          markers_per_frame=(1, 2), max_tilt_deg=30.0)
+    meta, frames = aruco_benchmark.load_corpus(str(tmp_path))
+    res = aruco_benchmark.run_benchmark(meta, frames)
+    assert res['frames'] == 6
+    assert res['recall'] >= 0.8
+    assert res['false_positives'] == 0
+    assert res['corner_error_px']['median'] < 3.0
+
+
+def test_marker_cache_and_batch_compositor():
+    first = synth.cached_marker('DICT_4X4_50', 3, 64)
+    again = synth.cached_marker(cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50), 3, 64)
+    assert first[0] is synth.cached_marker('DICT_4X4_50', 3, 64)[0]
+    np.testing.assert_array_equal(first[0], again[0])
+    assert not first[1].flags.writeable
+
+    frames = np.full((3, 100, 100, 3), 255, dtype=np.uint8)
+    img = np.zeros((10, 10, 3), dtype=np.uint8)
+    mask = np.zeros((10, 10), dtype=bool)
+    mask[:5] = True
+    synth.composite_markers(frames, [(0, img, mask, (0, 0)), (2, img, mask, (95, 95))])
+    assert frames[0, :5, :10].max() == 0 and frames[0, 5:10, :10].min() == 255
+    assert frames[1].min() == 255
+    assert frames[2, 95:100, 95:100].max() == 0
@@ -0,0 +1,46 @@
+# Tests du banc de rendu de l'interface (bench/bench_gui_render.py)
+# L'enregistrement/rejeu tourne sans Tk; la mesure complète nécessite un DISPLAY ou Xvfb.
+
+import sys
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+BENCH = os.path.join(ROOT, 'bench')
+for path in (ROOT, BENCH):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import bench_gui_render
+from robot_state import RobotStateManager
+
+
+def test_record_and_replay_roundtrip(tmp_path):
+    path = tmp_path / 'etats.jsonl'
+    bench_gui_render.record_stream(str(path), duration=0.5, state_hz=100.0, seed=4)
+    frames = list(bench_gui_render.recorded_frames(str(path), loop=False))
+    assert len(frames) == 50
+    live = bench_gui_render.simulated_frames(seed=4, tick_hz=100.0)
+    expected = [next(live) for _ in range(50)]
+    manager = RobotStateManager()
+    manager.update_frame(**frames[-1])
+    state = manager.get_state()
+    assert state.position.x == pytest.approx(expected[-1]['position'][0])
+    assert [w.encoder_ticks for w in state.wheels] == expected[-1]['wheel_ticks']
+
+
+def test_render_benchmark_smoke():
+    try:
+        xvfb = bench_gui_render.ensure_display()
+    except RuntimeError as e:
+        pytest.skip(str(e))
+    try:
+        res = bench_gui_render.run_benchmark(bench_gui_render.simulated_frames(), duration=0.5,
+                                             state_hz=100.0, interval_ms=20)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+    assert res['gui_fps'] > 0
+    assert '_update_terrain' in res['panels_ms']
+    assert res['event_loop_lag_ms']
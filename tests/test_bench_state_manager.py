@@ -0,0 +1,32 @@
+# Test rapide du banc de charge de RobotStateManager (bench/bench_state_manager.py)
+
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+BENCH = os.path.join(ROOT, 'bench')
+for path in (ROOT, BENCH):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import bench_common
+import bench_state_manager
+
+
+def test_scenario_reports_throughput_contention_and_latency():
+    res = bench_state_manager.run_scenario(producers=2, listeners=3, duration=0.2, mode='fields')
+    assert res['updates'] > 0
+    # chaque mise à jour notifie chaque listener
+    assert res['notifications'] == 3 * res['updates']
+    assert res['lock']['acquisitions'] >= res['updates']
+    lat = res['notify_latency_us']
+    assert 0 <= lat['p50'] <= lat['p99'] <= lat['max']
+
+
+def test_rate_limit_and_compare():
+    res = bench_state_manager.run_scenario(producers=1, listeners=1, rate=200, duration=0.3, mode='frame')
+    assert 20 <= res['updates'] <= 80
+    base = {'scenarios': {'a': {'updates_per_s': 100.0, 'lock': {'contended': 0}}}}
+    cur = {'scenarios': {'a': {'updates_per_s': 50.0, 'lock': {'contended': 0}}}}
+    diffs = bench_common.compare_results(base, cur)
+    assert [d[0] for d in diffs] == ['a.updates_per_s']
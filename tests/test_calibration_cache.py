@@ -0,0 +1,60 @@
+# Tests du cache de calibration (calibration_cache.py)
+# Écrit un YAML factice, vérifie la création du .npz voisin, sa réutilisation
+# et son invalidation quand la calibration change.
+
+import sys
+import os
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import calibration_cache
+
+
+def _write_yaml(path, fx=800.0):
+    K = np.array([[fx, 0, 320], [0, fx, 240], [0, 0, 1]], dtype=np.float64)
+    D = np.array([[-0.2, 0.05, 0.0, 0.0, 0.0]], dtype=np.float64)
+    fs = cv2.FileStorage(str(path), cv2.FILE_STORAGE_WRITE)
+    fs.write('K', K)
+    fs.write('D', D)
+    fs.release()
+
+
+def test_cache_written_and_reused(tmp_path):
+    calib = tmp_path / 'calibration_chessboard.yaml'
+    _write_yaml(calib)
+    first = calibration_cache.load_calibration(str(calib), (640, 480))
+    cache = tmp_path / 'calibration_chessboard.npz'
+    assert cache.exists()
+    assert first.map1.dtype == np.int16 and first.map1.shape == (480, 640, 2)
+
+    second = calibration_cache.load_calibration(str(calib), (640, 480))
+    np.testing.assert_array_equal(first.map1, second.map1)
+    np.testing.assert_allclose(first.new_mtx, second.new_mtx)
+
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    assert second.undistort(frame).shape == frame.shape
+    assert not second.pose_dist_coeffs(True).any()
+
+
+def test_cache_invalidated_on_change(tmp_path):
+    calib = tmp_path / 'calibration_chessboard.yaml'
+    _write_yaml(calib, fx=800.0)
+    a = calibration_cache.load_calibration(str(calib), (640, 480))
+    _write_yaml(calib, fx=600.0)
+    b = calibration_cache.load_calibration(str(calib), (640, 480))
+    assert b.mtx[0, 0] == pytest.approx(600.0)
+    assert not np.allclose(a.new_mtx, b.new_mtx)
+    c = calibration_cache.load_calibration(str(calib), (320, 240))
+    assert c.map1.shape == (240, 320, 2)
+
+
+def test_missing_file_raises(tmp_path):
+    with pytest.raises(IOError):
+        calibration_cache.read_calibration(str(tmp_path / 'absent.yaml'))
@@ -0,0 +1,108 @@
+# Tests de l'extraction des coins de la mire (calibration.py, mode headless):
+# détection sur des images synthétiques, cache par empreinte SHA1 + pattern
+# (réutilisation, invalidation, nettoyage des images disparues) et pool de processus.
+
+import sys
+import os
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import calibration
+
+
+def _chessboard(path, shift=0, square=40):
+    image = np.full((480, 640), 255, dtype=np.uint8)
+    x0, y0 = 100 + shift, 90
+    for j in range(calibration.number_of_squares_Y):
+        for i in range(calibration.number_of_squares_X):
+            if (i + j) % 2 == 0:
+                image[y0 + j * square:y0 + (j + 1) * square, x0 + i * square:x0 + (i + 1) * square] = 0
+    cv2.imwrite(str(path), image)
+    return str(path)
+
+
+@pytest.fixture
+def images(tmp_path):
+    files = [_chessboard(tmp_path / 'board{}.png'.format(i), shift=10 * i) for i in range(3)]
+    blank = str(tmp_path / 'blank.png')
+    cv2.imwrite(blank, np.full((480, 640), 128, dtype=np.uint8))
+    return files + [blank]
+
+
+@pytest.fixture
+def detections(monkeypatch):
+    """Compte les appels à detect_corners (mode jobs=1, même processus)."""
+    calls = []
+    detect = calibration.detect_corners
+
+    def counting(image_file):
+        calls.append(os.path.basename(image_file))
+        return detect(image_file)
+    monkeypatch.setattr(calibration, 'detect_corners', counting)
+    return calls
+
+
+def test_detect_corners(images, tmp_path):
+    size, corners = calibration.detect_corners(images[0])
+    assert size == (640, 480) and corners.shape == (calibration.nX * calibration.nY, 1, 2)
+    # premier coin intérieur: coin du premier carré noir
+    np.testing.assert_allclose(corners[0, 0], (139.5, 129.5), atol=1.0)
+    assert calibration.detect_corners(images[-1]) == ((640, 480), None)
+    assert calibration.detect_corners(str(tmp_path / 'absent.png')) == (None, None)
+
+
+def test_cache_hits_misses_and_invalidation(images, tmp_path, detections, monkeypatch):
+    cache = str(tmp_path / 'corners.npz')
+    first = calibration.extract_corners_headless(images, jobs=1, cache_path=cache)
+    assert len(detections) == 4 and os.path.exists(cache)
+    assert [f for f, _, c in first if c is not None] == images[:3]
+
+    # second passage: tout vient du cache, résultats identiques
+    second = calibration.extract_corners_headless(images, jobs=1, cache_path=cache)
+    assert len(detections) == 4
+    for (f1, s1, c1), (f2, s2, c2) in zip(first, second):
+        assert (f1, s1) == (f2, s2)
+        assert (c1 is None and c2 is None) or np.array_equal(c1, c2)
+
+    # image modifiée: nouvelle empreinte SHA1, seule elle est retraitée et l'ancienne entrée disparaît
+    _chessboard(images[1], shift=25)
+    calibration.extract_corners_headless(images, jobs=1, cache_path=cache)
+    assert detections[4:] == ['board1.png']
+    assert len(calibration.load_corners_cache(cache)) == 4
+
+    # autre mire: clé différente pour le même contenu
+    key = calibration.file_key(images[0])
+    monkeypatch.setattr(calibration, 'nX', calibration.nX - 1)
+    assert calibration.file_key(images[0]) != key and calibration.file_key(images[0]) not in \
+        calibration.load_corners_cache(cache)
+
+
+def test_cache_drops_deleted_images(images, tmp_path, detections):
+    cache = str(tmp_path / 'corners.npz')
+    calibration.extract_corners_headless(images, jobs=1, cache_path=cache)
+    os.remove(images[0])
+    out = calibration.extract_corners_headless(images[1:], jobs=1, cache_path=cache)
+    assert len(out) == 3 and len(detections) == 4
+    entries = calibration.load_corners_cache(cache)
+    assert sorted(os.path.basename(e[2]) for e in entries.values()) == ['blank.png', 'board1.png', 'board2.png']
+
+
+def test_unreadable_cache_is_ignored(tmp_path):
+    path = tmp_path / 'corners.npz'
+    path.write_bytes(b'pas un npz')
+    assert calibration.load_corners_cache(str(path)) == {}
+
+
+def test_process_pool_matches_sequential(images, tmp_path):
+    sequential = calibration.extract_corners_headless(images, jobs=1, cache_path=None)
+    pooled = calibration.extract_corners_headless(images, jobs=2, cache_path=str(tmp_path / 'pool.npz'))
+    assert [(f, s) for f, s, _ in pooled] == [(f, s) for f, s, _ in sequential]
+    for (_, _, a), (_, _, b) in zip(sequential, pooled):
+        assert (a is None and b is None) or np.allclose(a, b)
@@ -0,0 +1,104 @@
+# Tests de la calibration live (calibration.py): couverture de pose et recalibration
+# incrémentale sur des vues synthétiques de la mire (coins projetés avec une caméra connue),
+# et arrêt de la session headless quand la couverture sature sans convergence.
+
+import sys
+import os
+import time
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import calibration
+
+K = np.array([[700.0, 0, 320], [0, 710.0, 240], [0, 0, 1]])
+D = np.zeros(5)
+SIZE = (640, 480)
+# centre de la mire sur l'axe optique
+CENTER = -calibration.object_points_3D.mean(axis=0)
+
+
+def _view(rvec=(0.0, 0.0, 0.0), shift=(0.0, 0.0), z=0.6):
+    tvec = CENTER + np.array([shift[0], shift[1], z])
+    pts, _ = cv2.projectPoints(calibration.object_points_3D, np.array(rvec, dtype=np.float64), tvec, K, D)
+    return pts.reshape(-1, 1, 2).astype(np.float32)
+
+
+def test_pose_coverage_bins_position_scale_and_tilt():
+    coverage = calibration.PoseCoverage()
+    front = _view()
+    gx, gy, sb, tb = coverage.bin_for(front, SIZE)
+    assert (gx, gy, tb) == (1, 1, 0)
+    assert coverage.adds_coverage(front, SIZE)
+    coverage.add(front, SIZE)
+    # même vue: rien de nouveau
+    assert not coverage.adds_coverage(_view(shift=(0.001, 0.0)), SIZE)
+    assert coverage.bin_for(_view(shift=(-0.25, 0.0)), SIZE)[0] == 0
+    assert coverage.bin_for(_view(z=0.3), SIZE)[2] > sb
+    assert coverage.bin_for(_view(rvec=(0.7, 0.0, 0.0)), SIZE)[3] > 0
+    for view in (_view(shift=(-0.25, 0.0)), _view(z=0.3), _view(rvec=(0.7, 0.0, 0.0))):
+        assert coverage.adds_coverage(view, SIZE)
+        coverage.add(view, SIZE)
+    assert coverage.score == pytest.approx(4.0 / coverage.total)
+
+
+def test_live_calibrator_converges_on_synthetic_views():
+    rng = np.random.default_rng(3)
+    calibrator = calibration.LiveCalibrator(SIZE, min_frames=8, tol=0.01, window=3)
+    calibrator.start()
+    try:
+        for _ in range(10):
+            calibrator.add_view(_view(rvec=rng.normal(0, 0.3, 3), shift=rng.normal(0, 0.05, 2),
+                                      z=rng.uniform(0.5, 0.8)))
+            calibrator.wait_idle()
+        assert calibrator.frame_count == 10 and calibrator.converged
+        assert calibrator.rms_history[-1] < 0.05
+        np.testing.assert_allclose(calibrator.mtx, K, rtol=1e-2, atol=1.0)
+    finally:
+        calibrator.stop()
+
+
+def _chessboard_image():
+    image = np.full((SIZE[1], SIZE[0], 3), 255, dtype=np.uint8)
+    square = 40
+    x0, y0 = 120, 100
+    for j in range(calibration.number_of_squares_Y):
+        for i in range(calibration.number_of_squares_X):
+            if (i + j) % 2 == 0:
+                x, y = x0 + i * square, y0 + j * square
+                image[y:y + square, x:x + square] = 0
+    return image
+
+
+class EndlessCamera:
+    """Caméra qui montre toujours la même vue de la mire (couverture saturée dès la 1re image)."""
+    reads = 0
+
+    def __init__(self, target):
+        self.frame = _chessboard_image()
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        EndlessCamera.reads += 1
+        return True, self.frame.copy()
+
+    def release(self):
+        pass
+
+
+def test_headless_live_session_is_bounded_in_time(monkeypatch):
+    monkeypatch.setattr(calibration.cv2, 'VideoCapture', EndlessCamera)
+    EndlessCamera.reads = 0
+    t0 = time.monotonic()
+    mtx, dist = calibration.live_calibration(0, headless=True, max_seconds=0.5)
+    assert time.monotonic() - t0 < 3.0
+    # une seule vue retenue: pas de calibration possible, mais la session s'arrête
+    assert EndlessCamera.reads > 1 and mtx is None and dist is None
@@ -0,0 +1,49 @@
+# Tests du rapport de reprojection vectorisé (calibration.py)
+# Compare la projection NumPy en lot à cv2.projectPoints et vérifie
+# la détection d'une image aberrante.
+
+import sys
+import os
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import calibration
+
+K = np.array([[700.0, 0, 320], [0, 710.0, 240], [0, 0, 1]])
+D = np.array([[-0.2, 0.05, 0.001, -0.002, 0.01]])
+
+
+def _poses(n, seed=0):
+    rng = np.random.default_rng(seed)
+    rvecs = rng.normal(0, 0.3, (n, 3))
+    tvecs = np.c_[rng.normal(0, 0.05, (n, 2)), np.full(n, 0.6)]
+    return rvecs, tvecs
+
+
+def test_batch_projection_matches_opencv():
+    rvecs, tvecs = _poses(6)
+    batch = calibration.project_points_batch(calibration.object_points_3D, rvecs, tvecs, K, D)
+    for i in range(len(rvecs)):
+        ref, _ = cv2.projectPoints(calibration.object_points_3D, rvecs[i], tvecs[i], K, D)
+        np.testing.assert_allclose(batch[i], ref.reshape(-1, 2), atol=1e-6)
+
+
+def test_report_flags_outlier():
+    rvecs, tvecs = _poses(10, seed=1)
+    projected = calibration.project_points_batch(calibration.object_points_3D, rvecs, tvecs, K, D)
+    rng = np.random.default_rng(2)
+    observed = projected + rng.normal(0, 0.1, projected.shape)
+    observed[4] += rng.normal(0, 3.0, observed[4].shape)
+    points = [p.reshape(-1, 1, 2).astype(np.float32) for p in observed]
+
+    report = calibration.reprojection_report(points, rvecs, tvecs, K, D)
+    assert report['corner_error'].shape == (10, calibration.nX * calibration.nY)
+    assert list(report['outliers']) == [4]
+    assert report['per_image_rms'][4] > report['outlier_threshold']
@@ -0,0 +1,97 @@
+# Tests du traçage de latence des commandes (command_trace.py, pont control_robot.py --stdin)
+# L'Arduino est remplacé par un faux port série qui répond comme le firmware (OK <seq>).
+
+import sys
+import os
+import io
+import json
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import command_trace
+import control_robot
+
+
+class FakeArduino:
+    def __init__(self, stale=None):
+        self.written = []
+        self._replies = list(stale or [])
+
+    def write(self, data):
+        line = data.decode().strip()
+        self.written.append(line)
+        seq, cmd = command_trace.parse_tagged(line)
+        status = 'OK' if cmd.startswith('MOVE') else 'ERR'
+        self._replies.append(f"{status} {seq}" if seq is not None else status)
+
+    def readline(self):
+        return (self._replies.pop(0) + "\r\n").encode() if self._replies else b''
+
+
+def test_tag_and_ack_parsing():
+    assert command_trace.tag_command(7, "MOVE forward 200") == "#7 MOVE forward 200"
+    assert command_trace.parse_tagged("#7 MOVE forward 200\n") == (7, "MOVE forward 200")
+    assert command_trace.parse_tagged("MOVE stop 0") == (None, "MOVE stop 0")
+    assert command_trace.parse_ack("OK 7") == ("OK", 7)
+    assert command_trace.parse_ack("OK") == ("OK", None)
+    assert command_trace.parse_trace_line("OK 7") is None
+
+
+def test_stdin_bridge_to_gui_tracer(tmp_path):
+    tracer = command_trace.CommandTracer()
+    lines = []
+    for cmd in ("MOVE forward 200", "MOVE stop 0", "BAD"):
+        seq, tagged = tracer.begin(cmd, t=10.0)
+        tracer.mark(seq, 'ssh_send', 10.001)
+        lines.append(tagged + "\n")
+    # une réponse en retard d'une commande précédente doit être ignorée
+    port = FakeArduino(stale=["OK 99"])
+    out = io.StringIO()
+    control_robot.stdin_bridge(io.StringIO("".join(lines)), out, port)
+    assert port.written[0] == "#1 MOVE forward 200"
+
+    # sortie du shell: écho du pty puis lignes TRACE
+    echo = "admin@PEI:~ $ #1 MOVE forward 200\r\n"
+    assert tracer.feed_output(echo, t=10.004) == 0
+    assert tracer.feed_output(out.getvalue(), t=10.050) == 3
+
+    traces = {tr.seq: tr for tr in tracer.traces()}
+    assert traces[1].reply == "OK 1" and traces[3].reply == "ERR 3"
+    seg = traces[1].segments()
+    assert abs(seg['total'] - 0.050) < 1e-9
+    assert abs(seg['pty_echo'] - 0.003) < 1e-9
+    assert 0 <= seg['serial_ack'] and seg['transport'] <= seg['total']
+
+    edges, counts = tracer.histogram('total', bins=5)
+    assert sum(counts) == 3 and len(edges) == 6
+    path = tmp_path / 'trace.json'
+    tracer.export(str(path))
+    data = json.load(open(path))
+    assert data['summary']['total']['count'] == 3
+    csv_path = tmp_path / 'trace.csv'
+    tracer.export(str(csv_path))
+    assert open(csv_path).read().count('\n') == 4
+
+
+def test_unacknowledged_commands_are_bounded():
+    tracer = command_trace.CommandTracer(history=10)
+    for i in range(25):
+        tracer.begin("MOVE stop 0")
+    assert len(tracer.traces(include_pending=True)) <= 20
+    assert tracer.summary() == {}
+
+
+def test_output_split_across_chunks_and_root_prompt():
+    tracer = command_trace.CommandTracer()
+    seq, tagged = tracer.begin("MOVE forward 200", t=10.0)
+    tracer.mark(seq, 'ssh_send', 10.001)
+    # invite root (`#`) avant l'écho, puis ligne TRACE coupée en deux morceaux
+    assert tracer.feed_output("root@PEI:~# " + tagged + "\r", t=10.003) == 0
+    assert tracer.feed_output("\nTRACE 1 5.0 5.001 5.0", t=10.004) == 0
+    assert tracer.feed_output("2 OK 1\r\n", t=10.010) == 1
+    tr = tracer.traces()[0]
+    assert tr.reply == "OK 1"
+    assert abs(tr.segments()['pty_echo'] - 0.002) < 1e-9
+    assert abs(tr.segments()['total'] - 0.010) < 1e-9
@@ -0,0 +1,68 @@
+# Tests de la représentation compacte de l'état (compact_state.py) et de son banc
+# (bench/bench_state_model.py): compatibilité d'accès avec RobotState et mêmes sorties.
+
+import sys
+import os
+import json
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+BENCH = os.path.join(ROOT, 'bench')
+for path in (ROOT, BENCH):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import bench_state_model
+from compact_state import CompactState
+from robot_state import RobotState, RobotStateManager, WheelState
+
+
+def _feed(manager):
+    manager.update_frame(position=(1200.0, 800.0, 45.0), linear_velocity=120.0, wheel_states=['forward'] * 4,
+                         wheel_speeds=(60.0, 61.0, 62.0), wheel_ticks=(10, 20, 30, 40),
+                         wheel_targets=(200.0,) * 4, sensor_values=(150.0,) * 7, battery_level=85.0,
+                         aruco_ids=[3, 7])
+    manager.update_sensor(2, 42.0)
+    manager.update_actuator(1, position=55.0, is_enabled=True)
+
+
+def test_same_dict_and_attribute_access_as_dataclasses():
+    plain, compact = RobotStateManager(), RobotStateManager(compact=True)
+    for manager in (plain, compact):
+        _feed(manager)
+    a, b = plain.get_state(), compact.get_state()
+    assert isinstance(b, CompactState)
+    da, db = a.to_dict(), b.to_dict()
+    assert da.pop('last_update') <= db.pop('last_update')
+    assert json.dumps(da, sort_keys=True) == json.dumps(db, sort_keys=True)
+    assert CompactState.from_state(a).to_dict() == a.to_dict()
+
+    # vues compatibles: lecture et écriture comme sur RobotState
+    assert b.position.theta == b.direction == 45.0
+    assert [w.speed for w in b.wheels] == [60.0, 61.0, 62.0, 0.0]  # zip: liste courte tronquée
+    assert [(s.name, s.unit) for s in b.sensors] == [(s.name, s.unit) for s in a.sensors]
+    assert b.actuators[1].is_enabled is True and b.actuators[1].position == 55.0
+    compact.set_emergency_stop(True)
+    assert all(w.state == WheelState.STOPPED.value and w.speed == 0.0 for w in b.wheels)
+
+
+def test_columns_share_memory_with_numpy():
+    state = CompactState()
+    speeds = np.frombuffer(state.wheel_speeds)
+    ticks = np.frombuffer(state.wheel_ticks, dtype=np.int64)
+    state.wheels[3].speed = 12.5
+    state.wheels[0].encoder_ticks = -7
+    assert speeds.tolist() == [0.0, 0.0, 0.0, 12.5] and ticks[0] == -7
+    state.sensor_values[1] = 99.0
+    assert state.sensors[1].value == 99.0 and state.sensors[0].is_active
+    # les tableaux ne sont jamais redimensionnés par une image trop longue
+    state.apply_columns(sensor_values=range(20))
+    assert len(state.sensor_values) == 7 and state.sensors[6].value == 6.0
+
+
+def test_bench_reports_savings():
+    res = {name: bench_state_model.run_model(name, states=100, number=200) for name in bench_state_model.MODELS}
+    assert res['compact']['state_bytes'] < res['dataclass']['state_bytes']
+    assert res['compact']['to_dict_us'] < res['dataclass']['to_dict_us']
+    assert res['compact']['to_json_us'] < res['dataclass']['to_json_us']
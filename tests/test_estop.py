@@ -0,0 +1,118 @@
+# Tests de la voie prioritaire d'arrêt d'urgence: démon (trame S), liaisons asyncio,
+# pont stdin du Pi et verrouillage ESTOP / RESUME du firmware simulé.
+
+import sys
+import os
+import asyncio
+import io
+import time
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import control_robot
+import robot_daemon
+import robot_io
+from arduino_sim import DelayedArduino, SimulatedArduino
+from command_trace import parse_trace_line
+
+
+def test_priority_frame_preempts_daemon_queue():
+    slow = DelayedArduino(0.05, timeout=0.05)
+    daemon = robot_daemon.RobotDaemon(slow, port=0, host='127.0.0.1', max_in_flight=1).start()
+    acks = {}
+    client = robot_daemon.DaemonClient('127.0.0.1', daemon.port,
+                                       on_ack=lambda seq, status, stamps: acks.setdefault(seq, status)).connect()
+    try:
+        for n in range(10):
+            client.send(f"MOVE forward {100 + n}", seq=100 + n)
+        time.sleep(0.02)
+        t0 = time.monotonic()
+        status, stamps = client.emergency_stop()
+        elapsed = time.monotonic() - t0
+        assert status == 'OK' and stamps['pi_recv'] <= stamps['serial_write'] <= stamps['ack']
+        # seule la commande en vol précède l'ESTOP; la file est annulée
+        assert slow.commands.index("ESTOP") <= 2
+        assert elapsed < 10 * 0.05
+        deadline = time.monotonic() + 2.0
+        while len(acks) < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert list(acks.values()).count('CANCELLED') >= 7
+        assert daemon.priority_commands == 1
+        assert not slow.sim.target_rpm.any()
+
+        # verrouillé jusqu'à RESUME
+        assert client.request("MOVE forward 100")[0] == 'ERR_ESTOP'
+        assert client.request("MOVE stop 0")[0] == 'OK'
+        assert client.request("RESUME")[0] == 'OK'
+        assert client.request("VEL 100 0 0")[0] == 'OK'
+    finally:
+        client.close()
+        daemon.stop()
+
+
+def test_links_cancel_commands_waiting_for_window():
+    core = robot_io.IOCore().start()
+    daemon = robot_daemon.RobotDaemon(DelayedArduino(0.05, timeout=0.05), port=0, host='127.0.0.1',
+                                      max_in_flight=1).start()
+    link = robot_io.DaemonLink('127.0.0.1', daemon.port, max_in_flight=2)
+
+    async def scenario(link, stop, head_start=0.02):
+        tasks = [asyncio.ensure_future(link.command(f"VEL {n} 0 0", timeout=2.0)) for n in range(8)]
+        await asyncio.sleep(head_start)
+        estop = await stop()
+        return estop, await asyncio.gather(*tasks)
+
+    try:
+        core.call(link.connect(), timeout=3.0)
+        (status, _), replies = core.call(scenario(link, lambda: link.emergency_stop(timeout=2.0)), timeout=5.0)
+        assert status == 'OK'
+        statuses = [r[0] for r in replies]
+        assert statuses.count('CANCELLED') >= 5 and set(statuses) <= {'OK', 'CANCELLED'}
+
+        async def serial_scenario():
+            port = SimulatedArduino(timeout=0.0)
+            serial = await robot_io.AsyncSerial(port, poll=0.005).open()
+            serial_link = await robot_io.SerialLink(serial, max_in_flight=1).start()
+            result = await scenario(serial_link, serial_link.emergency_stop, head_start=0.0)
+            await serial_link.close()
+            return port, result
+
+        port, (status, replies) = core.call(serial_scenario(), timeout=5.0)
+        assert status == 'OK' and port.estop_latched
+        assert replies.count('CANCELLED') >= 5
+    finally:
+        core.call(link.close(), timeout=2.0)
+        core.stop()
+        daemon.stop()
+
+
+def test_stdin_bridge_runs_estop_first():
+    port = SimulatedArduino(timeout=0.0)
+    lines = "#1 MOVE forward 200\n#2 VEL 100 0 0\n#3 ESTOP\n#4 MOVE forward 100\n#5 RESUME\n"
+    out = io.StringIO()
+    control_robot.stdin_bridge(io.StringIO(lines), out, port)
+    assert port.commands == ["ESTOP", "MOVE forward 100", "RESUME"]
+    traces = [parse_trace_line(line) for line in out.getvalue().splitlines()]
+    assert [(seq, reply) for seq, _, reply in traces] == [
+        (3, "OK 3"), (1, "CANCELLED"), (2, "CANCELLED"), (4, "ERR_ESTOP 4"), (5, "OK 5")]
+
+
+def test_stdin_bridge_through_daemon_keeps_serial_port_exclusive():
+    port = SimulatedArduino(timeout=0.02)
+    daemon = robot_daemon.RobotDaemon(port, port=0, host='127.0.0.1', wdt_ms=500).start()
+    try:
+        lines = "#1 MOVE forward 200\n#2 ESTOP\n#3 RESUME\n#4 VEL 100 0 0\n"
+        out = io.StringIO()
+        control_robot.daemon_bridge(f"127.0.0.1:{daemon.port}", io.StringIO(lines), out)
+        traces = [parse_trace_line(line) for line in out.getvalue().splitlines()]
+        assert [(seq, reply) for seq, _, reply in traces] == [
+            (2, "OK 2"), (1, "CANCELLED"), (3, "OK 3"), (4, "OK 4")]
+        # seul le démon écrit sur le port série: pas de TELEM/WDT 0 du pont
+        # (puis `MOVE stop 0` de l'homme mort à la fermeture du pont)
+        assert port.commands[:4] == ["WDT 500", "ESTOP", "RESUME", "VEL 100 0 0"]
+        stamps = traces[0][1]
+        assert stamps['pi_recv'] <= stamps['serial_write'] <= stamps['ack']
+    finally:
+        daemon.stop()
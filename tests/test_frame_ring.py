@@ -0,0 +1,98 @@
+# Tests de l'anneau d'images en mémoire partagée (frame_ring.py)
+
+import sys
+import os
+import uuid
+import multiprocessing
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import frame_ring
+
+
+def _name():
+    return "test_ring_" + uuid.uuid4().hex[:8]
+
+
+def test_write_and_zero_copy_view():
+    ring = frame_ring.FrameRing.create(_name(), (4, 6, 3), slots=3)
+    reader = frame_ring.FrameRing.attach(ring.name)
+    try:
+        frame = np.arange(72, dtype=np.uint8).reshape(4, 6, 3)
+        seq = ring.write(frame, 1.5)
+        view, ts = reader.view(seq)
+        assert ts == 1.5
+        np.testing.assert_array_equal(view, frame)
+        assert not view.flags.writeable
+        del view
+        # après un tour complet, le slot est réécrit: l'ancienne image n'est plus valide
+        for i in range(3):
+            ring.write(frame, 2.0 + i)
+        assert not reader.is_valid(seq)
+        assert reader.view(seq) is None
+    finally:
+        reader.close()
+        ring.close()
+
+
+def test_ring_source_reads_in_order_and_counts_drops():
+    ring = frame_ring.FrameRing.create(_name(), (2, 2), slots=4)
+    src = frame_ring.RingSource(ring.name, latest=False, copy=True, timeout=0.05)
+    try:
+        for i in range(1, 4):
+            ring.write(np.full((2, 2), i, dtype=np.uint8), float(i))
+        values = [int(src.read()[1][0, 0]) for _ in range(3)]
+        assert values == [1, 2, 3]
+        for i in range(4, 14):
+            ring.write(np.full((2, 2), i, dtype=np.uint8), float(i))
+        ok, frame, ts = src.read()
+        assert ok and src.dropped > 0 and ts >= 10.0
+    finally:
+        src.release()
+        ring.close()
+
+
+def test_zero_copy_view_overwritten_during_processing_is_flagged():
+    ring = frame_ring.FrameRing.create(_name(), (2, 2), slots=2)
+    src = frame_ring.RingSource(ring.name, latest=True, copy=False, timeout=0.05)
+    try:
+        ring.write(np.full((2, 2), 1, dtype=np.uint8), 1.0)
+        ok, frame, _ = src.read()
+        assert ok and src.frame_valid()
+        # l'écrivain fait le tour pendant le « traitement » de la vue
+        for i in range(2, 4):
+            ring.write(np.full((2, 2), i, dtype=np.uint8), float(i))
+        assert not src.frame_valid() and src.dropped == 1
+        ok, frame, _ = src.read()
+        assert ok and int(frame[0, 0]) == 3 and src.frame_valid()
+    finally:
+        src.release()
+        ring.close()
+
+def _writer(name, count):
+    ring = frame_ring.FrameRing.attach(name)
+    for i in range(count):
+        ring.write(np.full((8, 8), i % 256, dtype=np.uint8), float(i))
+    ring.close()
+
+
+def test_cross_process_writer():
+    ring = frame_ring.FrameRing.create(_name(), (8, 8), slots=8)
+    try:
+        proc = multiprocessing.get_context('fork').Process(target=_writer, args=(ring.name, 5))
+        proc.start()
+        proc.join(timeout=10)
+        assert proc.exitcode == 0
+        assert ring.last_seq == 5
+        view, ts = ring.view(5)
+        assert ts == 4.0 and int(view[0, 0]) == 4
+        del view
+    finally:
+        ring.close()
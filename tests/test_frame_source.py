@@ -0,0 +1,62 @@
+# Tests des sources d'images de pos_estimation (frame_source.py)
+
+import sys
+import os
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import frame_source
+
+
+def _write_images(directory, n):
+    for i in range(n):
+        img = np.full((24, 32, 3), i * 10, dtype=np.uint8)
+        cv2.imwrite(str(directory / f"img_{i:03d}.png"), img)
+
+
+def test_image_dir_timestamps(tmp_path):
+    _write_images(tmp_path, 5)
+    src = frame_source.open_source(str(tmp_path), fps=10.0)
+    assert isinstance(src, frame_source.ImageDirSource)
+    stamps = [ts for _, ts in src]
+    assert stamps == pytest.approx([0.0, 0.1, 0.2, 0.3, 0.4])
+
+
+def test_prefetch_preserves_order_and_end(tmp_path):
+    _write_images(tmp_path, 12)
+    src = frame_source.open_source(str(tmp_path), max_speed=True, prefetch=3)
+    assert isinstance(src, frame_source.PrefetchSource)
+    values = [int(frame[0, 0, 0]) for frame, _ in src]
+    assert values == [i * 10 for i in range(12)]
+    ok, frame, _ = src.read()
+    assert not ok and frame is None
+    src.release()
+
+
+def test_prefetch_release_while_running(tmp_path):
+    _write_images(tmp_path, 20)
+    src = frame_source.open_source(str(tmp_path), max_speed=True, prefetch=2)
+    ok, _, _ = src.read()
+    assert ok
+    src.release()
+    assert not src._thread.is_alive()
+    # lecture après release(): fin de flux immédiate, pas de blocage
+    assert src.read() == (False, None, 0.0)
+
+
+def test_prefetch_read_returns_when_worker_died():
+    class DeadWorker(frame_source.PrefetchSource):
+        def _run(self):
+            pass  # thread terminé sans marquer la fin du flux
+
+    src = DeadWorker(frame_source.FrameSource())
+    src._thread.join(timeout=1.0)
+    assert src.read() == (False, None, 0.0)
+    src.release()
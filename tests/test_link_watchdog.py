@@ -0,0 +1,123 @@
+# Tests du chien de garde (link_watchdog.py), du homme mort du démon et du WDT firmware simulé
+# Horloge factice pour la logique, boucle locale réelle (démon + IOCore) pour le délai de détection.
+
+import sys
+import os
+import time
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import robot_daemon
+import robot_io
+from arduino_sim import SimulatedArduino
+from link_watchdog import Watchdog
+from robot_state import RobotStateManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_trip_once_and_recover_per_source():
+    clock = FakeClock()
+    manager = RobotStateManager()
+    manager.set_connected(True)
+    trips, beats = [], []
+    dog = Watchdog(manager, deadline=0.2, heartbeat=lambda: beats.append(clock.t), heartbeat_period=0.05,
+                   on_trip=trips.append, clock=clock)
+    dog.watch('daemon')
+    dog.watch('telemetry', deadline=0.6)
+
+    for _ in range(8):  # 400 ms de battements acquittés, télémétrie toutes les 200 ms
+        clock.t += 0.05
+        dog.feed('daemon')
+        if len(beats) % 4 == 0:
+            dog.feed('telemetry')
+        dog.tick()
+    assert not trips and len(beats) == 8
+    assert manager.get_state().is_connected
+
+    clock.t += 0.25  # plus d'acquittement: seule la source 'daemon' est en retard
+    assert dog.check() == ['daemon']
+    dog.check()
+    assert trips == [['daemon']] and dog.trips == 1
+    state = manager.get_state()
+    assert not state.is_connected and state.emergency_stop_active
+
+    dog.feed('daemon')
+    dog.feed('telemetry')
+    assert dog.check() == [] and not dog.tripped
+    state = manager.get_state()
+    # reconnecté, mais l'arrêt d'urgence attend l'opérateur
+    assert state.is_connected and state.emergency_stop_active
+
+
+def test_firmware_silence_stops_motors():
+    clock = FakeClock()
+    port = SimulatedArduino(clock=clock, timeout=0.0)
+    port.write(b"WDT 300\nMOVE forward 200\n")
+    for _ in range(4):  # PING toutes les 100 ms: le robot continue
+        clock.t += 0.1
+        port.write(b"PING\n")
+    port.advance(0.0)
+    assert port.sim.target_rpm.all() and port.watchdog_trips == 0
+    clock.t += 0.35
+    replies = [port.readline().strip() for _ in range(7)]
+    assert replies[-1] == b"WDT" and replies.count(b"OK") == 6
+    assert not port.sim.target_rpm.any() and port.watchdog_trips == 1
+
+
+def test_link_loss_detected_within_deadline():
+    serial_port = SimulatedArduino(timeout=0.02)
+    daemon = robot_daemon.RobotDaemon(serial_port, port=0, host='127.0.0.1').start()
+    core = robot_io.IOCore().start()
+    manager = RobotStateManager()
+    manager.set_connected(True)
+    tripped = []
+    link = robot_io.DaemonLink('127.0.0.1', daemon.port,
+                               on_event=lambda kind, payload: kind == 'ack' and dog.feed('daemon'))
+    dog = Watchdog(manager, deadline=0.2,
+                   heartbeat=lambda: core.loop.create_task(link.command("PING", timeout=0.2)),
+                   on_trip=lambda stale: tripped.append(time.monotonic()))
+    try:
+        core.call(link.connect(), timeout=3.0)
+        core.call(link.command("MOVE forward 150"), timeout=3.0)
+        dog.watch('daemon')
+        dog.start(core)
+        time.sleep(0.4)
+        assert not tripped and serial_port.commands.count("PING") >= 4
+
+        # démon arrêté (liaison coupée): détection en moins de 1,25 x le délai (+ marge d'ordonnancement)
+        t_cut = time.monotonic()
+        daemon.stop()
+        deadline = time.monotonic() + 2.0
+        while not tripped and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert tripped and tripped[0] - t_cut < 0.2 * 1.25 + 0.1
+        assert manager.get_state().emergency_stop_active
+    finally:
+        dog.stop()
+        core.call(link.close(), timeout=2.0)
+        core.stop()
+        daemon.stop()
+
+
+def test_daemon_stops_motors_when_client_drops():
+    serial_port = SimulatedArduino(timeout=0.02)
+    daemon = robot_daemon.RobotDaemon(serial_port, port=0, host='127.0.0.1').start()
+    client = robot_daemon.DaemonClient('127.0.0.1', daemon.port).connect()
+    try:
+        assert client.request("MOVE forward 150")[0] == 'OK'
+        client.close()
+        deadline = time.monotonic() + 2.0
+        while serial_port.commands[-1] != "MOVE stop 0" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert serial_port.commands[-1] == "MOVE stop 0"
+    finally:
+        daemon.stop()
@@ -0,0 +1,82 @@
+# Tests de l'instrumentation (perf.py) et de son branchement dans RobotStateManager
+
+import sys
+import os
+import subprocess
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import perf
+from robot_state import RobotStateManager
+
+
+@pytest.fixture
+def perf_on():
+    perf.reset()
+    perf.enable()
+    yield
+    perf.disable()
+    perf.reset()
+
+
+def test_disabled_records_nothing():
+    perf.disable()
+    perf.reset()
+
+    @perf.timed('test.fn')
+    def fn(x):
+        return x * 2
+
+    assert fn(3) == 6
+    with perf.span('test.span'):
+        pass
+    snap = perf.snapshot()
+    assert snap.get('test.fn', {}).get('count', 0) == 0
+    assert snap.get('test.span', {}).get('count', 0) == 0
+
+
+def test_spans_counts_and_rate(perf_on):
+    for _ in range(20):
+        with perf.span('test.span'):
+            time.sleep(0.001)
+        perf.count('test.event')
+    snap = perf.snapshot()
+    assert snap['test.span']['count'] == 20
+    assert snap['test.span']['p50_ms'] >= 1.0
+    assert snap['test.event']['rate_hz'] > 0
+    assert 'test.span' in perf.format_snapshot(snap)
+
+
+def test_state_manager_instrumentation(perf_on):
+    manager = RobotStateManager()
+    manager.add_listener(lambda state: time.sleep(0.0005))
+    manager.add_listener(lambda state: None)
+    for i in range(10):
+        manager.update_position(i, i, 0.0)
+    snap = perf.snapshot()
+    assert snap['state.update']['count'] == 10
+    assert snap['state.listener']['count'] == 20
+    assert snap['state.listener']['max_ms'] >= 0.5
+
+
+def test_startup_breakdown_and_lazy_backends(perf_on):
+    with perf.span('startup.b'):
+        pass
+    with perf.span('startup.a'):
+        time.sleep(0.002)
+    perf.record('gui.update', 0.001)
+    lines = perf.breakdown('startup.').splitlines()
+    # ordre de première mesure, autres mesures exclues
+    assert [line.split()[0] for line in lines] == ['startup.b', 'startup.a']
+    assert float(lines[1].split()[1]) >= 2.0
+
+    # importer l'interface ne charge aucune dépendance lourde (Tk seul)
+    code = ("import sys, robot_interface; "
+            "print(' '.join(m for m in ('paramiko', 'cv2', 'ttkbootstrap', 'asyncio') if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ''
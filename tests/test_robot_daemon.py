@@ -0,0 +1,145 @@
+# Tests du démon de commande (robot_daemon.py) en boucle locale
+# Le port série est remplacé par l'Arduino simulé (arduino_sim.py), la socket écoute sur 127.0.0.1.
+
+import sys
+import os
+import socket
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import robot_daemon
+from arduino_sim import DelayedArduino, SimulatedArduino
+from telemetry import parse_telemetry
+
+
+def _start(serial_port=None, **kwargs):
+    serial_port = serial_port or SimulatedArduino(timeout=0.05)
+    daemon = robot_daemon.RobotDaemon(serial_port, port=0, host='127.0.0.1', **kwargs).start()
+    return daemon, serial_port
+
+
+def test_frames_roundtrip_in_pieces():
+    data = robot_daemon.pack_frame(b'C', 7, "MOVE forward 200") + robot_daemon.pack_frame(b'A', 8, "OK 1 2 3")
+    decoder = robot_daemon.FrameDecoder()
+    frames = []
+    for i in range(len(data)):
+        frames += decoder.feed(data[i:i + 1])
+    assert frames == [(b'C', 7, "MOVE forward 200"), (b'A', 8, "OK 1 2 3")]
+    assert robot_daemon.parse_ack_payload("OK 1.5 1.6 1.7") == ('OK', {'pi_recv': 1.5, 'serial_write': 1.6, 'ack': 1.7})
+    # seules les réponses du firmware nourrissent le chien de garde de l'interface
+    assert robot_daemon.is_firmware_ack('OK') and robot_daemon.is_firmware_ack('ERR_ESTOP')
+    assert not any(robot_daemon.is_firmware_ack(s) for s in ('TIMEOUT', 'BUSY', 'CANCELLED', ''))
+
+
+def test_request_ack_and_errors():
+    daemon, serial_port = _start()
+    client = robot_daemon.DaemonClient('127.0.0.1', daemon.port).connect()
+    try:
+        status, stamps = client.request("MOVE forward 200")
+        assert status == 'OK'
+        assert stamps['pi_recv'] <= stamps['serial_write'] <= stamps['ack']
+        assert client.request("MOVE sideways 200")[0] == 'ERR_UNKNOWN_MOVE'
+        # commandes renumérotées par le démon pour le port série
+        assert serial_port.commands == ["MOVE forward 200", "MOVE sideways 200"]
+        assert (serial_port.sim.target_rpm > 0).all()
+    finally:
+        client.close()
+        daemon.stop()
+
+
+def test_delayed_arduino_keeps_write_order():
+    slow = DelayedArduino(0.02, timeout=0.5)
+    try:
+        for n in range(20):
+            slow.write(f"#{n} VEL {n} 0 0\n".encode())
+        assert slow.max_in_flight == 20
+        assert [slow.readline().split()[1] for _ in range(20)] == [str(n).encode() for n in range(20)]
+        assert slow.commands == [f"VEL {n} 0 0" for n in range(20)] and slow.in_flight == 0
+    finally:
+        slow.close()
+
+
+def test_pipelining_window_and_routing():
+    slow = DelayedArduino(0.02, timeout=0.05)
+    daemon, _ = _start(slow, max_in_flight=3)
+    acks = {0: [], 1: []}
+    done = threading.Event()
+
+    def on_ack(idx):
+        def cb(seq, status, stamps):
+            acks[idx].append((seq, status))
+            if len(acks[0]) + len(acks[1]) == 20:
+                done.set()
+        return cb
+
+    clients = [robot_daemon.DaemonClient('127.0.0.1', daemon.port, on_ack=on_ack(i)).connect() for i in range(2)]
+    try:
+        t0 = time.monotonic()
+        for n in range(10):
+            for c in clients:
+                c.send(f"VEL {n} 0 0", seq=100 + n)  # mêmes numéros côté client: routage par client
+        assert done.wait(5.0)
+        elapsed = time.monotonic() - t0
+        for idx in (0, 1):
+            assert acks[idx] == [(100 + n, 'OK') for n in range(10)]
+        assert daemon.max_pending == 3 and slow.max_in_flight <= 3
+        # 20 commandes à 20 ms de latence: bien moins que 20 allers-retours séquentiels
+        assert elapsed < 20 * 0.02
+    finally:
+        for c in clients:
+            c.close()
+        daemon.stop()
+
+
+def test_telemetry_broadcast_and_timeout():
+    class MuteArduino(SimulatedArduino):
+        def _execute(self, line):
+            if "MOVE" not in line:
+                super()._execute(line)
+
+    daemon, _ = _start(MuteArduino(timeout=0.05), telem_ms=50, ack_timeout=0.2)
+    frames = []
+    client = robot_daemon.DaemonClient('127.0.0.1', daemon.port, on_telemetry=frames.append).connect()
+    try:
+        time.sleep(0.3)
+        assert frames and all(parse_telemetry(f) is not None for f in frames)
+        # l'Arduino ne répond pas: acquittement TIMEOUT au bout de ack_timeout
+        status, _ = client.request("MOVE forward 100", timeout=2.0)
+        assert status == 'TIMEOUT' and daemon.timeouts == 1
+    finally:
+        client.close()
+        daemon.stop()
+
+
+def test_stalled_client_is_dropped_without_blocking_others():
+    daemon, serial_port = _start(send_timeout=0.2, client_queue=64)
+    healthy = robot_daemon.DaemonClient('127.0.0.1', daemon.port).connect()
+    stalled = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+    stalled.connect(('127.0.0.1', daemon.port))  # puis ne lit plus rien (Wi-Fi perdu sans FIN)
+    try:
+        deadline = time.monotonic() + 2.0
+        while len(daemon._clients) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        frame = robot_daemon.pack_frame(robot_daemon.KIND_TELEMETRY, 0, "T" * 4000)
+        worst = 0.0
+        deadline = time.monotonic() + 3.0
+        while daemon.dropped == 0 and time.monotonic() < deadline:
+            t0 = time.monotonic()
+            daemon._broadcast(frame)  # comme le lecteur série: ne doit jamais bloquer
+            worst = max(worst, time.monotonic() - t0)
+            time.sleep(0.002)
+        assert worst < 0.05
+        assert daemon.dropped == 1
+        # client lent perdu: arrêt des moteurs, les autres clients sont toujours servis
+        assert healthy.request("MOVE forward 100")[0] == 'OK'
+        assert healthy.emergency_stop()[0] == 'OK'
+        assert "MOVE stop 0" in serial_port.commands
+    finally:
+        stalled.close()
+        healthy.close()
+        daemon.stop()
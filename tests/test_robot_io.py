@@ -0,0 +1,145 @@
+# Tests du cœur d'E/S asyncio (robot_io.py): boucle en arrière-plan, annulation,
+# délais, contre-pression, pont vers Tk (sans fenêtre) et liaisons série / démon en boucle locale.
+
+import sys
+import os
+import asyncio
+import concurrent.futures
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import robot_daemon
+import robot_io
+from arduino_sim import SimulatedArduino
+from robot_state import RobotStateManager
+from telemetry import TelemetryDecoder
+
+
+@pytest.fixture
+def core():
+    core = robot_io.IOCore(events_max=4).start()
+    yield core
+    core.stop()
+    assert not core.running
+
+
+def test_cancel_periodic_and_bounded_events(core):
+    future = core.submit(asyncio.sleep(30))
+    assert future.cancel()
+    with pytest.raises(concurrent.futures.CancelledError):
+        future.result(1.0)
+
+    ticks = []
+    periodic = core.every(0.01, lambda: ticks.append(time.monotonic()))
+    time.sleep(0.2)
+    periodic.cancel()
+    assert 5 <= len(ticks) <= 30
+
+    for i in range(6):
+        core.post('n', i)
+    # file bornée à 4: les deux plus anciens sont jetés
+    assert core.dropped == 2
+    seen = []
+    bridge = robot_io.TkBridge(root=None, events=core.events, max_batch=3)
+    bridge.on('n', seen.append)
+    assert bridge.poll() == 3 and bridge.poll() == 1
+    assert seen == [2, 3, 4, 5]
+
+
+def test_serial_link_pipelines_and_decodes_telemetry(core):
+    port = SimulatedArduino(timeout=0.0)
+    port.write(b"TELEM 50\n")
+    manager = RobotStateManager()
+    decoder = TelemetryDecoder(manager, ticks_per_rev=port.sim.ticks_per_rev)
+
+    async def scenario():
+        serial = await robot_io.AsyncSerial(port, poll=0.002).open()
+        link = await robot_io.SerialLink(serial, decoder, max_in_flight=3).start()
+        replies = await asyncio.gather(*(link.command(f"VEL {n} 0 0") for n in range(10)))
+        replies.append(await link.command("MOVE forward 255"))
+        await asyncio.sleep(0.3)
+        await link.close()
+        return replies
+
+    replies = core.call(scenario(), timeout=5.0)
+    assert replies == ['OK'] * 11
+    assert port.commands[-1] == "MOVE forward 255"
+    assert decoder.frames >= 3
+    assert all(w.target_speed == 255 for w in manager.get_state().wheels)
+
+
+def test_serial_timeout_and_backpressure(core):
+    class MuteArduino(SimulatedArduino):
+        def _execute(self, line):
+            pass
+
+    async def scenario():
+        serial = await robot_io.AsyncSerial(MuteArduino(timeout=0.0)).open()
+        link = await robot_io.SerialLink(serial).start()
+        status = await link.command("MOVE forward 100", timeout=0.1)
+        await link.close()
+
+        # consommateur absent: la lecture s'arrête au-delà de `limit`, puis reprend
+        flood = SimulatedArduino(timeout=0.0)
+        flood._tx.extend(b"x" * 30 + b"\n" * 100)
+        reader = await robot_io.AsyncSerial(flood, poll=0.001, limit=64).open()
+        await asyncio.sleep(0.05)
+        paused = reader._paused
+        lines = [await reader.readline(timeout=0.5) for _ in range(100)]
+        flood._tx.extend(b"tail\n")
+        lines.append(await reader.readline(timeout=0.5))
+        reader.close()
+        return status, paused, lines
+
+    status, paused, lines = core.call(scenario(), timeout=5.0)
+    assert status == 'TIMEOUT'
+    assert paused
+    assert lines[0] == b"x" * 30 + b"\n" and lines[99] == b"\n"
+    assert lines[-1] == b"tail\n"
+
+
+def test_daemon_link_loopback(core):
+    daemon = robot_daemon.RobotDaemon(SimulatedArduino(timeout=0.05), port=0, host='127.0.0.1', telem_ms=50).start()
+    telemetry = []
+    link = robot_io.DaemonLink('127.0.0.1', daemon.port, on_event=core.post, on_telemetry=telemetry.append)
+    try:
+        core.call(link.connect(), timeout=3.0)
+        status, stamps = core.call(link.command("MOVE forward 200", seq=42), timeout=3.0)
+        assert status == 'OK' and set(stamps) == {'pi_recv', 'serial_write', 'ack'}
+        time.sleep(0.2)
+        assert telemetry
+        acks = []
+        bridge = robot_io.TkBridge(root=None, events=core.events, max_batch=1000)
+        bridge.on('ack', acks.append)
+        bridge.poll()
+        assert acks and acks[-1][:2] == (42, 'OK')
+    finally:
+        core.call(link.close(), timeout=3.0)
+        daemon.stop()
+
+
+def test_daemon_connect_failures_reach_tk_without_blocking(core):
+    # port fermé (refus) et délai nul (TimeoutError asyncio): résultats postés par done-callback
+    probe = robot_daemon.RobotDaemon(SimulatedArduino(timeout=0.05), port=0, host='127.0.0.1').start()
+    closed_port = probe.port
+    probe.stop()
+    results = []
+    bridge = robot_io.TkBridge(root=None, events=core.events)
+    bridge.on('connect', results.append)
+    for timeout in (3.0, 0.0):
+        link = robot_io.DaemonLink('127.0.0.1', closed_port)
+        future = core.submit(link.connect(timeout=timeout))
+        future.add_done_callback(lambda f: core.post('connect', f))
+    deadline = time.monotonic() + 3.0
+    while len(results) < 2 and time.monotonic() < deadline:
+        bridge.poll()
+        time.sleep(0.01)
+    assert len(results) == 2
+    for future in results:
+        with pytest.raises(robot_io.CONNECT_ERRORS):
+            future.result()
@@ -0,0 +1,63 @@
+# Tests de la commande de vitesse continue VEL (robot_motion.py)
+# La cinématique inverse (identique au firmware) est vérifiée dans le simulateur mécanum.
+
+import sys
+import os
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import robot_motion
+import robot_simulation
+
+
+def _drive(vx, vy, omega, seconds=1.0):
+    sim = robot_simulation.MecanumSimulation(tick_hz=200, seed=0, speed_noise=0.0)
+    sim.set_velocity(vx, vy, omega)
+    sim.run_for(seconds, publish_every=0)
+    return sim.pose - np.array([1500.0, 1000.0, 0.0])
+
+
+def test_mix_matches_firmware_tables_and_saturates():
+    assert robot_motion.mecanum_mix(200, 0, 0) == (200, 200, 200, 200)
+    # vy > 0 (gauche) = table « right » du firmware, voir robot_simulation
+    assert robot_motion.mecanum_mix(0, 200, 0) == tuple(200 * s for s in robot_simulation.FIRMWARE_MOVES["right"])
+    fl, fr, rl, rr = robot_motion.mecanum_mix(255, 255, 255)
+    assert max(abs(fl), abs(fr), abs(rl), abs(rr)) == 255
+    assert robot_motion.mecanum_mix(255, 255, 0) == (0, 255, 255, 0)
+
+
+def test_velocity_moves_in_commanded_direction():
+    dx, dy, dth = _drive(150, 0, 0)
+    assert dx > 100 and abs(dy) < 1e-6
+    dx, dy, dth = _drive(0, -150, 0)
+    assert dy < -100 and abs(dx) < 1e-6
+    dx, dy, dth = _drive(0, 0, 100, seconds=0.5)
+    assert dth > 0 and abs(dx) < 1e-6
+    dx, dy, dth = _drive(120, 120, 0)
+    assert dx > 50 and dy > 50
+
+
+def test_joystick_mapping():
+    assert robot_motion.joystick_to_velocity(0.05, -0.05, 0.0) == (0, 0, 0)  # zone morte
+    vx, vy, omega = robot_motion.joystick_to_velocity(0.0, -1.0, 0.0)
+    assert (vx, vy, omega) == (255, 0, 0)
+    vx, vy, omega = robot_motion.joystick_to_velocity(1.0, 0.0, 1.0)
+    assert vy == -255 and omega == -255
+    # expo: à mi-course, moins de la moitié de la vitesse
+    assert 0 < robot_motion.joystick_to_velocity(0.0, -0.5, 0.0)[0] < 128
+
+
+def test_client_deduplicates_and_always_stops():
+    sent = []
+    client = robot_motion.MotionClient(lambda cmd: sent.append(cmd) or "OK", keepalive=10.0)
+    assert client.velocity(100, 0, 0) == "OK"
+    assert client.velocity(100.2, 0, 0) is None
+    client.joystick(0.0, -1.0, 0.0)
+    client.stop()
+    client.stop()
+    assert sent == ["VEL 100 0 0", "VEL 255 0 0", "VEL 0 0 0", "VEL 0 0 0"]
+    assert client.skipped == 1
@@ -0,0 +1,186 @@
+# Tests du suivi multi-robots (robot_registry.py): registre et robots modifiés, télémétrie
+# multiplexée, dessin groupé du terrain (TerrainSprites sur canevas factice) et banc rapide.
+
+import sys
+import os
+import json
+import time
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+BENCH = os.path.join(ROOT, 'bench')
+for path in (ROOT, BENCH):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import pytest
+
+import robot_daemon
+from arduino_sim import SimulatedArduino
+from robot_interface import TerrainSprites
+from robot_registry import MultiTelemetryDecoder, RobotRegistry
+from robot_state import RobotStateManager
+from telemetry import TelemetryFrame, format_telemetry
+
+
+def _line(robot_id, t_ms, ticks):
+    line = format_telemetry(TelemetryFrame(t_ms, 850, (90, -90, 0, 90), (ticks,) * 4))
+    return (f"@{robot_id} {line}\n" if robot_id else f"{line}\n").encode('ascii')
+
+
+class FakeCanvas:
+    def __init__(self):
+        self.items = {}
+        self.calls = []
+
+    def _create(self, kind):
+        def create(*coords, **options):
+            item = len(self.items) + 1
+            self.items[item] = (kind, coords)
+            self.calls.append(('create', kind))
+            return item
+        return create
+
+    def __getattr__(self, name):
+        if name.startswith('create_'):
+            return self._create(name[7:])
+        raise AttributeError(name)
+
+    def coords(self, item, *coords):
+        self.items[item] = (self.items[item][0], coords)
+        self.calls.append(('coords', item))
+
+    def delete(self, item):
+        del self.items[item]
+        self.calls.append(('delete', item))
+
+
+def test_registry_tracks_dirty_robots_with_separate_locks():
+    main = RobotStateManager()
+    registry = RobotRegistry()
+    assert registry.add('main', main) is main
+    pami = registry.add('pami1')
+    assert registry.add('pami1') is pami and len(registry) == 2 and pami._lock is not main._lock
+    seen = []
+    registry.add_listener(lambda robot_id, state: seen.append(robot_id))
+    assert registry.take_dirty() == {'main', 'pami1'}
+
+    pami.update_position(500.0, 250.0, 90.0)
+    pami.set_battery_level(40.0)
+    assert registry.take_dirty() == {'pami1'} and registry.take_dirty() == set()
+    assert seen == ['pami1', 'pami1']
+
+    positions = registry.snapshot(lambda s: (s.position.x, s.battery_level))
+    assert positions == {'main': (0.0, 100.0), 'pami1': (500.0, 40.0)}
+
+    assert registry.remove('pami1') is pami and 'pami1' not in registry
+    pami.update_position(0.0, 0.0, 0.0)  # plus suivi
+    assert registry.take_dirty() == {'pami1'} and seen == ['pami1', 'pami1']
+
+
+def test_multiplexed_telemetry_routes_frames_per_robot():
+    registry = RobotRegistry()
+    main = registry.add('main')
+    lines = []
+    mux = MultiTelemetryDecoder(registry, on_line=lambda robot_id, line: lines.append((robot_id, line)))
+    data = _line(None, 0, 0) + _line('pami1', 0, 0) + b"@pami1 OK 12\n" + _line('pami2', 0, 0)
+    data += _line(None, 100, 60) + _line('pami1', 100, 30) + b"@pami2 T 1 2*00\n"
+    # découpage arbitraire du flux
+    decoded = sum(mux.feed(data[i:i + 7]) for i in range(0, len(data), 7))
+    assert decoded == 5 and mux.frames == 5 and mux.errors == 1
+    assert registry.ids() == ['main', 'pami1', 'pami2']
+    assert lines == [('pami1', 'OK 12')]
+    # 60 ticks en 100 ms = 100 tr/min, 30 ticks = 50 tr/min
+    assert main.get_state().wheels[0].speed == pytest.approx(100.0)
+    pami1 = registry['pami1'].get_state()
+    assert pami1.wheels[0].speed == pytest.approx(50.0) and pami1.wheels[1].state == 'backward'
+
+    strict = MultiTelemetryDecoder(registry, auto_add=False)
+    assert strict.feed(_line('pami9', 0, 0)) == 0 and strict.unknown == 1 and 'pami9' not in registry
+
+
+def test_multiplexed_telemetry_follows_registry_changes_and_bounds_auto_add():
+    registry = RobotRegistry()
+    mux = MultiTelemetryDecoder(registry, auto_add=False)
+    pami = registry.add('pami1')
+    assert mux.feed(_line('pami1', 0, 0)) == 1
+    # robot retiré: ses trames ne mettent plus à jour le gestionnaire détaché
+    registry.remove('pami1')
+    pami.update_position(1.0, 2.0, 3.0)
+    assert mux.feed(_line('pami1', 100, 30)) == 0 and mux.unknown == 1
+    assert pami.get_state().position.x == 1.0 and mux.frames == 1
+
+    # auto_add: le robot retiré revient avec un gestionnaire neuf
+    mux.auto_add = True
+    assert mux.feed(_line('pami1', 200, 60)) == 1 and registry.ids() == ['pami1']
+    assert registry['pami1'] is not pami and mux.frames == 2
+
+    # identifiants corrompus et nombre de robots bornés
+    mux.max_robots = 3
+    assert mux.feed(b"@p\xe9mi T 1 2*00\n" + _line('x' * 40, 0, 0)) == 0
+    for i in range(5):
+        mux.feed(_line(f'pami{i + 2}', 0, 0))
+    assert registry.ids() == ['pami1', 'pami2', 'pami3'] and mux.unknown == 6
+
+def test_daemon_relays_multiplexed_frames_to_the_registry():
+    class Gateway(SimulatedArduino):
+        """Passerelle radio: trames des PAMI préfixées sur le même port série."""
+        def __init__(self, lines, **kwargs):
+            super().__init__(**kwargs)
+            self.lines = list(lines)
+
+        def readline(self):
+            return self.lines.pop(0) if self.lines else super().readline()
+
+    registry = RobotRegistry()
+    main = registry.add('main')
+    mux = MultiTelemetryDecoder(registry)
+    gateway = Gateway([], timeout=0.05)
+    daemon = robot_daemon.RobotDaemon(gateway, port=0, host='127.0.0.1').start()
+    client = robot_daemon.DaemonClient('127.0.0.1', daemon.port, on_telemetry=mux.feed_line)
+    try:
+        client.connect()
+        gateway.lines += [_line('pami1', 0, 0), _line(None, 0, 0), _line('pami1', 100, 30), _line(None, 100, 60)]
+        deadline = time.monotonic() + 3.0
+        while mux.frames < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert registry.ids() == ['main', 'pami1']
+        assert registry['pami1'].get_state().wheels[0].speed == pytest.approx(50.0)
+        assert main.get_state().wheels[0].speed == pytest.approx(100.0)
+    finally:
+        client.close()
+        daemon.stop()
+
+def test_terrain_sprites_move_items_and_skip_unchanged():
+    canvas = FakeCanvas()
+    sprites = TerrainSprites(canvas)
+    registry = RobotRegistry()
+    pami = registry.add('pami1')
+    state = pami.get_state()
+
+    assert sprites.draw('pami1', state, '#a78bfa', label='pami1')
+    assert [c[0] for c in canvas.calls] == ['create'] * 3
+    assert not sprites.draw('pami1', state, '#a78bfa', label='pami1')  # pose inchangée: aucun appel
+
+    pami.update_position(1500.0, 1000.0, 45.0)
+    canvas.calls.clear()
+    assert sprites.draw('pami1', pami.get_state(), '#a78bfa', label='pami1')
+    assert [c[0] for c in canvas.calls] == ['coords'] * 3 and len(canvas.items) == 3
+    oval = canvas.items[1][1]
+    assert (oval[0] + oval[2]) / 2 == 250.0  # milieu du terrain (500 px pour 3000 mm)
+
+    sprites.remove('pami1')
+    assert not canvas.items and 'pami1' not in sprites
+
+
+def test_multi_robot_bench_smoke(tmp_path):
+    import bench_multi_robot
+    out = tmp_path / 'multi.json'
+    results = bench_multi_robot.main(['--robots', '5', '--seconds', '0.5', '--json', str(out)])
+    original, single, fleet = (results['scenarios'][name] for name in ('original', 'single', 'fleet'))
+    # redessin d'origine: suppression + recréation du corps et de la flèche (sauf au premier rafraîchissement)
+    assert 2 < original['canvas_calls_per_tick'] <= 4
+    # dessin groupé: au plus deux appels canevas (corps, flèche) + étiquette par robot et par rafraîchissement
+    assert single['canvas_calls_per_tick'] <= 2
+    assert fleet['canvas_calls_per_tick'] <= 2 + 3 * 4
+    assert fleet['cpu_ms_per_s_per_robot'] < 2.0 * single['cpu_ms_per_s_per_robot']
+    assert json.loads(out.read_text())['meta']['bench'] == 'multi_robot'
@@ -0,0 +1,74 @@
+# Tests du moteur de simulation mécanum (robot_simulation.py)
+
+import sys
+import os
+import time
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import robot_simulation
+from robot_state import RobotStateManager
+
+
+def _run(direction, seconds=1.0, speed=200, seed=0):
+    sim = robot_simulation.MecanumSimulation(tick_hz=200, seed=seed, speed_noise=0.0)
+    sim.command(direction, speed)
+    sim.run_for(seconds, publish_every=0)
+    return sim.pose - np.array([1500.0, 1000.0, 0.0])
+
+
+def test_firmware_moves_kinematics():
+    dx, dy, dth = _run("forward")
+    assert dx > 100 and abs(dy) < 1e-6 and abs(dth) < 1e-9
+    dx, dy, dth = _run("forwardRight")
+    assert dx > 50 and dy < -50 and abs(dx + dy) < 1e-6
+    dx, dy, dth = _run("forwardLeft")
+    assert dx > 50 and dy > 50
+    # tables du firmware: « right » / « rotateCW » vont à gauche / anti-horaire avec des rouleaux en X
+    dx, dy, dth = _run("right")
+    assert abs(dx) < 1e-6 and dy > 100
+    dx, dy, dth = _run("rotateCW", seconds=0.5)
+    assert abs(dx) < 1e-6 and abs(dy) < 1e-6 and dth > 0
+    np.testing.assert_allclose(_run("stop"), 0.0)
+
+
+def test_seeded_runs_are_reproducible():
+    a = robot_simulation.MecanumSimulation(tick_hz=500, seed=3)
+    b = robot_simulation.MecanumSimulation(tick_hz=500, seed=3)
+    a.run_for(5.0, publish_every=0)
+    b.run_for(5.0, publish_every=0)
+    assert a.ticks == b.ticks == 2500
+    np.testing.assert_array_equal(a.pose, b.pose)
+    assert a.frame() == b.frame()
+    assert 0.0 <= a.pose[0] <= 3000.0 and 0.0 <= a.pose[1] <= 2000.0
+
+
+def test_manager_receives_whole_frames():
+    manager = RobotStateManager()
+    notifications = []
+    manager.add_listener(lambda state: notifications.append(state.last_update))
+    sim = robot_simulation.MecanumSimulation(manager, tick_hz=100, seed=1)
+    sim.run_for(1.0)
+    # une notification par tick (et non une par champ)
+    assert len(notifications) == 100
+    state = manager.get_state()
+    frame = sim.frame()
+    assert state.position.x == pytest.approx(frame['position'][0])
+    assert [w.encoder_ticks for w in state.wheels] == frame['wheel_ticks']
+    assert [s.value for s in state.sensors] == pytest.approx(frame['sensor_values'])
+
+
+def test_accelerated_background_simulation():
+    manager = RobotStateManager()
+    manager.start_simulation(tick_hz=1000, time_scale=0, seed=2)
+    try:
+        time.sleep(0.3)
+    finally:
+        manager.stop_simulation()
+    assert manager.simulation is None
+    assert manager.get_state().is_connected
@@ -0,0 +1,106 @@
+# Tests des encodages de l'état (state_codec.py): allers-retours struct, MessagePack et delta
+# sur les deux modèles d'état, plus un passage rapide du banc.
+
+import sys
+import os
+import json
+import struct
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+BENCH = os.path.join(ROOT, 'bench')
+for path in (ROOT, BENCH):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import pytest
+
+import state_codec
+from compact_state import CompactState
+from robot_state import RobotState, RobotStateManager
+
+
+def _match_state(compact=False):
+    manager = RobotStateManager(compact=compact)
+    manager.update_frame(position=(1234.5, 876.25, 90.0), wheel_states=['forward', 'forward', 'backward', 'stopped'],
+                         wheel_speeds=(1.5, 2.0, -3.25, 0.0), wheel_ticks=(10, -20, 30, 400000),
+                         sensor_values=(150.0, 300.0, 0.0, 0.0, 42.5, 0.0, 0.0), battery_level=80.0)
+    state = manager.get_state()
+    state.detected_aruco_ids = [3, 42]
+    state.score = 17
+    return state
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_round_trips_match_to_dict(compact):
+    state = _match_state(compact)
+    expected = state.to_dict()
+
+    assert state_codec.decode_msgpack(state_codec.encode_msgpack(state)).to_dict() == expected
+    codec = state_codec.StructCodec()
+    data = codec.encode(state)
+    assert len(data) == codec.size < len(json.dumps(expected)) // 5
+    # valeurs choisies exactement représentables en float32
+    assert codec.decode(bytes(data), CompactState()).to_dict() == expected
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_struct_truncates_and_pads_aruco_ids(compact):
+    codec = state_codec.StructCodec()
+    state = _match_state(compact)
+    max_ids = state_codec.MAX_ARUCO_IDS
+    # bloc des ids en fin de trame: nombre (B) puis MAX_ARUCO_IDS emplacements (H)
+    ids_block = struct.Struct('<B' + 'H' * max_ids)
+    offset = codec.size - ids_block.size
+    # liste longue d'abord: les emplacements libres des trames suivantes doivent être remis à zéro
+    for ids in (list(range(1, max_ids + 3)), [5], []):
+        state.detected_aruco_ids = ids
+        data = bytes(codec.encode(state))
+        count, *slots = ids_block.unpack_from(data, offset)
+        kept = ids[:max_ids]
+        assert count == len(kept)
+        assert slots == kept + [0] * (max_ids - len(kept))
+        assert codec.decode(data).detected_aruco_ids == kept
+
+
+def test_msgpack_subset_matches_format():
+    obj = [None, True, False, 0, 127, 128, -1, -33, 70000, -70000, 2 ** 40, 1.5, 'é' * 40, b'\x00\x01',
+           list(range(20)), {1: 'a', 'k': [2.25]}]
+    data = state_codec.pack(obj)
+    assert state_codec.unpack(data) == obj
+    # octets de référence de la spécification
+    assert state_codec.pack([1, -1, 'ab', None]) == b'\x94\x01\xff\xa2ab\xc0'
+    assert state_codec.pack({0: 1.0}) == b'\x81\x00\xcb\x3f\xf0' + b'\x00' * 6
+
+
+def test_delta_sends_only_changes_and_detects_gaps():
+    state = _match_state()
+    encoder, decoder = state_codec.DeltaEncoder(), state_codec.DeltaDecoder()
+    mirror = RobotState()
+    full = encoder.encode(state)
+    decoder.decode(full, mirror)
+    assert encoder.changed == len(state_codec.FIELDS)
+
+    state.position.x += 2.5
+    state.wheels[1].encoder_ticks += 12
+    delta = encoder.encode(state)
+    assert encoder.changed == 2 and len(delta) < len(full) // 5
+    assert decoder.decode(delta, mirror).to_dict() == state.to_dict()
+
+    state.score += 1
+    encoder.encode(state)  # image perdue
+    state.score += 1
+    with pytest.raises(ValueError):
+        decoder.decode(encoder.encode(state), mirror)
+    encoder.reset()  # image complète: le décodeur se resynchronise
+    assert decoder.decode(encoder.encode(state), mirror).score == state.score
+
+
+def test_codec_bench_smoke(tmp_path):
+    import bench_state_codec
+    out = tmp_path / 'codec.json'
+    results = bench_state_codec.main(['--frames', '20', '--number', '50', '--json', str(out)])
+    scenarios = results['scenarios']
+    assert {'json', 'struct', 'msgpack', 'delta'} <= set(scenarios)
+    assert scenarios['delta']['bytes'] < scenarios['msgpack']['bytes'] < scenarios['json']['bytes']
+    assert scenarios['struct']['encode_us'] < scenarios['json']['encode_us']
+    assert json.loads(out.read_text())['meta']['bench'] == 'state_codec'
@@ -0,0 +1,122 @@
+# Tests de la diffusion d'état (state_sync.py): miroirs multiples par boucle locale,
+# limite de cadence par client et déconnexion d'un client qui ne lit plus.
+
+import sys
+import os
+import socket
+import time
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from robot_state import RobotStateManager
+from state_sync import HELLO, MAGIC, StateBroadcastServer, StateSyncClient
+
+
+def _frame(manager, i):
+    manager.update_frame(position=(300.0 + i, 200.0 + i * 0.5, (i * 7) % 360), wheel_states=['forward'] * 4,
+                         wheel_speeds=(i, i, i, i), wheel_ticks=(i * 12,) * 4, sensor_values=(i % 50,) * 7,
+                         battery_level=80.0)
+
+
+def _wait(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_mirrors_follow_source_with_deltas():
+    source = RobotStateManager()
+    source.set_mode('manual')
+    server = StateBroadcastServer(source, port=0, host='127.0.0.1', max_rate=200.0)
+    mirrors = [RobotStateManager(), RobotStateManager(compact=True)]
+    clients = [StateSyncClient('127.0.0.1', m, port=server.port) for m in mirrors]
+    try:
+        # état complet dès la connexion, sans attendre de mise à jour
+        assert _wait(lambda: all(m.get_state().mode == 'manual' for m in mirrors))
+        for i in range(1, 40):
+            _frame(source, i)
+            time.sleep(0.005)
+        source.update_aruco_detection(True, [7, 21])
+        expected = source.get_state().to_dict()
+        for mirror in mirrors:
+            assert _wait(lambda: mirror.get_state().to_dict() == expected)
+        subscriber = server.clients[0]
+        # après l'image complète, seuls les champs modifiés passent
+        assert subscriber.bytes / subscriber.sent < 90
+    finally:
+        for client in clients:
+            client.close()
+        server.close()
+
+
+def test_per_client_rate_limit():
+    source = RobotStateManager()
+    server = StateBroadcastServer(source, port=0, host='127.0.0.1', max_rate=200.0)
+    fast, slow = RobotStateManager(), RobotStateManager()
+    clients = [StateSyncClient('127.0.0.1', fast, port=server.port),
+               StateSyncClient('127.0.0.1', slow, port=server.port, rate=5.0)]
+    try:
+        assert _wait(lambda: all(c.frames for c in clients))
+        t0 = time.monotonic()
+        i = 0
+        while time.monotonic() - t0 < 0.6:
+            i += 1
+            _frame(source, i)
+            time.sleep(0.002)
+        # dernier état toujours livré, même au client lent
+        assert _wait(lambda: slow.get_state().position.x == 300.0 + i)
+        assert clients[1].frames <= 6
+        assert clients[0].frames > 3 * clients[1].frames
+    finally:
+        for client in clients:
+            client.close()
+        server.close()
+
+
+def test_stalled_client_is_dropped():
+    source = RobotStateManager()
+    server = StateBroadcastServer(source, port=0, host='127.0.0.1', max_rate=1000.0, send_timeout=0.2,
+                                  sndbuf=4096)
+    healthy = RobotStateManager()
+    client = StateSyncClient('127.0.0.1', healthy, port=server.port)
+    stalled = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+    stalled.connect(('127.0.0.1', server.port))
+    stalled.sendall(HELLO.pack(MAGIC, 0.0))  # puis ne lit plus rien
+    try:
+        assert _wait(lambda: server.client_count == 2)
+        i = 0
+        t0 = time.monotonic()
+        while server.dropped == 0 and time.monotonic() - t0 < 5.0:
+            i += 1
+            _frame(source, i)
+            time.sleep(0.001)
+        assert server.dropped == 1 and server.client_count == 1
+        # l'autre client continue de suivre
+        assert _wait(lambda: healthy.get_state().position.x == 300.0 + i)
+    finally:
+        stalled.close()
+        client.close()
+        server.close()
+
+
+def test_idle_mirror_stays_connected():
+    source = RobotStateManager()
+    server = StateBroadcastServer(source, port=0, host='127.0.0.1', keepalive=0.1)
+    mirror = RobotStateManager()
+    client = StateSyncClient('127.0.0.1', mirror, port=server.port, read_timeout=0.5)
+    try:
+        assert _wait(lambda: client.frames == 1)
+        subscriber = server.clients[0]
+        # état inchangé bien au-delà du délai de lecture du client: pas de reconnexion
+        time.sleep(1.5)
+        assert client.connected and server.clients == [subscriber]
+        assert client.frames == 1 and not client.last_error
+        _frame(source, 1)
+        assert _wait(lambda: mirror.get_state().position.x == 301.0)
+    finally:
+        client.close()
+        server.close()
@@ -0,0 +1,124 @@
+# Tests de la télémétrie codeurs/PWM (telemetry.py) contre le port série simulé (arduino_sim.py)
+# L'horloge du faux Arduino est pilotée par le test: déroulement déterministe, sans attente.
+
+import sys
+import os
+import io
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import control_robot
+import telemetry
+from arduino_sim import SimulatedArduino
+from robot_simulation import MecanumSimulation
+from robot_state import RobotStateManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def _arduino(**kwargs):
+    clock = FakeClock()
+    sim = MecanumSimulation(tick_hz=100, seed=0, speed_noise=0.0, script=())
+    return SimulatedArduino(sim, timeout=0.0, clock=clock, **kwargs), clock
+
+
+def test_parse_roundtrip_and_checksum():
+    frame = telemetry.TelemetryFrame(1234, 850, (200, -200, 0, 255), (10, -20, 30, -40))
+    line = telemetry.format_telemetry(frame)
+    assert line.startswith("T 1234 850 200 -200 0 255 10 -20 30 -40*")
+    assert telemetry.parse_telemetry(line) == frame
+    # caractère altéré, somme de contrôle absente ou trame tronquée: rejet
+    assert telemetry.parse_telemetry(line.replace("850", "851")) is None
+    assert telemetry.parse_telemetry(line.split('*')[0]) is None
+    assert telemetry.parse_telemetry("T 1 2 3*" + format(telemetry.checksum("T 1 2 3"), '02X')) is None
+    assert telemetry.parse_telemetry("OK 12") is None
+
+
+def test_decoder_splits_stream_and_updates_wheels():
+    manager = RobotStateManager()
+    notified = []
+    manager.add_listener(lambda state: notified.append(state))
+    replies = []
+    decoder = telemetry.TelemetryDecoder(manager, ticks_per_rev=360, on_line=replies.append)
+
+    a = telemetry.format_telemetry(telemetry.TelemetryFrame(1000, 900, (200, 200, -200, 0), (0, 0, 0, 0)))
+    b = telemetry.format_telemetry(telemetry.TelemetryFrame(1100, 900, (200, 200, -200, 0), (60, 60, -60, 0)))
+    data = (a + "\r\nOK 3\r\n" + b + "\r\nT garbage*00\r\n").encode()
+    # octet par octet: les lignes partielles sont conservées entre deux appels
+    decoded = sum(decoder.feed(data[i:i + 1]) for i in range(len(data)))
+
+    assert decoded == 2 and decoder.errors == 1
+    assert replies == ["OK 3"]
+    assert len(notified) == 2  # une notification par trame, pas par roue
+    wheels = manager.get_state().wheels
+    # 60 ticks en 100 ms à 360 ticks/tour = 100 tr/min
+    assert [round(w.speed) for w in wheels] == [100, 100, -100, 0]
+    assert [w.encoder_ticks for w in wheels] == [60, 60, -60, 0]
+    assert [w.target_speed for w in wheels] == [200, 200, -200, 0]
+    assert [w.state for w in wheels] == ["forward", "forward", "backward", "stopped"]
+
+
+def test_simulated_port_streams_frames_between_replies():
+    port, clock = _arduino()
+    manager = RobotStateManager()
+    decoder = telemetry.TelemetryDecoder(manager, ticks_per_rev=port.sim.ticks_per_rev)
+    frames = []
+
+    response, _, _ = control_robot.send_command_timed("TELEM 100", seq=1, port=port)
+    assert response == "OK 1"
+    response, _, _ = control_robot.send_command_timed("MOVE forward 255", seq=2, port=port,
+                                                     on_telemetry=frames.append)
+    assert response == "OK 2"
+
+    clock.t += 1.0
+    while port.in_waiting:
+        decoder.feed(port.read(port.in_waiting))
+    assert decoder.frames == 10
+    assert decoder.last.pwm == (255, 255, 255, 255)
+    # moteurs à 150 tr/min (constante de temps 0.15 s): vitesse établie en fin de seconde
+    assert all(140 < w.speed < 155 for w in manager.get_state().wheels)
+
+    # une trame arrive pendant l'attente de la réponse: transmise à on_telemetry, réponse intacte
+    clock.t += 0.1
+    response, _, _ = control_robot.send_command_timed("VEL 0 0 0", seq=3, port=port,
+                                                     on_telemetry=frames.append)
+    assert response == "OK 3"
+    assert len(frames) == 1 and telemetry.parse_telemetry(frames[0]) is not None
+
+
+def test_stdin_bridge_relays_telemetry():
+    port, clock = _arduino()
+    port.write(b"TELEM 50\n")
+    port.readline()
+    clock.t += 0.2
+    out = io.StringIO()
+    control_robot.stdin_bridge(io.StringIO("#7 MOVE stop 0\n"), out, port)
+    lines = out.getvalue().splitlines()
+    assert sum(telemetry.is_telemetry(l) for l in lines) == 4
+    assert lines[-1].startswith("TRACE 7 ") and lines[-1].endswith("OK 7")
+    assert port.commands == ["TELEM 50", "MOVE stop 0"]
+
+
+def test_terminal_filter_hides_frames_split_across_chunks():
+    frame = telemetry.format_telemetry(telemetry.TelemetryFrame(1200, 850, (90, 90, 90, 90), (10, 10, 10, 10)))
+    # trames du robot principal et d'un robot secondaire (flux multiplexé `@<id> `)
+    text = "OK 3\r\n" + frame + "\r\n@pami1 " + frame + "\r\nTRACE 3 1 2 3 OK 3\r\nadmin@PEI:~ $ "
+    for size in (1, 3, 7, len(text)):
+        filt = telemetry.TerminalFilter()
+        shown = "".join(filt.feed(text[i:i + size]) for i in range(0, len(text), size))
+        assert shown == "OK 3\r\nTRACE 3 1 2 3 OK 3\r\nadmin@PEI:~ $ "
+
+
+def test_robot_id_prefix():
+    assert telemetry.split_robot_id("@pami1 T 1 2*00") == ('pami1', "T 1 2*00")
+    assert telemetry.split_robot_id("T 1 2*00") == (None, "T 1 2*00")
+    assert telemetry.is_any_telemetry("@pami1 T 1 2*00") and telemetry.is_any_telemetry("T 1 2*00")
+    assert not telemetry.is_any_telemetry("@pami1 OK 3") and not telemetry.is_telemetry("@pami1 T 1 2*00")
@@ -0,0 +1,83 @@
+# Tests du flux vidéo JPEG (video_stream.py)
+# Régulation qualité/cadence et aller-retour serveur -> client sur la boucle locale.
+
+import sys
+import os
+import time
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import video_stream
+
+
+def test_adaptive_rate_degrades_then_recovers():
+    rate = video_stream.AdaptiveRate(fps=15.0, quality=70, min_quality=30)
+    # lien saturé: la qualité baisse d'abord, puis la cadence
+    for _ in range(20):
+        rate.update(20000, 0.2)
+    assert rate.quality == 30
+    assert rate.fps < 15.0
+    slow_fps = rate.fps
+    # lien rapide: la cadence remonte avant la qualité
+    rate.update(20000, 0.001)
+    assert rate.fps > slow_fps and rate.quality == 30
+    for _ in range(40):
+        rate.update(20000, 0.001)
+    assert rate.fps == 15.0 and rate.quality == rate.max_quality
+
+
+def test_encode_downscales_and_ppm_roundtrip():
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    frame[:, :, 2] = 200
+    jpeg, w, h = video_stream.encode_frame(frame, 480, 70)
+    assert (w, h) == (480, 270)
+    decoded = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    ppm = video_stream.frame_to_ppm(decoded)
+    back = cv2.imdecode(np.frombuffer(ppm, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert back.shape == (270, 480, 3)
+    np.testing.assert_allclose(back.mean(axis=(0, 1)), decoded.mean(axis=(0, 1)), atol=1.0)
+
+
+def test_server_to_client_loopback():
+    server = video_stream.FrameStreamServer(port=0, host='127.0.0.1', max_width=320)
+    client = video_stream.FrameStreamClient('127.0.0.1', server.port, retry=0.2)
+    try:
+        deadline = time.monotonic() + 5.0
+        while server.client_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        frame = np.full((480, 640, 3), 128, dtype=np.uint8)
+        ppm = None
+        while ppm is None and time.monotonic() < deadline:
+            server.publish(frame, 1.25)
+            time.sleep(0.05)
+            ppm = client.latest()
+        assert ppm is not None and ppm.startswith(b'P6 320 240 255\n')
+        assert client.size == (320, 240)
+        assert client.latest() is None  # une image n'est rendue qu'une fois
+    finally:
+        client.close()
+        server.close()
+
+
+def test_idle_stream_keeps_client_connected():
+    server = video_stream.FrameStreamServer(port=0, host='127.0.0.1', max_width=320, keepalive=0.1)
+    client = video_stream.FrameStreamClient('127.0.0.1', server.port, retry=0.2, read_timeout=0.5)
+    try:
+        deadline = time.monotonic() + 5.0
+        while server.client_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        sender = server._clients[0]
+        # détecteur muet bien au-delà du délai de lecture: pas de reconnexion
+        time.sleep(1.5)
+        assert client.connected and server._clients == [sender]
+        assert client.frames == 0 and not client.last_error
+    finally:
+        client.close()
+        server.close()
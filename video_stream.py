@@ -0,0 +1,360 @@
+"""
+File: `video_stream.py`
+Author: Hugo Demont
+Version: 1.0.0
+
+Flux vidéo basse bande passante du détecteur vers le tableau de bord.
+
+Le détecteur (`pos_estimation.py --stream-port 5800`) publie les images annotées,
+réduites et compressées en JPEG, sur une socket TCP. Chaque client a son propre
+thread d'envoi qui ne transmet que l'image la plus récente: un lien lent saute
+des images au lieu d'accumuler du retard. La qualité JPEG puis la cadence
+s'adaptent au temps d'envoi mesuré (`AdaptiveRate`).
+
+Trame: en-tête `HEADER` (magic, taille JPEG, timestamp, largeur, hauteur, qualité,
+FPS du détecteur) suivi des octets JPEG. Sans nouvelle image (détecteur arrêté,
+scène en pause), un en-tête de taille 0 toutes les `keepalive` secondes maintient
+la connexion: le client ne se reconnecte qu'après `read_timeout` sans rien recevoir.
+
+`FrameStreamClient` (utilisé par l'onglet « Caméra » de `robot_interface.py`)
+reçoit et décode dans un thread; le thread Tk récupère une image PPM prête à
+afficher via `latest()`.
+"""
+import socket
+import struct
+import threading
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+MAGIC = b'ARV1'
+HEADER = struct.Struct('!4sIdHHBf')
+DEFAULT_PORT = 5800
+
+
+def encode_frame(frame: np.ndarray, max_width: int, quality: int) -> Tuple[bytes, int, int]:
+    """Réduit (si besoin) puis compresse une image en JPEG. Retourne (jpeg, largeur, hauteur)."""
+    h, w = frame.shape[:2]
+    if w > max_width:
+        h = int(round(h * max_width / w))
+        w = max_width
+        frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise ValueError("Échec de l'encodage JPEG")
+    return buf.tobytes(), w, h
+
+
+def frame_to_ppm(frame: np.ndarray) -> bytes:
+    """Image BGR/gris -> PPM binaire (P6), format lu directement par tk.PhotoImage."""
+    if frame.ndim == 2:
+        rgb = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
+    else:
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    h, w = rgb.shape[:2]
+    return b'P6 %d %d 255\n' % (w, h) + rgb.tobytes()
+
+
+class AdaptiveRate:
+    """
+    Régulation qualité/cadence à partir du temps d'envoi de chaque image.
+    Occupation du lien = temps d'envoi * cadence: au-dessus de `high` on baisse
+    d'abord la qualité puis la cadence; en dessous de `low` on remonte la cadence
+    puis la qualité.
+    """
+    def __init__(self, fps: float = 15.0, quality: int = 70, min_fps: float = 2.0, max_fps: float = 15.0,
+                 min_quality: int = 30, max_quality: int = 85, low: float = 0.4, high: float = 0.8):
+        self.fps = fps
+        self.quality = quality
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.low = low
+        self.high = high
+        self.bytes_per_s = 0.0
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.fps
+
+    def update(self, nbytes: int, send_seconds: float) -> None:
+        if send_seconds > 0:
+            rate = nbytes / send_seconds
+            self.bytes_per_s = rate if self.bytes_per_s == 0 else 0.8 * self.bytes_per_s + 0.2 * rate
+        load = send_seconds * self.fps
+        if load > self.high:
+            if self.quality > self.min_quality:
+                self.quality = max(self.min_quality, self.quality - 5)
+            else:
+                self.fps = max(self.min_fps, self.fps * 0.8)
+        elif load < self.low:
+            if self.fps < self.max_fps:
+                self.fps = min(self.max_fps, self.fps * 1.25)
+            elif self.quality < self.max_quality:
+                self.quality = min(self.max_quality, self.quality + 5)
+
+
+class _ClientSender(threading.Thread):
+    def __init__(self, server: 'FrameStreamServer', conn: socket.socket, addr):
+        super().__init__(daemon=True)
+        self.server = server
+        self.conn = conn
+        self.addr = addr
+        self.rate = AdaptiveRate(fps=server.max_fps, quality=server.quality, max_fps=server.max_fps,
+                                 max_quality=server.quality)
+        self.sent = 0
+
+    def run(self):
+        last_seq = 0
+        next_time = 0.0
+        last_send = time.monotonic()
+        try:
+            while not self.server._stop.is_set():
+                item = self.server._wait_frame(last_seq, timeout=min(0.5, self.server.keepalive))
+                if item is None:
+                    if time.monotonic() - last_send >= self.server.keepalive:
+                        self.conn.sendall(HEADER.pack(MAGIC, 0, 0.0, 0, 0, 0, 0.0))
+                        last_send = time.monotonic()
+                    continue
+                seq, frame, ts, fps = item
+                now = time.monotonic()
+                if now < next_time:
+                    # trop tôt pour cette cadence: on attend, une image plus récente arrivera peut-être
+                    time.sleep(min(next_time - now, 0.05))
+                    continue
+                last_seq = seq
+                quality = self.rate.quality
+                jpeg, w, h = self.server._encoded(seq, frame, quality)
+                t0 = time.monotonic()
+                self.conn.sendall(HEADER.pack(MAGIC, len(jpeg), ts, w, h, quality, fps) + jpeg)
+                elapsed = time.monotonic() - t0
+                self.rate.update(HEADER.size + len(jpeg), elapsed)
+                self.sent += 1
+                last_send = time.monotonic()
+                next_time = t0 + self.rate.interval
+        except OSError:
+            pass
+        finally:
+            self.server._remove(self)
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+
+
+class FrameStreamServer:
+    """
+    Serveur de flux JPEG. `publish()` ne bloque jamais le détecteur: elle
+    remplace l'image courante; les threads clients encodent et envoient.
+    """
+    def __init__(self, port: int = DEFAULT_PORT, host: str = '0.0.0.0', max_width: int = 480,
+                 quality: int = 70, max_fps: float = 15.0, sndbuf: int = 65536, keepalive: float = 1.0):
+        self.max_width = max_width
+        self.quality = quality
+        self.max_fps = max_fps
+        self.sndbuf = sndbuf
+        self.keepalive = keepalive
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._frame: Optional[np.ndarray] = None
+        self._ts = 0.0
+        self._fps = 0.0
+        self._cache = {}
+        self._clients = []
+        self._stop = threading.Event()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(4)
+        self._sock.settimeout(0.5)
+        self.port = self._sock.getsockname()[1]
+        self._accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._accept_thread.start()
+
+    @property
+    def client_count(self) -> int:
+        with self._cond:
+            return len(self._clients)
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, addr = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # petit tampon d'envoi: sendall bloque dès que le lien sature, ce qui alimente AdaptiveRate
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+            sender = _ClientSender(self, conn, addr)
+            with self._cond:
+                self._clients.append(sender)
+            print(f"[INFO] Client flux vidéo connecté: {addr[0]}:{addr[1]}")
+            sender.start()
+
+    def _remove(self, sender):
+        with self._cond:
+            if sender in self._clients:
+                self._clients.remove(sender)
+
+    def publish(self, frame: np.ndarray, timestamp: float, detector_fps: float = 0.0) -> None:
+        """Publie une image (la réduction est faite ici, ce qui en fait aussi une copie)."""
+        if not self._clients:
+            return
+        h, w = frame.shape[:2]
+        if w > self.max_width:
+            small = cv2.resize(frame, (self.max_width, int(round(h * self.max_width / w))),
+                               interpolation=cv2.INTER_AREA)
+        else:
+            small = frame.copy()
+        with self._cond:
+            self._seq += 1
+            self._frame = small
+            self._ts = timestamp
+            self._fps = detector_fps
+            self._cache = {}
+            self._cond.notify_all()
+
+    def _wait_frame(self, last_seq: int, timeout: float):
+        with self._cond:
+            if self._seq == last_seq:
+                self._cond.wait(timeout)
+            if self._seq == last_seq or self._frame is None:
+                return None
+            return self._seq, self._frame, self._ts, self._fps
+
+    def _encoded(self, seq: int, frame: np.ndarray, quality: int):
+        # les clients à la même qualité partagent l'encodage
+        key = (seq, quality)
+        with self._cond:
+            cached = self._cache.get(key)
+        if cached is None:
+            cached = encode_frame(frame, self.max_width, quality)
+            with self._cond:
+                if self._seq == seq:
+                    self._cache[key] = cached
+        return cached
+
+    def close(self) -> None:
+        self._stop.set()
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        with self._cond:
+            clients = list(self._clients)
+            self._cond.notify_all()
+        for sender in clients:
+            try:
+                sender.conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sender.join(timeout=1.0)
+        self._accept_thread.join(timeout=1.0)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        r = sock.recv_into(view[got:], n - got)
+        if r == 0:
+            raise ConnectionError("Flux vidéo fermé par le serveur")
+        got += r
+    return bytes(buf)
+
+
+class FrameStreamClient:
+    """
+    Réception et décodage du flux dans un thread. Seule la dernière image est
+    conservée (déjà convertie en PPM); `latest()` la rend une seule fois.
+    Reconnexion automatique toutes les `retry` secondes, et après `read_timeout`
+    secondes sans rien recevoir (ni image, ni maintien de connexion).
+    """
+    def __init__(self, host: str, port: int = DEFAULT_PORT, retry: float = 2.0, read_timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.retry = retry
+        self.read_timeout = read_timeout
+        self.connected = False
+        self.frames = 0
+        self.fps = 0.0
+        self.kbps = 0.0
+        self.quality = 0
+        self.detector_fps = 0.0
+        self.size = (0, 0)
+        self.last_error = ''
+        self._lock = threading.Lock()
+        self._ppm: Optional[bytes] = None
+        self._sock: Optional[socket.socket] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def latest(self) -> Optional[bytes]:
+        with self._lock:
+            ppm, self._ppm = self._ppm, None
+        return ppm
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._sock = socket.create_connection((self.host, self.port), timeout=self.retry)
+                self._sock.settimeout(self.read_timeout)
+                self.connected = True
+                self._receive(self._sock)
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+            finally:
+                self.connected = False
+                if self._sock is not None:
+                    try:
+                        self._sock.close()
+                    except OSError:
+                        pass
+                    self._sock = None
+            self._stop.wait(self.retry)
+
+    def _receive(self, sock: socket.socket):
+        window_start = time.monotonic()
+        window_frames = 0
+        window_bytes = 0
+        while not self._stop.is_set():
+            magic, length, ts, w, h, quality, detector_fps = HEADER.unpack(_recv_exact(sock, HEADER.size))
+            if magic != MAGIC:
+                raise ValueError("En-tête de flux vidéo invalide")
+            if not length:
+                continue  # maintien de connexion: pas de nouvelle image
+            jpeg = _recv_exact(sock, length)
+            frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                continue
+            ppm = frame_to_ppm(frame)
+            with self._lock:
+                self._ppm = ppm
+            self.frames += 1
+            self.quality = quality
+            self.detector_fps = detector_fps
+            self.size = (w, h)
+            window_frames += 1
+            window_bytes += HEADER.size + length
+            now = time.monotonic()
+            if now - window_start >= 1.0:
+                self.fps = window_frames / (now - window_start)
+                self.kbps = 8.0 * window_bytes / (now - window_start) / 1000.0
+                window_start, window_frames, window_bytes = now, 0, 0
+
+    def close(self) -> None:
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._thread.join(timeout=2.0)